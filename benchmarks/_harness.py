@@ -0,0 +1,186 @@
+"""
+Shared helpers for the benchmark scripts
+Loads each service's app.py in-process and serves Flask apps on loopback
+so benchmarks can run without the three VMs
+"""
+
+import contextlib
+import importlib.util
+import io
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from werkzeug.serving import make_server, WSGIRequestHandler
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_service(service_dir_name, module="app"):
+    """
+    Import <service>/<module>.py as a uniquely named module
+    The service's sibling modules are removed from sys.modules afterwards so
+    same-named helpers in another service directory do not collide
+    """
+    service_dir = os.path.join(REPO_ROOT, service_dir_name)
+    module_name = f"{service_dir_name.replace('-', '_')}_{module}"
+    before = set(sys.modules)
+    sys.path.insert(0, service_dir)
+    try:
+        spec = importlib.util.spec_from_file_location(module_name, os.path.join(service_dir, f"{module}.py"))
+        loaded = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(loaded)
+    finally:
+        sys.path.remove(service_dir)
+        for name in set(sys.modules) - before:
+            module_file = getattr(sys.modules[name], "__file__", None) or ""
+            if module_file.startswith(service_dir + os.sep):
+                del sys.modules[name]
+    return loaded
+
+
+def stay_dates(days_ahead, nights=3):
+    """
+    (check_in, check_out) of a stay starting days_ahead days from today, as
+    ISO dates; the Availability service's horizon rolls on from today
+    """
+    check_in = date.today() + timedelta(days=days_ahead)
+    return check_in.isoformat(), (check_in + timedelta(days=nights)).isoformat()
+
+
+def guest_booking(i, **fields):
+    """
+    The Orchestrator's default booking for a guest of its own; the Payment
+    service's velocity rules decline a guest who books too often
+    """
+    check_in, check_out = stay_dates(30)
+    return dict({
+        "guest_name": f"Guest {i}", "guest_email": f"guest{i}@example.com", "hotel_name": "Grand Plaza",
+        "room_type": "Suite", "check_in": check_in, "check_out": check_out, "payment_method": "credit_card"
+    }, **fields)
+
+
+def unlimited_inventory(availability, rooms_per_night=10 ** 6):
+    """
+    Give every room type a huge nightly capacity in a loaded Availability app
+    The orchestrator's hardcoded booking always asks for the same Suite, which
+    would otherwise sell out after the first reservation
+    """
+    hotels = {
+        hotel_name: dict(hotel, rooms={
+            room_type: dict(room_info, available=rooms_per_night)
+            for room_type, room_info in hotel["rooms"].items()
+        })
+        for hotel_name, hotel in availability.HOTELS_DATABASE.items()
+    }
+    availability.INVENTORY = availability.Inventory(
+        hotels, availability.INVENTORY_START_DATE, availability.INVENTORY_HORIZON_DAYS
+    )
+    availability.AVAILABILITY_CACHE.clear()
+    availability.INVENTORY.add_listener(availability.AVAILABILITY_CACHE.invalidate)
+
+
+def temporary_transaction_store(payment):
+    """Point a loaded Payment app's store and velocity counts at a throwaway SQLite file, not vcc-3/payments.db"""
+    path = os.path.join(tempfile.mkdtemp(prefix="vcc3-bench-"), "payments.db")
+    payment.TRANSACTION_DB_PATH = path
+    payment.TRANSACTION_STORE = payment.create_store("sqlite", path)
+    payment.PAYMENT_RULES = payment.new_payment_rules()
+    return path
+
+
+def temporary_saga_log(orchestrator):
+    """Point a loaded Orchestrator app at a throwaway saga log instead of vcc-1/sagas.db"""
+    path = os.path.join(tempfile.mkdtemp(prefix="vcc1-bench-"), "sagas.db")
+    orchestrator.SAGAS = orchestrator.SagaLog(path)
+    return path
+
+
+def without_admission_control(orchestrator):
+    """Let a loaded Orchestrator app admit every booking, for benchmarks that measure something else"""
+    orchestrator.ADMISSION_CONTROL = False
+    orchestrator.ADMISSION_LIMITER = orchestrator.new_limiter()
+
+
+class QuietHandler(WSGIRequestHandler):
+    """HTTP/1.1 request handler (keep-alive) without per-request logging"""
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        # Headers and body are written separately; without TCP_NODELAY the body
+        # waits on the client's delayed ACK and every call costs ~40 ms
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def free_port():
+    """Ask the OS for an unused loopback port"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port, timeout_s=15, host="127.0.0.1"):
+    """Block until something accepts connections on host:port"""
+    deadline = time.time() + timeout_s
+    while time.time() < deadline:
+        try:
+            socket.create_connection((host, port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"nothing listening on {host}:{port} after {timeout_s}s")
+
+
+def with_latency(app, delay_s):
+    """WSGI middleware that delays every response, simulating a slow downstream"""
+    if not delay_s:
+        return app
+
+    def delayed(environ, start_response):
+        time.sleep(delay_s)
+        return app(environ, start_response)
+    return delayed
+
+
+def serve_in_thread(app, host="127.0.0.1", port=0):
+    """Serve a WSGI app on a background thread; returns (server, port)"""
+    server = make_server(host, port, app, threaded=True, request_handler=QuietHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, server.server_port
+
+
+@contextlib.contextmanager
+def quiet_stdout():
+    """Swallow the services' print() progress lines while benchmarking"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies_s):
+    """Summarize a list of latencies (seconds) in milliseconds"""
+    values = sorted(latencies_s)
+    return {
+        "count": len(values),
+        "mean_ms": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "p999_ms": round(percentile(values, 99.9) * 1000, 3)
+    }
@@ -0,0 +1,46 @@
+"""
+Run one Orchestrator engine on loopback against given downstream URLs
+Used by bench_engines.py so each engine gets its own process (and core)
+
+Usage: python benchmarks/_run_orchestrator.py --engine sync|async --port P
+           --availability-url URL --payment-url URL
+"""
+
+import argparse
+import os
+import tempfile
+
+from _harness import load_service, quiet_stdout, QuietHandler
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--engine", choices=["sync", "async"], required=True)
+    parser.add_argument("--port", type=int, required=True)
+    parser.add_argument("--availability-url", required=True)
+    parser.add_argument("--payment-url", required=True)
+    args = parser.parse_args()
+    os.environ["SAGA_DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="vcc1-bench-"), "sagas.db")
+    os.environ["ADMISSION_CONTROL"] = "0"  # compare the engines, not their load shedding
+
+    if args.engine == "async":
+        from aiohttp import web
+        async_app = load_service("vcc-1", "async_app")
+        app = async_app.create_app(args.availability_url, args.payment_url)
+        web.run_app(app, host="127.0.0.1", port=args.port, print=None, access_log=None)
+        return
+
+    from werkzeug.serving import run_simple
+    orchestrator = load_service("vcc-1")
+    orchestrator.AVAILABILITY_CLIENT = orchestrator.DownstreamClient(
+        "availability", args.availability_url, pool_size=orchestrator.POOL_SIZE
+    )
+    orchestrator.PAYMENT_CLIENT = orchestrator.DownstreamClient(
+        "payment", args.payment_url, pool_size=orchestrator.POOL_SIZE
+    )
+    with quiet_stdout():
+        run_simple("127.0.0.1", args.port, orchestrator.app, threaded=True, request_handler=QuietHandler)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Benchmark: /book-hotel goodput under overload, with and without admission control
+Availability and Payment run in-process on loopback, each capped like a
+small instance: --slots requests at a time, each holding its slot for
+--service-ms, the rest waiting in line. That gives the topology a fixed
+booking capacity (three Availability and two Payment calls per booking).
+The Orchestrator is then loaded open loop (bench_topology.drive) at
+multiples of that capacity, once with ADMISSION_CONTROL off and once on
+For every offered rate: goodput (bookings confirmed per second), latency of
+every answer (shed ones included), status codes, and the limit the
+Orchestrator settled on. Without admission control goodput collapses past capacity as
+bookings time out in the queue; with it, excess bookings are shed with 503
+and goodput stays near capacity
+
+Usage: python benchmarks/bench_admission.py [--load 0.5 1 2 4] [--duration 10] [--slots 4] [--service-ms 50]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+
+from _harness import (
+    load_service, temporary_transaction_store, temporary_saga_log, serve_in_thread, quiet_stdout
+)
+from bench_topology import arrival_offsets, drive, synthetic_requests
+
+AVAILABILITY_CALLS = 3  # /check-availability, /reserve, /confirm per booking
+PAYMENT_CALLS = 2       # /validate-payment, /process-payment
+
+
+class Slots:
+    """WSGI middleware: at most slots requests at a time, each holding its slot for service_seconds"""
+
+    def __init__(self, app, slots, service_seconds):
+        self.app = app
+        self.service_seconds = service_seconds
+        self.waiting = 0  # requests holding or waiting for a slot
+        self._slots = threading.BoundedSemaphore(slots)
+        self._lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        with self._lock:
+            self.waiting += 1
+        try:
+            with self._slots:
+                time.sleep(self.service_seconds)
+                return self.app(environ, start_response)
+        finally:
+            with self._lock:
+                self.waiting -= 1
+
+    def drain(self):
+        """Wait for the queue a previous run left behind (its clients may have given up long ago)"""
+        while self.waiting:
+            time.sleep(0.1)
+
+
+def start_service(service, slots, service_seconds):
+    with quiet_stdout():
+        module = load_service(service)
+    if service == "vcc-3":
+        temporary_transaction_store(module)
+        module.PAYMENT_SUCCESS_RATE = 1.0
+    capped = Slots(module.app, slots, service_seconds)
+    _, port = serve_in_thread(capped)
+    return module, capped, f"127.0.0.1:{port}"
+
+
+def point_at(orchestrator, availability, payment):
+    """Fresh downstream clients (and breakers) for the Orchestrator, so runs do not share state"""
+    with quiet_stdout():
+        orchestrator.AVAILABILITY_CLIENT = orchestrator.DownstreamClient(
+            "availability", registry=orchestrator.new_registry("availability", availability), pool_size=256,
+            connect_timeout=orchestrator.CONNECT_TIMEOUT, read_timeout=orchestrator.AVAILABILITY_READ_TIMEOUT,
+            retries=orchestrator.DOWNSTREAM_RETRIES, retry_methods=["GET", "POST"],
+            breaker=orchestrator.new_breaker("availability", orchestrator.AVAILABILITY_SLOW_CALL_SECONDS),
+            hedge=orchestrator.new_hedge_policy()
+        )
+        orchestrator.PAYMENT_CLIENT = orchestrator.DownstreamClient(
+            "payment", registry=orchestrator.new_registry("payment", payment), pool_size=256,
+            connect_timeout=orchestrator.CONNECT_TIMEOUT, read_timeout=orchestrator.PAYMENT_READ_TIMEOUT,
+            retries=orchestrator.DOWNSTREAM_RETRIES, retry_methods=["GET", "POST"],
+            breaker=orchestrator.new_breaker("payment", orchestrator.PAYMENT_SLOW_CALL_SECONDS)
+        )
+
+
+def run(orchestrator, url, requests, rate, args):
+    offsets = arrival_offsets(rate, args.duration, "poisson", seed=int(rate))
+    with quiet_stdout():
+        result = asyncio.run(drive(url, requests, offsets, args.warmup, max_in_flight=4096,
+                                   timeout_s=args.timeout))
+    measured_for = args.duration - args.warmup
+    confirmed = result["status_codes"].get("200", 0)
+    summary = {
+        "offered_rps": result["offered_rps"],
+        "goodput_rps": round(confirmed / measured_for, 1),
+        "p50_ms": result["p50_ms"],
+        "p99_ms": result["p99_ms"],
+        "status_codes": result["status_codes"],
+        "errors": result["errors"]
+    }
+    if orchestrator.ADMISSION_LIMITER is not None:
+        snapshot = orchestrator.ADMISSION_LIMITER.snapshot()
+        summary["limit"] = snapshot["limit"]
+        summary["min_rtt_ms"] = snapshot["min_rtt_ms"]
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--load", type=float, nargs="+", default=[0.5, 1, 2, 4],
+                        help="offered rates as multiples of the booking capacity")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per run")
+    parser.add_argument("--warmup", type=float, default=2.0, help="seconds at the start of a run not measured")
+    parser.add_argument("--slots", type=int, default=4, help="requests each downstream service runs at once")
+    parser.add_argument("--service-ms", type=float, default=50.0, help="time a downstream request holds its slot")
+    parser.add_argument("--timeout", type=float, default=15.0, help="client timeout per booking")
+    args = parser.parse_args()
+
+    os.environ["INVENTORY_ROOMS"] = str(10 ** 6)
+    service_seconds = args.service_ms / 1000
+    availability, availability_slots, availability_address = start_service("vcc-2", args.slots, service_seconds)
+    _, payment_slots, payment_address = start_service("vcc-3", args.slots, service_seconds)
+    with quiet_stdout():
+        orchestrator = load_service("vcc-1")
+    temporary_saga_log(orchestrator)
+    _, port = serve_in_thread(orchestrator.app)
+    url = f"http://127.0.0.1:{port}"
+    hotels = availability.app.test_client().get("/hotels").get_json()["available_hotels"]
+    capacity = args.slots / service_seconds / max(AVAILABILITY_CALLS, PAYMENT_CALLS)
+
+    results = {"capacity_bookings_per_s": round(capacity, 1), "runs": {}}
+    for mode in ("off", "adaptive"):
+        runs = results["runs"][mode] = {}
+        for load in args.load:
+            orchestrator.ADMISSION_CONTROL = mode == "adaptive"
+            orchestrator.ADMISSION_LIMITER = orchestrator.new_limiter()
+            point_at(orchestrator, availability_address, payment_address)
+            availability_slots.drain()
+            payment_slots.drain()
+            runs[f"{load}x"] = run(orchestrator, url, synthetic_requests(hotels, seed=1), capacity * load, args)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark: Availability service requests per second with the cache cold and warm
+Cold: the availability cache is cleared before every request, so each one is
+priced against the inventory. Warm: the same queries with the cache populated.
+Also compares a full /hotels response with a 304 revalidation
+
+Usage: python benchmarks/bench_availability_cache.py [--requests 3000] [--distinct 50]
+"""
+
+import argparse
+import json
+import time
+
+import requests
+
+from _harness import load_service, serve_in_thread, summarize
+from bench_batch_availability import make_queries
+
+
+def measure(session, send, total_requests, before_each=None):
+    latencies = []
+    start = time.perf_counter()
+    for i in range(total_requests):
+        if before_each:
+            before_each()
+        request_start = time.perf_counter()
+        send(session, i)
+        latencies.append(time.perf_counter() - request_start)
+    elapsed = time.perf_counter() - start
+    result = summarize(latencies)
+    result["requests_per_s"] = round(total_requests / elapsed, 1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--distinct", type=int, default=50, help="distinct availability queries")
+    args = parser.parse_args()
+
+    availability = load_service("vcc-2")
+    server, port = serve_in_thread(availability.app)
+    base_url = f"http://127.0.0.1:{port}"
+    queries = make_queries(availability.HOTELS_DATABASE, args.distinct)
+    session = requests.Session()
+
+    def check(session, i):
+        session.post(f"{base_url}/check-availability", json=queries[i % len(queries)]).content
+
+    results = {
+        "check_availability_cold": measure(session, check, args.requests, availability.AVAILABILITY_CACHE.clear)
+    }
+    availability.AVAILABILITY_CACHE.clear()
+    for query in queries:
+        session.post(f"{base_url}/check-availability", json=query)
+    results["check_availability_warm"] = measure(session, check, args.requests)
+    results["cache_stats"] = availability.AVAILABILITY_CACHE.stats()
+
+    etag = session.get(f"{base_url}/hotels").headers["ETag"]
+    results["hotels_full"] = measure(
+        session, lambda s, i: s.get(f"{base_url}/hotels").content, args.requests
+    )
+    results["hotels_304"] = measure(
+        session, lambda s, i: s.get(f"{base_url}/hotels", headers={"If-None-Match": etag}).content, args.requests
+    )
+
+    server.shutdown()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
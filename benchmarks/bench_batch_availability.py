@@ -0,0 +1,80 @@
+"""
+Benchmark: N single /check-availability calls vs one /check-availability/batch
+Serves the Availability app on loopback and times both paths over a pooled
+keep-alive session, plus the in-process quote_batch() pricing pass alone
+
+Usage: python benchmarks/bench_batch_availability.py [--size 50] [--rounds 50]
+"""
+
+import argparse
+import itertools
+import json
+import time
+
+import requests
+
+from _harness import load_service, serve_in_thread, summarize, stay_dates
+
+
+def make_queries(hotels, size):
+    combos = itertools.cycle(
+        (hotel_name, room_type)
+        for hotel_name, hotel in hotels.items()
+        for room_type in hotel["rooms"]
+    )
+    queries = []
+    for i in range(size):
+        hotel_name, room_type = next(combos)
+        check_in, check_out = stay_dates(30 + i % 20, nights=2 + i % 5)
+        queries.append({
+            "hotel_name": hotel_name,
+            "room_type": room_type,
+            "check_in": check_in,
+            "check_out": check_out,
+            "num_guests": 1 + i % 3
+        })
+    return queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=50, help="queries per batch")
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    availability = load_service("vcc-2")
+    server, port = serve_in_thread(availability.app)
+    base_url = f"http://127.0.0.1:{port}"
+    queries = make_queries(availability.HOTELS_DATABASE, args.size)
+    session = requests.Session()
+
+    single, batch, in_process = [], [], []
+    for _ in range(args.rounds):
+        start = time.perf_counter()
+        for query in queries:
+            session.post(f"{base_url}/check-availability", json=query).json()
+        single.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        session.post(f"{base_url}/check-availability/batch", json={"queries": queries}).json()
+        batch.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        availability.quote_batch(queries, availability.HOTELS_DATABASE, availability.INVENTORY, availability.RATE_PLANS)
+        in_process.append(time.perf_counter() - start)
+
+    server.shutdown()
+    results = {
+        "batch_size": args.size,
+        f"{args.size}_single_calls": summarize(single),
+        "one_batch_call": summarize(batch),
+        "quote_batch_in_process": summarize(in_process)
+    }
+    results["speedup_p50"] = round(
+        results[f"{args.size}_single_calls"]["p50_ms"] / max(results["one_batch_call"]["p50_ms"], 1e-9), 1
+    )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark: N sequential /book-hotel calls vs one /book-hotels/batch call
+The Availability and Payment apps run on loopback with an optional simulated
+network delay; the Orchestrator is served over HTTP too so the batch
+response is really streamed. Reports total time for all N bookings and, for
+the batch, the time until the first NDJSON result arrives
+
+Usage: python benchmarks/bench_batch_booking.py [--size 100] [--delay-ms 5]
+"""
+
+import argparse
+import json
+import time
+
+import requests
+
+from _harness import (
+    load_service, unlimited_inventory, temporary_transaction_store, temporary_saga_log, serve_in_thread,
+    quiet_stdout, with_latency, stay_dates
+)
+
+
+def make_bookings(hotels, count):
+    """count booking payloads spread over every hotel and room type"""
+    rooms = [(hotel_name, room_type) for hotel_name, hotel in hotels.items() for room_type in hotel["rooms"]]
+    bookings = []
+    for i in range(count):
+        hotel_name, room_type = rooms[i % len(rooms)]
+        check_in, check_out = stay_dates(30, nights=1 + i % 5)
+        bookings.append({
+            "guest_name": f"Guest {i}",
+            "guest_email": f"guest{i}@example.com",
+            "hotel_name": hotel_name,
+            "room_type": room_type,
+            "check_in": check_in,
+            "check_out": check_out,
+            "payment_method": "credit_card"
+        })
+    return bookings
+
+
+def sequential(base_url, bookings):
+    session = requests.Session()
+    status_codes = {}
+    start = time.perf_counter()
+    for booking in bookings:
+        status_code = session.post(f"{base_url}/book-hotel", json=booking).status_code
+        status_codes[status_code] = status_codes.get(status_code, 0) + 1
+    return {"total_s": round(time.perf_counter() - start, 3), "status_codes": status_codes}
+
+
+def batch(base_url, bookings):
+    status_codes = {}
+    first_result = None
+    start = time.perf_counter()
+    with requests.post(f"{base_url}/book-hotels/batch", json={"bookings": bookings}, stream=True) as response:
+        for line in response.iter_lines():
+            item = json.loads(line)
+            if "index" not in item:
+                continue
+            if first_result is None:
+                first_result = time.perf_counter() - start
+            status_codes[item["http_status"]] = status_codes.get(item["http_status"], 0) + 1
+    return {
+        "total_s": round(time.perf_counter() - start, 3),
+        "first_result_ms": round(first_result * 1000, 1) if first_result is not None else None,
+        "status_codes": status_codes
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=100, help="bookings per run")
+    parser.add_argument("--delay-ms", type=float, default=5, help="simulated latency added to each downstream call")
+    args = parser.parse_args()
+
+    availability = load_service("vcc-2")
+    payment = load_service("vcc-3")
+    orchestrator = load_service("vcc-1")
+    unlimited_inventory(availability)
+    temporary_transaction_store(payment)
+    temporary_saga_log(orchestrator)
+    payment.PAYMENT_SUCCESS_RATE = 1.0
+
+    delay = args.delay_ms / 1000
+    availability_server, availability_port = serve_in_thread(with_latency(availability.app, delay))
+    payment_server, payment_port = serve_in_thread(with_latency(payment.app, delay))
+    orchestrator.AVAILABILITY_CLIENT = orchestrator.DownstreamClient(
+        "availability", f"http://127.0.0.1:{availability_port}", pool_size=orchestrator.POOL_SIZE
+    )
+    orchestrator.PAYMENT_CLIENT = orchestrator.DownstreamClient(
+        "payment", f"http://127.0.0.1:{payment_port}", pool_size=orchestrator.POOL_SIZE
+    )
+    orchestrator_server, orchestrator_port = serve_in_thread(orchestrator.app)
+    base_url = f"http://127.0.0.1:{orchestrator_port}"
+
+    bookings = make_bookings(availability.HOTELS_DATABASE, args.size)
+    with quiet_stdout():
+        results = {
+            "sequential_book_hotel": sequential(base_url, bookings),
+            "batch": batch(base_url, bookings)
+        }
+    results["speedup"] = round(results["sequential_book_hotel"]["total_s"] / results["batch"]["total_s"], 2)
+
+    for server in (orchestrator_server, availability_server, payment_server):
+        server.shutdown()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
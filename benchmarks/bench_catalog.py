@@ -0,0 +1,165 @@
+"""
+Benchmark: hotel catalogue cold start, memory and hot reload
+Generates a synthetic catalogue of N hotels (three room types each) as
+JSON and as the memory-mapped hotels.cat, then measures:
+1. Cold start, each in a fresh interpreter: importing the Availability app
+   on the catalogue file, against parsing the same catalogue from JSON into
+   dicts (what a file-backed HOTELS_DATABASE would cost without the
+   binary format); wall time and peak RSS of the process
+2. Reload: load_catalog() plus install_catalog() (search indexes and the
+   /hotels body included) for a changed file
+3. /check-availability latency over loopback while the catalogue is
+   reloaded in a loop, against the same requests without reloads
+
+Usage: python benchmarks/bench_catalog.py [--hotels 100000] [--requests 2000] [--reloads 3]
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+from _harness import REPO_ROOT, load_service, serve_in_thread, quiet_stdout, summarize, stay_dates
+
+ROOM_TYPES = {"Standard": (80, 200), "Deluxe": (150, 320), "Suite": (250, 600)}
+
+# Run in a fresh interpreter; prints {"seconds": ..., "max_rss_mb": ...}. Peak RSS
+# is read from VmHWM: ru_maxrss would carry the benchmark's own peak across exec
+COLD_START = """
+import json, sys, time
+start = time.perf_counter()
+{body}
+seconds = time.perf_counter() - start
+with open("/proc/self/status") as f:
+    peak_kb = next(int(line.split()[1]) for line in f if line.startswith("VmHWM:"))
+print(json.dumps({{"seconds": seconds, "max_rss_mb": peak_kb / 1024}}))
+"""
+IMPORT_APP = "sys.path.insert(0, {service_dir!r})\nimport app\nassert len(app.HOTELS_DATABASE) == {hotels}"
+PARSE_JSON = "hotels = json.load(open({source!r}))\nassert len(hotels) == {hotels}"
+IMPORT_ONLY = "sys.path.insert(0, {service_dir!r})\nimport flask, inventory, search, catalog"
+
+
+def make_catalogue(hotels, seed=1):
+    rng = random.Random(seed)
+    return {
+        f"Hotel {i}": {
+            "city": f"City {i % 500}",
+            "rooms": {
+                room_type: {"available": rng.randint(1, 20), "rate": float(rng.randint(low, high))}
+                for room_type, (low, high) in ROOM_TYPES.items()
+            }
+        }
+        for i in range(hotels)
+    }
+
+
+def cold_start(body, env=None, runs=3):
+    """Fastest of a few fresh interpreters (the file is in the page cache after the first)"""
+    best = None
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", COLD_START.format(body=body)], env={**os.environ, **(env or {})},
+            capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        if best is None or result["seconds"] < best["seconds"]:
+            best = result
+    return {"seconds": round(best["seconds"], 3), "max_rss_mb": round(best["max_rss_mb"], 1)}
+
+
+def latency(url, queries, stop=None):
+    samples = []
+    with requests.Session() as session:
+        for query in queries:
+            start = time.perf_counter()
+            response = session.post(url, json=query)
+            samples.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.text
+            if stop is not None and stop.is_set():
+                break
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--hotels", type=int, default=100000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--reloads", type=int, default=3)
+    args = parser.parse_args()
+
+    service_dir = os.path.join(REPO_ROOT, "vcc-2")
+    workdir = tempfile.mkdtemp(prefix="vcc-catalog-")
+    source = os.path.join(workdir, "hotels.json")
+    path = os.path.join(workdir, "hotels.cat")
+    catalogue = make_catalogue(args.hotels)
+    with open(source, "w") as f:
+        json.dump(catalogue, f)
+
+    availability = load_service("vcc-2")
+    catalog_module = load_service("vcc-2", "catalog")
+    start = time.perf_counter()
+    catalog_module.write_catalog(catalogue, path)
+    results = {
+        "hotels": args.hotels,
+        "json_mb": round(os.path.getsize(source) / 2 ** 20, 1),
+        "catalog_mb": round(os.path.getsize(path) / 2 ** 20, 1),
+        "compile_s": round(time.perf_counter() - start, 3)
+    }
+
+    env = {"CATALOG_PATH": path}
+    results["cold_start"] = {
+        "interpreter_and_modules": cold_start(IMPORT_ONLY.format(service_dir=service_dir)),
+        "app_on_catalog": cold_start(IMPORT_APP.format(service_dir=service_dir, hotels=args.hotels), env),
+        "json_to_dicts": cold_start(PARSE_JSON.format(source=source, hotels=args.hotels))
+    }
+
+    # Serve the big catalogue in-process and reload it while requests run
+    with quiet_stdout():
+        catalog = availability.load_catalog(path)
+        availability.CATALOG_WATCHER.path, availability.CATALOG_WATCHER.source = path, None
+        availability.install_catalog(catalog)
+    _, port = serve_in_thread(availability.app)
+    url = f"http://127.0.0.1:{port}/check-availability"
+    rng = random.Random(2)
+    check_in, check_out = stay_dates(30, nights=2)
+    queries = [{
+        "hotel_name": f"Hotel {rng.randrange(args.hotels)}", "room_type": rng.choice(list(ROOM_TYPES)),
+        "check_in": check_in, "check_out": check_out
+    } for _ in range(args.requests)]
+    latency(url, queries[:200])  # warm up
+    results["requests_idle"] = summarize(latency(url, queries))
+
+    reload_seconds = []
+    stop = threading.Event()
+
+    def reload_forever():
+        while not stop.is_set():
+            os.utime(path)  # a new file identity, so the watcher loads it again
+            start = time.perf_counter()
+            with quiet_stdout():
+                assert availability.CATALOG_WATCHER.check() is not None
+            reload_seconds.append(time.perf_counter() - start)
+            if len(reload_seconds) >= args.reloads:
+                stop.wait(0.05)
+
+    reloader = threading.Thread(target=reload_forever, daemon=True)
+    reloader.start()
+    during = []
+    while len(reload_seconds) < args.reloads:
+        during.extend(latency(url, queries[:200]))
+    stop.set()
+    reloader.join()
+    results["reload"] = summarize(reload_seconds)
+    results["requests_during_reloads"] = summarize(during)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
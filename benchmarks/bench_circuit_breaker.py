@@ -0,0 +1,71 @@
+"""
+Benchmark: /book-hotel latency while the Availability service is degraded
+Availability answers slower than the Orchestrator's read timeout, so every
+call times out. Without a breaker each booking waits out the timeout; with
+one, bookings fail fast with 503 once the breaker has opened
+
+Usage: python benchmarks/bench_circuit_breaker.py [--bookings 50] [--delay-ms 500] [--timeout-ms 200]
+"""
+
+import argparse
+import json
+import time
+
+from _harness import (
+    load_service, temporary_saga_log, quiet_stdout, serve_in_thread, summarize, with_latency,
+    guest_booking
+)
+
+
+def run(orchestrator, bookings):
+    client = orchestrator.app.test_client()
+    latencies = []
+    status_codes = {}
+    with quiet_stdout():
+        for i in range(bookings):
+            start = time.perf_counter()
+            response = client.post("/book-hotel", json=guest_booking(i))
+            latencies.append(time.perf_counter() - start)
+            status_codes[response.status_code] = status_codes.get(response.status_code, 0) + 1
+    result = summarize(latencies)
+    result["total_s"] = round(sum(latencies), 2)
+    result["status_codes"] = status_codes
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--bookings", type=int, default=50)
+    parser.add_argument("--delay-ms", type=float, default=500, help="Availability response delay")
+    parser.add_argument("--timeout-ms", type=float, default=200, help="Orchestrator read timeout")
+    args = parser.parse_args()
+
+    availability = load_service("vcc-2")
+    payment = load_service("vcc-3")
+    orchestrator = load_service("vcc-1")
+    temporary_saga_log(orchestrator)
+    availability_server, availability_port = serve_in_thread(with_latency(availability.app, args.delay_ms / 1000))
+    payment_server, payment_port = serve_in_thread(payment.app)
+
+    read_timeout = args.timeout_ms / 1000
+    results = {}
+    for label, with_breaker in (("no_breaker", False), ("breaker", True)):
+        orchestrator.AVAILABILITY_CLIENT = orchestrator.DownstreamClient(
+            "availability", f"http://127.0.0.1:{availability_port}", read_timeout=read_timeout,
+            breaker=orchestrator.new_breaker("availability", read_timeout) if with_breaker else None
+        )
+        orchestrator.PAYMENT_CLIENT = orchestrator.DownstreamClient(
+            "payment", f"http://127.0.0.1:{payment_port}",
+            breaker=orchestrator.new_breaker("payment", orchestrator.PAYMENT_SLOW_CALL_SECONDS) if with_breaker else None
+        )
+        results[label] = run(orchestrator, args.bookings)
+        orchestrator.AVAILABILITY_CLIENT.close()
+        orchestrator.PAYMENT_CLIENT.close()
+
+    availability_server.shutdown()
+    payment_server.shutdown()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark: JSON serialization cost of every endpoint's response body
+Each body is captured from the in-process services, then encoded the old way
+(Flask's default provider, stdlib json with sorted keys) and through the
+services' encoding module (orjson when installed). Bodies that are now
+pre-encoded at startup or rendered from a JSONTemplate are timed on that
+path too. Reports microseconds per body; --no-orjson times the stdlib
+fallback of the encoding module
+
+Usage: python benchmarks/bench_encoding.py [--repeat 20000] [--no-orjson]
+"""
+
+import argparse
+import json
+import sys
+import timeit
+
+from _harness import load_service, unlimited_inventory, temporary_transaction_store, quiet_stdout, stay_dates
+
+
+def capture(client, method, path, **kwargs):
+    response = getattr(client, method)(path, **kwargs)
+    return response.get_json()
+
+
+def bodies():
+    """(endpoint, body, fast path or None) for every JSON endpoint of the three services"""
+    availability = load_service("vcc-2")
+    payment = load_service("vcc-3")
+    orchestrator = load_service("vcc-1")
+    booking = load_service("vcc-1", "booking")
+    unlimited_inventory(availability)
+    temporary_transaction_store(payment)
+    payment.PAYMENT_SUCCESS_RATE = 1.0
+    check_in, check_out = stay_dates(30)
+    month_start, month_end = stay_dates(16, nights=28)
+    stay = {"hotel_name": "Grand Plaza", "room_type": "Deluxe", "check_in": check_in, "check_out": check_out}
+    charge = {
+        "booking_id": "BOOK1792206808EB1127", "guest_name": "Lakshya Vashisth", "hotel_name": "Grand Plaza",
+        "room_type": "Deluxe", "amount": 540.0, "currency": "USD", "payment_method": "credit_card",
+        "check_in": check_in, "check_out": check_out
+    }
+
+    a = availability.app.test_client()
+    p = payment.app.test_client()
+    o = orchestrator.app.test_client()
+    with quiet_stdout():
+        for i in range(100):
+            p.post("/process-payment", json=dict(charge, booking_id=f"BOOK{i}", guest_name=f"Guest {i}"))
+        confirmation = booking.confirmation(
+            booking.DEFAULT_BOOKING, "BOOK1792206808EB1127", "TXN1001", 300.0, 3, 900.0
+        )
+        approved = payment.TRANSACTION_STORE.get("TXN1001")
+        return [
+            ("vcc-1 GET /", capture(o, "get", "/"), lambda: orchestrator.WELCOME_BODY),
+            ("vcc-1 POST /book-hotel", confirmation, lambda: booking.CONFIRMATION.render(confirmation)),
+            ("vcc-1 GET /pool-stats", capture(o, "get", "/pool-stats"), None),
+            ("vcc-1 GET /circuit-breakers", capture(o, "get", "/circuit-breakers"), None),
+            ("vcc-2 GET /", capture(a, "get", "/"), lambda: availability.WELCOME_BODY),
+            ("vcc-2 GET /hotels", capture(a, "get", "/hotels"), lambda: availability.hotels_response()[0]),
+            ("vcc-2 POST /check-availability", capture(a, "post", "/check-availability", json=stay), None),
+            ("vcc-2 POST /check-availability/batch (50)",
+             capture(a, "post", "/check-availability/batch", json={"queries": [stay] * 50}), None),
+            ("vcc-2 POST /reserve", capture(a, "post", "/reserve", json=stay), None),
+            ("vcc-2 GET /inventory", capture(a, "get", f"/inventory/Grand Plaza/Deluxe?check_in={month_start}&check_out={month_end}"), None),
+            ("vcc-2 GET /cache-stats", capture(a, "get", "/cache-stats"), None),
+            ("vcc-3 GET /", capture(p, "get", "/"), lambda: payment.WELCOME_BODY),
+            ("vcc-3 POST /process-payment", capture(p, "post", "/process-payment", json=charge),
+             lambda: payment.PAYMENT_APPROVED.render(approved)),
+            ("vcc-3 POST /validate-payment", capture(p, "post", "/validate-payment", json=charge),
+             lambda: payment.PRECHECK_VALID_BODY),
+            ("vcc-3 GET /payment-status", capture(p, "get", "/payment-status/TXN1001"), None),
+            ("vcc-3 GET /transactions (100)", capture(p, "get", "/transactions?limit=100"), None),
+            ("vcc-3 GET /idempotency-stats", capture(p, "get", "/idempotency-stats"), None)
+        ], availability.app, load_service("vcc-1", "encoding")
+
+
+def per_call_us(run, repeat):
+    return round(min(timeit.repeat(run, number=repeat, repeat=3)) / repeat * 1e6, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=20000)
+    parser.add_argument("--no-orjson", action="store_true", help="time the stdlib fallback")
+    args = parser.parse_args()
+    if args.no_orjson:
+        sys.modules["orjson"] = None  # makes "import orjson" fail in the services
+
+    endpoints, app, encoding = bodies()
+    # The encoding before JSONProvider: Flask's default provider with its default settings
+    flask_default = type(app.json).__mro__[1](app)
+    results = {"encoder": encoding.ENCODER, "endpoints": {}}
+    for endpoint, body, fast_path in endpoints:
+        result = {
+            "bytes": len(encoding.dumps(body)),
+            "flask_default_us": per_call_us(lambda: flask_default.dumps(body).encode("utf-8"), args.repeat),
+            "encoder_us": per_call_us(lambda: encoding.dumps(body), args.repeat)
+        }
+        if fast_path is not None:
+            result["fast_path_us"] = per_call_us(fast_path, args.repeat)
+        results["endpoints"][endpoint] = result
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark: sync (Flask, thread per request) vs async (aiohttp) orchestration
+Availability and Payment stand-ins run on loopback with an injected delay so
+the orchestrator spends its time waiting on downstreams, as on the VMs.
+Each engine runs alone in a subprocess; a closed-loop aiohttp client keeps
+--concurrency bookings in flight and reports throughput and latency
+
+Usage: python benchmarks/bench_engines.py [--requests 1000] [--concurrency 64] [--delay-ms 20]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import aiohttp
+
+from _harness import (
+    load_service, unlimited_inventory, temporary_transaction_store, serve_in_thread,
+    with_latency, quiet_stdout, summarize, free_port, wait_for_port,
+    guest_booking
+)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+async def drive(url, total_requests, concurrency):
+    latencies = []
+    statuses = {}
+    remaining = iter(range(total_requests))
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        async def worker():
+            for i in remaining:
+                start = time.perf_counter()
+                async with session.post(url, json=guest_booking(i)) as response:
+                    await response.read()
+                latencies.append(time.perf_counter() - start)
+                statuses[response.status] = statuses.get(response.status, 0) + 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    result = summarize(latencies)
+    result["throughput_rps"] = round(total_requests / elapsed, 1)
+    result["status_codes"] = statuses
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--delay-ms", type=float, default=20.0, help="injected downstream latency")
+    args = parser.parse_args()
+
+    with quiet_stdout():
+        availability = load_service("vcc-2")
+        unlimited_inventory(availability)
+        payment = load_service("vcc-3")
+        temporary_transaction_store(payment)
+    _, availability_port = serve_in_thread(with_latency(availability.app, args.delay_ms / 1000))
+    _, payment_port = serve_in_thread(with_latency(payment.app, args.delay_ms / 1000))
+
+    results = {}
+    for engine in ("sync", "async"):
+        port = free_port()
+        process = subprocess.Popen([
+            sys.executable, os.path.join(HERE, "_run_orchestrator.py"),
+            "--engine", engine, "--port", str(port),
+            "--availability-url", f"http://127.0.0.1:{availability_port}",
+            "--payment-url", f"http://127.0.0.1:{payment_port}"
+        ])
+        try:
+            wait_for_port(port)
+            with quiet_stdout():
+                results[engine] = asyncio.run(
+                    drive(f"http://127.0.0.1:{port}/book-hotel", args.requests, args.concurrency)
+                )
+        finally:
+            process.terminate()
+            process.wait()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+Benchmark: client-side load balancing over scaled replicas
+Every replica is a real Availability or Payment app on loopback, capped like
+a one-worker instance: one request at a time, each holding it for at least
+--service-ms (a sleep, so replicas in this one process run side by side as
+separate VMs would)
+1. Booking throughput through the Orchestrator with 1, 2 and 4 replicas of
+   each service behind its endpoint registries, --clients bookings in flight
+2. Calls without an affinity key (/validate-payment) over 4 Payment
+   replicas, one of them --slow-factor times slower: least_outstanding vs
+   p2c; latency and each replica's share of the calls
+3. A Payment replica that starts answering 503 mid-run: calls that failed
+   before it was ejected, and how long ejection took
+
+Usage: python benchmarks/bench_load_balancing.py [--replicas 1 2 4] [--clients 16] [--seconds 5] [--service-ms 10]
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+from _harness import (
+    load_service, temporary_transaction_store, temporary_saga_log, serve_in_thread, quiet_stdout, summarize,
+    stay_dates, guest_booking, without_admission_control
+)
+
+HOTELS = 64  # enough hotels for the Availability affinity to spread over every replica
+PRECHECK = {"guest_name": "Balance Guest", "payment_method": "credit_card", "amount": 300.0}
+
+
+class Capped:
+    """WSGI middleware: one request at a time, service_seconds each; 503 for everything once failing"""
+
+    def __init__(self, app, service_seconds):
+        self.app = app
+        self.service_seconds = service_seconds
+        self.failing = False
+        self._slot = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        if self.failing:
+            start_response("503 Service Unavailable", [("Content-Type", "application/json"), ("Content-Length", "2")])
+            return [b"{}"]
+        with self._slot:
+            time.sleep(self.service_seconds)
+            return self.app(environ, start_response)
+
+
+def write_catalogue(path):
+    catalog = load_service("vcc-2", "catalog")
+    catalog.write_catalog({
+        f"Hotel {i}": {"city": f"City {i % 8}", "rooms": {"Standard": {"available": 1, "rate": 100.0 + i}}}
+        for i in range(HOTELS)
+    }, path)
+
+
+def start_replicas(service, count, service_seconds):
+    """count (Capped, address) pairs of a freshly loaded service"""
+    replicas = []
+    for _ in range(count):
+        with quiet_stdout():
+            module = load_service(service)
+        if service == "vcc-3":
+            temporary_transaction_store(module)
+            module.PAYMENT_SUCCESS_RATE = 1.0
+        capped = Capped(module.app, service_seconds)
+        _, port = serve_in_thread(capped)
+        replicas.append((capped, f"127.0.0.1:{port}"))
+    return replicas
+
+
+def registry(orchestrator, name, addresses, balancer):
+    orchestrator.LOAD_BALANCER = balancer
+    with quiet_stdout():
+        return orchestrator.new_registry(name, ",".join(addresses))
+
+
+def closed_loop(clients, seconds, call):
+    """clients threads calling call() back to back for seconds; returns (latencies, status codes)"""
+    latencies, status_codes = [], {}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def run():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                status = call()
+            except Exception as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                status_codes[status] = status_codes.get(status, 0) + 1
+
+    threads = [threading.Thread(target=run) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, status_codes
+
+
+def booking_throughput(orchestrator, availability, payment, replicas, clients, seconds):
+    orchestrator.AVAILABILITY_CLIENT = orchestrator.DownstreamClient(
+        "availability", registry=registry(orchestrator, "availability",
+                                          [address for _, address in availability[:replicas]], "least_outstanding"),
+        pool_size=clients, retries=orchestrator.DOWNSTREAM_RETRIES, retry_methods=["GET", "POST"]
+    )
+    orchestrator.PAYMENT_CLIENT = orchestrator.DownstreamClient(
+        "payment", registry=registry(orchestrator, "payment",
+                                     [address for _, address in payment[:replicas]], "least_outstanding"),
+        pool_size=clients, retries=orchestrator.DOWNSTREAM_RETRIES, retry_methods=["GET", "POST"]
+    )
+    local = threading.local()
+    rng = random.Random(replicas)
+    guests = itertools.count()
+
+    def book():
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = orchestrator.app.test_client()
+        check_in, check_out = stay_dates(rng.randrange(30, 57), nights=1)
+        return client.post("/book-hotel", json=guest_booking(
+            next(guests), hotel_name=f"Hotel {rng.randrange(HOTELS)}", room_type="Standard",
+            check_in=check_in, check_out=check_out
+        )).status_code
+
+    with quiet_stdout():
+        latencies, status_codes = closed_loop(clients, seconds, book)
+    result = summarize(latencies)
+    result["bookings_per_s"] = round(status_codes.get(200, 0) / seconds, 1)
+    result["status_codes"] = status_codes
+    return result
+
+
+def shares(client):
+    endpoints = client.registry.snapshot()["endpoints"]
+    total = sum(endpoint["requests"] for endpoint in endpoints) or 1
+    return [round(endpoint["requests"] / total, 3) for endpoint in endpoints]
+
+
+def unkeyed_calls(orchestrator, payment, clients, seconds, slow_factor, service_seconds):
+    payment[0][0].service_seconds = service_seconds * slow_factor
+    results = {}
+    for balancer in ("least_outstanding", "p2c"):
+        client = orchestrator.DownstreamClient(
+            "payment", registry=registry(orchestrator, "payment", [address for _, address in payment], balancer),
+            pool_size=clients
+        )
+        with quiet_stdout():
+            latencies, status_codes = closed_loop(
+                clients, seconds, lambda: client.post("/validate-payment", json=PRECHECK).status_code
+            )
+        results[balancer] = dict(summarize(latencies), calls_per_s=round(len(latencies) / seconds, 1),
+                                 replica_shares=shares(client), status_codes=status_codes)
+        client.close()
+    payment[0][0].service_seconds = service_seconds
+    return results
+
+
+def ejection(orchestrator, payment, clients, seconds):
+    client = orchestrator.DownstreamClient(
+        "payment", registry=registry(orchestrator, "payment", [address for _, address in payment], "p2c"),
+        pool_size=clients
+    )
+    sick = payment[-1][0]
+    failed_at = []
+
+    def fail_later():
+        time.sleep(seconds / 2)
+        failed_at.append(time.perf_counter())
+        sick.failing = True
+
+    threading.Thread(target=fail_later, daemon=True).start()
+    with quiet_stdout():
+        latencies, status_codes = closed_loop(
+            clients, seconds, lambda: client.post("/validate-payment", json=PRECHECK).status_code
+        )
+    sick.failing = False
+    endpoint = client.registry.snapshot()["endpoints"][-1]
+    client.close()
+    return {
+        "calls": len(latencies),
+        "status_codes": status_codes,
+        "sick_replica": {key: endpoint[key] for key in ("requests", "failures", "ejections", "ejected_for")}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--replicas", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=16, help="bookings or calls in flight")
+    parser.add_argument("--seconds", type=float, default=5.0, help="duration of each run")
+    parser.add_argument("--service-ms", type=float, default=10.0, help="time a replica spends per request")
+    parser.add_argument("--slow-factor", type=float, default=5.0)
+    args = parser.parse_args()
+
+    catalogue = os.path.join(tempfile.mkdtemp(prefix="vcc-balance-"), "hotels.cat")
+    write_catalogue(catalogue)
+    os.environ.update({"CATALOG_PATH": catalogue, "INVENTORY_ROOMS": str(10 ** 6)})
+    service_seconds = args.service_ms / 1000
+    count = max(max(args.replicas), 4)
+    availability = start_replicas("vcc-2", count, service_seconds)
+    payment = start_replicas("vcc-3", count, service_seconds)
+    with quiet_stdout():
+        orchestrator = load_service("vcc-1")
+    temporary_saga_log(orchestrator)
+    without_admission_control(orchestrator)
+    orchestrator.PAYMENT_PRECHECK = True
+
+    results = {"bookings": {
+        f"{replicas}_replicas": booking_throughput(orchestrator, availability, payment, replicas,
+                                                   args.clients, args.seconds)
+        for replicas in args.replicas
+    }}
+    results["unkeyed_with_slow_replica"] = unkeyed_calls(
+        orchestrator, payment[:4], args.clients, args.seconds, args.slow_factor, service_seconds
+    )
+    results["replica_failing_midway"] = ejection(orchestrator, payment[:4], args.clients, args.seconds)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Benchmark: retained memory per stored transaction and per held reservation
+Each transaction is built from a freshly parsed JSON body, as it would be in
+a request, then kept either as the plain dict the Payment service used to
+hold or in MemoryTransactionStore's compact records. Reservations compare
+the old per-reservation dict with inventory.Reservation. Reports bytes per
+item measured with tracemalloc
+
+Usage: python benchmarks/bench_memory.py [--transactions 200000] [--reservations 200000]
+"""
+
+import argparse
+import json
+import tracemalloc
+from datetime import datetime, timedelta
+
+from _harness import load_service
+
+HOTELS = ["Grand Plaza", "Oceanview Resort", "City Center Inn"]
+ROOM_TYPES = ["Standard", "Deluxe", "Suite"]
+
+
+def transaction_bodies(count):
+    """JSON bodies as the Orchestrator sends them to /process-payment"""
+    start = datetime(2026, 1, 1)
+    for i in range(count):
+        yield json.dumps({
+            "booking_id": f"BOOK{1790000000 + i}{i:08X}",
+            "guest_name": f"Guest {i}",
+            "hotel_name": HOTELS[i % len(HOTELS)],
+            "room_type": ROOM_TYPES[i % len(ROOM_TYPES)],
+            "amount": 100.0 + i % 500,
+            "currency": "USD",
+            "payment_method": "credit_card",
+            "check_in": "2026-02-15",
+            "check_out": "2026-02-18"
+        }), (start + timedelta(seconds=i)).isoformat()
+
+
+def as_dicts(count):
+    transactions = {}
+    for i, (body, timestamp) in enumerate(transaction_bodies(count)):
+        data = json.loads(body)
+        transaction_id = f"TXN{1001 + i}"
+        transactions[transaction_id] = {
+            "transaction_id": transaction_id,
+            "booking_id": data["booking_id"],
+            "guest_name": data["guest_name"],
+            "hotel_name": data["hotel_name"],
+            "room_type": data["room_type"],
+            "amount": data["amount"],
+            "currency": data["currency"],
+            "payment_method": data["payment_method"],
+            "status": "approved",
+            "reason": None,
+            "timestamp": timestamp,
+            "check_in": data["check_in"],
+            "check_out": data["check_out"],
+            "idempotency_key": data["booking_id"]
+        }
+    return transactions
+
+
+def as_records(store_module, count):
+    store = store_module.MemoryTransactionStore()
+    for body, timestamp in transaction_bodies(count):
+        data = json.loads(body)
+        data.update(status="approved", reason=None, timestamp=timestamp, idempotency_key=data["booking_id"])
+        store.add(data)
+    return store
+
+
+def reservation_requests(count):
+    for i in range(count):
+        yield json.loads(json.dumps({
+            "hotel_name": HOTELS[i % len(HOTELS)],
+            "room_type": ROOM_TYPES[i % len(ROOM_TYPES)],
+            "check_in": "2026-02-15",
+            "check_out": "2026-02-18",
+            "booking_id": f"BOOK{1790000000 + i}{i:08X}"
+        }))
+
+
+def reservation_dicts(inventory, count):
+    reservations = {}
+    for i, data in enumerate(reservation_requests(count)):
+        start, end = inventory.night_range(data["check_in"], data["check_out"])
+        reservation_id = f"RSV{i + 1}"
+        reservations[reservation_id] = {
+            "reservation_id": reservation_id,
+            "hotel_name": data["hotel_name"],
+            "room_type": data["room_type"],
+            "check_in": data["check_in"],
+            "check_out": data["check_out"],
+            "rooms": 1,
+            "reference": data["booking_id"],
+            "nights": (start, end)
+        }
+    return reservations
+
+
+def reservation_records(inventory, count):
+    for data in reservation_requests(count):
+        inventory.reserve(data["hotel_name"], data["room_type"], data["check_in"], data["check_out"],
+                          reference=data["booking_id"])
+    return inventory
+
+
+def bytes_per_item(build, count):
+    tracemalloc.start()
+    kept = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return round(size / count, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--transactions", type=int, default=200000)
+    parser.add_argument("--reservations", type=int, default=200000)
+    args = parser.parse_args()
+
+    store_module = load_service("vcc-3", "store")
+    inventory_module = load_service("vcc-2", "inventory")
+    hotels = {name: {"rooms": {room_type: {"available": args.reservations} for room_type in ROOM_TYPES}}
+              for name in HOTELS}
+
+    results = {
+        "transaction_dict_bytes": bytes_per_item(lambda: as_dicts(args.transactions), args.transactions),
+        "transaction_record_bytes": bytes_per_item(lambda: as_records(store_module, args.transactions), args.transactions),
+        "reservation_dict_bytes": bytes_per_item(
+            lambda: reservation_dicts(inventory_module.Inventory(hotels, "2026-01-01", 365), args.reservations), args.reservations
+        ),
+        "reservation_record_bytes": bytes_per_item(
+            lambda: reservation_records(inventory_module.Inventory(hotels, "2026-01-01", 365), args.reservations), args.reservations
+        )
+    }
+    results["transaction_saving"] = round(1 - results["transaction_record_bytes"] / results["transaction_dict_bytes"], 3)
+    results["reservation_saving"] = round(1 - results["reservation_record_bytes"] / results["reservation_dict_bytes"], 3)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
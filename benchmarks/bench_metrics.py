@@ -0,0 +1,102 @@
+"""
+Benchmark: cost of recording request metrics on the hot path
+Compares the thread-sharded Metrics registry with a single lock-protected
+counter dict under N threads, then measures Payment /validate-payment
+requests per second with and without the /metrics instrumentation
+
+Usage: python benchmarks/bench_metrics.py [--samples 200000] [--threads 1 4 8] [--requests 3000]
+"""
+
+import argparse
+import json
+import threading
+import time
+
+import requests
+
+from _harness import load_service, serve_in_thread, summarize
+
+
+def locked_metrics(module):
+    """Baseline: the same registry, but one shared shard behind a process-wide lock"""
+
+    class LockedMetrics(module.Metrics):
+        def __init__(self, service):
+            super().__init__(service)
+            self.shared = module._Shard()
+
+        def _shard(self):
+            return self.shared
+
+        def observe_request(self, *args):
+            with self._lock:
+                super().observe_request(*args)
+
+    return LockedMetrics("bench")
+
+
+def record(metrics, samples, threads):
+    per_thread = samples // threads
+
+    def work():
+        for i in range(per_thread):
+            metrics.observe_request("/validate-payment", "POST", 200, (i % 50) / 10000)
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    return round(per_thread * threads / elapsed)
+
+
+def requests_per_s(session, url, payload, total_requests):
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(total_requests):
+        request_start = time.perf_counter()
+        session.post(url, json=payload).content
+        latencies.append(time.perf_counter() - request_start)
+    result = summarize(latencies)
+    result["requests_per_s"] = round(total_requests / (time.perf_counter() - start), 1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--samples", type=int, default=200000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--requests", type=int, default=3000)
+    args = parser.parse_args()
+
+    payment = load_service("vcc-3")
+    metrics = load_service("vcc-3", "metrics")
+    results = {"samples_per_s": {}}
+    for threads in args.threads:
+        results["samples_per_s"][f"{threads}_threads"] = {
+            "sharded": record(metrics.Metrics("bench"), args.samples, threads),
+            "locked": record(locked_metrics(metrics), args.samples, threads)
+        }
+
+    payload = {"guest_name": "Bench", "hotel_name": "Grand Plaza", "payment_method": "credit_card"}
+    session = requests.Session()
+    server, port = serve_in_thread(payment.app)
+    url = f"http://127.0.0.1:{port}/validate-payment"
+    results["validate_payment_instrumented"] = requests_per_s(session, url, payload, args.requests)
+    server.shutdown()
+
+    bare = load_service("vcc-3")
+    bare.app.before_request_funcs.clear()
+    bare.app.after_request_funcs.clear()
+    server, port = serve_in_thread(bare.app)
+    url = f"http://127.0.0.1:{port}/validate-payment"
+    results["validate_payment_bare"] = requests_per_s(session, url, payload, args.requests)
+    server.shutdown()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
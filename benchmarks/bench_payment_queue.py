@@ -0,0 +1,93 @@
+"""
+Benchmark: /process-payment intake with a slow payment gateway, inline vs queued
+The Payment app is served on loopback with a simulated gateway latency.
+N client threads post payments, first synchronously (the request waits for
+the gateway), then with "Prefer: respond-async" (the request only queues
+the payment). Reports intake latency and throughput, how many requests were
+turned away with 429, and how long the queue took to settle everything
+
+Usage: python benchmarks/bench_payment_queue.py [--payments 400] [--threads 16] [--gateway-ms 50] [--queue-size 1000]
+"""
+
+import argparse
+import json
+import threading
+import time
+
+import requests
+
+from _harness import load_service, temporary_transaction_store, serve_in_thread, quiet_stdout, summarize
+
+
+def post_payments(base_url, payments, threads, prefer):
+    latencies = []
+    status_codes = {}
+    lock = threading.Lock()
+    per_thread = payments // threads
+
+    def client(worker):
+        session = requests.Session()
+        headers = {"Prefer": prefer} if prefer else {}
+        for i in range(per_thread):
+            payment = {
+                "booking_id": f"BOOK-{prefer or 'sync'}-{worker}-{i}",
+                "guest_name": f"Guest {prefer or 'sync'}-{worker}-{i}",  # one payment each: no velocity declines
+                "hotel_name": "Grand Plaza",
+                "amount": 300.0,
+                "payment_method": "credit_card"
+            }
+            start = time.perf_counter()
+            status_code = session.post(f"{base_url}/process-payment", json=payment, headers=headers).status_code
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                status_codes[status_code] = status_codes.get(status_code, 0) + 1
+
+    workers = [threading.Thread(target=client, args=(worker,)) for worker in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    result = summarize(latencies)
+    result["intake_per_s"] = round(len(latencies) / elapsed, 1)
+    result["status_codes"] = status_codes
+    return result, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--payments", type=int, default=400)
+    parser.add_argument("--threads", type=int, default=16, help="concurrent clients")
+    parser.add_argument("--gateway-ms", type=float, default=50, help="simulated gateway latency")
+    parser.add_argument("--queue-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    payment = load_service("vcc-3")
+    temporary_transaction_store(payment)
+    payment.PAYMENT_SUCCESS_RATE = 1.0
+    payment.GATEWAY_LATENCY_SECONDS = args.gateway_ms / 1000
+    payment.PAYMENT_QUEUE.max_depth = args.queue_size
+    server, port = serve_in_thread(payment.app)
+    base_url = f"http://127.0.0.1:{port}"
+
+    results = {}
+    with quiet_stdout():
+        results["inline"], inline_s = post_payments(base_url, args.payments, args.threads, None)
+        start = time.perf_counter()
+        results["queued"], _ = post_payments(base_url, args.payments, args.threads, "respond-async")
+        while True:
+            stats = payment.PAYMENT_QUEUE.stats()
+            if stats["processed"] >= stats["accepted"]:
+                break
+            time.sleep(0.01)
+        results["queued"]["settled_s"] = round(time.perf_counter() - start, 3)
+    results["inline"]["total_s"] = round(inline_s, 3)
+    results["queued"]["queue"] = stats
+    server.shutdown()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Benchmark: fraud and limit rule evaluation cost per payment
+1. The rules of vcc-3/payment_rules.json (PaymentRules.evaluate) for a
+   payment that passes every rule and one the amount limit declines
+2. Static rules only (a --blocklist-name blocklist, --patterns patterns,
+   the amount limit and the method check): compiled against a reference
+   that reads every rule's settings from its dict for every payment
+3. A larger set: those rules plus the shipped velocity limits declining,
+   listed with the expensive rules first. Payments come from --guests
+   guests and cards (the velocity windows hold that many keys), 5% of them
+   over the amount limit. Plan order (cost / selectivity) against file order
+4. /process-payment through the Payment app with the shipped rules and
+   with none, to show the rules' share of a whole charge (runs interleaved,
+   best of three rounds)
+Microseconds per payment
+
+Usage: python benchmarks/bench_payment_rules.py [--guests 100000] [--blocklist 10000] [--patterns 20] [--repeat 20000]
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import timeit
+
+from _harness import REPO_ROOT, load_service, temporary_transaction_store, quiet_stdout
+
+PAYMENT = {
+    "booking_id": "BOOK1", "guest_name": "Rule Guest", "hotel_name": "Grand Plaza", "room_type": "Deluxe",
+    "amount": 540.0, "currency": "USD", "payment_method": "credit_card", "card_token": "tok_1"
+}
+
+
+def per_call_us(run, repeat):
+    return round(min(timeit.repeat(run, number=repeat, repeat=3)) / repeat * 1e6, 3)
+
+
+def interpreted(rules, payment):
+    """Reference: read every static rule's settings from its dict for every payment, in file order"""
+    for rule in rules:
+        value = payment.get(rule.get("field", "guest_name"))
+        if rule["type"] == "max_amount" and payment.get("amount", 0) > rule["limit"]:
+            return rule["name"], rule.get("reason")
+        if rule["type"] == "contains" and isinstance(value, str) and any(
+                pattern.lower() in value.lower() for pattern in rule["patterns"]):
+            return rule["name"], rule.get("reason")
+        if rule["type"] == "blocklist" and isinstance(value, str) and value.strip().casefold() in {
+                blocked.strip().casefold() for blocked in rule["values"]}:
+            return rule["name"], rule.get("reason")
+    return None
+
+
+def static_rules(shipped, args):
+    """The shipped static rules after a blocklist and a many-pattern check"""
+    return [
+        {"name": "Blocked guests", "type": "blocklist", "field": "guest_name",
+         "values": [f"Blocked Guest {i}" for i in range(args.blocklist)]},
+        {"name": "Disposable methods", "type": "contains", "field": "payment_method",
+         "patterns": [f"test{i}" for i in range(args.patterns)]},
+        *(dict(rule, selectivity=0.05) if rule["type"] == "max_amount" else rule
+          for rule in shipped["rules"] if rule["type"] != "velocity")
+    ]
+
+
+def payments(guests, seed=1):
+    """Endless payments over `guests` guests and cards, 5% of them over the amount limit"""
+    rng = random.Random(seed)
+    for i in itertools.count():
+        yield dict(PAYMENT, guest_name=f"Guest {rng.randrange(guests)}", card_token=f"tok_{rng.randrange(guests)}",
+                   amount=20000.0 if rng.random() < 0.05 else 540.0, booking_id=f"BOOK{i}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--guests", type=int, default=100000, help="guests and cards the payments come from")
+    parser.add_argument("--blocklist", type=int, default=10000, help="names in the blocklist rule")
+    parser.add_argument("--patterns", type=int, default=20, help="patterns in the pattern rule")
+    parser.add_argument("--repeat", type=int, default=20000)
+    args = parser.parse_args()
+
+    rules = load_service("vcc-3", "rules")
+    with open(os.path.join(REPO_ROOT, "vcc-3", "payment_rules.json")) as f:
+        shipped = json.load(f)
+    engine = rules.PaymentRules(shipped)
+    over_limit = dict(PAYMENT, amount=20000.0)
+    results = {"shipped_rules": {
+        "passes_us": per_call_us(lambda: engine.evaluate(PAYMENT, record=False), args.repeat),
+        "declined_by_amount_us": per_call_us(lambda: engine.evaluate(over_limit, record=False), args.repeat)
+    }}
+
+    static = static_rules(shipped, args)
+    engine = rules.PaymentRules({"rules": static})
+    results["static_rules"] = {
+        "rules": len(static),
+        "compiled_us": per_call_us(lambda: engine.evaluate(PAYMENT), args.repeat),
+        "interpreted_us": per_call_us(lambda: interpreted(static, PAYMENT), max(100, args.repeat // 100))
+    }
+
+    large = {"rules": [dict(rule, action="decline") for rule in shipped["rules"] if rule["type"] == "velocity"]
+             + static}
+    results["large_rule_set"] = {"rules": len(large["rules"]), "guests": args.guests}
+    for order in ("plan_order", "file_order"):
+        engine = rules.PaymentRules(large, max_keys=args.guests * 2)
+        if order == "file_order":
+            engine._plan = tuple(rule for rule in engine.rules if rule.action == rules.DECLINE)
+        stream = payments(args.guests)
+        for payment in itertools.islice(stream, args.guests):  # fill the velocity windows
+            engine.evaluate(payment)
+        feed = itertools.cycle(list(itertools.islice(stream, args.repeat)))
+        results["large_rule_set"][order] = {
+            "evaluate_us": per_call_us(lambda: engine.evaluate(next(feed)), args.repeat),
+            "order": [rule["name"] for rule in engine.stats()["rules"]]
+        }
+
+    with quiet_stdout():
+        payment = load_service("vcc-3")
+    temporary_transaction_store(payment)
+    payment.PAYMENT_SUCCESS_RATE = 1.0
+    client = payment.app.test_client()
+    ids = itertools.count()
+    charges = {"shipped_rules_us": [], "no_rules_us": []}
+    for _ in range(3):
+        for name, config in (("shipped_rules_us", shipped), ("no_rules_us", {})):
+            payment.PAYMENT_RULES = payment.PaymentRules(config)
+            with quiet_stdout():
+                charges[name].append(per_call_us(
+                    lambda: client.post("/process-payment", json=dict(PAYMENT, booking_id=f"BOOK{next(ids)}",
+                                                                      guest_name=f"Guest {next(ids)}")),
+                    max(100, args.repeat // 50)
+                ))
+    results["process_payment"] = {name: min(runs) for name, runs in charges.items()}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
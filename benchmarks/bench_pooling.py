@@ -0,0 +1,77 @@
+"""
+Benchmark: booking latency with and without downstream connection pooling
+Runs the Availability and Payment apps on loopback as stand-in services,
+then drives the Orchestrator's /book-hotel in-process with N client threads
+
+Usage: python benchmarks/bench_pooling.py [--requests 2000] [--threads 8]
+"""
+
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from _harness import (
+    load_service, unlimited_inventory, temporary_transaction_store, temporary_saga_log, serve_in_thread,
+    quiet_stdout, summarize, guest_booking, without_admission_control
+)
+
+
+def run(orchestrator, total_requests, threads):
+    client = orchestrator.app.test_client
+
+    def one_booking(i):
+        start = time.perf_counter()
+        client().post("/book-hotel", json=guest_booking(i))
+        return time.perf_counter() - start
+
+    with quiet_stdout(), ThreadPoolExecutor(max_workers=threads) as pool:
+        start = time.perf_counter()
+        latencies = list(pool.map(one_booking, range(total_requests)))
+        elapsed = time.perf_counter() - start
+
+    result = summarize(latencies)
+    result["throughput_rps"] = round(total_requests / elapsed, 1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    availability = load_service("vcc-2")
+    unlimited_inventory(availability)
+    payment = load_service("vcc-3")
+    temporary_transaction_store(payment)
+    orchestrator = load_service("vcc-1")
+    temporary_saga_log(orchestrator)
+    without_admission_control(orchestrator)
+    availability_server, availability_port = serve_in_thread(availability.app)
+    payment_server, payment_port = serve_in_thread(payment.app)
+
+    results = {}
+    for pooled in (False, True):
+        orchestrator.AVAILABILITY_CLIENT = orchestrator.DownstreamClient(
+            "availability", f"http://127.0.0.1:{availability_port}",
+            pool_size=args.threads, pooled=pooled
+        )
+        orchestrator.PAYMENT_CLIENT = orchestrator.DownstreamClient(
+            "payment", f"http://127.0.0.1:{payment_port}",
+            pool_size=args.threads, pooled=pooled
+        )
+        label = "pooled" if pooled else "unpooled"
+        results[label] = run(orchestrator, args.requests, args.threads)
+        results[label]["pools"] = {
+            "availability": orchestrator.AVAILABILITY_CLIENT.stats.snapshot(),
+            "payment": orchestrator.PAYMENT_CLIENT.stats.snapshot()
+        }
+
+    availability_server.shutdown()
+    payment_server.shutdown()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
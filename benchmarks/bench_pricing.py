@@ -0,0 +1,102 @@
+"""
+Benchmark: quote latency under rate plans, by length of stay
+Prices stays of 1 to 365 nights under vcc-2/rate_plans.json three ways:
+1. per_night: walk the stay night by night, applying every weekend and
+   seasonal rule, with the dates parsed on each call (quoting without any
+   precomputation)
+2. prefix_sums: RatePlans.quote() on night offsets, the O(1) lookup
+3. quote_batch: a whole single /check-availability quote (date lookup in
+   the memoized day-index cache, free rooms from the inventory, price)
+Also times building a price profile (first quote of a room) and a date
+parse through strptime against the day-index cache. Microseconds per call
+
+Usage: python benchmarks/bench_pricing.py [--nights 1 3 7 14 30 90 365] [--repeat 2000]
+"""
+
+import argparse
+import json
+import os
+import timeit
+from datetime import date, datetime, timedelta
+
+from _harness import REPO_ROOT, load_service, quiet_stdout
+
+HOTEL, ROOM_TYPE = "Oceanview Resort", "Deluxe"
+FIRST_NIGHT = date.today() + timedelta(days=30)
+
+
+def per_call_us(run, repeat):
+    return round(min(timeit.repeat(run, number=repeat, repeat=3)) / repeat * 1e6, 3)
+
+
+def per_night_total(plans, city, rate, check_in, check_out):
+    """Reference: price every night of the stay against every rule, as a request would without precomputation"""
+    first = datetime.strptime(check_in, "%Y-%m-%d").date()
+    last = datetime.strptime(check_out, "%Y-%m-%d").date()
+    nights = max(1, (last - first).days)
+    total = 0.0
+    for offset in range(nights):
+        night = first + timedelta(days=offset)
+        price = rate
+        for rule in plans.get("weekend", []):
+            if night.strftime("%A").lower() in rule["nights"]:
+                price *= rule["multiplier"]
+        for rule in plans.get("seasons", []):
+            if "cities" in rule and city not in rule["cities"]:
+                continue
+            if rule["start"] <= night.isoformat() < rule["end"]:
+                price *= rule["multiplier"]
+        total += price
+    discount = max([rule["discount"] for rule in plans.get("length_of_stay", []) if nights >= rule["min_nights"]],
+                   default=0.0)
+    return round(total * (1 - discount), 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--nights", type=int, nargs="+", default=[1, 3, 7, 14, 30, 90, 365])
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    with quiet_stdout():
+        availability = load_service("vcc-2")
+    rates = load_service("vcc-2", "rates")
+    pricing = load_service("vcc-2", "pricing")
+    with open(os.path.join(REPO_ROOT, "vcc-2", "rate_plans.json")) as f:
+        plans = json.load(f)
+    hotel = availability.HOTELS_DATABASE[HOTEL]
+    city, rate = hotel.get("city"), hotel["rooms"][ROOM_TYPE]["rate"]
+    engine, inventory = availability.RATE_PLANS, availability.INVENTORY
+
+    results = {"stays": {}}
+    for nights in args.nights:
+        check_in = FIRST_NIGHT.isoformat()
+        check_out = (FIRST_NIGHT + timedelta(days=nights)).isoformat()
+        start, end = inventory.night_range(check_in, check_out)
+        query = {"hotel_name": HOTEL, "room_type": ROOM_TYPE, "check_in": check_in, "check_out": check_out}
+        reference = per_night_total(plans, city, rate, check_in, check_out)
+        quoted = engine.quote(HOTEL, city, ROOM_TYPE, rate, start, end)[0]
+        assert abs(reference - quoted) <= 0.01, (nights, reference, quoted)
+        results["stays"][f"{nights}_nights"] = {
+            "total_price": quoted,
+            "per_night_us": per_call_us(lambda: per_night_total(plans, city, rate, check_in, check_out), args.repeat),
+            "prefix_sums_us": per_call_us(lambda: engine.quote(HOTEL, city, ROOM_TYPE, rate, start, end), args.repeat),
+            "quote_batch_us": per_call_us(
+                lambda: pricing.quote_batch([query], availability.HOTELS_DATABASE, inventory, engine), args.repeat
+            )
+        }
+
+    horizon = (availability.INVENTORY_START_DATE, availability.INVENTORY_HORIZON_DAYS)
+    results["profile_build_us"] = per_call_us(
+        lambda: rates.RatePlans(plans, *horizon).quote(HOTEL, city, ROOM_TYPE, rate, 0, 1), 50
+    )
+    results["date_parse_us"] = {
+        "strptime": per_call_us(lambda: datetime.strptime("2026-06-01", "%Y-%m-%d").toordinal(), args.repeat * 10),
+        "day_index_cache": per_call_us(lambda: pricing.day_index("2026-06-01"), args.repeat * 10)
+    }
+    results["rate_plans"] = engine.describe()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
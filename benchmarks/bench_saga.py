@@ -0,0 +1,151 @@
+"""
+Benchmark: booking saga holds, hold expiry and the saga log
+1. Hot room: N clients book the same room type, with few rooms left and a
+   slow payment gateway, through the Orchestrator's saga. Reports confirmed
+   bookings against the rooms there were (oversold must be 0), declines
+   (no retries are needed: a client either gets a room or a 409 at once)
+   and holds left behind
+2. Hold expiry: with H holds outstanding, the cost of one expiry tick in
+   which a few holds lapse, via the inventory's TimerWheel and via a scan of
+   every reservation's deadline (what expiry would cost without the wheel)
+3. Saga log: cost per booking of the four writes that persist a saga
+
+Usage: python benchmarks/bench_saga.py [--clients 50] [--rooms 5] [--gateway-ms 100] [--holds 100000]
+"""
+
+import argparse
+import json
+import threading
+import time
+import timeit
+
+from _harness import (
+    load_service, temporary_transaction_store, temporary_saga_log, serve_in_thread, quiet_stdout, summarize,
+    stay_dates, guest_booking, without_admission_control
+)
+
+CHECK_IN, CHECK_OUT = stay_dates(30)
+
+STAY = {"hotel_name": "Grand Plaza", "room_type": "Suite", "check_in": CHECK_IN, "check_out": CHECK_OUT}
+
+
+def hot_room(clients, rooms, gateway_ms):
+    availability = load_service("vcc-2")
+    payment = load_service("vcc-3")
+    orchestrator = load_service("vcc-1")
+    hotels = dict(availability.HOTELS_DATABASE)
+    hotels["Grand Plaza"] = dict(hotels["Grand Plaza"], rooms=dict(
+        hotels["Grand Plaza"]["rooms"], Suite=dict(hotels["Grand Plaza"]["rooms"]["Suite"], available=rooms)
+    ))
+    availability.INVENTORY = availability.Inventory(
+        hotels, availability.INVENTORY_START_DATE, availability.INVENTORY_HORIZON_DAYS
+    )
+    availability.AVAILABILITY_CACHE.clear()
+    availability.INVENTORY.add_listener(availability.AVAILABILITY_CACHE.invalidate)
+    temporary_transaction_store(payment)
+    temporary_saga_log(orchestrator)
+    without_admission_control(orchestrator)
+    payment.PAYMENT_SUCCESS_RATE = 1.0
+    payment.GATEWAY_LATENCY_SECONDS = gateway_ms / 1000
+    _, availability_port = serve_in_thread(availability.app)
+    _, payment_port = serve_in_thread(payment.app)
+    orchestrator.AVAILABILITY_CLIENT = orchestrator.DownstreamClient(
+        "availability", f"http://127.0.0.1:{availability_port}", pool_size=clients
+    )
+    orchestrator.PAYMENT_CLIENT = orchestrator.DownstreamClient(
+        "payment", f"http://127.0.0.1:{payment_port}", pool_size=clients
+    )
+    client = orchestrator.app.test_client()
+    latencies = []
+    status_codes = {}
+    lock = threading.Lock()
+
+    def book(i):
+        start = time.perf_counter()
+        status_code = client.post("/book-hotel", json=guest_booking(i, **STAY)).status_code
+        with lock:
+            latencies.append(time.perf_counter() - start)
+            status_codes[status_code] = status_codes.get(status_code, 0) + 1
+
+    threads = [threading.Thread(target=book, args=(i,)) for i in range(clients)]
+    with quiet_stdout():
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    result = summarize(latencies)
+    confirmed = status_codes.get(200, 0)
+    result.update(
+        rooms=rooms, status_codes=status_codes, confirmed=confirmed, oversold=max(0, confirmed - rooms),
+        rooms_left=availability.INVENTORY.available("Grand Plaza", "Suite", STAY["check_in"], STAY["check_out"]),
+        holds_left=availability.INVENTORY.holds(),
+        sagas_confirmed=orchestrator.SAGAS.count("confirmed"), sagas_failed=orchestrator.SAGAS.count("failed")
+    )
+    return result
+
+
+def hold_expiry(holds):
+    inventory_module = load_service("vcc-2", "inventory")
+    wheel_module = load_service("vcc-2", "timer_wheel")
+    clock = [0.0]
+    wheel = wheel_module.TimerWheel(inventory_module.HOLD_TICK_SECONDS, inventory_module.HOLD_WHEEL_BUCKETS,
+                                    clock=lambda: clock[0])
+    deadlines = {}
+    for seq in range(holds):
+        deadlines[seq] = 1.0 + (seq % 1200) * 0.25  # spread over five minutes of ticks
+        wheel.schedule(seq, deadlines[seq])
+
+    def wheel_tick():
+        clock[0] += wheel.tick_seconds
+        for seq in wheel.advance():
+            wheel.schedule(seq, clock[0] + 300)  # keep the population constant
+
+    def scan_tick():
+        clock[0] += wheel.tick_seconds
+        now = clock[0]
+        for seq, deadline in deadlines.items():
+            if deadline <= now:
+                deadlines[seq] = now + 300
+
+    ticks = 200
+    return {
+        "holds": holds,
+        "due_per_tick": round(holds / 1200, 1),
+        "wheel_tick_us": round(min(timeit.repeat(wheel_tick, number=ticks, repeat=3)) / ticks * 1e6, 1),
+        "scan_tick_us": round(min(timeit.repeat(scan_tick, number=ticks, repeat=3)) / ticks * 1e6, 1)
+    }
+
+
+def saga_log_writes(bookings):
+    orchestrator = load_service("vcc-1")
+    temporary_saga_log(orchestrator)
+    sagas = orchestrator.SAGAS
+    booking = guest_booking(0, **STAY)
+    start = time.perf_counter()
+    for i in range(bookings):
+        booking_id = f"BOOK-LOG-{i}"
+        sagas.start(booking_id, booking, 900.0)
+        sagas.advance(booking_id, "held", reservation_id=f"RSV{i}")
+        sagas.advance(booking_id, "charged", transaction_id=f"TXN{i}")
+        sagas.advance(booking_id, "confirmed")
+    return {"bookings": bookings, "per_booking_us": round((time.perf_counter() - start) / bookings * 1e6, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=50, help="concurrent bookings of the hot room")
+    parser.add_argument("--rooms", type=int, default=5, help="rooms of that type left")
+    parser.add_argument("--gateway-ms", type=float, default=100, help="simulated gateway latency")
+    parser.add_argument("--holds", type=int, default=100000, help="outstanding holds for the expiry test")
+    args = parser.parse_args()
+
+    results = {
+        "hot_room": hot_room(args.clients, args.rooms, args.gateway_ms),
+        "hold_expiry": hold_expiry(args.holds),
+        "saga_log": saga_log_writes(2000)
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Benchmark: hotel search over a growing catalogue, indexed vs scanned
+Builds a synthetic catalogue of N hotels (three room types each, spread over
+a number of cities, a share of the rooms already booked) and times:
+1. SearchIndex.search(): city and room type indexes, rate bisect, cheapest
+   stay first under the shipped rate plans
+2. The scan a client gets without /search: every hotel's room types checked
+   against the inventory (one /check-availability each), filtered and sorted
+3. GET /search through the Flask app, index included
+Also reports how long the indexes take to build
+
+Usage: python benchmarks/bench_search.py [--hotels 1000 10000 30000] [--cities 50] [--queries 500]
+"""
+
+import argparse
+import json
+import random
+import time
+from datetime import date, timedelta
+
+from _harness import load_service, summarize
+
+ROOM_TYPES = {"Standard": (80, 200), "Deluxe": (150, 320), "Suite": (250, 600)}
+HORIZON_DAYS = 90  # a short horizon keeps tens of thousands of segment trees small
+FIRST_NIGHT = date.today()  # inside the Availability service's horizon, which starts a day back
+
+
+def stay(first, nights):
+    check_in = FIRST_NIGHT + timedelta(days=first)
+    return check_in.isoformat(), (check_in + timedelta(days=nights)).isoformat()
+
+
+def make_catalogue(hotels, cities, seed=1):
+    rng = random.Random(seed)
+    catalogue = {}
+    for i in range(hotels):
+        catalogue[f"Hotel {i}"] = {
+            "city": f"City {i % cities}",
+            "rooms": {
+                room_type: {"available": rng.randint(0, 5), "rate": float(rng.randint(low, high))}
+                for room_type, (low, high) in ROOM_TYPES.items()
+            }
+        }
+    return catalogue
+
+
+def make_queries(cities, count, seed=2):
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        check_in, check_out = stay(rng.randrange(HORIZON_DAYS - 10), rng.randint(1, 5))
+        queries.append({
+            "city": f"City {rng.randrange(cities)}",
+            "room_type": rng.choice([None, *ROOM_TYPES]),
+            "max_rate": rng.choice([None, 150.0, 250.0, 400.0]),
+            "check_in": check_in,
+            "check_out": check_out
+        })
+    return queries
+
+
+def scan(catalogue, inventory, rate_plans, query, limit):
+    """Every room type of every hotel checked, priced and filtered, then sorted: the round trips /search replaces"""
+    start, end = inventory.night_range(query["check_in"], query["check_out"])
+    matches = []
+    for hotel_name, hotel in catalogue.items():
+        if hotel["city"] != query["city"]:
+            continue
+        for room_type, room_info in hotel["rooms"].items():
+            if query["room_type"] and room_type != query["room_type"]:
+                continue
+            if query["max_rate"] is not None and room_info["rate"] > query["max_rate"]:
+                continue
+            free = inventory.available(hotel_name, room_type, query["check_in"], query["check_out"])
+            if free >= 1:
+                total, _ = rate_plans.quote(hotel_name, hotel["city"], room_type, room_info["rate"], start, end)
+                matches.append((total, room_info["rate"], hotel_name, room_type, free))
+    matches.sort()
+    return matches[:limit]
+
+
+def run(hotels, cities, query_count, limit):
+    availability = load_service("vcc-2")
+    catalogue = make_catalogue(hotels, cities)
+    inventory = availability.Inventory(catalogue, availability.INVENTORY_START_DATE, HORIZON_DAYS)
+    rng = random.Random(3)
+    for hotel_name, hotel in catalogue.items():  # book some nights so the search has to skip sold-out rooms
+        for room_type in hotel["rooms"]:
+            if rng.random() < 0.3:
+                inventory.reserve(hotel_name, room_type, *stay(rng.randrange(HORIZON_DAYS - 10), rng.randint(1, 10)))
+
+    start = time.perf_counter()
+    index = availability.SearchIndex(catalogue, inventory, availability.RATE_PLANS).build()
+    build_s = time.perf_counter() - start
+
+    queries = make_queries(cities, query_count)
+    indexed, scanned = [], []
+    for query in queries:
+        start = time.perf_counter()
+        _, page, _ = index.search(query["check_in"], query["check_out"], city=query["city"],
+                                  room_type=query["room_type"], max_rate=query["max_rate"], limit=limit)
+        indexed.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        expected = scan(catalogue, inventory, availability.RATE_PLANS, query, limit)
+        scanned.append(time.perf_counter() - start)
+        assert [(hotel_name, room_type) for _, _, hotel_name, room_type, _ in expected] == \
+            [(hotel_name, room_type) for hotel_name, room_type, _, _ in page], query
+
+    availability.HOTELS_DATABASE = catalogue
+    availability.INVENTORY = inventory
+    availability.SEARCH_INDEX = index
+    client = availability.app.test_client()
+    http = []
+    for query in queries:
+        params = {key: value for key, value in query.items() if value is not None}
+        params["limit"] = limit
+        start = time.perf_counter()
+        assert client.get("/search", query_string=params).status_code == 200
+        http.append(time.perf_counter() - start)
+
+    return {
+        "hotels": hotels,
+        "offers": len(index),
+        "index_build_ms": round(build_s * 1000, 1),
+        "indexed": summarize(indexed),
+        "scan": summarize(scanned),
+        "http_search": summarize(http)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--hotels", type=int, nargs="+", default=[1000, 10000, 30000], help="catalogue sizes")
+    parser.add_argument("--cities", type=int, default=50)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=20, help="results per page")
+    args = parser.parse_args()
+
+    results = [run(hotels, args.cities, args.queries, args.limit) for hotels in args.hotels]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""
+Benchmark: open-loop load against the whole three-service topology
+Starts vcc-2, vcc-3 and vcc-1 under their production servers (serve.py) on
+loopback, each on its own host:port, and points the Orchestrator at the
+other two through SERVICE_B_*/SERVICE_C_*. Pass --url instead to load an
+Orchestrator that is already running (e.g. on the VMs)
+Requests are sent at a fixed offered rate, whether or not earlier ones have
+answered (open loop), so a slow server shows up as latency instead of as a
+lower request rate. Each latency is measured from the request's scheduled
+send time, so requests held back by a saturated client count too.
+Traffic is synthetic bookings (seeded, so every run sends the same ones) or
+a JSONL file replayed in order, one request per line: either a booking
+body for /book-hotel, or {"method": ..., "path": ..., "body": ...}
+Prints one JSON document with RPS, p50/p95/p99/p999 latency, status codes
+and client errors, plus the commit and settings it ran with; --output
+appends it as a line to a JSONL file, to compare runs across commits
+
+Usage: python benchmarks/bench_topology.py [--rate 50] [--duration 30] [--warmup 5]
+           [--arrivals uniform|poisson] [--seed 1] [--replay FILE] [--url URL]
+           [--host 127.0.0.1] [--ports 5001 5002 5003] [--workers 2] [--threads 4]
+           [--rooms 1000000] [--gateway-ms 0] [--max-in-flight 1000] [--output FILE]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import aiohttp
+
+from _harness import REPO_ROOT, summarize, free_port, wait_for_port
+
+PAYMENT_METHODS = ["credit_card", "debit_card", "bank_transfer"]
+FIRST_STAY = date.today()       # inside the Availability service's horizon, which starts a day back
+STAY_WINDOW_DAYS = 700          # inside its 730-day horizon
+
+
+def start_topology(host, ports, workers, threads, rooms, gateway_ms):
+    """
+    Start Availability, Payment and Orchestrator under serve.py; returns the
+    processes (stop them with stop_topology) and the Orchestrator's URL
+    Availability keeps its inventory in memory, so it always runs one worker
+    """
+    orchestrator_port, availability_port, payment_port = ports
+    state_dir = tempfile.mkdtemp(prefix="vcc-topology-")
+    env = dict(os.environ)
+    env.update({
+        "SERVICE_B_IP": host, "SERVICE_B_PORT": str(availability_port),
+        "SERVICE_C_IP": host, "SERVICE_C_PORT": str(payment_port),
+        "INVENTORY_ROOMS": str(rooms),
+        "GATEWAY_LATENCY_SECONDS": str(gateway_ms / 1000),
+        "TRANSACTION_DB_PATH": os.path.join(state_dir, "payments.db"),
+        "SAGA_DB_PATH": os.path.join(state_dir, "sagas.db")
+    })
+    processes = []
+    for service, port, service_workers in (
+        ("vcc-2", availability_port, 1), ("vcc-3", payment_port, workers), ("vcc-1", orchestrator_port, workers)
+    ):
+        processes.append(subprocess.Popen(
+            [sys.executable, "serve.py", "--bind", f"{host}:{port}",
+             "--workers", str(service_workers), "--threads", str(threads)],
+            cwd=os.path.join(REPO_ROOT, service), env=env, stdout=subprocess.DEVNULL
+        ))
+        try:
+            wait_for_port(port, host=host)
+        except RuntimeError:
+            stop_topology(processes)
+            raise
+    return processes, f"http://{host}:{orchestrator_port}"
+
+
+def stop_topology(processes):
+    for process in reversed(processes):
+        process.terminate()
+    for process in processes:
+        process.wait()
+
+
+def synthetic_requests(hotels, seed):
+    """Endless seeded stream of /book-hotel requests over the hotels' room types and the stay window"""
+    rng = random.Random(seed)
+    rooms = [(hotel["name"], room_type) for hotel in hotels for room_type in hotel["room_types"]]
+    for i in range(10 ** 12):
+        hotel_name, room_type = rng.choice(rooms)
+        check_in = FIRST_STAY + timedelta(days=rng.randrange(STAY_WINDOW_DAYS))
+        yield "POST", "/book-hotel", {
+            "guest_name": f"Load Guest {i}",
+            "guest_email": f"guest{i}@example.com",
+            "hotel_name": hotel_name,
+            "room_type": room_type,
+            "check_in": check_in.isoformat(),
+            "check_out": (check_in + timedelta(days=rng.randint(1, 7))).isoformat(),
+            "payment_method": rng.choice(PAYMENT_METHODS),
+            "num_guests": rng.randint(1, 4)
+        }
+
+
+def replayed_requests(path):
+    """The requests of a JSONL file, in order, over and over"""
+    requests = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if "path" in entry:
+                requests.append((entry.get("method", "POST"), entry["path"], entry.get("body")))
+            else:
+                requests.append(("POST", "/book-hotel", entry))
+    if not requests:
+        raise SystemExit(f"{path} holds no requests")
+    while True:
+        yield from requests
+
+
+def arrival_offsets(rate, duration_s, arrivals, seed):
+    """Send times (seconds after the start) at the offered rate: evenly spaced or a Poisson process"""
+    if arrivals == "uniform":
+        return [i / rate for i in range(int(rate * duration_s))]
+    rng = random.Random(seed)
+    offsets = []
+    t = rng.expovariate(rate)
+    while t < duration_s:
+        offsets.append(t)
+        t += rng.expovariate(rate)
+    return offsets
+
+
+async def fetch_hotels(session, availability_url):
+    """The hotel catalogue for synthetic traffic, from the Availability service"""
+    async with session.get(f"{availability_url}/hotels") as response:
+        return (await response.json())["available_hotels"]
+
+
+async def drive(base_url, requests, offsets, warmup_s, max_in_flight, timeout_s):
+    """Fire one request per offset, open loop; returns stats for the requests sent after warmup_s"""
+    latencies = []
+    status_codes = {}
+    errors = {}
+    late = 0
+    connector = aiohttp.TCPConnector(limit=max_in_flight)
+    timeout = aiohttp.ClientTimeout(total=timeout_s)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        async def send(scheduled, method, path, body, measured):
+            try:
+                async with session.request(method, base_url + path, json=body) as response:
+                    await response.read()
+                    status = response.status
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if measured:
+                    name = type(e).__name__
+                    errors[name] = errors.get(name, 0) + 1
+                return
+            if measured:
+                latencies.append(time.perf_counter() - scheduled)
+                status_codes[status] = status_codes.get(status, 0) + 1
+
+        tasks = []
+        start = time.perf_counter() + 0.1
+        for offset in offsets:
+            scheduled = start + offset
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            elif delay < -0.01:
+                late += offset >= warmup_s  # the client itself fell behind the schedule
+            method, path, body = next(requests)
+            tasks.append(asyncio.ensure_future(send(scheduled, method, path, body, offset >= warmup_s)))
+        sent_for = time.perf_counter() - start
+        await asyncio.gather(*tasks)
+
+    measured = sum(1 for offset in offsets if offset >= warmup_s)
+    result = summarize(latencies)
+    result.update({
+        "sent": measured,
+        "offered_rps": round(measured / max(1e-9, sent_for - warmup_s), 1) if measured else 0.0,
+        "completed_rps": round(sum(status_codes.values()) / max(1e-9, sent_for - warmup_s), 1) if measured else 0.0,
+        "status_codes": {str(code): count for code, count in sorted(status_codes.items())},
+        "errors": errors,
+        "error_rate": round((measured - status_codes.get(200, 0)) / measured, 4) if measured else 0.0,
+        "late_sends": late
+    })
+    return result
+
+
+def git_revision():
+    """(commit, dirty) of the working tree, or (None, None) outside a git checkout"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_ROOT,
+                               capture_output=True, text=True, check=True).stdout.strip() != ""
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rate", type=float, default=50, help="offered requests per second")
+    parser.add_argument("--duration", type=float, default=30, help="seconds of traffic, warmup included")
+    parser.add_argument("--warmup", type=float, default=5, help="leading seconds left out of the results")
+    parser.add_argument("--arrivals", choices=["uniform", "poisson"], default="poisson")
+    parser.add_argument("--seed", type=int, default=1, help="seeds the synthetic traffic and the arrivals")
+    parser.add_argument("--replay", help="JSONL file of requests to replay instead of synthetic bookings")
+    parser.add_argument("--url", help="load this Orchestrator instead of starting the services")
+    parser.add_argument("--availability-url", help="Availability service for the hotel catalogue (with --url)")
+    parser.add_argument("--host", default="127.0.0.1", help="address the local services listen on")
+    parser.add_argument("--ports", type=int, nargs=3, metavar=("VCC1", "VCC2", "VCC3"),
+                        help="Orchestrator, Availability and Payment ports (default: free ports)")
+    parser.add_argument("--workers", type=int, default=2, help="worker processes of vcc-1 and vcc-3")
+    parser.add_argument("--threads", type=int, default=4, help="threads per worker process")
+    parser.add_argument("--rooms", type=int, default=10 ** 6, help="rooms per night of every room type")
+    parser.add_argument("--gateway-ms", type=float, default=0, help="simulated payment gateway latency")
+    parser.add_argument("--max-in-flight", type=int, default=1000, help="client connection limit")
+    parser.add_argument("--timeout", type=float, default=30, help="seconds before a request counts as an error")
+    parser.add_argument("--label", help="free-form name stored with the results")
+    parser.add_argument("--output", help="append the results as one line to this JSONL file")
+    args = parser.parse_args()
+    if args.url and not (args.replay or args.availability_url):
+        parser.error("--url needs --replay or --availability-url (for the hotel catalogue)")
+
+    processes = []
+    ports = args.ports or [free_port(), free_port(), free_port()]
+    if args.url:
+        base_url, availability_url = args.url.rstrip("/"), args.availability_url
+    else:
+        processes, base_url = start_topology(args.host, ports, args.workers, args.threads, args.rooms, args.gateway_ms)
+        availability_url = f"http://{args.host}:{ports[1]}"
+
+    try:
+        if args.replay:
+            requests = replayed_requests(args.replay)
+        else:
+            async def catalogue():
+                async with aiohttp.ClientSession() as session:
+                    return await fetch_hotels(session, availability_url)
+            requests = synthetic_requests(asyncio.run(catalogue()), args.seed)
+        offsets = arrival_offsets(args.rate, args.duration, args.arrivals, args.seed)
+        result = asyncio.run(drive(base_url, requests, offsets, args.warmup, args.max_in_flight, args.timeout))
+    finally:
+        stop_topology(processes)
+
+    commit, dirty = git_revision()
+    report = {
+        "label": args.label,
+        "commit": commit,
+        "dirty": dirty,
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "host": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "settings": {
+            "rate": args.rate, "duration_s": args.duration, "warmup_s": args.warmup, "arrivals": args.arrivals,
+            "seed": args.seed, "traffic": args.replay or "synthetic", "target": args.url or "local",
+            "workers": args.workers, "threads": args.threads, "rooms": args.rooms, "gateway_ms": args.gateway_ms,
+            "max_in_flight": args.max_in_flight
+        },
+        "result": result
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "a") as f:
+            f.write(json.dumps(report) + "\n")
+
+
+if __name__ == "__main__":
+    main()
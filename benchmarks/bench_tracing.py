@@ -0,0 +1,119 @@
+"""
+Benchmark: request tracing overhead and per-stage booking latency
+1. Cost of one span (start + finish), sampled and unsampled
+2. /book-hotel latency through the Orchestrator with Availability and Payment
+   served on loopback, with no trace sampled and with every trace sampled
+3. The sampled bookings' spans, collected from the three services'
+   /debug/traces, as a per-stage breakdown: mean and p95 duration of each
+   span name, and the time each downstream call spent outside the called
+   service's handler (network, connection setup, HTTP and JSON framing)
+
+Usage: python benchmarks/bench_tracing.py [--bookings 300]
+"""
+
+import argparse
+import json
+import time
+import timeit
+
+from _harness import (
+    load_service, unlimited_inventory, temporary_transaction_store, temporary_saga_log,
+    serve_in_thread, quiet_stdout, summarize, stay_dates, guest_booking
+)
+
+CHECK_IN, CHECK_OUT = stay_dates(30, nights=2)
+
+BOOKING = {
+    "hotel_name": "Oceanview Resort", "room_type": "Deluxe",
+    "check_in": CHECK_IN, "check_out": CHECK_OUT, "payment_method": "credit_card"
+}
+
+
+def span_cost(orchestrator):
+    tracer = orchestrator.Tracer("bench", sample_rate=0.0, buffer_size=4096)
+    results = {}
+    for label, parent in (("unsampled", ("0" * 31 + "1", "0" * 15 + "1", False)),
+                          ("sampled", ("0" * 31 + "1", "0" * 15 + "1", True))):
+        def one_span():
+            span = tracer.start_span("bench", "client", parent)
+            span.set("http.status_code", 200)
+            tracer.finish(span)
+        results[f"{label}_span_us"] = round(min(timeit.repeat(one_span, number=20000, repeat=3)) / 20000 * 1e6, 2)
+    return results
+
+
+def book(client, bookings):
+    latencies = []
+    trace_ids = []
+    with quiet_stdout():
+        for i in range(bookings):
+            start = time.perf_counter()
+            response = client.post("/book-hotel", json=guest_booking(i, **BOOKING))
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.get_json()
+            trace_ids.append(response.headers.get("X-Trace-Id"))
+    return latencies, [trace_id for trace_id in trace_ids if trace_id]
+
+
+def breakdown(services, trace_ids):
+    """Per span name (prefixed with its service): mean/p95 ms, plus time outside the called handlers"""
+    durations = {}
+    outside = {}
+    for trace_id in trace_ids:
+        spans = []
+        for service in services:
+            for trace in service.TRACER.traces(limit=1, trace_id=trace_id):
+                spans.extend((service.SERVICE_NAME, span) for span in trace["spans"])
+        by_parent = {span["parent_id"]: span for _, span in spans if span["kind"] == "server"}
+        for service_name, span in spans:
+            durations.setdefault(f"{service_name}: {span['name']}", []).append(span["duration_ms"] / 1000)
+            server = by_parent.get(span["span_id"]) if span["kind"] == "client" else None
+            if server is not None:
+                outside.setdefault(span["name"], []).append((span["duration_ms"] - server["duration_ms"]) / 1000)
+
+    def stats(samples):
+        summary = summarize(samples)
+        return {"mean_ms": round(sum(samples) / len(samples) * 1000, 3), "p95_ms": summary["p95_ms"]}
+
+    return {
+        "spans": {name: stats(samples) for name, samples in sorted(durations.items())},
+        "outside_handler": {name: stats(samples) for name, samples in sorted(outside.items())}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--bookings", type=int, default=300)
+    args = parser.parse_args()
+
+    availability = load_service("vcc-2")
+    payment = load_service("vcc-3")
+    orchestrator = load_service("vcc-1")
+    unlimited_inventory(availability)
+    temporary_transaction_store(payment)
+    temporary_saga_log(orchestrator)
+    payment.PAYMENT_SUCCESS_RATE = 1.0
+    _, availability_port = serve_in_thread(availability.app)
+    _, payment_port = serve_in_thread(payment.app)
+    orchestrator.AVAILABILITY_CLIENT = orchestrator.DownstreamClient(
+        "availability", f"http://127.0.0.1:{availability_port}", tracer=orchestrator.TRACER
+    )
+    orchestrator.PAYMENT_CLIENT = orchestrator.DownstreamClient(
+        "payment", f"http://127.0.0.1:{payment_port}", tracer=orchestrator.TRACER
+    )
+    client = orchestrator.app.test_client()
+    book(client, 20)  # warm the connection pools
+
+    results = {"span_cost": span_cost(orchestrator)}
+    orchestrator.TRACER.sample_rate = 0.0
+    latencies, _ = book(client, args.bookings)
+    results["booking_unsampled"] = summarize(latencies)
+    orchestrator.TRACER.sample_rate = 1.0
+    latencies, trace_ids = book(client, args.bookings)
+    results["booking_sampled"] = summarize(latencies)
+    results["breakdown"] = breakdown((orchestrator, availability, payment), trace_ids)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
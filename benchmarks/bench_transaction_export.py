@@ -0,0 +1,94 @@
+"""
+Benchmark: streaming /transactions/export vs building the full list in memory
+Fills a throwaway SQLite transaction store, then measures export rows/s and
+the peak Python memory of the streamed NDJSON export against one response
+built from a list of every transaction, plus the latency of a /transactions
+page taken deep into the table
+
+Usage: python benchmarks/bench_transaction_export.py [--rows 200000]
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+from datetime import datetime
+
+from _harness import load_service, temporary_transaction_store
+
+HOTELS = ["Grand Plaza", "Oceanview Resort", "City Center Inn"]
+
+
+def fill(store, rows):
+    for i in range(rows):
+        store.add({
+            "booking_id": f"BOOK{i}",
+            "guest_name": f"Guest {i}",
+            "hotel_name": HOTELS[i % len(HOTELS)],
+            "room_type": "Standard",
+            "amount": 100.0 + i % 500,
+            "currency": "USD",
+            "payment_method": "credit_card",
+            "status": "approved" if i % 20 else "declined",
+            "reason": None,
+            "timestamp": datetime.now().isoformat(),
+            "check_in": "2026-02-15",
+            "check_out": "2026-02-18",
+            "idempotency_key": f"BOOK{i}"
+        })
+
+
+def streamed(client):
+    size = 0
+    with client.get("/transactions/export") as response:
+        for chunk in response.response:
+            size += len(chunk)
+    return size
+
+
+def materialized(payment):
+    transactions = [payment.transaction_record(t) for t in payment.TRANSACTION_STORE.iter_transactions()]
+    return len("".join(json.dumps(record) + "\n" for record in transactions))
+
+
+def measure(run, rows, trace):
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    size = run()
+    elapsed = time.perf_counter() - start
+    result = {"rows_per_s": round(rows / elapsed), "bytes": size}
+    if trace:
+        result["peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 1)
+        tracemalloc.stop()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=200000)
+    args = parser.parse_args()
+
+    payment = load_service("vcc-3")
+    temporary_transaction_store(payment)
+    start = time.perf_counter()
+    fill(payment.TRANSACTION_STORE, args.rows)
+    client = payment.app.test_client()
+
+    results = {"fill_rows_per_s": round(args.rows / (time.perf_counter() - start))}
+    results["streamed_export"] = measure(lambda: streamed(client), args.rows, trace=False)
+    results["streamed_export"]["peak_mb"] = measure(lambda: streamed(client), args.rows, trace=True)["peak_mb"]
+    results["full_list"] = measure(lambda: materialized(payment), args.rows, trace=False)
+    results["full_list"]["peak_mb"] = measure(lambda: materialized(payment), args.rows, trace=True)["peak_mb"]
+
+    cursor = f"TXN{load_service('vcc-3', 'store').TRANSACTION_ID_BASE + args.rows - 150}"
+    start = time.perf_counter()
+    for _ in range(100):
+        client.get(f"/transactions?status=approved&cursor={cursor}&limit=100")
+    results["deep_page_ms"] = round((time.perf_counter() - start) * 10, 3)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
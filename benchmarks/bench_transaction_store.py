@@ -0,0 +1,106 @@
+"""
+Benchmark: Payment transaction store write and lookup throughput
+Each worker process writes --ops transactions to one shared SQLite (WAL)
+store, then looks them up by transaction_id and booking_id. Run with 1, 4
+and 16 workers; the process-local memory store is shown for reference
+
+Usage: python benchmarks/bench_transaction_store.py [--ops 2000] [--workers 1 4 16]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+
+from _harness import load_service
+
+store_module = load_service("vcc-3", "store")
+
+
+def sample_transaction(worker, i):
+    return {
+        "booking_id": f"BOOK{worker}-{i}",
+        "guest_name": "Lakshya Vashisth",
+        "hotel_name": "Grand Plaza",
+        "room_type": "Suite",
+        "amount": 900.0,
+        "currency": "USD",
+        "payment_method": "credit_card",
+        "status": "approved",
+        "reason": "Payment gateway approval",
+        "timestamp": "2026-02-15T10:00:00",
+        "check_in": "2026-02-15",
+        "check_out": "2026-02-18"
+    }
+
+
+def worker_run(backend, path, worker, ops, start_event, results):
+    store = store_module.create_store(backend, path)
+    start_event.wait()
+
+    start = time.perf_counter()
+    transaction_ids = [store.add(sample_transaction(worker, i)) for i in range(ops)]
+    write_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for transaction_id in transaction_ids:
+        store.get(transaction_id)
+    lookup_id_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(ops):
+        store.find_by_booking(f"BOOK{worker}-{i}")
+    lookup_booking_s = time.perf_counter() - start
+
+    results.put((transaction_ids, write_s, lookup_id_s, lookup_booking_s))
+
+
+def run(backend, workers, ops):
+    path = os.path.join(tempfile.mkdtemp(prefix="vcc3-store-"), "payments.db")
+    if backend == "sqlite":
+        store_module.create_store(backend, path).close()  # create schema up front
+    context = multiprocessing.get_context("fork")
+    start_event = context.Event()
+    results = context.Queue()
+    processes = [
+        context.Process(target=worker_run, args=(backend, path, worker, ops, start_event, results))
+        for worker in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    wall_start = time.perf_counter()
+    start_event.set()
+    outcomes = [results.get() for _ in processes]
+    wall_s = time.perf_counter() - wall_start
+    for process in processes:
+        process.join()
+
+    all_ids = [transaction_id for ids, *_ in outcomes for transaction_id in ids]
+    total = workers * ops
+    return {
+        "workers": workers,
+        "transactions": total,
+        "duplicate_ids": len(all_ids) - len(set(all_ids)),
+        "write_ops_per_s": round(total / max(outcome[1] for outcome in outcomes), 1),
+        "lookup_by_id_ops_per_s": round(total / max(outcome[2] for outcome in outcomes), 1),
+        "lookup_by_booking_ops_per_s": round(total / max(outcome[3] for outcome in outcomes), 1),
+        "wall_s": round(wall_s, 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--ops", type=int, default=2000, help="transactions per worker")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    args = parser.parse_args()
+
+    results = {"memory (1 process)": run("memory", 1, args.ops)}
+    for workers in args.workers:
+        results[f"sqlite ({workers} workers)"] = run("sqlite", workers, args.ops)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
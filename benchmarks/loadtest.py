@@ -0,0 +1,143 @@
+"""
+Load test: one service under its production server (serve.py / gunicorn)
+Starts the chosen service on loopback with the given workers and threads,
+keeps --concurrency requests in flight for --duration seconds and reports
+requests per second, tail latency and status codes as JSON.
+vcc-1 is pointed at in-process Availability and Payment stand-ins
+
+Usage: python benchmarks/loadtest.py --service vcc-2 [--workers 1] [--threads 8]
+           [--concurrency 32] [--duration 10]
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import aiohttp
+
+from _harness import (
+    REPO_ROOT, load_service, unlimited_inventory, temporary_transaction_store, serve_in_thread,
+    quiet_stdout, summarize, free_port, wait_for_port, stay_dates, guest_booking
+)
+
+CHECK_IN, CHECK_OUT = stay_dates(30)
+
+AVAILABILITY_QUERY = {
+    "hotel_name": "Oceanview Resort",
+    "room_type": "Deluxe",
+    "check_in": CHECK_IN,
+    "check_out": CHECK_OUT,
+    "num_guests": 2
+}
+
+
+def request_factory(service):
+    """Return a function producing (method, path, json_body) for request i"""
+    if service == "vcc-1":
+        return lambda i: ("POST", "/book-hotel", guest_booking(f"{os.getpid()}-{i}"))
+    if service == "vcc-2":
+        return lambda i: ("POST", "/check-availability", AVAILABILITY_QUERY)
+    return lambda i: ("POST", "/process-payment", {
+        "booking_id": f"LOAD{os.getpid()}-{i}",
+        "guest_name": f"Load Test {os.getpid()}-{i}",
+        "hotel_name": "Grand Plaza",
+        "room_type": "Suite",
+        "amount": 900.0,
+        "currency": "USD",
+        "payment_method": "credit_card"
+    })
+
+
+async def drive(base_url, make_request, concurrency, duration_s):
+    latencies = []
+    statuses = {}
+    errors = {}
+    counter = itertools.count()
+    deadline = time.perf_counter() + duration_s
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        async def worker():
+            while time.perf_counter() < deadline:
+                method, path, body = make_request(next(counter))
+                start = time.perf_counter()
+                try:
+                    async with session.request(method, base_url + path, json=body) as response:
+                        await response.read()
+                        statuses[response.status] = statuses.get(response.status, 0) + 1
+                except aiohttp.ClientError as e:
+                    errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+                    continue
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    result = summarize(latencies)
+    result["requests_per_s"] = round(len(latencies) / elapsed, 1)
+    result["status_codes"] = statuses
+    result["errors"] = errors
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--service", choices=["vcc-1", "vcc-2", "vcc-3"], required=True)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if args.service == "vcc-1":
+        with quiet_stdout():
+            availability = load_service("vcc-2")
+            unlimited_inventory(availability)
+            payment = load_service("vcc-3")
+            temporary_transaction_store(payment)
+        _, availability_port = serve_in_thread(availability.app)
+        _, payment_port = serve_in_thread(payment.app)
+        env.update({
+            "SERVICE_B_IP": "127.0.0.1", "SERVICE_B_PORT": str(availability_port),
+            "SERVICE_C_IP": "127.0.0.1", "SERVICE_C_PORT": str(payment_port),
+            "SAGA_DB_PATH": os.path.join(tempfile.mkdtemp(prefix="vcc1-load-"), "sagas.db")
+        })
+    if args.service == "vcc-3":
+        env["TRANSACTION_DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="vcc3-load-"), "payments.db")
+
+    port = free_port()
+    service_dir = os.path.join(REPO_ROOT, args.service)
+    server = subprocess.Popen(
+        [sys.executable, "serve.py", "--bind", f"127.0.0.1:{port}",
+         "--workers", str(args.workers), "--threads", str(args.threads)],
+        cwd=service_dir, env=env, stdout=subprocess.DEVNULL
+    )
+    try:
+        wait_for_port(port)
+        with quiet_stdout():
+            result = asyncio.run(drive(
+                f"http://127.0.0.1:{port}", request_factory(args.service), args.concurrency, args.duration
+            ))
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(json.dumps({
+        "service": args.service,
+        "workers": args.workers,
+        "threads": args.threads,
+        "concurrency": args.concurrency,
+        "duration_s": args.duration,
+        "result": result
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Response Encoding - shared by VCC-1, VCC-2 and VCC-3
+Edit common/encoding.py only; python common/sync.py copies it into each service
+Pluggable JSON encoder for the bodies this service reads and writes
+orjson is used when it is installed, the standard library json module
+otherwise; both produce compact UTF-8. Bodies that never change are encoded
+once at startup (encode_constant), and the hottest bodies are filled into
+pre-encoded byte fragments (JSONTemplate) instead of being serialized key by
+key. JSONProvider plugs the encoder into Flask, so jsonify, request.get_json
+and app.json all use it
+"""
+
+import json
+import math
+from json.encoder import encode_basestring
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+ENCODER = "orjson" if orjson is not None else "json"
+
+
+def _default(value):
+    # Types neither encoder handles natively (Decimal, UUID, dataclasses, ...) as Flask encodes them
+    return DefaultJSONProvider.default(value)
+
+
+if orjson is not None:
+    def dumps(obj):
+        """Encode obj as compact UTF-8 JSON bytes"""
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+    loads = orjson.loads
+else:
+    _encode = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False, default=_default).encode
+
+    def dumps(obj):
+        """Encode obj as compact UTF-8 JSON bytes"""
+        return _encode(obj).encode("utf-8")
+
+    loads = json.loads
+
+
+def encode_constant(obj):
+    """Encode a response body once, exactly as jsonify would send it"""
+    return dumps(obj) + b"\n"
+
+
+class JSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by dumps/loads above (install with app.json = JSONProvider(app))"""
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return dumps(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj) + b"\n", mimetype=self.mimetype)
+
+
+SLOT = object()  # marks a JSONTemplate value that is filled in per response
+
+
+class _Body(dict):
+    """A body built by JSONTemplate.fill, whose constants are already in place"""
+
+
+def _encode_value(value):
+    kind = type(value)
+    if kind is str:
+        return encode_basestring(value)
+    if kind is int or (kind is float and math.isfinite(value)):
+        return repr(value)
+    if value is None:
+        return "null"
+    return dumps(value).decode("utf-8")
+
+
+class JSONTemplate:
+    """
+    A JSON object with a fixed key order whose constant members are encoded
+    once; render(values) only encodes the SLOT members
+    With orjson the whole object is encoded in one call instead, which
+    measures faster than joining fragments
+    """
+
+    def __init__(self, layout):
+        self.layout = dict(layout)
+        self.slots = []
+        self._fragments = []
+        fragment = "{"
+        for position, (key, value) in enumerate(self.layout.items()):
+            fragment += ("," if position else "") + encode_basestring(key) + ":"
+            if value is SLOT:
+                self._fragments.append(fragment)
+                self.slots.append(key)
+                fragment = ""
+            else:
+                fragment += dumps(value).decode("utf-8")
+        self._fragments.append(fragment + "}\n")
+
+    def fill(self, values):
+        """The body as a dict, in layout order, with the slots taken from values"""
+        body = _Body(self.layout)
+        for key in self.slots:
+            body[key] = values[key]
+        return body
+
+    def render(self, values):
+        """
+        Encoded body (with jsonify's trailing newline) for the given slot
+        values, which may also be a body returned by fill
+        """
+        if orjson is not None:
+            return dumps(values if type(values) is _Body else self.fill(values)) + b"\n"
+        parts = [self._fragments[0]]
+        for key, fragment in zip(self.slots, self._fragments[1:]):
+            parts.append(_encode_value(values[key]))
+            parts.append(fragment)
+        return "".join(parts).encode("utf-8")
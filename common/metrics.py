@@ -0,0 +1,178 @@
+"""
+Service Metrics - shared by VCC-1, VCC-2 and VCC-3
+Edit common/metrics.py only; python common/sync.py copies it into each service
+Per-endpoint request counts, error counts by status code and latency
+histograms, plus downstream call latency, exposed in Prometheus text format
+Every thread records into its own shard, so the hot path takes no lock;
+shards are only merged when /metrics is scraped
+Each gunicorn worker process keeps its own metrics and reports them on the
+connections it serves
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from flask import Response, g, request
+
+# Histogram bucket upper bounds in seconds (+Inf is implicit)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _Shard:
+    """Counters and histograms written by a single thread"""
+
+    def __init__(self):
+        self.counters = {}    # (name, labels) -> count
+        self.histograms = {}  # (name, labels) -> [bucket counts..., +Inf count, sum]
+
+
+class Metrics:
+    """Thread-sharded registry of counters and latency histograms"""
+
+    def __init__(self, service, buckets=LATENCY_BUCKETS):
+        self.service = service
+        self.buckets = tuple(buckets)
+        self.started_at = time.time()
+        self._local = threading.local()
+        self._shards = []
+        self._gauges = {}              # (name, labels) -> callable read on every scrape
+        self._lock = threading.Lock()  # only taken when a thread records its first sample
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def inc(self, name, labels, amount=1):
+        _count(self._shard(), (name, labels), amount)
+
+    def observe(self, name, labels, seconds):
+        _record(self._shard(), (name, labels), self.buckets, seconds)
+
+    def gauge(self, name, read, labels=()):
+        """Report read() as a gauge on every scrape (e.g. a queue depth)"""
+        with self._lock:
+            self._gauges[(name, labels)] = read
+
+    def observe_request(self, endpoint, method, status_code, seconds):
+        """Record one served request"""
+        shard = self._shard()
+        labels = (("endpoint", endpoint), ("method", method), ("status", str(status_code)))
+        _count(shard, ("http_requests_total", labels), 1)
+        if status_code >= 400:
+            _count(shard, ("http_request_errors_total", labels), 1)
+        _record(shard, ("http_request_duration_seconds", labels[:2]), self.buckets, seconds)
+
+    def observe_downstream(self, target, path, outcome, seconds):
+        """Record one call to another service; outcome is the status code or the failure kind"""
+        shard = self._shard()
+        labels = (("target", target), ("path", path), ("outcome", str(outcome)))
+        _count(shard, ("downstream_requests_total", labels), 1)
+        _record(shard, ("downstream_request_duration_seconds", labels[:2]), self.buckets, seconds)
+
+    def _merged(self):
+        with self._lock:
+            shards = list(self._shards)
+        counters = {}
+        histograms = {}
+        for shard in shards:
+            # dict() copies in one step under the GIL, so a writer thread
+            # adding a new series cannot break the iteration
+            for key, value in dict(shard.counters).items():
+                counters[key] = counters.get(key, 0) + value
+            for key, values in dict(shard.histograms).items():
+                merged = histograms.get(key)
+                if merged is None:
+                    histograms[key] = list(values)
+                else:
+                    for i, value in enumerate(values):
+                        merged[i] += value
+        return counters, histograms
+
+    def render(self):
+        """Prometheus text exposition of everything recorded so far"""
+        counters, histograms = self._merged()
+        service = (("service", self.service),)
+        lines = [
+            "# TYPE process_start_time_seconds gauge",
+            f"process_start_time_seconds{_labels(service)} {self.started_at:.3f}"
+        ]
+        with self._lock:
+            gauges = dict(self._gauges)
+        for name in sorted({key[0] for key in gauges}):
+            lines.append(f"# TYPE {name} gauge")
+            for (series, labels), read in sorted(gauges.items(), key=lambda item: item[0]):
+                if series == name:
+                    lines.append(f"{name}{_labels(service + labels)} {read()}")
+        for name in sorted({key[0] for key in counters}):
+            lines.append(f"# TYPE {name} counter")
+            for (series, labels), value in sorted(counters.items()):
+                if series == name:
+                    lines.append(f"{name}{_labels(service + labels)} {value}")
+        for name in sorted({key[0] for key in histograms}):
+            lines.append(f"# TYPE {name} histogram")
+            for (series, labels), values in sorted(histograms.items()):
+                if series != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",), values):
+                    cumulative += count
+                    le = bound if bound == "+Inf" else repr(bound)
+                    lines.append(f"{name}_bucket{_labels(service + labels + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{_labels(service + labels)} {values[-1]:.6f}")
+                lines.append(f"{name}_count{_labels(service + labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+def _count(shard, key, amount):
+    counters = shard.counters
+    counters[key] = counters.get(key, 0) + amount
+
+
+def _record(shard, key, buckets, seconds):
+    histogram = shard.histograms.get(key)
+    if histogram is None:
+        histogram = shard.histograms[key] = [0] * (len(buckets) + 2)
+    histogram[bisect_left(buckets, seconds)] += 1
+    histogram[-1] += seconds
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(pairs):
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def instrument(app, metrics):
+    """
+    Time every request of a Flask app and serve the results on GET /metrics
+    Requests are labelled by URL rule (e.g. /payment-status/<transaction_id>)
+    rather than raw path, so the number of series stays bounded
+    Returns metrics, so a service can record its own samples into it
+    """
+    @app.before_request
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _record(response):
+        started = g.pop("metrics_started", None)
+        if started is not None:
+            endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+            metrics.observe_request(endpoint, request.method, response.status_code,
+                                    time.perf_counter() - started)
+        return response
+
+    @app.route('/metrics', methods=['GET'])
+    def prometheus_metrics():
+        """Prometheus scrape endpoint"""
+        return Response(metrics.render(), content_type=CONTENT_TYPE)
+
+    return metrics
@@ -0,0 +1,63 @@
+"""
+Shared Module Sync
+The modules every service uses unchanged are written once, here in common/,
+and copied into vcc-1, vcc-2 and vcc-3: each VM is set up with only its own
+service directory, so the services cannot import them from one place
+tests/test_shared_modules.py fails while a copy differs from its source
+Run with: python common/sync.py [--check]
+"""
+
+import argparse
+import os
+import sys
+
+COMMON_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(COMMON_DIR)
+
+SHARED_MODULES = ("metrics.py", "encoding.py", "tracing.py")
+SERVICES = ("vcc-1", "vcc-2", "vcc-3")
+
+
+def _read(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def stale_copies():
+    """Paths (relative to the repository) of copies that are missing or differ from common/"""
+    stale = []
+    for module in SHARED_MODULES:
+        source = _read(os.path.join(COMMON_DIR, module))
+        for service in SERVICES:
+            if _read(os.path.join(REPO_ROOT, service, module)) != source:
+                stale.append(os.path.join(service, module))
+    return stale
+
+
+def sync():
+    """Overwrite every stale copy with its source; returns the paths written"""
+    stale = stale_copies()
+    for path in stale:
+        with open(os.path.join(COMMON_DIR, os.path.basename(path)), "rb") as f:
+            source = f.read()
+        with open(os.path.join(REPO_ROOT, path), "wb") as f:
+            f.write(source)
+    return stale
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Copy the shared modules in common/ into every service")
+    parser.add_argument("--check", action="store_true", help="only report stale copies; exit 1 if there are any")
+    args = parser.parse_args()
+    paths = stale_copies() if args.check else sync()
+    for path in paths:
+        print(f"{'stale' if args.check else 'updated'}: {path}")
+    if args.check and paths:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Shared fixtures for the tests
+The services are loaded in-process with the benchmark harness
+(benchmarks/_harness.py): every test gets fresh modules, throwaway SQLite
+files, and Availability and Payment served on loopback ports
+
+Usage: python -m pytest tests
+"""
+
+import os
+import sys
+from datetime import date
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from _harness import (  # noqa: E402
+    load_service, quiet_stdout, serve_in_thread, temporary_saga_log, temporary_transaction_store
+)
+
+
+class FakeClock:
+    """A clock that only moves when a test moves it"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def stay(inventory, first_night, nights):
+    """(check_in, check_out) for a stay starting first_night nights into the inventory's horizon"""
+    return (date.fromordinal(inventory.start_day + first_night).isoformat(),
+            date.fromordinal(inventory.start_day + first_night + nights).isoformat())
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def availability():
+    with quiet_stdout():
+        return load_service("vcc-2")
+
+
+@pytest.fixture
+def payment():
+    with quiet_stdout():
+        module = load_service("vcc-3")
+    temporary_transaction_store(module)
+    module.PAYMENT_SUCCESS_RATE = 1.0
+    return module
+
+
+@pytest.fixture
+def orchestrator(availability, payment):
+    """Orchestrator app wired to Availability and Payment on loopback, with its own saga log"""
+    with quiet_stdout():
+        module = load_service("vcc-1")
+    temporary_saga_log(module)
+    servers = []
+    for name, service in (("availability", availability), ("payment", payment)):
+        server, port = serve_in_thread(service.app)
+        servers.append(server)
+        client = module.DownstreamClient(name, f"http://127.0.0.1:{port}")
+        setattr(module, f"{name.upper()}_CLIENT", client)
+    yield module
+    for server in servers:
+        server.shutdown()
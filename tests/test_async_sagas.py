@@ -0,0 +1,54 @@
+"""Saga log on the async engine (vcc-1/async_app.py): a slow saga write holds up only its own booking"""
+
+import asyncio
+import time
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from _harness import guest_booking, load_service, quiet_stdout, serve_in_thread
+
+from conftest import stay
+
+WRITE_SECONDS = 0.3
+
+
+def test_slow_saga_writes_do_not_stall_the_event_loop(availability, payment, monkeypatch, tmp_path):
+    monkeypatch.setenv("SAGA_DB_PATH", str(tmp_path / "sagas.db"))
+    with quiet_stdout():
+        async_app = load_service("vcc-1", "async_app")
+    saga = load_service("vcc-1", "saga")
+
+    class SlowSagaLog(saga.SagaLog):
+        """Every state change waits, as it would behind another process's write lock"""
+
+        def advance(self, *args, **kwargs):
+            time.sleep(WRITE_SECONDS)
+            return super().advance(*args, **kwargs)
+
+    sagas = SlowSagaLog(str(tmp_path / "slow.db"))
+    async_app.SAGA_LOG = async_app.AsyncSagaLog(sagas)
+    _, availability_port = serve_in_thread(availability.app)
+    _, payment_port = serve_in_thread(payment.app)
+    app = async_app.create_app(f"http://127.0.0.1:{availability_port}", f"http://127.0.0.1:{payment_port}")
+    check_in, check_out = stay(availability.INVENTORY, 30, 3)
+
+    async def run():
+        async with TestClient(TestServer(app)) as client:
+            booking = asyncio.ensure_future(client.post("/book-hotel", json=guest_booking(
+                1, check_in=check_in, check_out=check_out
+            )))
+            slowest = 0.0
+            while not booking.done():
+                started = time.perf_counter()
+                response = await client.get("/")
+                assert response.status == 200
+                slowest = max(slowest, time.perf_counter() - started)
+                await asyncio.sleep(0.02)
+            response = await booking
+            return response.status, await response.json(), slowest
+
+    with quiet_stdout():
+        status, body, slowest = asyncio.run(run())
+    assert status == 200, body
+    assert sagas.get(body["booking_id"])["state"] == "confirmed"
+    assert slowest < WRITE_SECONDS / 2
@@ -0,0 +1,83 @@
+"""Availability cache (vcc-2/cache.py, /check-availability, /hotels): a room change drops only the stays it touches"""
+
+from _harness import load_service
+
+from conftest import stay
+
+cache_module = load_service("vcc-2", "cache")
+
+ROOM = ("Grand Plaza", "Suite")
+
+
+def check(client, check_in, check_out, **headers):
+    response = client.post("/check-availability", headers=headers, json={
+        "hotel_name": ROOM[0], "room_type": ROOM[1], "check_in": check_in, "check_out": check_out
+    })
+    return response.headers.get("X-Cache"), response.get_json().get("available_rooms", 0)
+
+
+def test_reserve_and_release_drop_overlapping_stays(availability):
+    client = availability.app.test_client()
+    stay_dates = stay(availability.INVENTORY, 30, 3)
+    later = stay(availability.INVENTORY, 40, 3)
+    _, rooms = check(client, *stay_dates)
+    check(client, *later)
+    assert check(client, *stay_dates) == ("HIT", rooms)
+
+    reserved = client.post("/reserve", json={
+        "hotel_name": ROOM[0], "room_type": ROOM[1], "check_in": stay_dates[0], "check_out": stay_dates[1]
+    }).get_json()
+    assert check(client, *stay_dates) == ("MISS", rooms - 1)
+    assert check(client, *later) == ("HIT", rooms)  # no night in common
+
+    client.post("/release", json={"reservation_id": reserved["reservation_id"]})
+    assert check(client, *stay_dates) == ("MISS", rooms)
+    assert check(client, *stay_dates, **{"Cache-Control": "no-cache"}) == (None, rooms)
+
+
+def test_a_lapsed_hold_drops_its_stays(availability, clock):
+    availability.INVENTORY = availability.Inventory(
+        availability.HOTELS_DATABASE, availability.INVENTORY_START_DATE, availability.INVENTORY_HORIZON_DAYS,
+        clock=clock
+    )
+    availability.INVENTORY.add_listener(availability.AVAILABILITY_CACHE.invalidate)
+    client = availability.app.test_client()
+    stay_dates = stay(availability.INVENTORY, 30, 3)
+    availability.INVENTORY.reserve(*ROOM, *stay_dates, hold_seconds=10)
+    _, held = check(client, *stay_dates)
+    clock.advance(11)
+    availability.INVENTORY.expire_holds()
+    assert check(client, *stay_dates) == ("MISS", held + 1)
+
+
+def test_a_quote_computed_before_a_change_is_not_stored(clock):
+    cache = cache_module.AvailabilityCache(clock=clock)
+    cache.put("stale", ROOM, (0, 3), "old quote", version=1, current_version=lambda: 2)
+    assert cache.get("stale") is None
+    cache.put("fresh", ROOM, (0, 3), "quote", version=2, current_version=lambda: 2)
+    assert cache.get("fresh") == "quote"
+
+
+def test_entries_expire_and_the_least_recent_is_evicted(clock):
+    cache = cache_module.AvailabilityCache(max_entries=2, ttl_seconds=30, clock=clock)
+    for night, key in enumerate(("a", "b")):
+        cache.put(key, ROOM, (night, night + 1), key, 0, lambda: 0)
+    cache.get("a")
+    cache.put("c", ROOM, (5, 6), "c", 0, lambda: 0)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == ("a", None, "c")
+    cache.invalidate(ROOM, 5, 10)
+    assert cache.get("c") is None and cache.get("a") == "a"
+    clock.advance(31)
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert (stats["evictions"], stats["invalidations"], stats["expirations"]) == (1, 1, 1)
+
+
+def test_hotels_supports_conditional_get(availability):
+    client = availability.app.test_client()
+    first = client.get("/hotels")
+    assert first.status_code == 200 and first.headers["ETag"]
+    assert first.get_json()["available_hotels"]
+    revalidated = client.get("/hotels", headers={"If-None-Match": first.headers["ETag"]})
+    assert revalidated.status_code == 304
+    assert revalidated.get_data() == b""
@@ -0,0 +1,158 @@
+"""Service discovery (vcc-1/discovery.py): sources, balancing, ejection and health checks across replicas"""
+
+import random
+import socket
+
+import pytest
+from flask import Flask, jsonify
+
+from _harness import load_service, serve_in_thread
+
+discovery = load_service("vcc-1", "discovery")
+downstream = load_service("vcc-1", "downstream")
+
+REPLICAS = ["10.0.0.1:5002", "10.0.0.2:5002", "10.0.0.3:5002"]
+
+
+class FakeSession:
+    """Health check answers by address: a status code, or an exception to raise"""
+
+    def __init__(self, answers):
+        self.answers = answers
+
+    def get(self, url, timeout):
+        answer = self.answers[url.split("/")[2]]
+        if isinstance(answer, Exception):
+            raise answer
+
+        class Response:
+            status_code = answer
+        return Response()
+
+
+def registry(clock, addresses=REPLICAS, **settings):
+    return discovery.EndpointRegistry("availability", discovery.StaticSource(addresses), health_path=None,
+                                      health_interval=3600, clock=clock, **settings)
+
+
+def test_sources_resolve_their_replicas(tmp_path):
+    assert discovery.source_from_spec("10.0.0.1:5002, 10.0.0.2:5002 10.0.0.1:5002").resolve() == REPLICAS[:2]
+    with pytest.raises(ValueError):
+        discovery.parse_addresses("10.0.0.1")
+
+    path = tmp_path / "availability.txt"
+    path.write_text("# replicas\n10.0.0.1:5002\n10.0.0.2:5002  # second\n")
+    source = discovery.source_from_spec(f"file:{path}")
+    assert source.resolve() == REPLICAS[:2]
+    path.write_text("\n".join(REPLICAS) + "\n")
+    assert source.resolve() == REPLICAS
+
+    resolved = discovery.source_from_spec("dns:localhost:5002").resolve()
+    assert any(address in resolved for address in ("127.0.0.1:5002", "[::1]:5002"))
+    with pytest.raises(ValueError):
+        discovery.source_from_spec("dns:localhost")
+
+
+def test_refresh_keeps_the_state_of_known_replicas(tmp_path, clock):
+    path = tmp_path / "availability.txt"
+    path.write_text("\n".join(REPLICAS[:2]))
+    replicas = discovery.EndpointRegistry("availability", discovery.FileSource(str(path)), health_path=None,
+                                          health_interval=3600, clock=clock)
+    first = replicas.endpoints()[0]
+    replicas.acquire(first)
+    path.write_text("\n".join(REPLICAS[::-1]))
+    assert replicas.refresh()
+    assert [endpoint.address for endpoint in replicas.endpoints()] == REPLICAS[::-1]
+    assert replicas.endpoints()[-1] is first and first.outstanding == 1
+    path.unlink()
+    assert not replicas.refresh()  # a failed resolve keeps the last known replicas
+    assert len(replicas.endpoints()) == 3 and replicas.refresh_errors == 1
+
+
+@pytest.mark.parametrize("balancer", discovery.BALANCERS)
+def test_calls_go_to_the_least_busy_replica(clock, balancer):
+    replicas = registry(clock, REPLICAS[:2], balancer=balancer)
+    busy, idle = replicas.endpoints()
+    replicas.acquire(busy)
+    assert all(replicas.pick() is idle for _ in range(20))
+    replicas.acquire(idle)
+    assert {replicas.pick().address for _ in range(50)} == set(REPLICAS[:2])
+    assert replicas.pick(avoid=(busy.address,)) is idle
+
+
+def test_failing_replica_is_ejected_and_comes_back(clock):
+    replicas = registry(clock, eject_after=3, eject_seconds=10)
+    bad = replicas.endpoints()[0]
+    for _ in range(3):
+        replicas.acquire(bad)
+        replicas.release(bad, failed=True, error="HTTP 503")
+    assert all(replicas.pick() is not bad for _ in range(30))
+    clock.advance(10)
+    assert bad.available(clock())
+    for _ in range(3):  # ejected again soon after: twice as long
+        replicas.acquire(bad)
+        replicas.release(bad, failed=True, error="HTTP 503")
+    clock.advance(10)
+    assert not bad.available(clock())
+    clock.advance(10)
+    assert bad.available(clock())
+
+
+def test_health_checks_take_replicas_out_and_back(clock):
+    replicas = discovery.EndpointRegistry("availability", discovery.StaticSource(REPLICAS[:2]), health_path="/",
+                                          health_interval=3600, unhealthy_after=2, clock=clock)
+    answers = {REPLICAS[0]: 200, REPLICAS[1]: discovery.requests.exceptions.ConnectionError("refused")}
+    session = FakeSession(answers)
+    replicas.check(session)
+    assert all(endpoint.healthy for endpoint in replicas.endpoints())  # one failure is not enough
+    replicas.check(session)
+    assert [endpoint.healthy for endpoint in replicas.endpoints()] == [True, False]
+    answers[REPLICAS[1]] = 404  # any answer below 500 means the replica is up
+    replicas.check(session)
+    assert all(endpoint.healthy for endpoint in replicas.endpoints())
+
+    # With every replica down, all of them are used rather than none
+    answers.update({address: 503 for address in REPLICAS[:2]})
+    replicas.check(session)
+    replicas.check(session)
+    assert replicas.pick().address in REPLICAS[:2]
+
+
+def test_a_key_stays_with_its_owner(clock):
+    replicas = registry(clock, eject_after=1)
+    owners = {key: replicas.owner(key) for key in ("Grand Plaza", "Oceanview Resort", "BOOK1", "BOOK2")}
+    assert all(replicas.pick(affinity=key).address == owner for key, owner in owners.items())
+    owner = next(endpoint for endpoint in replicas.endpoints() if endpoint.address == owners["BOOK1"])
+    replicas.acquire(owner)
+    replicas.release(owner, failed=True, error="HTTP 503")
+    with pytest.raises(discovery.OwnerUnavailableError):
+        replicas.pick(affinity="BOOK1")
+    assert replicas.owner("BOOK1") == owners["BOOK1"]  # health never moves a key
+
+
+def test_client_spreads_calls_and_skips_a_dead_replica(monkeypatch):
+    monkeypatch.setattr(discovery, "random", random.Random(7))  # ties between idle replicas break the same way
+    calls = []
+
+    def replica(name):
+        app = Flask(name)
+
+        @app.route("/check", methods=["POST"])
+        def check():
+            calls.append(name)
+            return jsonify({"replica": name})
+
+        _, port = serve_in_thread(app)
+        return f"127.0.0.1:{port}"
+
+    with socket.socket() as unused:
+        unused.bind(("127.0.0.1", 0))
+        dead = f"127.0.0.1:{unused.getsockname()[1]}"
+    live = [replica("a"), replica("b")]
+    replicas = discovery.EndpointRegistry("availability", discovery.StaticSource(live + [dead]), health_path=None,
+                                          health_interval=3600, eject_after=1)
+    client = downstream.DownstreamClient("availability", registry=replicas, retries=2)
+    assert all(client.post("/check", json={}).status_code == 200 for _ in range(30))
+    assert {"a", "b"} == set(calls)
+    dead_endpoint = next(endpoint for endpoint in replicas.endpoints() if endpoint.address == dead)
+    assert dead_endpoint.ejections == 1 and dead_endpoint.requests == 1
@@ -0,0 +1,74 @@
+"""Hedged reads (vcc-1 DownstreamClient, AsyncDownstreamClient): a fast 503 does not beat a slow success"""
+
+import asyncio
+import itertools
+import time
+
+import pytest
+from flask import Flask, jsonify
+
+from _harness import load_service, serve_in_thread
+
+downstream = load_service("vcc-1", "downstream")
+resilience = load_service("vcc-1", "resilience")
+
+HEDGE_DELAY = 0.05
+
+
+def replica(*answers):
+    """A service answering its nth call with answers[n]: (seconds to wait, status code)"""
+    app = Flask(__name__)
+    calls = itertools.count()
+
+    @app.route("/check", methods=["POST"])
+    def check():
+        seconds, status_code = answers[min(next(calls), len(answers) - 1)]
+        time.sleep(seconds)
+        return jsonify({"status_code": status_code}), status_code
+
+    _, port = serve_in_thread(app)
+    return f"http://127.0.0.1:{port}"
+
+
+def hedge_policy():
+    return resilience.HedgePolicy(default_delay=HEDGE_DELAY)
+
+
+def test_fast_503_from_the_backup_does_not_win():
+    client = downstream.DownstreamClient("availability", replica((0.3, 200), (0.0, 503)), hedge=hedge_policy())
+    response = client.post("/check", json={}, hedge=True)
+    assert response.status_code == 200
+    assert client.hedge.snapshot()["hedges_won"] == 0
+    assert client.hedge.snapshot()["hedges_sent"] == 1
+
+
+def test_backup_success_wins():
+    client = downstream.DownstreamClient("availability", replica((0.3, 200), (0.0, 200)), hedge=hedge_policy())
+    assert client.post("/check", json={}, hedge=True).status_code == 200
+    assert client.hedge.snapshot()["hedges_won"] == 1
+
+
+def test_both_failing_returns_the_failure():
+    client = downstream.DownstreamClient("availability", replica((0.1, 503), (0.0, 503)), hedge=hedge_policy())
+    assert client.post("/check", json={}, hedge=True).status_code == 503
+    assert client.hedge.snapshot()["hedges_won"] == 0
+
+
+@pytest.mark.parametrize("answers, status_code, won", [
+    (((0.3, 200), (0.0, 503)), 200, 0),
+    (((0.3, 200), (0.0, 200)), 200, 1),
+    (((0.1, 503), (0.0, 503)), 503, 0)
+])
+def test_async_engine_hedges_the_same_way(answers, status_code, won):
+    async_app = load_service("vcc-1", "async_app")
+    client = async_app.AsyncDownstreamClient("availability", replica(*answers), hedge=hedge_policy())
+
+    async def call():
+        await client.start()
+        try:
+            return await client.post_json("/check", {}, hedge=True)
+        finally:
+            await client.close()
+
+    assert asyncio.run(call())[0] == status_code
+    assert client.hedge.snapshot()["hedges_won"] == won
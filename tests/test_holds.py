@@ -0,0 +1,101 @@
+"""Room holds (vcc-2/inventory.py, POST /reserve, /confirm): a hold lapses unless confirmed in time"""
+
+import pytest
+
+from conftest import stay
+
+HOTEL, ROOM_TYPE = "Grand Plaza", "Suite"
+HOLD_SECONDS = 10
+
+
+@pytest.fixture
+def inventory(availability, clock):
+    """The Availability app's inventory on a clock the test moves"""
+    availability.INVENTORY = availability.Inventory(
+        availability.HOTELS_DATABASE, availability.INVENTORY_START_DATE, availability.INVENTORY_HORIZON_DAYS,
+        clock=clock
+    )
+    return availability.INVENTORY
+
+
+def free(inventory, check_in, check_out):
+    return inventory.available(HOTEL, ROOM_TYPE, check_in, check_out)
+
+
+def test_hold_lapses_after_its_ttl(inventory, clock):
+    check_in, check_out = stay(inventory, 30, 3)
+    rooms = free(inventory, check_in, check_out)
+    hold = inventory.reserve(HOTEL, ROOM_TYPE, check_in, check_out, reference="BOOK1", hold_seconds=HOLD_SECONDS)
+    assert hold.state == "held"
+    assert free(inventory, check_in, check_out) == rooms - 1
+
+    clock.advance(HOLD_SECONDS - 0.5)
+    inventory.expire_holds()
+    assert inventory.holds() == 1  # not a moment early
+
+    clock.advance(1.0)
+    inventory.expire_holds()
+    assert inventory.holds() == 0
+    assert free(inventory, check_in, check_out) == rooms
+    assert inventory.confirm(hold.reservation_id) is None
+
+
+def test_confirmed_hold_never_lapses(inventory, clock):
+    check_in, check_out = stay(inventory, 30, 3)
+    rooms = free(inventory, check_in, check_out)
+    hold = inventory.reserve(HOTEL, ROOM_TYPE, check_in, check_out, reference="BOOK1", hold_seconds=HOLD_SECONDS)
+
+    clock.advance(HOLD_SECONDS - 1)
+    assert inventory.confirm(hold.reservation_id).state == "confirmed"
+    assert inventory.confirm(hold.reservation_id).state == "confirmed"  # twice is harmless
+
+    clock.advance(10 * HOLD_SECONDS)
+    inventory.expire_holds()
+    assert inventory.holds() == 0
+    assert inventory.holds_expired == 0
+    assert free(inventory, check_in, check_out) == rooms - 1
+
+
+def test_lapsed_room_can_be_booked_again(inventory, clock):
+    check_in, check_out = stay(inventory, 30, 3)
+    rooms = free(inventory, check_in, check_out)
+    hold = inventory.reserve(HOTEL, ROOM_TYPE, check_in, check_out, rooms=rooms, reference="BOOK1",
+                             hold_seconds=HOLD_SECONDS)
+    assert inventory.reserve(HOTEL, ROOM_TYPE, check_in, check_out, reference="BOOK2") is None
+
+    clock.advance(HOLD_SECONDS + 1)
+    inventory.expire_holds()
+    assert inventory.reserve(HOTEL, ROOM_TYPE, check_in, check_out, reference="BOOK2") is not None
+    # The lapsed booking lost its rooms: a retry of it is a new reservation, not the old hold
+    assert inventory.reserve(HOTEL, ROOM_TYPE, check_in, check_out, rooms=rooms, reference="BOOK1") is None
+    assert inventory.confirm(hold.reservation_id) is None
+
+
+def test_confirm_endpoint_after_lapse_is_404(availability, inventory, clock):
+    client = availability.app.test_client()
+    check_in, check_out = stay(inventory, 30, 3)
+    response = client.post("/reserve", json={
+        "hotel_name": HOTEL, "room_type": ROOM_TYPE, "check_in": check_in, "check_out": check_out,
+        "booking_id": "BOOK1", "hold_seconds": HOLD_SECONDS
+    })
+    assert response.status_code == 201
+    reservation_id = response.get_json()["reservation_id"]
+
+    clock.advance(HOLD_SECONDS + 1)
+    inventory.expire_holds()
+    assert client.post("/confirm", json={"reservation_id": reservation_id}).status_code == 404
+
+
+def test_confirm_endpoint_in_time(availability, inventory, clock):
+    client = availability.app.test_client()
+    check_in, check_out = stay(inventory, 30, 3)
+    reservation_id = client.post("/reserve", json={
+        "hotel_name": HOTEL, "room_type": ROOM_TYPE, "check_in": check_in, "check_out": check_out,
+        "booking_id": "BOOK1", "hold_seconds": HOLD_SECONDS
+    }).get_json()["reservation_id"]
+
+    clock.advance(HOLD_SECONDS - 1)
+    assert client.post("/confirm", json={"reservation_id": reservation_id}).status_code == 200
+    clock.advance(HOLD_SECONDS)
+    inventory.expire_holds()
+    assert client.post("/confirm", json={"reservation_id": reservation_id}).status_code == 200
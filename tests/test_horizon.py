@@ -0,0 +1,113 @@
+"""Rolling horizon (Inventory.roll, RatePlans.extend, vcc-2 roll_horizon): a new day drops a night and opens one"""
+
+from datetime import date, timedelta
+
+import pytest
+
+from _harness import load_service
+
+inventory_module = load_service("vcc-2", "inventory")
+rates = load_service("vcc-2", "rates")
+
+HOTELS = {"Grand Plaza": {"city": "New York", "rooms": {"Suite": {"rate": 450, "available": 1}}}}
+PLANS = {
+    "weekend": [{"nights": ["friday", "saturday"], "multiplier": 1.15}],
+    "seasons": [{"start": "2026-01-12", "end": "2026-01-20", "multiplier": 1.5}],
+    "length_of_stay": [{"min_nights": 7, "discount": 0.1}]
+}
+
+
+@pytest.fixture
+def inventory():
+    return inventory_module.Inventory(HOTELS, "2026-01-01", 10)
+
+
+def free(inventory, check_in, check_out):
+    return inventory.available("Grand Plaza", "Suite", check_in, check_out)
+
+
+def test_roll_drops_past_nights_and_opens_new_ones(inventory):
+    with pytest.raises(inventory_module.InventoryError):
+        free(inventory, "2026-01-10", "2026-01-12")
+    reservation = inventory.reserve("Grand Plaza", "Suite", "2026-01-02", "2026-01-05", reference="BOOK1")
+
+    assert inventory.roll("2026-01-03") == 2
+    with pytest.raises(inventory_module.InventoryError):
+        free(inventory, "2026-01-02", "2026-01-04")
+    # The reservation keeps its rooms on the nights left, and the new nights start free
+    assert free(inventory, "2026-01-03", "2026-01-05") == 0
+    assert free(inventory, "2026-01-05", "2026-01-13") == 1
+    assert reservation.check_in == "2026-01-02"
+    assert [count for _, count in inventory.nightly("Grand Plaza", "Suite", "2026-01-03", "2026-01-06")] == [0, 0, 1]
+
+    # Releasing it gives back only the nights still on the books
+    inventory.release(reservation.reservation_id)
+    assert free(inventory, "2026-01-03", "2026-01-13") == 1
+    assert inventory.reserve("Grand Plaza", "Suite", "2026-01-03", "2026-01-13", reference="BOOK2") is not None
+
+
+def test_roll_is_idempotent_and_never_goes_back(inventory):
+    assert inventory.roll("2026-01-04") == 3
+    assert inventory.roll("2026-01-04") == 0
+    assert inventory.roll("2026-01-02") == 0
+    assert inventory.night_range("2026-01-04", "2026-01-05") == (3, 4)
+
+
+def test_roll_past_the_whole_horizon(inventory):
+    inventory.reserve("Grand Plaza", "Suite", "2026-01-01", "2026-01-11")
+    assert inventory.roll("2026-02-01") == 31
+    assert free(inventory, "2026-02-01", "2026-02-11") == 1
+
+
+def test_roll_bumps_versions_and_tells_listeners(inventory):
+    inventory.reserve("Grand Plaza", "Suite", "2026-01-02", "2026-01-03")
+    version = inventory.version("Grand Plaza", "Suite")
+    changes = []
+    inventory.add_listener(lambda key, start, end: changes.append((key, start, end)))
+    inventory.roll("2026-01-02")
+    assert inventory.version("Grand Plaza", "Suite") > version
+    assert changes == [(("Grand Plaza", "Suite"), 0, 11)]
+
+
+def test_hold_spanning_dropped_nights_lapses_cleanly():
+    clock = [0.0]
+    inventory = inventory_module.Inventory(HOTELS, "2026-01-01", 10, clock=lambda: clock[0])
+    inventory.reserve("Grand Plaza", "Suite", "2026-01-01", "2026-01-04", reference="BOOK1", hold_seconds=5)
+    inventory.roll("2026-01-02")
+    clock[0] = 10.0
+    inventory.expire_holds()
+    assert inventory.holds() == 0
+    assert free(inventory, "2026-01-02", "2026-01-12") == 1
+
+
+def test_extended_rate_plans_price_new_nights_like_a_fresh_build():
+    rolled = rates.RatePlans(PLANS, "2026-01-01", 10)
+    rolled.quote("Grand Plaza", "New York", "Suite", 450, 0, 3)  # built over the first horizon
+    assert rolled.extend(25)
+    assert not rolled.extend(20)
+    fresh = rates.RatePlans(PLANS, "2026-01-01", 25)
+    for start, end in ((0, 3), (8, 12), (10, 18), (15, 25)):
+        assert (rolled.quote("Grand Plaza", "New York", "Suite", 450, start, end) ==
+                fresh.quote("Grand Plaza", "New York", "Suite", 450, start, end))
+        assert (rolled.nightly("Grand Plaza", "New York", "Suite", 450, start, end) ==
+                fresh.nightly("Grand Plaza", "New York", "Suite", 450, start, end))
+
+
+def test_service_rolls_its_horizon(availability):
+    client = availability.app.test_client()
+    today = date.fromordinal(availability.INVENTORY.start_day + availability.INVENTORY_BACK_DAYS)
+    first = today - timedelta(days=availability.INVENTORY_BACK_DAYS)
+    new_last = first + timedelta(days=availability.INVENTORY_HORIZON_DAYS + 2)
+
+    def rates_for(check_in, check_out):
+        return client.get(f"/rates/Grand Plaza/Deluxe?check_in={check_in}&check_out={check_out}")
+
+    assert rates_for(first, first + timedelta(days=1)).status_code == 200
+    assert rates_for(new_last - timedelta(days=1), new_last).status_code == 400
+
+    assert availability.roll_horizon(today + timedelta(days=3)) == 3
+    assert rates_for(first, first + timedelta(days=1)).status_code == 400
+    response = rates_for(new_last - timedelta(days=1), new_last)
+    assert response.status_code == 200
+    assert response.get_json()["nights"][0]["date"] == (new_last - timedelta(days=1)).isoformat()
+    assert availability.roll_horizon(today + timedelta(days=3)) == 0
@@ -0,0 +1,113 @@
+"""Idempotent payments (vcc-3/idempotency.py, POST /process-payment): a repeated key replays, on any worker"""
+
+import threading
+
+import pytest
+
+from _harness import load_service, quiet_stdout
+
+idempotency = load_service("vcc-3", "idempotency")
+
+PAYMENT = {
+    "booking_id": "BOOK1", "guest_name": "Replay Guest", "hotel_name": "Grand Plaza", "room_type": "Deluxe",
+    "amount": 300.0, "currency": "USD", "payment_method": "credit_card"
+}
+
+
+@pytest.fixture
+def gateway_calls(payment):
+    """Count the simulated gateway's charges"""
+    calls = []
+    run_gateway = payment.run_gateway
+
+    def counting(data):
+        calls.append(data["booking_id"])
+        return run_gateway(data)
+
+    payment.run_gateway = counting
+    return calls
+
+
+def another_worker(payment):
+    """A second Payment app process on the same SQLite store, with its own (empty) idempotency cache"""
+    with quiet_stdout():
+        other = load_service("vcc-3")
+    other.TRANSACTION_STORE = other.create_store("sqlite", payment.TRANSACTION_DB_PATH)
+    other.PAYMENT_SUCCESS_RATE = 1.0
+    return other
+
+
+def test_a_repeated_key_replays_without_charging(payment, gateway_calls):
+    client = payment.app.test_client()
+    first = client.post("/process-payment", json=PAYMENT)
+    again = client.post("/process-payment", json=PAYMENT)
+    assert first.status_code == again.status_code == 200
+    assert again.get_json()["transaction_id"] == first.get_json()["transaction_id"]
+    assert again.headers["Idempotent-Replay"] == "true"
+    assert "Idempotent-Replay" not in first.headers
+    assert gateway_calls == ["BOOK1"]
+    assert payment.TRANSACTION_STORE.count() == 1
+
+    different = client.post("/process-payment", json=dict(PAYMENT, amount=301.0))
+    assert different.status_code == 422
+    # The header names the charge; without it the booking ID does
+    retried = client.post("/process-payment", json=PAYMENT, headers={"Idempotency-Key": "retry-1"})
+    assert retried.get_json()["transaction_id"] != first.get_json()["transaction_id"]
+    assert payment.TRANSACTION_STORE.count() == 2
+
+
+def test_concurrent_requests_with_one_key_charge_once(payment, gateway_calls):
+    barrier = threading.Barrier(8)
+    transaction_ids = []
+
+    def charge():
+        client = payment.app.test_client()
+        barrier.wait()
+        transaction_ids.append(client.post("/process-payment", json=PAYMENT).get_json()["transaction_id"])
+
+    threads = [threading.Thread(target=charge) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(transaction_ids)) == 1
+    assert gateway_calls == ["BOOK1"]
+
+
+def test_another_worker_replays_from_the_store(payment):
+    other = another_worker(payment)
+    first = payment.app.test_client().post("/process-payment", json=PAYMENT).get_json()
+    replay = other.app.test_client().post("/process-payment", json=PAYMENT)
+    assert replay.headers["Idempotent-Replay"] == "true"
+    assert replay.get_json()["transaction_id"] == first["transaction_id"]
+    stats = other.app.test_client().get("/idempotency-stats").get_json()["idempotency_cache"]
+    assert (stats["hits"], stats["store_hits"], stats["misses"]) == (0, 1, 0)
+
+
+def test_a_key_charged_by_another_worker_meanwhile_is_replayed(payment):
+    # Both workers missed the key; the other one stores its transaction first
+    other = another_worker(payment)
+    first = other.app.test_client().post("/process-payment", json=PAYMENT).get_json()
+    payment.IDEMPOTENCY_CACHE.lookup = lambda key, store: None
+    replay = payment.app.test_client().post("/process-payment", json=PAYMENT)
+    assert replay.headers["Idempotent-Replay"] == "true"
+    assert replay.get_json()["transaction_id"] == first["transaction_id"]
+    assert payment.TRANSACTION_STORE.count() == 1
+
+
+def test_cache_expires_and_evicts_but_the_store_still_answers(clock, tmp_path):
+    store = load_service("vcc-3", "store").create_store("sqlite", str(tmp_path / "payments.db"))
+    cache = idempotency.IdempotencyCache(max_entries=2, ttl_seconds=60, clock=clock)
+    for key in ("BOOK1", "BOOK2", "BOOK3"):
+        transaction = dict(PAYMENT, booking_id=key, status="approved", idempotency_key=key)
+        store.add(transaction)
+        cache.put(key, transaction)
+    assert cache.get("BOOK1") is None  # least recently used, evicted
+    assert cache.get("BOOK2") is not None
+    clock.advance(61)
+    assert cache.get("BOOK2") is None
+    assert cache.lookup("BOOK1", store)["booking_id"] == "BOOK1"
+    assert cache.lookup("BOOK1", store) is not None  # cached again
+    assert cache.lookup("BOOK9", store) is None
+    stats = cache.stats()
+    assert (stats["evictions"], stats["expirations"], stats["store_hits"], stats["misses"]) == (1, 1, 1, 1)
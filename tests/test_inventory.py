@@ -0,0 +1,115 @@
+"""Room inventory (vcc-2/inventory.py, POST /reserve, /release): per-night counts, and a room is never sold twice"""
+
+import random
+import threading
+
+import pytest
+
+from _harness import load_service
+
+from conftest import stay
+
+inventory_module = load_service("vcc-2", "inventory")
+
+HOTELS = {"Grand Plaza": {"city": "New York", "rooms": {"Suite": {"rate": 450, "available": 2}}}}
+
+
+@pytest.fixture
+def inventory():
+    return inventory_module.Inventory(HOTELS, "2026-01-01", 30)
+
+
+def free(inventory, check_in, check_out):
+    return inventory.available("Grand Plaza", "Suite", check_in, check_out)
+
+
+def test_nightly_counts_match_a_list_of_nights():
+    rng = random.Random(4)
+    for nights in (1, 5, 30, 64, 100):
+        counts = inventory_module.NightlyCounts(nights, 10)
+        expected = [10] * nights
+        for _ in range(300):
+            start = rng.randrange(nights)
+            end = rng.randint(start + 1, nights)
+            if rng.random() < 0.5:
+                value = rng.randint(-3, 3)
+                counts.add(start, end, value)
+                expected[start:end] = [count + value for count in expected[start:end]]
+            else:
+                assert counts.min(start, end) == min(expected[start:end])
+        assert counts.counts(0, nights) == expected
+
+
+def test_a_stay_takes_a_room_on_each_of_its_nights(inventory):
+    first = inventory.reserve("Grand Plaza", "Suite", "2026-01-05", "2026-01-08")
+    second = inventory.reserve("Grand Plaza", "Suite", "2026-01-07", "2026-01-10")
+    assert [count for _, count in inventory.nightly("Grand Plaza", "Suite", "2026-01-04", "2026-01-11")] == [
+        2, 1, 1, 0, 1, 1, 2
+    ]
+    # One full night is enough to refuse the whole stay, and nothing is taken
+    assert inventory.reserve("Grand Plaza", "Suite", "2026-01-06", "2026-01-09") is None
+    assert free(inventory, "2026-01-05", "2026-01-07") == 1
+    assert free(inventory, "2026-01-10", "2026-01-12") == 2
+
+    inventory.release(first.reservation_id)
+    assert inventory.release(first.reservation_id) is None
+    assert free(inventory, "2026-01-05", "2026-01-07") == 2
+    assert free(inventory, "2026-01-07", "2026-01-08") == 1
+    assert inventory.reserve("Grand Plaza", "Suite", "2026-01-06", "2026-01-09") is not None
+    assert second.state == "confirmed"
+
+
+def test_a_reference_reserves_once(inventory):
+    reservation = inventory.reserve("Grand Plaza", "Suite", "2026-01-05", "2026-01-08", reference="BOOK1")
+    assert inventory.reserve("Grand Plaza", "Suite", "2026-01-05", "2026-01-08", reference="BOOK1") is reservation
+    assert free(inventory, "2026-01-05", "2026-01-08") == 1
+    with pytest.raises(inventory_module.InventoryError):
+        inventory.reserve("Grand Plaza", "Suite", "2026-01-05", "2026-01-09", reference="BOOK1")
+
+
+def test_dates_outside_the_horizon_are_refused(inventory):
+    for check_in, check_out in (("2025-12-31", "2026-01-02"), ("2026-01-29", "2026-02-01"),
+                                ("2026-01-05", "05/01/2026")):
+        with pytest.raises(inventory_module.InventoryError):
+            inventory.reserve("Grand Plaza", "Suite", check_in, check_out)
+    # Like calculate_nights, a stay is at least one night
+    assert inventory.reserve("Grand Plaza", "Suite", "2026-01-05", "2026-01-05").nights == (4, 5)
+
+
+def test_concurrent_reservations_never_oversell(inventory):
+    barrier = threading.Barrier(16)
+    taken = []
+
+    def book(i):
+        barrier.wait()
+        # Overlapping stays: every one of them needs the night of 2026-01-10
+        start = 5 + i % 5
+        reservation = inventory.reserve("Grand Plaza", "Suite", f"2026-01-{start:02d}", "2026-01-11")
+        if reservation is not None:
+            taken.append(reservation)
+
+    threads = [threading.Thread(target=book, args=(i,)) for i in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(taken) == 2
+    assert free(inventory, "2026-01-10", "2026-01-11") == 0
+
+
+def test_reserve_and_release_endpoints(availability):
+    client = availability.app.test_client()
+    check_in, check_out = stay(availability.INVENTORY, 30, 2)
+    room = {"hotel_name": "Grand Plaza", "room_type": "Suite", "check_in": check_in, "check_out": check_out}
+    rooms = availability.INVENTORY.available("Grand Plaza", "Suite", check_in, check_out)
+
+    reservations = [client.post("/reserve", json=room) for _ in range(rooms)]
+    assert [response.status_code for response in reservations] == [201] * rooms
+    assert client.post("/reserve", json=room).status_code == 409
+    nights = client.get(f"/inventory/Grand Plaza/Suite?check_in={check_in}&check_out={check_out}").get_json()
+    assert nights["min_available"] == 0
+
+    released = client.post("/release", json={"reservation_id": reservations[0].get_json()["reservation_id"]})
+    assert released.status_code == 200
+    assert client.post("/check-availability", json=room).get_json()["available_rooms"] == 1
+    assert client.post("/release", json={"reservation_id": "RSV999999"}).status_code == 404
@@ -0,0 +1,73 @@
+"""Pending payment recovery (vcc-3): a payment a dead worker's queue left pending is settled once, by a sweep"""
+
+import pytest
+
+from _harness import load_service
+
+store = load_service("vcc-3", "store")
+
+LEFT_BEHIND = "2026-01-01T12:00:00.000000"  # stored long before any sweep in these tests
+
+
+def pending(booking_id, timestamp=LEFT_BEHIND):
+    return {
+        "booking_id": booking_id, "guest_name": "Pending Guest", "hotel_name": "Grand Plaza",
+        "room_type": "Deluxe", "amount": 300.0, "currency": "USD", "payment_method": "credit_card",
+        "status": "pending", "reason": None, "timestamp": timestamp, "idempotency_key": booking_id
+    }
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def transactions(request, tmp_path):
+    return store.create_store(request.param, str(tmp_path / "payments.db"))
+
+
+def test_a_pending_transaction_is_leased_once(transactions):
+    transaction_id = transactions.add(pending("BOOK1"))
+    assert transactions.claim_pending(transaction_id, 100.0, 160.0)
+    assert not transactions.claim_pending(transaction_id, 150.0, 210.0)  # still leased
+    assert transactions.claim_pending(transaction_id, 161.0, 221.0)      # the lease lapsed
+    transactions.update_status(transaction_id, "approved", "Payment gateway approval")
+    assert not transactions.claim_pending(transaction_id, 500.0, 560.0)
+
+
+def test_claim_stale_pending_skips_recent_and_leased_payments(transactions):
+    stale = transactions.add(pending("BOOK1"))
+    leased = transactions.add(pending("BOOK2"))
+    transactions.add(pending("BOOK3", timestamp="2026-01-01T12:10:00.000000"))
+    transactions.add(dict(pending("BOOK4"), status="approved"))
+    assert transactions.claim_pending(leased, 100.0, 160.0)
+    claimed = transactions.claim_stale_pending("2026-01-01T12:05:00", 100.0, 160.0)
+    assert [transaction["transaction_id"] for transaction in claimed] == [stale]
+    assert transactions.claim_stale_pending("2026-01-01T12:05:00", 100.0, 160.0) == []
+
+
+def test_sweep_settles_what_a_dead_worker_left(payment):
+    # A pending payment whose queue went away with its worker
+    transaction_id = payment.TRANSACTION_STORE.add(pending("BOOK1"))
+    client = payment.app.test_client()
+    assert client.post("/bookings/BOOK1/refund").status_code == 409
+
+    assert payment.recover_pending_payments() == 1
+    assert payment.TRANSACTION_STORE.get(transaction_id)["status"] == "approved"
+    assert payment.recover_pending_payments() == 0
+    refund = client.post("/bookings/BOOK1/refund")
+    assert refund.status_code == 200
+    assert payment.TRANSACTION_STORE.get(transaction_id)["status"] == "refunded"
+
+
+def test_queue_worker_skips_a_payment_the_sweep_took(payment):
+    transaction = pending("BOOK1")
+    payment.TRANSACTION_STORE.add(transaction)
+    settled = []
+    payment.run_gateway = lambda payment_data: settled.append(payment_data["transaction_id"]) or ("approved", "ok")
+    assert payment.recover_pending_payments() == 1
+    payment.settle_queued_payment(transaction)
+    assert settled == [transaction["transaction_id"]]
+
+
+def test_sweep_leaves_a_payment_being_settled_alone(payment):
+    transaction_id = payment.TRANSACTION_STORE.add(pending("BOOK1"))
+    assert payment.claim_payment(transaction_id)  # a queue worker is calling the gateway
+    assert payment.recover_pending_payments() == 0
+    assert payment.TRANSACTION_STORE.get(transaction_id)["status"] == "pending"
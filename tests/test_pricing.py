@@ -0,0 +1,57 @@
+"""Batch pricing (vcc-2 quote_batch, RatePlans.quote_many): the batch prices every stay as a single quote would"""
+
+import random
+
+from _harness import load_service
+
+from conftest import stay
+
+rates = load_service("vcc-2", "rates")
+
+PLANS = {
+    "weekend": [{"nights": ["friday", "saturday"], "multiplier": 1.15}],
+    "seasons": [{"start": "2026-01-12", "end": "2026-01-20", "multiplier": 1.5, "cities": ["Miami"]}],
+    "length_of_stay": [{"min_nights": 3, "discount": 0.05}, {"min_nights": 7, "discount": 0.1},
+                       {"min_nights": 5, "discount": 0.02, "room_types": ["Suite"]}]
+}
+ROOMS = [("Grand Plaza", "New York", "Suite"), ("Oceanview Resort", "Miami", "Deluxe"),
+         ("Oceanview Resort", "Miami", "Suite")]
+
+
+def test_quote_many_matches_quote():
+    plans = rates.RatePlans(PLANS, "2026-01-01", 60)
+    rng = random.Random(3)
+    rooms, base_rates, starts, ends = [], [], [], []
+    for _ in range(500):
+        start = rng.randrange(50)
+        rooms.append(rng.choice(ROOMS))
+        base_rates.append(float(rng.randint(80, 600)))
+        starts.append(start)
+        ends.append(start + rng.randint(1, 10))
+    totals, discounts = plans.quote_many(rooms, base_rates, starts, ends)
+    assert list(zip(totals, discounts)) == [
+        plans.quote(*room, rate, start, end) for room, rate, start, end in zip(rooms, base_rates, starts, ends)
+    ]
+
+
+def test_length_of_stay_tiers():
+    plans = rates.RatePlans(PLANS, "2026-01-01", 60)
+    discounts = [plans.quote("Grand Plaza", "New York", "Suite", 100, 0, nights)[1] for nights in range(1, 12)]
+    # A room-type rule smaller than a shorter stay's discount never lowers it
+    assert discounts == [0.0, 0.0, 0.05, 0.05, 0.05, 0.05, 0.1, 0.1, 0.1, 0.1, 0.1]
+
+
+def test_batch_prices_like_single_checks(availability):
+    client = availability.app.test_client()
+    inventory = availability.INVENTORY
+    rng = random.Random(5)
+    queries = []
+    for hotel_name, hotel in availability.HOTELS_DATABASE.items():
+        for room_type in hotel["rooms"]:
+            check_in, check_out = stay(inventory, rng.randrange(30, 200), rng.randint(1, 9))
+            queries.append({"hotel_name": hotel_name, "room_type": room_type,
+                            "check_in": check_in, "check_out": check_out})
+    batch = client.post("/check-availability/batch", json={"queries": queries}).get_json()["results"]
+    singles = [client.post("/check-availability", json=query).get_json() for query in queries]
+    assert [result.get("total_price") for result in batch] == [single.get("total_price") for single in singles]
+    assert sum(result["available"] for result in batch) > len(batch) // 2  # most of them were priced
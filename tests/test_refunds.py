@@ -0,0 +1,60 @@
+"""Payment refunds (vcc-3 POST /bookings/<booking_id>/refund): safe to repeat, 404 for an unknown booking"""
+
+PAYMENT = {
+    "booking_id": "BOOK1", "guest_name": "Refund Guest", "hotel_name": "Grand Plaza",
+    "room_type": "Deluxe", "amount": 540.0, "currency": "USD", "payment_method": "credit_card"
+}
+
+
+def charge(client, **fields):
+    response = client.post("/process-payment", json=dict(PAYMENT, **fields))
+    assert response.status_code == 200
+    return response.get_json()["transaction_id"]
+
+
+def statuses(client, booking_id):
+    return [t["payment_status"] for t in client.get(f"/bookings/{booking_id}/payments").get_json()["transactions"]]
+
+
+def test_refund_is_idempotent(payment):
+    client = payment.app.test_client()
+    transaction_id = charge(client)
+
+    first = client.post("/bookings/BOOK1/refund", json={"reason": "Hold lapsed"})
+    assert first.status_code == 200
+    assert first.get_json()["refunded"] == [transaction_id]
+    assert first.get_json()["amount_refunded"] == PAYMENT["amount"]
+
+    for _ in range(2):
+        again = client.post("/bookings/BOOK1/refund", json={"reason": "Hold lapsed"})
+        assert again.status_code == 200
+        assert again.get_json()["refunded"] == []
+        assert again.get_json()["amount_refunded"] == 0
+    assert statuses(client, "BOOK1") == ["refunded"]
+
+
+def test_retried_charge_after_refund_is_not_charged_again(payment):
+    client = payment.app.test_client()
+    transaction_id = charge(client)
+    client.post("/bookings/BOOK1/refund")
+
+    # The idempotency key (the booking ID) answers the retry from the first charge
+    retry = client.post("/process-payment", json=PAYMENT)
+    assert retry.get_json()["transaction_id"] == transaction_id
+    assert retry.get_json()["status"] == "refunded"
+    assert statuses(client, "BOOK1") == ["refunded"]
+
+
+def test_refund_leaves_other_bookings_alone(payment):
+    client = payment.app.test_client()
+    charge(client)
+    charge(client, booking_id="BOOK2")
+    client.post("/bookings/BOOK1/refund")
+    assert statuses(client, "BOOK2") == ["approved"]
+
+
+def test_refund_of_unknown_booking_is_404(payment):
+    client = payment.app.test_client()
+    response = client.post("/bookings/NOPE/refund")
+    assert response.status_code == 404
+    assert response.get_json()["status"] == "not_found"
@@ -0,0 +1,131 @@
+"""
+Saga recovery (vcc-1 recover_sagas): a booking cut short by a crash is
+rolled back if it was not charged and rolled forward if it was
+Each test drives a saga to the point of the crash by hand, the way
+reserve_and_pay would have, then runs one recovery pass
+"""
+
+import pytest
+
+from conftest import stay
+
+HOTEL, ROOM_TYPE = "Grand Plaza", "Suite"
+AMOUNT = 1350.0
+
+
+@pytest.fixture
+def booking(availability, orchestrator):
+    check_in, check_out = stay(availability.INVENTORY, 30, 3)
+    return orchestrator.booking_from_payload({
+        "guest_name": "Crash Guest", "guest_email": "crash@example.com", "hotel_name": HOTEL,
+        "room_type": ROOM_TYPE, "check_in": check_in, "check_out": check_out, "payment_method": "credit_card"
+    })
+
+
+def free_rooms(availability, booking):
+    return availability.INVENTORY.available(HOTEL, ROOM_TYPE, booking["check_in"], booking["check_out"])
+
+
+def hold_room(orchestrator, booking, booking_id):
+    """Steps of reserve_and_pay up to a held room"""
+    orchestrator.SAGAS.start(booking_id, booking, AMOUNT)
+    status_code, data = orchestrator.call_downstream(
+        orchestrator.AVAILABILITY_CLIENT, "/reserve",
+        orchestrator.reserve_request(booking, booking_id, orchestrator.HOLD_SECONDS),
+        "availability", orchestrator.AVAILABILITY_ENDPOINTS, booking_id
+    )
+    reservation_id = orchestrator.handle_reservation(status_code, data, booking, booking_id)
+    orchestrator.SAGAS.advance(booking_id, orchestrator.HELD, reservation_id=reservation_id)
+    return reservation_id
+
+
+def charge(orchestrator, booking, booking_id):
+    """The payment step of reserve_and_pay, without recording its outcome in the saga"""
+    status_code, data = orchestrator.call_downstream(
+        orchestrator.PAYMENT_CLIENT, "/process-payment", orchestrator.payment_request(booking, booking_id, AMOUNT),
+        "payment", orchestrator.PAYMENT_ENDPOINTS, booking_id, headers=orchestrator.idempotency_headers(booking_id)
+    )
+    return orchestrator.handle_payment(status_code, data, booking_id)
+
+
+def payment_statuses(payment, booking_id):
+    return [transaction["status"] for transaction in payment.TRANSACTION_STORE.find_by_booking(booking_id)]
+
+
+def recover(orchestrator):
+    orchestrator.SAGA_IDLE_SECONDS = 0
+    return orchestrator.recover_sagas()
+
+
+def test_held_saga_without_charge_is_rolled_back(availability, payment, orchestrator, booking):
+    rooms = free_rooms(availability, booking)
+    booking_id = "BOOK1"
+    hold_room(orchestrator, booking, booking_id)
+    assert free_rooms(availability, booking) == rooms - 1
+
+    assert recover(orchestrator) == 1
+    saga = orchestrator.SAGAS.get(booking_id)
+    assert saga["state"] == orchestrator.FAILED
+    assert free_rooms(availability, booking) == rooms
+    assert availability.INVENTORY.holds() == 0
+    assert payment_statuses(payment, booking_id) == []
+
+
+def test_held_saga_charged_before_the_crash_is_refunded(availability, payment, orchestrator, booking):
+    rooms = free_rooms(availability, booking)
+    booking_id = "BOOK1"
+    hold_room(orchestrator, booking, booking_id)
+    charge(orchestrator, booking, booking_id)  # approved, but the saga never heard
+
+    recover(orchestrator)
+    assert orchestrator.SAGAS.get(booking_id)["state"] == orchestrator.FAILED
+    assert payment_statuses(payment, booking_id) == ["refunded"]
+    assert free_rooms(availability, booking) == rooms
+
+
+def test_charged_saga_is_rolled_forward(availability, payment, orchestrator, booking):
+    rooms = free_rooms(availability, booking)
+    booking_id = "BOOK1"
+    reservation_id = hold_room(orchestrator, booking, booking_id)
+    transaction_id = charge(orchestrator, booking, booking_id)
+    orchestrator.SAGAS.advance(booking_id, orchestrator.CHARGED, transaction_id=transaction_id)
+
+    recover(orchestrator)
+    saga = orchestrator.SAGAS.get(booking_id)
+    assert saga["state"] == orchestrator.CONFIRMED
+    assert saga["transaction_id"] == transaction_id
+    assert availability.INVENTORY.confirm(reservation_id).state == "confirmed"
+    assert availability.INVENTORY.holds() == 0
+    assert free_rooms(availability, booking) == rooms - 1
+    assert payment_statuses(payment, booking_id) == ["approved"]
+
+
+def test_charged_saga_whose_hold_lapsed_is_refunded(availability, payment, orchestrator, booking):
+    rooms = free_rooms(availability, booking)
+    booking_id = "BOOK1"
+    reservation_id = hold_room(orchestrator, booking, booking_id)
+    transaction_id = charge(orchestrator, booking, booking_id)
+    orchestrator.SAGAS.advance(booking_id, orchestrator.CHARGED, transaction_id=transaction_id)
+    availability.INVENTORY.release(reservation_id)  # the hold ran out while the Orchestrator was down
+
+    recover(orchestrator)
+    assert orchestrator.SAGAS.get(booking_id)["state"] == orchestrator.FAILED
+    assert payment_statuses(payment, booking_id) == ["refunded"]
+    assert free_rooms(availability, booking) == rooms
+
+
+def test_compensating_saga_with_an_approved_charge_waits_for_the_refund(payment, orchestrator, booking):
+    # The charge was approved, so a Payment replica that does not know the
+    # booking has not settled anything: the saga stays compensating
+    booking_id = "BOOK1"
+    orchestrator.SAGAS.start(booking_id, booking, AMOUNT)
+    orchestrator.SAGAS.advance(booking_id, orchestrator.COMPENSATING, transaction_id="TXN-ELSEWHERE")
+
+    recover(orchestrator)
+    assert orchestrator.SAGAS.get(booking_id)["state"] == orchestrator.COMPENSATING
+
+
+def test_saga_interrupted_before_the_hold_fails(orchestrator, booking):
+    orchestrator.SAGAS.start("BOOK1", booking, AMOUNT)
+    recover(orchestrator)
+    assert orchestrator.SAGAS.get("BOOK1")["state"] == orchestrator.FAILED
@@ -0,0 +1,71 @@
+"""Hotel search (vcc-2/search.py, GET /search): results come cheapest stay first, after rate plans"""
+
+from _harness import load_service
+
+from conftest import stay
+
+inventory_module = load_service("vcc-2", "inventory")
+rates = load_service("vcc-2", "rates")
+search = load_service("vcc-2", "search")
+
+HOTELS = {
+    "Beach Inn": {"city": "Miami", "rooms": {"Deluxe": {"rate": 100, "available": 2}}},
+    "Harbor House": {"city": "Boston", "rooms": {"Deluxe": {"rate": 110, "available": 2}}},
+    "Long Stay Lodge": {"city": "Boston", "rooms": {"Deluxe": {"rate": 120, "available": 2}}},
+    "Park Hotel": {"city": "Boston", "rooms": {"Deluxe": {"rate": 130, "available": 2}}}
+}
+# 2026-01-01 is a Thursday
+PLANS = {
+    "seasons": [{"start": "2026-01-05", "end": "2026-01-10", "multiplier": 1.5, "cities": ["Miami"]}],
+    "length_of_stay": [{"min_nights": 3, "discount": 0.2, "hotels": ["Long Stay Lodge"]}]
+}
+
+
+def names(index, check_in, check_out, **filters):
+    _, page, _ = index.search(check_in, check_out, **filters)
+    return [hotel_name for hotel_name, _, _, _ in page]
+
+
+def new_index(plans=PLANS):
+    inventory = inventory_module.Inventory(HOTELS, "2026-01-01", 30)
+    return search.SearchIndex(HOTELS, inventory, rates.RatePlans(plans, "2026-01-01", 30)), inventory
+
+
+def test_without_rate_plans_order_is_the_catalogue_rate():
+    index, _ = new_index({})
+    assert names(index, "2026-01-05", "2026-01-06") == ["Beach Inn", "Harbor House", "Long Stay Lodge", "Park Hotel"]
+
+
+def test_season_and_stay_discount_change_the_order():
+    index, _ = new_index()
+    # One night in season: Beach Inn costs 150, Long Stay Lodge gets no discount
+    assert names(index, "2026-01-05", "2026-01-06") == ["Harbor House", "Long Stay Lodge", "Park Hotel", "Beach Inn"]
+    # Three nights: Long Stay Lodge 288 < Harbor House 330 < Park Hotel 390 < Beach Inn 450
+    assert names(index, "2026-01-05", "2026-01-08") == ["Long Stay Lodge", "Harbor House", "Park Hotel", "Beach Inn"]
+    # Two nights out of season: catalogue rate order again
+    assert names(index, "2026-01-12", "2026-01-14") == ["Beach Inn", "Harbor House", "Long Stay Lodge", "Park Hotel"]
+
+
+def test_rate_filter_and_paging_follow_the_stay_order():
+    index, inventory = new_index()
+    assert names(index, "2026-01-05", "2026-01-08", max_rate=115) == ["Harbor House", "Beach Inn"]
+    assert names(index, "2026-01-05", "2026-01-08", offset=1, limit=2) == ["Harbor House", "Park Hotel"]
+    inventory.reserve("Long Stay Lodge", "Deluxe", "2026-01-05", "2026-01-08", rooms=2)
+    assert names(index, "2026-01-05", "2026-01-08", limit=1) == ["Harbor House"]
+
+
+def test_search_endpoint_totals_are_in_order(availability):
+    # Every Miami night costs three times its catalogue rate
+    plans = {"seasons": [{"start": "2000-01-01", "end": "2100-01-01", "multiplier": 3, "cities": ["Miami"]}]}
+    availability.RATE_PLANS = rates.RatePlans(plans, availability.INVENTORY_START_DATE,
+                                              availability.INVENTORY_HORIZON_DAYS)
+    availability.SEARCH_INDEX = availability.SearchIndex(
+        availability.HOTELS_DATABASE, availability.INVENTORY, availability.RATE_PLANS
+    )
+    check_in, check_out = stay(availability.INVENTORY, 30, 3)
+    body = availability.app.test_client().get(f"/search?check_in={check_in}&check_out={check_out}&limit=100")
+    results = body.get_json()["results"]
+    totals = [result["total_price"] for result in results]
+    assert totals == sorted(totals)
+    base_rates = [result["base_rate"] for result in results]
+    assert base_rates != sorted(base_rates)  # the plan did change the order
@@ -0,0 +1,9 @@
+"""Shared modules (common/): every service's copy matches its source, see common/sync.py"""
+
+from _harness import load_service
+
+sync = load_service("common", "sync")
+
+
+def test_service_copies_match_common():
+    assert sync.stale_copies() == [], "run python common/sync.py"
@@ -0,0 +1,79 @@
+"""TimerWheel (vcc-2/timer_wheel.py): timers fire on time, never early, at most one tick late"""
+
+import random
+
+from _harness import load_service
+
+from conftest import FakeClock
+
+timer_wheel = load_service("vcc-2", "timer_wheel")
+
+TICK = 0.25
+BUCKETS = 16
+
+
+def new_wheel():
+    clock = FakeClock(0.0)
+    return clock, timer_wheel.TimerWheel(TICK, BUCKETS, clock)
+
+
+def test_timers_never_fire_early():
+    clock, wheel = new_wheel()
+    rng = random.Random(7)
+    # Deadlines up to several revolutions ahead, so buckets hold timers of later rounds too
+    deadlines = {key: rng.uniform(0, 5 * BUCKETS * TICK) for key in range(2000)}
+    for key, deadline in deadlines.items():
+        wheel.schedule(key, deadline)
+    fired = {}
+    while clock.now < 6 * BUCKETS * TICK:
+        clock.advance(rng.uniform(0, 3 * TICK))
+        for key in wheel.advance():
+            assert key not in fired
+            fired[key] = clock.now
+    assert fired.keys() == deadlines.keys()
+    for key, at in fired.items():
+        assert at >= deadlines[key]
+
+
+def test_timers_fire_at_most_one_tick_late():
+    clock, wheel = new_wheel()
+    deadlines = {key: 0.1 + key * 0.07 for key in range(100)}
+    for key, deadline in deadlines.items():
+        wheel.schedule(key, deadline)
+    while len(wheel):
+        clock.advance(0.01)
+        for key in wheel.advance():
+            assert deadlines[key] <= clock.now <= deadlines[key] + TICK + 0.01
+
+
+def test_timer_a_revolution_ahead_waits_for_its_round():
+    clock, wheel = new_wheel()
+    wheel.schedule("later", BUCKETS * TICK + 1.0)  # shares a bucket with t=1.0
+    clock.advance(1.0)
+    assert wheel.advance() == []
+    clock.advance(BUCKETS * TICK)
+    assert wheel.advance() == ["later"]
+
+
+def test_cancelled_and_rescheduled_timers():
+    clock, wheel = new_wheel()
+    wheel.schedule("cancelled", 1.0)
+    wheel.schedule("moved", 1.0)
+    assert wheel.cancel("cancelled")
+    assert not wheel.cancel("cancelled")
+    wheel.schedule("moved", 3.0)
+    clock.advance(2.0)
+    assert wheel.advance() == []
+    clock.advance(1.0)
+    assert wheel.advance() == ["moved"]
+    assert len(wheel) == 0
+
+
+def test_past_deadline_fires_on_the_next_tick():
+    clock, wheel = new_wheel()
+    clock.advance(10.0)
+    wheel.advance()
+    wheel.schedule("overdue", 5.0)
+    assert wheel.advance() == []  # the clock has not moved since
+    clock.advance(TICK)
+    assert wheel.advance() == ["overdue"]
@@ -0,0 +1,89 @@
+"""Transaction queries (vcc-3 GET /transactions, /transactions/export): cursor pages and exports miss nothing"""
+
+import csv
+import io
+import json
+
+import pytest
+
+HOTELS = ["Grand Plaza", "Oceanview Resort", "Mountain Lodge"]
+
+
+@pytest.fixture(params=["sqlite", "memory"])
+def payments(request, payment):
+    """The Payment app with 40 transactions across three hotels and two statuses"""
+    if request.param == "memory":
+        payment.TRANSACTION_STORE = payment.create_store("memory")
+    for i in range(40):
+        payment.TRANSACTION_STORE.add({
+            "booking_id": f"BOOK{i % 20}", "guest_name": f"Guest {i}", "hotel_name": HOTELS[i % 3],
+            "room_type": "Deluxe", "amount": 100.0 + i, "currency": "USD", "payment_method": "credit_card",
+            "status": "declined" if i % 4 == 0 else "approved", "reason": None,
+            "timestamp": f"2026-01-01T12:{i:02d}:00", "idempotency_key": None
+        })
+    payment.EXPORT_PAGE_SIZE = 7
+    return payment
+
+
+def pages(client, query):
+    """Follow next_cursor through every page; returns the pages' transaction IDs"""
+    result, cursor = [], None
+    while True:
+        body = client.get(f"/transactions?{query}" + (f"&cursor={cursor}" if cursor else "")).get_json()
+        result.append([transaction["transaction_id"] for transaction in body["transactions"]])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return result
+
+
+def expected(payments, keep):
+    return [t["transaction_id"] for t in payments.TRANSACTION_STORE.iter_transactions() if keep(t)]
+
+
+def test_cursor_pages_cover_every_match_once(payments):
+    client = payments.app.test_client()
+    walked = pages(client, "limit=6")
+    assert [len(page) for page in walked] == [6] * 6 + [4]
+    assert sum(walked, []) == expected(payments, lambda t: True)
+
+    walked = pages(client, "status=approved&hotel_name=Grand Plaza&limit=4")
+    assert sum(walked, []) == expected(
+        payments, lambda t: t["status"] == "approved" and t["hotel_name"] == "Grand Plaza"
+    )
+    assert pages(client, "booking_id=BOOK3") == [expected(payments, lambda t: t["booking_id"] == "BOOK3")]
+    walked = pages(client, "since=2026-01-01T12:10:00&until=2026-01-01T12:19:00&limit=3")
+    assert sum(walked, []) == expected(payments, lambda t: "12:10:00" <= t["timestamp"][11:] <= "12:19:00")
+
+
+def test_writes_between_pages_are_not_skipped(payments):
+    client = payments.app.test_client()
+    first = client.get("/transactions?status=declined&limit=5").get_json()
+    payments.TRANSACTION_STORE.update_status(first["transactions"][0]["transaction_id"], "approved")
+    added = payments.TRANSACTION_STORE.add(dict(first["transactions"][1], transaction_id=None))
+    rest = client.get(f"/transactions?status=declined&limit=100&cursor={first['next_cursor']}").get_json()
+    ids = [t["transaction_id"] for t in first["transactions"] + rest["transactions"]]
+    assert len(ids) == len(set(ids)) == 11
+    assert ids[-1] == added
+
+
+@pytest.mark.parametrize("query", ["limit=0", "limit=1001", "cursor=BOOK1", "since=yesterday"])
+def test_bad_queries_are_rejected(payments, query):
+    response = payments.app.test_client().get(f"/transactions?{query}")
+    assert response.status_code == 400
+    assert response.get_json()["status"] == "error"
+
+
+def test_exports_stream_every_match(payments):
+    client = payments.app.test_client()
+    matches = expected(payments, lambda t: t["status"] == "approved")
+
+    ndjson = client.get("/transactions/export?format=ndjson&status=approved")
+    assert ndjson.is_streamed
+    records = [json.loads(line) for line in ndjson.get_data(as_text=True).splitlines()]
+    assert [record["transaction_id"] for record in records] == matches
+    assert set(records[0]) == set(payments.COLUMNS)
+
+    rows = list(csv.DictReader(io.StringIO(client.get("/transactions/export?format=csv&status=approved")
+                                           .get_data(as_text=True))))
+    assert [row["transaction_id"] for row in rows] == matches
+    assert rows[0]["hotel_name"] in HOTELS
@@ -0,0 +1,97 @@
+"""Transaction store (vcc-3/store.py): IDs never collide across threads or processes, every worker sees every write"""
+
+import multiprocessing
+import threading
+
+import pytest
+
+from _harness import load_service, quiet_stdout
+
+store = load_service("vcc-3", "store")
+
+WRITES = 50
+
+
+def transaction(i, **fields):
+    return dict({
+        "booking_id": f"BOOK{i}", "guest_name": f"Guest {i}", "hotel_name": "Grand Plaza", "room_type": "Deluxe",
+        "amount": 100.0 + i, "currency": "USD", "payment_method": "credit_card", "status": "approved",
+        "reason": None, "timestamp": "2026-01-01T12:00:00", "idempotency_key": None
+    }, **fields)
+
+
+def write_from_process(path, worker, results):
+    transactions = store.create_store("sqlite", path)
+    results.put([transactions.add(transaction(worker * WRITES + i)) for i in range(WRITES)])
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def transactions(request, tmp_path):
+    return store.create_store(request.param, str(tmp_path / "payments.db"))
+
+
+def test_ids_are_unique_across_threads(transactions):
+    ids = []
+
+    def write(worker):
+        written = [transactions.add(transaction(worker * WRITES + i)) for i in range(WRITES)]
+        ids.extend(written)
+
+    threads = [threading.Thread(target=write, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(ids)) == len(ids) == transactions.count() == 8 * WRITES
+    for transaction_id in ids:
+        stored = transactions.get(transaction_id)
+        assert stored["transaction_id"] == transaction_id
+        assert transactions.find_by_booking(stored["booking_id"]) == [stored]
+
+
+def test_ids_are_unique_across_processes(tmp_path):
+    path = str(tmp_path / "payments.db")
+    store.create_store("sqlite", path)  # schema first, as the app's import does
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    processes = [context.Process(target=write_from_process, args=(path, worker, results)) for worker in range(4)]
+    for process in processes:
+        process.start()
+    ids = [transaction_id for _ in processes for transaction_id in results.get(timeout=30)]
+    for process in processes:
+        process.join()
+    assert len(set(ids)) == len(ids) == 4 * WRITES
+    assert store.create_store("sqlite", path).count() == 4 * WRITES
+
+
+def test_an_idempotency_key_is_stored_once(transactions):
+    first = transactions.add(transaction(1, idempotency_key="BOOK1"))
+    with pytest.raises(store.DuplicateKeyError) as duplicate:
+        transactions.add(transaction(2, idempotency_key="BOOK1"))
+    assert duplicate.value.existing["transaction_id"] == first
+    assert transactions.find_by_idempotency_key("BOOK1")["transaction_id"] == first
+    assert transactions.count() == 1
+    transactions.add(transaction(3))
+    transactions.add(transaction(4))  # transactions without a key never collide
+    assert transactions.count() == 3
+
+
+def test_update_status_moves_a_transaction_between_status_filters(transactions):
+    transaction_id = transactions.add(transaction(1, status="pending"))
+    assert transactions.update_status(transaction_id, "approved", "Payment gateway approval")
+    assert not transactions.update_status("TXN999999", "approved")
+    assert list(transactions.iter_transactions({"status": "pending"})) == []
+    assert [t["transaction_id"] for t in transactions.iter_transactions({"status": "approved"})] == [transaction_id]
+
+
+def test_status_written_by_one_worker_is_read_by_another(payment):
+    with quiet_stdout():
+        other = load_service("vcc-3")
+    other.TRANSACTION_STORE = other.create_store("sqlite", payment.TRANSACTION_DB_PATH)
+    charged = payment.app.test_client().post("/process-payment", json={
+        "booking_id": "BOOK1", "guest_name": "Store Guest", "hotel_name": "Grand Plaza",
+        "amount": 300.0, "payment_method": "credit_card"
+    }).get_json()
+    status = other.app.test_client().get(f"/payment-status/{charged['transaction_id']}")
+    assert status.status_code == 200
+    assert status.get_json()["booking_id"] == "BOOK1"
@@ -0,0 +1,22 @@
+"""Payment pre-check (vcc-3 POST /validate-payment): malformed bodies are a 400, not a 500"""
+
+import pytest
+
+
+@pytest.mark.parametrize("body", [None, [], "credit_card", 42])
+def test_non_object_body_is_400(payment, body):
+    response = payment.app.test_client().post("/validate-payment", json=body)
+    assert response.status_code == 400
+    assert response.get_json()["valid"] is False
+
+
+def test_missing_body_is_400(payment):
+    assert payment.app.test_client().post("/validate-payment").status_code == 400
+
+
+def test_valid_method_passes(payment):
+    response = payment.app.test_client().post("/validate-payment", json={
+        "guest_name": "Check Guest", "payment_method": "credit_card"
+    })
+    assert response.status_code == 200
+    assert response.get_json()["valid"] is True
@@ -0,0 +1,73 @@
+"""Velocity rules (vcc-3/payment_rules.json): the shipped guest and card limits decline, across workers"""
+
+from _harness import load_service, quiet_stdout
+
+from conftest import stay
+
+rules = load_service("vcc-3", "rules")
+store = load_service("vcc-3", "store")
+
+DECLINED = rules.DEFAULT_REASONS["velocity"]
+
+PAYMENT = {
+    "guest_name": "Velocity Guest", "hotel_name": "Grand Plaza", "room_type": "Deluxe",
+    "amount": 100.0, "currency": "USD", "payment_method": "credit_card"
+}
+
+
+def charge(client, i, **fields):
+    """HTTP status of a charge"""
+    return client.post("/process-payment", json=dict(PAYMENT, booking_id=f"BOOK{i}", **fields)).status_code
+
+
+def test_guest_velocity_declines_the_eleventh_payment(payment):
+    client = payment.app.test_client()
+    assert [charge(client, i) for i in range(10)] == [200] * 10
+    declined = client.post("/process-payment", json=dict(PAYMENT, booking_id="BOOK10"))
+    assert declined.status_code == 402
+    assert declined.get_json()["message"] == "Payment declined: Too many payments for this guest"
+    assert charge(client, 11, guest_name="Another Guest") == 200
+
+
+def test_card_velocity_keys_on_the_card_token(payment):
+    client = payment.app.test_client()
+    statuses = [charge(client, i, guest_name=f"Guest {i}", card_token="tok_1") for i in range(6)]
+    assert statuses == [200] * 5 + [402]
+    assert charge(client, 6, guest_name="Guest 6", card_token="tok_2") == 200
+
+
+def test_orchestrator_passes_the_card_token_on(availability, orchestrator):
+    check_in, check_out = stay(availability.INVENTORY, 30, 3)
+    payload = {
+        "guest_name": "Card Guest", "hotel_name": "Grand Plaza", "room_type": "Suite",
+        "check_in": check_in, "check_out": check_out, "payment_method": "credit_card"
+    }
+    booking = orchestrator.booking_from_payload(dict(payload, card_token="tok_1"))
+    assert orchestrator.payment_request(booking, "BOOK1", 100.0)["card_token"] == "tok_1"
+    assert orchestrator.precheck_request(booking)["card_token"] == "tok_1"
+    assert "card_token" not in orchestrator.payment_request(orchestrator.booking_from_payload(payload), "BOOK2", 100.0)
+
+
+def test_workers_share_the_velocity_window(payment):
+    # Two worker processes: two loaded apps on one SQLite file
+    with quiet_stdout():
+        other = load_service("vcc-3")
+    other.TRANSACTION_DB_PATH = payment.TRANSACTION_DB_PATH
+    other.TRANSACTION_STORE = other.create_store("sqlite", other.TRANSACTION_DB_PATH)
+    other.PAYMENT_RULES = other.new_payment_rules()
+    other.PAYMENT_SUCCESS_RATE = 1.0
+    clients = [payment.app.test_client(), other.app.test_client()]
+    statuses = [charge(clients[i % 2], i, guest_name=f"Guest {i}", card_token="tok_1") for i in range(6)]
+    assert statuses == [200] * 5 + [402]
+
+
+def test_shared_window_slides(tmp_path, clock):
+    log = store.SQLiteVelocityLog(str(tmp_path / "velocity.db"))
+    config = {"rules": [{"name": "Guest velocity", "type": "velocity", "window_seconds": 60, "max_payments": 2}]}
+    workers = [rules.PaymentRules(config, clock=clock, velocity_log=log) for _ in range(2)]
+    payment = {"guest_name": "Sliding Guest", "amount": 10.0}
+    assert [workers[i % 2].evaluate(payment) for i in range(3)] == [None, None, ("Guest velocity", DECLINED)]
+    assert workers[0].evaluate(payment, record=False) is not None
+    clock.advance(61)
+    assert workers[1].evaluate(payment) is None
+    assert workers[0].stats()["rules"][0]["tracked_keys"] == 1
@@ -0,0 +1,155 @@
+"""
+Admission Control - VCC-1
+Adaptive concurrency limit for the Orchestrator's bookings
+Instead of accepting every booking and letting a queue build up in front of
+the Availability and Payment services, the Orchestrator runs only as many
+bookings at once as the limit allows and sheds the rest straight away (503
+with Retry-After), so the bookings it does accept still finish in time
+The limit follows the latency of admitted bookings, which is almost all
+downstream time: while it stays near the latency of an unloaded system
+(the fastest recent booking) the limit grows by a few requests, and once
+bookings get slower than that by more than the tolerance (a queue is
+forming downstream) it shrinks in proportion. A booking that ended in a downstream
+timeout or connection failure cuts the limit by a fixed ratio
+Each priority class may fill its own share of the limit, so the lower
+classes are shed first as the limit fills up
+Limiter state is per process: every gunicorn worker adapts independently
+"""
+
+import math
+import threading
+import time
+
+# How an admitted request ended, as reported to release()
+OK = "ok"            # its latency is a sample of how loaded the services are
+DROPPED = "dropped"  # a timeout or refused connection: a sign of overload
+IGNORED = "ignored"  # says nothing about load (failed fast, orchestration error)
+
+CRITICAL = "critical"
+NORMAL = "normal"
+SHEDDABLE = "sheddable"
+PRIORITY_SHARES = {CRITICAL: 1.0, NORMAL: 0.9, SHEDDABLE: 0.5}  # share of the limit each class may fill
+
+
+class LimitExceededError(Exception):
+    """The limiter shed the request without running it"""
+
+    def __init__(self, name, priority, limit, retry_after):
+        super().__init__(f"{name} is at its concurrency limit ({limit}) for {priority} requests")
+        self.name = name
+        self.priority = priority
+        self.limit = limit
+        self.retry_after = retry_after
+
+
+class AdaptiveLimiter:
+    """
+    Gradient concurrency limit with a multiplicative back-off on dropped requests
+    For every OK sample, gradient = tolerance * min_rtt / rtt, clamped to
+    [0.5, 1], where min_rtt is the fastest sample of the last one or two
+    windows of min_rtt_window samples (so it follows lasting changes in the
+    services). The new limit is limit * gradient + queue_size, smoothed and
+    clamped to [min_limit, max_limit]; it only grows while at least half of
+    it is in use. A DROPPED request multiplies the limit by backoff_ratio
+    """
+
+    def __init__(self, name, initial_limit=20, min_limit=2, max_limit=200, tolerance=1.5, smoothing=0.2,
+                 queue_size=2, min_rtt_window=500, backoff_ratio=0.9, priority_shares=None,
+                 default_priority=NORMAL, retry_after=1.0, clock=time.monotonic):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.queue_size = queue_size
+        self.min_rtt_window = min_rtt_window
+        self.backoff_ratio = backoff_ratio
+        self.priority_shares = dict(priority_shares or PRIORITY_SHARES)
+        if default_priority not in self.priority_shares:
+            raise ValueError(f"Unknown default priority {default_priority!r}")
+        self.default_priority = default_priority
+        self.retry_after = retry_after
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._limit = float(min(max_limit, max(min_limit, initial_limit)))
+        self._window_min = None    # fastest sample of the current window...
+        self._window_samples = 0
+        self._previous_min = None  # ...and of the one before it
+        self._last_rtt = None
+        self.in_flight = 0
+        self.admitted = dict.fromkeys(self.priority_shares, 0)
+        self.shed = dict.fromkeys(self.priority_shares, 0)
+        self.dropped = 0
+
+    @property
+    def limit(self):
+        return self._limit
+
+    def priority(self, value):
+        """The priority class for a client-supplied value; anything unknown gets the default"""
+        return value if value in self.priority_shares else self.default_priority
+
+    def acquire(self, priority=None):
+        """
+        Admit a request or raise LimitExceededError; returns the permit to
+        hand back to release() when the request has finished
+        """
+        priority = self.priority(priority)
+        with self._lock:
+            allowed = max(1, math.floor(self._limit * self.priority_shares[priority]))
+            if self.in_flight >= allowed:
+                self.shed[priority] += 1
+                raise LimitExceededError(self.name, priority, allowed, self.retry_after)
+            self.in_flight += 1
+            self.admitted[priority] += 1
+        return self._clock()
+
+    def release(self, permit, outcome=OK):
+        """An admitted request finished; outcome is OK, DROPPED or IGNORED"""
+        rtt = self._clock() - permit
+        with self._lock:
+            in_flight = self.in_flight  # including this request, as while it ran
+            self.in_flight -= 1
+            if outcome == DROPPED:
+                self.dropped += 1
+                self._limit = max(self.min_limit, self._limit * self.backoff_ratio)
+            elif outcome == OK and rtt > 0:
+                self._sample(rtt, in_flight)
+
+    def _min_rtt(self):
+        return min(rtt for rtt in (self._window_min, self._previous_min) if rtt is not None)
+
+    def _sample(self, rtt, in_flight):
+        # Called with self._lock held
+        self._last_rtt = rtt
+        self._window_min = rtt if self._window_min is None else min(self._window_min, rtt)
+        self._window_samples += 1
+        if self._window_samples >= self.min_rtt_window:
+            self._previous_min, self._window_min, self._window_samples = self._window_min, None, 0
+        gradient = max(0.5, min(1.0, self.tolerance * self._min_rtt() / rtt))
+        target = self._limit * gradient + self.queue_size
+        if target > self._limit and in_flight < self._limit / 2:
+            return  # the limit is not what holds this process back, so there is no case for raising it
+        limit = self._limit * (1 - self.smoothing) + target * self.smoothing
+        self._limit = min(self.max_limit, max(self.min_limit, limit))
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "limit": round(self._limit, 2),
+                "in_flight": self.in_flight,
+                "min_limit": self.min_limit,
+                "max_limit": self.max_limit,
+                "min_rtt_ms": round(self._min_rtt() * 1000, 2) if self._last_rtt is not None else None,
+                "last_rtt_ms": round(self._last_rtt * 1000, 2) if self._last_rtt is not None else None,
+                "dropped": self.dropped,
+                "priorities": {
+                    priority: {
+                        "share": share,
+                        "allowed": max(1, math.floor(self._limit * share)),
+                        "admitted": self.admitted[priority],
+                        "shed": self.shed[priority]
+                    }
+                    for priority, share in self.priority_shares.items()
+                }
+            }
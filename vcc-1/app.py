@@ -5,25 +5,232 @@ This service accepts booking requests and coordinates with availability and paym
 Educational Purpose: Learning service orchestration patterns in microservices
 """
 
+import os
 import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 import requests
 from flask import Flask, request, jsonify
-from datetime import datetime
+from downstream import DownstreamClient
+from discovery import EndpointRegistry, NoEndpointError, OwnerUnavailableError, source_from_spec
+from encoding import JSONProvider, encode_constant, loads
+from metrics import Metrics, instrument
+from tracing import Tracer, instrument_tracing
+from resilience import CircuitBreaker, CircuitOpenError, HedgePolicy
+from admission import AdaptiveLimiter, LimitExceededError, OK, DROPPED, IGNORED, SHEDDABLE
+from saga import SagaLog, STARTED, HELD, CHARGED, CONFIRMED, COMPENSATING, FAILED, IN_FLIGHT
+from booking import (
+    StepFailed, new_booking, booking_from_payload, parse_batch, batch_result, batch_summary,
+    availability_request, reserve_request, confirm_request, release_request, refund_request,
+    precheck_request, payment_request, idempotency_headers, downstream_error, handle_availability,
+    handle_reservation, handle_precheck, handle_payment, hold_lapsed, confirmation_pending,
+    confirmation, replica_chunks, overloaded, CONFIRMATION
+)
 
 app = Flask(__name__)
+app.json = JSONProvider(app)  # orjson when installed (see encoding.py)
 
 # Service Configuration
 SERVICE_NAME = "Orchestrator"
 SERVICE_PORT = 5001
+DEBUG = os.environ.get("FLASK_DEBUG") == "1"  # dev server only; serve.py never runs debug
 
-# Downstream services configuration
-SERVICE_B_IP = "10.109.0.151"
-SERVICE_B_PORT = 5002
-SERVICE_C_IP = "10.109.0.152"
-SERVICE_C_PORT = 5003
+# Downstream services configuration (environment variables override the VM addresses)
+SERVICE_B_IP = os.environ.get("SERVICE_B_IP", "10.109.0.151")
+SERVICE_B_PORT = int(os.environ.get("SERVICE_B_PORT", 5002))
+SERVICE_C_IP = os.environ.get("SERVICE_C_IP", "10.109.0.152")
+SERVICE_C_PORT = int(os.environ.get("SERVICE_C_PORT", 5003))
+
+# Service discovery: the replicas of each downstream service, as a spec that
+# discovery.source_from_spec() reads: "host:port,host:port", "file:/path"
+# (one host:port per line, re-read when it changes) or "dns:name:port"
+AVAILABILITY_ENDPOINTS = os.environ.get("AVAILABILITY_ENDPOINTS", f"{SERVICE_B_IP}:{SERVICE_B_PORT}")
+PAYMENT_ENDPOINTS = os.environ.get("PAYMENT_ENDPOINTS", f"{SERVICE_C_IP}:{SERVICE_C_PORT}")
+LOAD_BALANCER = os.environ.get("LOAD_BALANCER", "least_outstanding")  # or "p2c" (power of two choices)
+DISCOVERY_REFRESH_SECONDS = 5.0  # how often file and DNS sources are re-resolved
+HEALTH_CHECK_PATH = "/"
+HEALTH_CHECK_INTERVAL = 2.0
+HEALTH_CHECK_TIMEOUT = 0.5
+UNHEALTHY_AFTER_CHECKS = 2       # failed health checks before a replica leaves rotation
+EJECT_AFTER_FAILURES = 3         # failed calls in a row before a replica is ejected...
+EJECT_SECONDS = 10.0             # ...for this long, doubled on each repeat ejection
 
 REQUEST_TIMEOUT = 5
 
+# Downstream connection pooling
+POOL_SIZE = 20                  # keep-alive connections per downstream service
+CONNECT_TIMEOUT = 1.0           # seconds to establish a TCP connection
+AVAILABILITY_READ_TIMEOUT = 2.0
+PAYMENT_READ_TIMEOUT = REQUEST_TIMEOUT
+DOWNSTREAM_RETRIES = 2          # payments are retried safely under an Idempotency-Key
+PAYMENT_PRECHECK = True         # validate the payment method before checking availability
+
+# Batch bookings (/book-hotels/batch)
+MAX_BATCH_BOOKINGS = 500        # bookings accepted per batch
+AVAILABILITY_BATCH_SIZE = 500   # queries per /check-availability/batch call (the Availability service's limit)
+BATCH_CONCURRENCY = 8           # bookings of one batch reserved and paid for in parallel
+
+# Booking sagas (see saga.py): the room is held while the guest is charged
+HOLD_SECONDS = 300                    # hold TTL; outlives a booking's downstream calls and a recovery pass
+SAGA_DB_PATH = os.environ.get(
+    "SAGA_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "sagas.db")
+)
+SAGA_IDLE_SECONDS = 60                # a saga untouched this long has lost its request
+SAGA_LEASE_SECONDS = 60               # a recovering worker owns a saga this long
+SAGA_RECOVERY_INTERVAL_SECONDS = 30
+SAGA_RETENTION_SECONDS = 7 * 24 * 60 * 60  # finished sagas are kept this long
+
+SAGAS = SagaLog(SAGA_DB_PATH)
+
+# Request tracing (see tracing.py): traceparent is passed on to both services
+TRACE_SAMPLE_RATE = float(os.environ.get("TRACE_SAMPLE_RATE", 0.1))  # share of new traces recorded
+TRACE_BUFFER_SIZE = 4096                                             # spans kept for /debug/traces
+TRACE_EXPORT_PATH = os.environ.get("TRACE_EXPORT_PATH")             # OTLP/JSON lines file; unset = no export
+
+TRACER = instrument_tracing(app, Tracer(SERVICE_NAME, TRACE_SAMPLE_RATE, TRACE_BUFFER_SIZE, TRACE_EXPORT_PATH))
+
+# Circuit breakers: stop waiting on a degraded service and fail fast instead
+BREAKER_FAILURE_RATE = 0.5            # open when half of the recent calls fail...
+BREAKER_SLOW_CALL_RATE = 0.8          # ...or 80% of them are slow
+BREAKER_WINDOW = 20                   # recent calls considered
+BREAKER_MINIMUM_CALLS = 10            # calls needed before the rates are judged
+BREAKER_OPEN_SECONDS = 5.0            # fail fast this long before trying again
+BREAKER_HALF_OPEN_CALLS = 3           # successful trial calls needed to close
+AVAILABILITY_SLOW_CALL_SECONDS = 1.0
+PAYMENT_SLOW_CALL_SECONDS = 3.0
+
+# Hedged availability reads: resend /check-availability once it is slower than p95
+HEDGE_AVAILABILITY_READS = True
+HEDGE_PERCENTILE = 0.95
+HEDGE_MAX_DELAY = AVAILABILITY_READ_TIMEOUT / 2
+
+# Admission control (see admission.py): bookings beyond an adaptive
+# concurrency limit are shed with 503 instead of queueing on the services
+ADMISSION_CONTROL = os.environ.get("ADMISSION_CONTROL", "1") != "0"
+ADMISSION_INITIAL_LIMIT = 20          # bookings in flight per process before any latency is measured
+ADMISSION_MIN_LIMIT = 2
+ADMISSION_MAX_LIMIT = 200
+ADMISSION_LATENCY_TOLERANCE = 1.5     # bookings may get this much slower than unloaded before the limit shrinks
+ADMISSION_RETRY_AFTER = 1.0           # seconds a shed client is told to wait
+PRIORITY_HEADER = "X-Request-Priority"  # critical, normal (the default) or sheddable
+
+def on_breaker_transition(name, old_state, new_state):
+    """Log and count every breaker state change"""
+    print(f"[{SERVICE_NAME}] Circuit for {name}: {old_state} -> {new_state}")
+    METRICS.inc("circuit_breaker_transitions_total", (("target", name), ("to", new_state)))
+
+def new_breaker(name, slow_call_seconds):
+    """Circuit breaker for one downstream service, built from the settings above"""
+    return CircuitBreaker(
+        name,
+        failure_rate_threshold=BREAKER_FAILURE_RATE,
+        slow_call_seconds=slow_call_seconds,
+        slow_call_rate_threshold=BREAKER_SLOW_CALL_RATE,
+        window_size=BREAKER_WINDOW,
+        minimum_calls=BREAKER_MINIMUM_CALLS,
+        open_seconds=BREAKER_OPEN_SECONDS,
+        half_open_calls=BREAKER_HALF_OPEN_CALLS,
+        on_transition=on_breaker_transition
+    )
+
+def new_hedge_policy():
+    """Hedge policy for availability reads, or None when hedging is off"""
+    if not HEDGE_AVAILABILITY_READS:
+        return None
+    return HedgePolicy(fraction=HEDGE_PERCENTILE, max_delay=HEDGE_MAX_DELAY)
+
+def new_limiter():
+    """Admission limiter for /book-hotel, or None when admission control is off"""
+    if not ADMISSION_CONTROL:
+        return None
+    return AdaptiveLimiter(
+        "Orchestrator",
+        initial_limit=ADMISSION_INITIAL_LIMIT,
+        min_limit=ADMISSION_MIN_LIMIT,
+        max_limit=ADMISSION_MAX_LIMIT,
+        tolerance=ADMISSION_LATENCY_TOLERANCE,
+        retry_after=ADMISSION_RETRY_AFTER
+    )
+
+def new_registry(name, spec):
+    """Endpoint registry for one downstream service, built from the settings above"""
+    return EndpointRegistry(
+        name,
+        source_from_spec(spec),
+        balancer=LOAD_BALANCER,
+        refresh_seconds=DISCOVERY_REFRESH_SECONDS,
+        health_path=HEALTH_CHECK_PATH,
+        health_interval=HEALTH_CHECK_INTERVAL,
+        health_timeout=HEALTH_CHECK_TIMEOUT,
+        unhealthy_after=UNHEALTHY_AFTER_CHECKS,
+        eject_after=EJECT_AFTER_FAILURES,
+        eject_seconds=EJECT_SECONDS
+    )
+
+# Availability replicas each keep their own nightly inventory, so every call
+# about a hotel goes to the replica that owns it (affinity=hotel_name); a
+# Payment replica keeps its own transactions, so a booking's payment calls
+# stick to one replica (affinity=booking_id)
+AVAILABILITY_REGISTRY = new_registry("availability", AVAILABILITY_ENDPOINTS)
+PAYMENT_REGISTRY = new_registry("payment", PAYMENT_ENDPOINTS)
+
+# POSTs are retried: /check-availability only reads, /confirm and /release are
+# idempotent, and /reserve returns the booking's existing reservation on a retry
+AVAILABILITY_CLIENT = DownstreamClient(
+    "availability",
+    registry=AVAILABILITY_REGISTRY,
+    pool_size=POOL_SIZE,
+    connect_timeout=CONNECT_TIMEOUT,
+    read_timeout=AVAILABILITY_READ_TIMEOUT,
+    retries=DOWNSTREAM_RETRIES,
+    retry_methods=["GET", "POST"],
+    breaker=new_breaker("availability", AVAILABILITY_SLOW_CALL_SECONDS),
+    hedge=new_hedge_policy(),
+    tracer=TRACER
+)
+PAYMENT_CLIENT = DownstreamClient(
+    "payment",
+    registry=PAYMENT_REGISTRY,
+    pool_size=POOL_SIZE,
+    connect_timeout=CONNECT_TIMEOUT,
+    read_timeout=PAYMENT_READ_TIMEOUT,
+    retries=DOWNSTREAM_RETRIES,
+    retry_methods=["GET", "POST"],
+    breaker=new_breaker("payment", PAYMENT_SLOW_CALL_SECONDS),
+    tracer=TRACER
+)
+
+METRICS = instrument(app, Metrics(SERVICE_NAME))
+for _state in IN_FLIGHT:
+    METRICS.gauge("booking_sagas_in_flight", lambda state=_state: SAGAS.count(state), (("state", _state),))
+
+ADMISSION_LIMITER = new_limiter()
+if ADMISSION_LIMITER is not None:
+    METRICS.gauge("admission_limit", lambda: round(ADMISSION_LIMITER.limit, 2))
+    METRICS.gauge("admission_in_flight", lambda: ADMISSION_LIMITER.in_flight)
+
+WELCOME_BODY = encode_constant({
+    "port": SERVICE_PORT,
+    "description": "Hotel Booking Orchestrator Service",
+    "endpoints": {
+        "POST /book-hotel": "Book a hotel (orchestrates availability and payment)",
+        "POST /book-hotels/batch": "Book many rooms at once; results stream back as NDJSON",
+        "GET /sagas/<booking_id>": "State of a booking's saga (hold, payment, confirmation)",
+        "GET /pool-stats": "Downstream connection pool statistics",
+        "GET /circuit-breakers": "Circuit breaker state and hedging statistics per downstream service",
+        "GET /endpoints": "Replicas of each downstream service with their health and load",
+        "GET /admission": "Adaptive concurrency limit for bookings, admitted and shed per priority",
+        "GET /debug/traces": "Recent sampled request traces with per-span timings",
+        "GET /metrics": "Request and downstream latency metrics (Prometheus format)"
+    }
+})
+
+def encoded_response(body, status_code=200):
+    """Response for a JSON body that is already encoded"""
+    return app.response_class(body, status=status_code, mimetype="application/json")
+
 def get_local_ip():
     """Get the local IP address of the service"""
     try:
@@ -35,166 +242,355 @@ def get_local_ip():
     except Exception as e:
         return "127.0.0.1"
 
+def shutdown():
+    """Graceful shutdown hook (called by serve.py): close pooled downstream connections"""
+    print(f"[{SERVICE_NAME}] Shutting down, closing downstream connection pools")
+    AVAILABILITY_CLIENT.close()
+    PAYMENT_CLIENT.close()
+    SAGAS.close()
+
+def call_downstream(client, path, payload, service, address, booking_id, headers=None, hedge=False,
+                    affinity=None):
+    """
+    POST to a downstream service and return (status_code, json_body)
+    Transport and decoding errors, and calls rejected by an open circuit
+    breaker, are translated into StepFailed responses
+    The call's latency and outcome are recorded in METRICS
+    hedge=True allows a duplicate attempt, so only pass it for reads
+    affinity picks the replica that keeps the state the call is about
+    """
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        response = client.post(path, json=payload, headers=headers, hedge=hedge, affinity=affinity)
+        outcome = response.status_code
+        try:
+            data = loads(response.content)
+        except ValueError:
+            if response.status_code == 200:
+                raise
+            data = {}
+        return response.status_code, data
+    except CircuitOpenError as e:
+        outcome = "circuit_open"
+        raise downstream_error(service, "circuit_open", booking_id, detail=e.retry_after)
+    except requests.exceptions.Timeout:
+        outcome = "timeout"
+        raise downstream_error(service, "timeout", booking_id)
+    except OwnerUnavailableError as e:
+        outcome = "owner_unavailable"
+        raise downstream_error(service, "owner_unavailable", booking_id, detail=e.address)
+    except (requests.exceptions.ConnectionError, NoEndpointError):
+        outcome = "connection"
+        raise downstream_error(service, "connection", booking_id, address)
+    except Exception as e:
+        raise downstream_error(service, "error", booking_id, detail=str(e))
+    finally:
+        METRICS.observe_downstream(client.name, path, outcome, time.perf_counter() - started)
+
+def admission_outcome(failure):
+    """How a failed booking ended, for the admission limiter: timeouts and refused connections mean overload"""
+    if failure.cause in ("timeout", "connection"):
+        return DROPPED
+    if failure.cause is not None:
+        return IGNORED  # failed fast (open circuit) or broke; its latency says nothing about load
+    return OK  # the services answered, e.g. no rooms left
+
+@contextmanager
+def admitted(booking_id, priority=None, sample=True):
+    """
+    Run a booking under the admission limit: raises StepFailed (503 with
+    Retry-After) if it is shed, otherwise tells the limiter how it ended
+    With sample=False its latency is not a sample for the limit (a batch
+    booking skips steps a single one takes); a timeout still counts
+    """
+    if ADMISSION_LIMITER is None:
+        yield
+        return
+    priority = ADMISSION_LIMITER.priority(priority)
+    try:
+        permit = ADMISSION_LIMITER.acquire(priority)
+    except LimitExceededError as e:
+        METRICS.inc("admission_requests_total", (("priority", priority), ("decision", "shed")))
+        raise overloaded(booking_id, e)
+    METRICS.inc("admission_requests_total", (("priority", priority), ("decision", "admitted")))
+    outcome = IGNORED
+    try:
+        yield
+        outcome = OK if sample else IGNORED
+    except StepFailed as failure:
+        outcome = admission_outcome(failure)
+        if outcome == OK and not sample:
+            outcome = IGNORED
+        raise
+    finally:
+        ADMISSION_LIMITER.release(permit, outcome)
+
+def saga_hotel(saga):
+    """Hotel of a recorded saga, the Availability affinity key of its hold"""
+    return (saga.get("booking") or {}).get("hotel_name")
+
+def release_reservation(reservation_id, hotel_name=None):
+    """Release a held room; returns False if the Availability service could not be told"""
+    print(f"[{SERVICE_NAME}] Releasing reservation {reservation_id}...")
+    try:
+        response = AVAILABILITY_CLIENT.post("/release", json=release_request(reservation_id), affinity=hotel_name)
+    except (requests.exceptions.RequestException, CircuitOpenError, NoEndpointError) as e:
+        print(f"[{SERVICE_NAME}] Could not release {reservation_id}: {e}")
+        return False
+    return response.status_code in (200, 404)  # 404: already released, or the hold lapsed
+
+def refund_booking(booking_id, reason, uncharged_ok=False):
+    """
+    Refund whatever was charged for a booking; returns False if that is not settled yet
+    A 404 (the Payment service has no payment for the booking) only settles
+    it with uncharged_ok: a charge still on its way could land after it
+    """
+    print(f"[{SERVICE_NAME}] Refunding booking {booking_id}...")
+    try:
+        response = PAYMENT_CLIENT.post(
+            f"/bookings/{booking_id}/refund", json=refund_request(reason), affinity=booking_id
+        )
+    except (requests.exceptions.RequestException, CircuitOpenError, NoEndpointError) as e:
+        print(f"[{SERVICE_NAME}] Could not refund {booking_id}: {e}")
+        return False
+    if response.status_code == 404:
+        print(f"[{SERVICE_NAME}] No payment recorded for {booking_id}")
+        return uncharged_ok
+    return response.status_code == 200
+
+def compensate(booking_id, reservation_id, refund, error=None, hotel_name=None, uncharged_ok=False):
+    """
+    Undo a booking saga: release its hold and, when the guest may have been
+    charged, refund the booking. The saga ends "failed" once both are done;
+    otherwise it stays "compensating" and recover_sagas() finishes the job
+    (see refund_booking for uncharged_ok)
+    """
+    SAGAS.advance(booking_id, COMPENSATING, error=error)
+    released = reservation_id is None or release_reservation(reservation_id, hotel_name)
+    refunded = not refund or refund_booking(booking_id, error or "Booking not completed", uncharged_ok)
+    if released and refunded:
+        SAGAS.advance(booking_id, FAILED)
+
+def confirm_hold(booking_id, reservation_id, hotel_name=None):
+    """
+    Last step of a charged saga: make its room hold permanent
+    Returns "confirmed"; "lapsed" if the hold ran out first (the booking is
+    then compensated and refunded); or "pending" if the Availability service
+    gave no answer, in which case recover_sagas() retries later
+    """
+    try:
+        status_code, _ = call_downstream(
+            AVAILABILITY_CLIENT, "/confirm", confirm_request(reservation_id),
+            "availability", AVAILABILITY_ENDPOINTS, booking_id, affinity=hotel_name
+        )
+    except StepFailed:
+        return "pending"
+    if status_code == 200:
+        SAGAS.advance(booking_id, CONFIRMED)
+        return "confirmed"
+    if status_code == 404:
+        compensate(booking_id, None, refund=True, error="Room hold expired before confirmation", hotel_name=hotel_name)
+        return "lapsed"
+    return "pending"
+
+def recover_saga(saga):
+    """Finish or undo one saga whose request is gone (see saga.py for the rules)"""
+    booking_id = saga["booking_id"]
+    print(f"[{SERVICE_NAME}] Recovering saga {booking_id} ({saga['state']})")
+    if saga["state"] == STARTED:
+        # No hold is known; one taken while its answer was lost lapses by itself
+        SAGAS.advance(booking_id, FAILED, error="Interrupted before the room was held")
+    elif saga["state"] == CHARGED:
+        confirm_hold(booking_id, saga["reservation_id"], saga_hotel(saga))
+    elif saga["state"] == HELD:
+        # The payment may or may not have gone through: release and refund.
+        # A charge sent SAGA_IDLE_SECONDS ago has landed by now, so a booking
+        # the Payment service does not know was never charged
+        compensate(booking_id, saga["reservation_id"], refund=True, error="Interrupted before payment completed",
+                   hotel_name=saga_hotel(saga), uncharged_ok=True)
+    else:
+        # Unless a charge was approved (then the refund must find it)
+        compensate(booking_id, saga["reservation_id"], refund=True, hotel_name=saga_hotel(saga),
+                   uncharged_ok=saga["transaction_id"] is None)
+
+def recover_sagas():
+    """
+    One recovery pass: drive every saga left in flight by a crashed or
+    restarted worker to "confirmed" or "failed"; returns how many were picked up
+    """
+    sagas = SAGAS.claim_stale(SAGA_IDLE_SECONDS, SAGA_LEASE_SECONDS)
+    for saga in sagas:
+        try:
+            recover_saga(saga)
+        except Exception as e:
+            print(f"[{SERVICE_NAME}] Saga {saga['booking_id']} recovery failed: {e}")
+    SAGAS.prune(SAGA_RETENTION_SECONDS)
+    return len(sagas)
+
+def start_saga_recovery():
+    """Run recover_sagas() now and every SAGA_RECOVERY_INTERVAL_SECONDS on a daemon thread"""
+    def run():
+        while True:
+            try:
+                recover_sagas()
+            except Exception as e:
+                print(f"[{SERVICE_NAME}] Saga recovery pass failed: {e}")
+            time.sleep(SAGA_RECOVERY_INTERVAL_SECONDS)
+    threading.Thread(target=run, name="saga-recovery", daemon=True).start()
+
 @app.route('/', methods=['GET'])
 def welcome():
-    """Welcome endpoint with service information"""
+    """Welcome endpoint with service information (encoded once at startup)"""
+    return encoded_response(WELCOME_BODY)
+
+@app.route('/pool-stats', methods=['GET'])
+def pool_stats():
+    """Report connection pool configuration and hit/miss counters per downstream service"""
+    return jsonify({
+        "status": "success",
+        "pools": {
+            AVAILABILITY_CLIENT.name: AVAILABILITY_CLIENT.describe(),
+            PAYMENT_CLIENT.name: PAYMENT_CLIENT.describe()
+        }
+    })
+
+@app.route('/circuit-breakers', methods=['GET'])
+def circuit_breakers():
+    """Report circuit breaker state and hedged-read statistics per downstream service"""
+    return jsonify({
+        "status": "success",
+        "breakers": {
+            client.name: client.breaker.snapshot()
+            for client in (AVAILABILITY_CLIENT, PAYMENT_CLIENT) if client.breaker is not None
+        },
+        "hedging": {
+            client.name: client.hedge.snapshot()
+            for client in (AVAILABILITY_CLIENT, PAYMENT_CLIENT) if client.hedge is not None
+        }
+    })
+
+@app.route('/endpoints', methods=['GET'])
+def endpoints():
+    """Replicas of each downstream service: source, balancer, health, ejections and calls in flight"""
     return jsonify({
-        "port": SERVICE_PORT,
-        "description": "Hotel Booking Orchestrator Service",
-        "endpoints": {
-            "POST /book-hotel": "Book a hotel (orchestrates availability and payment)"
+        "status": "success",
+        "services": {
+            client.name: client.registry.snapshot()
+            for client in (AVAILABILITY_CLIENT, PAYMENT_CLIENT) if client.registry is not None
         }
     })
 
+@app.route('/admission', methods=['GET'])
+def admission():
+    """Admission limit for /book-hotel: current limit, bookings in flight, admitted and shed per priority"""
+    if ADMISSION_LIMITER is None:
+        return jsonify({"status": "success", "enabled": False})
+    return jsonify({"status": "success", "enabled": True, "limiter": ADMISSION_LIMITER.snapshot()})
+
+@app.route('/sagas/<booking_id>', methods=['GET'])
+def booking_saga(booking_id):
+    """State of a booking's saga: started, held, charged, confirmed, compensating or failed"""
+    saga = SAGAS.get(booking_id)
+    if saga is None:
+        return jsonify({
+            "status": "not_found",
+            "message": f"No saga recorded for booking {booking_id}",
+            "booking_id": booking_id
+        }), 404
+    return jsonify({"status": "success", "saga": saga})
+
+def reserve_and_pay(booking, booking_id, total_amount):
+    """
+    Run the booking saga (see saga.py); returns the transaction ID
+    The room is held for HOLD_SECONDS while the guest is charged, and the
+    hold is confirmed once the payment is approved. A failed payment
+    releases the hold, and also refunds the booking unless the Payment
+    service answered that nothing was charged
+    """
+    SAGAS.start(booking_id, booking, total_amount)
+    try:
+        status_code, data = call_downstream(
+            AVAILABILITY_CLIENT, "/reserve", reserve_request(booking, booking_id, HOLD_SECONDS),
+            "availability", AVAILABILITY_ENDPOINTS, booking_id, affinity=booking["hotel_name"]
+        )
+        reservation_id = handle_reservation(status_code, data, booking, booking_id)
+    except StepFailed as failure:
+        SAGAS.advance(booking_id, FAILED, error=failure.body.get("message"))
+        raise
+    SAGAS.advance(booking_id, HELD, reservation_id=reservation_id)
+
+    status_code = None
+    try:
+        status_code, data = call_downstream(
+            PAYMENT_CLIENT, "/process-payment", payment_request(booking, booking_id, total_amount),
+            "payment", PAYMENT_ENDPOINTS, booking_id,
+            headers=idempotency_headers(booking_id), affinity=booking_id
+        )
+        transaction_id = handle_payment(status_code, data, booking_id)
+    except StepFailed as failure:
+        compensate(booking_id, reservation_id, refund=status_code not in (400, 402), error=failure.body.get("message"),
+                   hotel_name=booking["hotel_name"])
+        raise
+    SAGAS.advance(booking_id, CHARGED, transaction_id=transaction_id)
+
+    outcome = confirm_hold(booking_id, reservation_id, booking["hotel_name"])
+    if outcome == "lapsed":
+        raise hold_lapsed(booking, booking_id)
+    if outcome == "pending":
+        raise confirmation_pending(booking_id, transaction_id)
+    return transaction_id
+
 @app.route('/book-hotel', methods=['POST'])
 def book_hotel():
     """
-    Orchestrate hotel booking workflow with hardcoded values
-    Flow: 1. Check availability with Availability Service
-          2. If available, process payment with Payment Service
-          3. Return consolidated booking confirmation
+    Orchestrate hotel booking workflow
+    Books the JSON body's booking (see booking.booking_from_payload), or the
+    hardcoded booking when the body is empty
+    Flow: 1. Pre-check the payment method with Payment Service (optional)
+          2. Check availability with Availability Service
+          3. Hold the room, process payment with Payment Service, then confirm
+             the hold (the saga in reserve_and_pay; the hold is released if
+             the payment fails)
+          4. Return consolidated booking confirmation
+    Steps 1-3 run under the admission limit: a booking beyond it is shed
+    with 503 before any downstream call (priority from X-Request-Priority)
     """
     try:
-        # Hardcoded booking details
-        guest_name = "Lakshya Vashisth"
-        guest_email = "lakshya@example.com"
-        hotel_name = "Grand Plaza"
-        check_in = "2026-02-15"
-        check_out = "2026-02-18"
-        room_type = "Suite"
-        payment_method = "credit_card"
-        num_guests = 1
-        
-        booking_id = f"BOOK{int(datetime.now().timestamp())}"
-        
-        # Step 1: Check availability with Availability Service
-        print(f"[{SERVICE_NAME}] Checking availability...")
         try:
-            availability_response = requests.post(
-                f"http://{SERVICE_B_IP}:{SERVICE_B_PORT}/check-availability",
-                json={
-                    "hotel_name": hotel_name,
-                    "check_in": check_in,
-                    "check_out": check_out,
-                    "room_type": room_type,
-                    "num_guests": num_guests
-                },
-                timeout=REQUEST_TIMEOUT
-            )
-            
-            if availability_response.status_code != 200:
-                return jsonify({
-                    "status": "booking_failed",
-                    "message": "Hotel availability service unavailable",
-                    "booking_id": booking_id
-                }), 503
-            
-            availability_data = availability_response.json()
-            
-            # Check if room is available
-            if availability_data.get("available") is False:
-                return jsonify({
-                    "status": "booking_failed",
-                    "message": f"No {room_type} rooms available at {hotel_name} for selected dates",
-                    "booking_id": booking_id,
-                    "check_in": check_in,
-                    "check_out": check_out
-                }), 409
-            
-            room_rate = availability_data.get("room_rate", 0)
-            num_nights = availability_data.get("num_nights", 0)
-            total_amount = room_rate * num_nights
-            
-        except requests.exceptions.Timeout:
-            return jsonify({
-                "status": "error",
-                "message": "Availability service timeout",
-                "booking_id": booking_id
-            }), 504
-        except requests.exceptions.ConnectionError:
-            return jsonify({
-                "status": "error",
-                "message": f"Cannot connect to availability service at {SERVICE_B_IP}:{SERVICE_B_PORT}",
-                "booking_id": booking_id
-            }), 503
-        except Exception as e:
-            return jsonify({
-                "status": "error",
-                "message": f"Availability check error: {str(e)}",
-                "booking_id": booking_id
-            }), 500
-        
-        # Step 2: Process payment with Payment Service
-        print(f"[{SERVICE_NAME}] Processing payment...")
-        try:
-            payment_response = requests.post(
-                f"http://{SERVICE_C_IP}:{SERVICE_C_PORT}/process-payment",
-                json={
-                    "booking_id": booking_id,
-                    "guest_name": guest_name,
-                    "hotel_name": hotel_name,
-                    "room_type": room_type,
-                    "amount": total_amount,
-                    "currency": "USD",
-                    "payment_method": payment_method,
-                    "check_in": check_in,
-                    "check_out": check_out
-                },
-                timeout=REQUEST_TIMEOUT
-            )
-            
-            payment_data = payment_response.json()
-            
-            if payment_response.status_code not in [200, 201]:
-                return jsonify({
-                    "status": "booking_failed",
-                    "message": payment_data.get("message", "Payment processing failed"),
-                    "booking_id": booking_id,
-                    "reason": "Payment declined"
-                }), 402
-            
-        except requests.exceptions.Timeout:
-            return jsonify({
-                "status": "error",
-                "message": "Payment service timeout",
-                "booking_id": booking_id
-            }), 504
-        except requests.exceptions.ConnectionError:
-            return jsonify({
-                "status": "error",
-                "message": f"Cannot connect to payment service at {SERVICE_C_IP}:{SERVICE_C_PORT}",
-                "booking_id": booking_id
-            }), 503
-        except Exception as e:
-            return jsonify({
-                "status": "error",
-                "message": f"Payment processing error: {str(e)}",
-                "booking_id": booking_id
-            }), 500
-        
-        # Step 3: Return consolidated booking confirmation
-        transaction_id = payment_data.get("transaction_id")
-        
-        booking_confirmation = {
-            "status": "confirmed",
-            "message": "Hotel booking confirmed successfully",
-            "booking_id": booking_id,
-            "transaction_id": transaction_id,
-            "guest_name": guest_name,
-            "guest_email": guest_email,
-            "hotel_name": hotel_name,
-            "room_type": room_type,
-            "check_in": check_in,
-            "check_out": check_out,
-            "number_of_nights": num_nights,
-            "room_rate_per_night": room_rate,
-            "total_amount": total_amount,
-            "currency": "USD",
-            "payment_status": "approved",
-            "booking_timestamp": datetime.now().isoformat()
-        }
-        
-        return jsonify(booking_confirmation), 200
+            data = request.get_json(silent=True)
+            booking, booking_id = new_booking(booking_from_payload(data) if data else None)
+
+            with admitted(booking_id, request.headers.get(PRIORITY_HEADER)):
+                # Step 1: Fraud and limits pre-check with Payment Service
+                if PAYMENT_PRECHECK:
+                    print(f"[{SERVICE_NAME}] Pre-checking payment...")
+                    status_code, data = call_downstream(
+                        PAYMENT_CLIENT, "/validate-payment", precheck_request(booking),
+                        "payment", PAYMENT_ENDPOINTS, booking_id
+                    )
+                    handle_precheck(status_code, data, booking_id)
+
+                # Step 2: Check availability with Availability Service
+                print(f"[{SERVICE_NAME}] Checking availability...")
+                status_code, data = call_downstream(
+                    AVAILABILITY_CLIENT, "/check-availability", availability_request(booking),
+                    "availability", AVAILABILITY_ENDPOINTS, booking_id, hedge=True, affinity=booking["hotel_name"]
+                )
+                room_rate, num_nights, total_amount = handle_availability(status_code, data, booking, booking_id)
+
+                # Step 3: Hold the room, process payment with Payment Service, confirm the hold
+                print(f"[{SERVICE_NAME}] Holding room and processing payment...")
+                transaction_id = reserve_and_pay(booking, booking_id, total_amount)
+
+        except StepFailed as failure:
+            return jsonify(failure.body), failure.status_code, failure.headers
+
+        # Step 4: Return consolidated booking confirmation
+        booking_confirmation = confirmation(
+            booking, booking_id, transaction_id, room_rate, num_nights, total_amount
+        )
+        return encoded_response(CONFIRMATION.render(booking_confirmation))
 
     except Exception as e:
         return jsonify({
@@ -202,6 +598,117 @@ def book_hotel():
             "message": f"Booking orchestration error: {str(e)}"
         }), 500
 
+def quote_bookings(bookings, booking_ids):
+    """
+    Check availability for many bookings with /check-availability/batch,
+    one call per Availability replica and AVAILABILITY_BATCH_SIZE queries
+    Returns one entry per booking: the (status_code, data) quote, the
+    StepFailed that ended its chunk, or None if the Availability service has
+    no batch endpoint and the booking must be checked on its own
+    """
+    quotes = [None] * len(bookings)
+    for indexes in replica_chunks(bookings, AVAILABILITY_CLIENT.registry, AVAILABILITY_BATCH_SIZE):
+        chunk = [bookings[index] for index in indexes]
+        try:
+            status_code, data = call_downstream(
+                AVAILABILITY_CLIENT, "/check-availability/batch",
+                {"queries": [availability_request(booking) for booking in chunk]},
+                "availability", AVAILABILITY_ENDPOINTS, booking_ids[indexes[0]], hedge=True,
+                affinity=chunk[0]["hotel_name"]
+            )
+        except StepFailed as failure:
+            for index in indexes:
+                quotes[index] = failure
+            continue
+        results = data.get("results")
+        if status_code == 200 and isinstance(results, list) and len(results) == len(chunk):
+            for index, item in zip(indexes, results):
+                quotes[index] = (item.get("http_status", 200), item)
+    return quotes
+
+def book_quoted(booking, booking_id, quote):
+    """
+    Finish one booking of a batch from its availability quote; returns (status_code, body)
+    The booking takes an admission slot as sheddable, so a batch gives way
+    to single bookings and is shed first (503 for that booking)
+    """
+    try:
+        try:
+            if isinstance(quote, StepFailed):
+                raise StepFailed(dict(quote.body, booking_id=booking_id), quote.status_code, quote.headers)
+            with admitted(booking_id, SHEDDABLE, sample=False):
+                if quote is None:
+                    quote = call_downstream(
+                        AVAILABILITY_CLIENT, "/check-availability", availability_request(booking),
+                        "availability", AVAILABILITY_ENDPOINTS, booking_id, hedge=True,
+                        affinity=booking["hotel_name"]
+                    )
+                room_rate, num_nights, total_amount = handle_availability(*quote, booking, booking_id)
+                transaction_id = reserve_and_pay(booking, booking_id, total_amount)
+        except StepFailed as failure:
+            return failure.status_code, failure.body
+        return 200, confirmation(booking, booking_id, transaction_id, room_rate, num_nights, total_amount)
+    except Exception as e:
+        return 500, {
+            "status": "error",
+            "message": f"Booking orchestration error: {str(e)}",
+            "booking_id": booking_id
+        }
+
+def stream_batch(entries, span=None):
+    """
+    Generate the NDJSON lines of a batch booking response
+    Rejected bookings are reported first, then every booking as soon as it
+    completes (not in request order; each line carries its index), then a
+    summary line
+    The body is generated after the view has returned, so the request's
+    trace span is passed in and its downstream calls are traced under it
+    """
+    confirmed = 0
+    accepted = []
+    for index, entry in enumerate(entries):
+        if isinstance(entry, StepFailed):
+            yield app.json.dumps(batch_result(index, entry.status_code, entry.body)) + "\n"
+        else:
+            booking, booking_id = new_booking(entry)
+            accepted.append((index, booking, booking_id))
+
+    quotes = TRACER.bind(quote_bookings, span)(
+        [booking for _, booking, _ in accepted], [booking_id for _, _, booking_id in accepted]
+    )
+    executor = ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY, thread_name_prefix="batch-booking")
+    try:
+        futures = {
+            executor.submit(TRACER.bind(book_quoted, span), booking, booking_id, quote): index
+            for (index, booking, booking_id), quote in zip(accepted, quotes)
+        }
+        for future in as_completed(futures):
+            status_code, body = future.result()
+            confirmed += status_code == 200
+            yield app.json.dumps(batch_result(futures[future], status_code, body)) + "\n"
+    finally:
+        # A client that disconnects mid-stream cancels the bookings not started yet
+        executor.shutdown(wait=True, cancel_futures=True)
+    print(f"[{SERVICE_NAME}] Batch complete: {confirmed}/{len(entries)} bookings confirmed")
+    yield app.json.dumps(batch_summary(len(entries), confirmed)) + "\n"
+
+@app.route('/book-hotels/batch', methods=['POST'])
+def book_hotels_batch():
+    """
+    Book many rooms in one request (group and corporate bookings)
+    Expected payload: {"bookings": [<booking as for /book-hotel>, ...]}
+    Availability is checked in bulk, then bookings are reserved and paid for
+    BATCH_CONCURRENCY at a time; results stream back as NDJSON, one line per
+    booking as it completes, followed by a summary line
+    Each booking is admitted as sheddable (see book_quoted)
+    """
+    try:
+        entries = parse_batch(request.get_json(silent=True), MAX_BATCH_BOOKINGS)
+    except StepFailed as failure:
+        return jsonify(failure.body), failure.status_code
+    print(f"[{SERVICE_NAME}] Batch of {len(entries)} bookings...")
+    return app.response_class(stream_batch(entries, TRACER.current()), mimetype="application/x-ndjson")
+
 if __name__ == '__main__':
     print("=" * 60)
     print("Starting Orchestrator (Hotel Booking)...")
@@ -209,7 +716,10 @@ if __name__ == '__main__':
     print(f"Service: {SERVICE_NAME}")
     print(f"Port: {SERVICE_PORT}")
     print(f"Local IP: {get_local_ip()}")
-    print(f"Availability Service: {SERVICE_B_IP}:{SERVICE_B_PORT}")
-    print(f"Payment Service: {SERVICE_C_IP}:{SERVICE_C_PORT}")
+    print(f"Availability Service: {AVAILABILITY_ENDPOINTS} ({LOAD_BALANCER})")
+    print(f"Payment Service: {PAYMENT_ENDPOINTS} ({LOAD_BALANCER})")
+    print(f"Saga log: {SAGA_DB_PATH}")
+    print(f"Admission control: {f'adaptive, starting at {ADMISSION_INITIAL_LIMIT}' if ADMISSION_CONTROL else 'off'}")
     print("=" * 60)
-    app.run(host='0.0.0.0', port=SERVICE_PORT, debug=True)
+    start_saga_recovery()
+    app.run(host='0.0.0.0', port=SERVICE_PORT, debug=DEBUG)
@@ -0,0 +1,761 @@
+"""
+Orchestrator (Hotel Booking) - VCC-1, asyncio engine
+Same /book-hotel workflow as app.py, served by aiohttp on a single event loop
+Many bookings run concurrently in one process, and independent steps (the
+payment pre-check and the availability lookup) fan out in parallel
+/book-hotels/batch streams NDJSON exactly like the sync engine
+Run with: python async_app.py   (the sync engine stays available as app.py)
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import aiohttp
+from aiohttp import web
+
+from app import (
+    SERVICE_NAME, SERVICE_PORT, AVAILABILITY_ENDPOINTS, PAYMENT_ENDPOINTS, LOAD_BALANCER,
+    AVAILABILITY_REGISTRY, PAYMENT_REGISTRY,
+    POOL_SIZE, CONNECT_TIMEOUT, AVAILABILITY_READ_TIMEOUT, PAYMENT_READ_TIMEOUT,
+    DOWNSTREAM_RETRIES, PAYMENT_PRECHECK, AVAILABILITY_SLOW_CALL_SECONDS, PAYMENT_SLOW_CALL_SECONDS,
+    MAX_BATCH_BOOKINGS, AVAILABILITY_BATCH_SIZE, BATCH_CONCURRENCY,
+    HOLD_SECONDS, SAGAS, SAGA_IDLE_SECONDS, SAGA_LEASE_SECONDS, SAGA_RECOVERY_INTERVAL_SECONDS,
+    SAGA_RETENTION_SECONDS, METRICS, TRACER, ADMISSION_CONTROL, ADMISSION_INITIAL_LIMIT, ADMISSION_LIMITER,
+    PRIORITY_HEADER, get_local_ip, new_breaker, new_hedge_policy, saga_hotel, admitted
+)
+from admission import SHEDDABLE
+from discovery import NoEndpointError, OwnerUnavailableError
+from resilience import CircuitOpenError, RETRYABLE_STATUSES
+from metrics import CONTENT_TYPE
+from tracing import TRACEPARENT_HEADER, TRACE_ID_HEADER, parse_traceparent
+from encoding import dumps, encode_constant, loads
+from saga import STARTED, HELD, CHARGED, CONFIRMED, COMPENSATING, FAILED
+from booking import (
+    StepFailed, new_booking, booking_from_payload, parse_batch, batch_result, batch_summary,
+    availability_request, reserve_request, confirm_request, release_request, refund_request,
+    precheck_request, payment_request, idempotency_headers, downstream_error, handle_availability,
+    handle_reservation, handle_precheck, handle_payment, hold_lapsed, confirmation_pending,
+    confirmation, replica_chunks, CONFIRMATION
+)
+
+KEEPALIVE_TIMEOUT = 30  # seconds an idle pooled connection is kept open
+SAGA_LOG_THREADS = 4    # threads the saga log's SQLite calls run on, off the event loop
+
+WELCOME_BODY = encode_constant({
+    "port": SERVICE_PORT,
+    "description": "Hotel Booking Orchestrator Service (async engine)",
+    "endpoints": {
+        "POST /book-hotel": "Book a hotel (orchestrates availability and payment)",
+        "POST /book-hotels/batch": "Book many rooms at once; results stream back as NDJSON",
+        "GET /sagas/<booking_id>": "State of a booking's saga (hold, payment, confirmation)",
+        "GET /circuit-breakers": "Circuit breaker state and hedging statistics per downstream service",
+        "GET /endpoints": "Replicas of each downstream service with their health and load",
+        "GET /admission": "Adaptive concurrency limit for bookings, admitted and shed per priority",
+        "GET /debug/traces": "Recent sampled request traces with per-span timings",
+        "GET /metrics": "Request and downstream latency metrics (Prometheus format)"
+    }
+})
+
+
+class AsyncSagaLog:
+    """
+    saga.SagaLog for the event loop: every call runs on a small thread pool,
+    so a WAL write, or a wait for another process's write lock, holds up
+    only the booking making it instead of every request on the loop
+    """
+
+    def __init__(self, sagas, threads=SAGA_LOG_THREADS):
+        self.sagas = sagas
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="saga-log")
+
+    def run(self, method, *args, **kwargs):
+        """Await method(*args, **kwargs) on the saga log's threads"""
+        return asyncio.get_running_loop().run_in_executor(self._executor, partial(method, *args, **kwargs))
+
+    async def start(self, booking_id, booking, amount):
+        return await self.run(self.sagas.start, booking_id, booking, amount)
+
+    async def advance(self, booking_id, state, **fields):
+        return await self.run(self.sagas.advance, booking_id, state, **fields)
+
+    async def get(self, booking_id):
+        return await self.run(self.sagas.get, booking_id)
+
+    async def claim_stale(self, idle_seconds, lease_seconds):
+        return await self.run(self.sagas.claim_stale, idle_seconds, lease_seconds)
+
+    async def prune(self, older_than_seconds):
+        return await self.run(self.sagas.prune, older_than_seconds)
+
+
+SAGA_LOG = AsyncSagaLog(SAGAS)
+
+
+def json_response(body, status=200, headers=None):
+    """web.json_response through the shared encoder (orjson when installed)"""
+    return encoded_response(dumps(body), status, headers)
+
+
+def encoded_response(body, status=200, headers=None):
+    """Response for a JSON body that is already encoded"""
+    return web.Response(body=body, status=status, headers=headers, content_type="application/json")
+
+
+class AsyncDownstreamClient:
+    """Non-blocking counterpart of downstream.DownstreamClient"""
+
+    def __init__(self, name, base_url=None, pool_size=10, connect_timeout=1.0,
+                 read_timeout=5.0, retries=0, breaker=None, hedge=None, tracer=None, registry=None):
+        self.name = name
+        self.base_url = base_url.rstrip("/") if base_url else None
+        self.registry = registry
+        self.pool_size = pool_size
+        self.timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+        self.retries = retries
+        self.breaker = breaker
+        self.hedge = hedge
+        self.tracer = tracer
+        self.session = None
+
+    async def start(self):
+        connector = aiohttp.TCPConnector(limit_per_host=self.pool_size, keepalive_timeout=KEEPALIVE_TIMEOUT)
+        self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+
+    async def post_json(self, path, payload, headers=None, hedge=False, affinity=None):
+        """
+        POST a JSON payload and return (status_code, json_body)
+        Guarded by the circuit breaker (raises CircuitOpenError when open);
+        hedge=True sends a second attempt after the hedge delay, so only
+        pass it for reads. With a registry, affinity picks the replica
+        """
+        hedged = hedge and self.hedge is not None
+        if self.breaker is not None:
+            self.breaker.allow()
+        span = None
+        if self.tracer is not None:
+            span = self.tracer.start_span(f"POST {self.name} {path}", "client")
+            span.set("peer.service", self.name)
+            span.set("http.url", f"{self.base_url}{path}" if self.registry is None else path)
+            span.set("hedged", hedged)
+            headers = self.tracer.inject(headers, span)
+        started = time.perf_counter()
+        failed = True
+        try:
+            if hedged:
+                result = await self._post_hedged(path, payload, headers, affinity)
+            else:
+                result = await self._post(path, payload, headers, affinity)
+            failed = result[0] >= 500
+            if span is not None:
+                span.set("http.status_code", result[0])
+            return result
+        except asyncio.CancelledError:
+            failed = None
+            raise
+        except Exception as e:
+            if span is not None:
+                span.fail(f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            if self.breaker is not None:
+                if failed is None:
+                    self.breaker.abandon()
+                else:
+                    self.breaker.record(failed, elapsed)
+            if hedged and failed is False:
+                self.hedge.latencies.add(elapsed)
+            if span is not None:
+                if failed is not False and span.status != "error":
+                    span.fail("cancelled" if failed is None else "HTTP 5xx")
+                self.tracer.finish(span)
+
+    async def _post(self, path, payload, headers, affinity=None, picked=None, avoid=()):
+        # Only connection failures are retried (the request was never sent),
+        # on another replica when the registry has one (a keyed call only on its owner)
+        tried = list(avoid)
+        attempt = 0
+        while True:
+            endpoint = None
+            base_url = self.base_url
+            if self.registry is not None:
+                endpoint = self.registry.pick(affinity, tried)
+                base_url = endpoint.url
+                if picked is not None:
+                    picked.append(endpoint.address)
+                self.registry.acquire(endpoint)
+            failed, error = True, None
+            try:
+                async with self.session.post(f"{base_url}{path}", json=payload, headers=headers) as response:
+                    failed = response.status >= 500
+                    error = f"HTTP {response.status}" if failed else None
+                    try:
+                        data = loads(await response.read())
+                    except ValueError:
+                        if response.status == 200:
+                            raise
+                        data = {}
+                    return response.status, data
+            except aiohttp.ClientConnectorError as e:
+                error = f"{type(e).__name__}: {e}"
+                if attempt >= self.retries:
+                    raise
+            except asyncio.CancelledError:
+                failed = None
+                raise
+            except Exception as e:
+                error = error or f"{type(e).__name__}: {e}"
+                raise
+            finally:
+                if endpoint is not None:
+                    self.registry.release(endpoint, failed, error)
+            if endpoint is None or endpoint.address in tried:
+                await asyncio.sleep(0.1 * (2 ** attempt))
+            if endpoint is not None:
+                tried.append(endpoint.address)
+            attempt += 1
+
+    async def _post_hedged(self, path, payload, headers, affinity=None):
+        """
+        First successful of the original attempt and a delayed duplicate; the
+        loser is cancelled. A 502/503/504 answer is not a success: it is only
+        returned if the other attempt does no better. Without an affinity key
+        the duplicate goes to another replica
+        """
+        picked = []
+        primary = asyncio.ensure_future(self._post(path, payload, headers, affinity, picked))
+        done, _ = await asyncio.wait({primary}, timeout=self.hedge.delay())
+        if done:
+            return primary.result()
+        avoid = tuple(picked) if affinity is None else ()
+        backup = asyncio.ensure_future(self._post(path, payload, headers, affinity, None, avoid))
+        pending = {primary, backup}
+        lost = None  # a failed attempt, preferring a response over an exception
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    result = task.result() if task.exception() is None else None
+                    if result is not None and result[0] not in RETRYABLE_STATUSES:
+                        self.hedge.record_hedge(won=task is backup)
+                        return result
+                    if lost is None or result is not None:
+                        lost = task
+        finally:
+            for task in pending:
+                task.cancel()
+        self.hedge.record_hedge(won=False)
+        return lost.result()
+
+
+async def call_downstream(client, path, payload, service, address, booking_id, headers=None, hedge=False,
+                          affinity=None):
+    """Async call_downstream: translate transport errors into StepFailed and record metrics"""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        status_code, data = await client.post_json(path, payload, headers, hedge=hedge, affinity=affinity)
+        outcome = status_code
+        return status_code, data
+    except CircuitOpenError as e:
+        outcome = "circuit_open"
+        raise downstream_error(service, "circuit_open", booking_id, detail=e.retry_after)
+    except asyncio.TimeoutError:
+        outcome = "timeout"
+        raise downstream_error(service, "timeout", booking_id)
+    except OwnerUnavailableError as e:
+        outcome = "owner_unavailable"
+        raise downstream_error(service, "owner_unavailable", booking_id, detail=e.address)
+    except (aiohttp.ClientConnectionError, NoEndpointError):
+        outcome = "connection"
+        raise downstream_error(service, "connection", booking_id, address)
+    except asyncio.CancelledError:
+        outcome = "cancelled"
+        raise
+    except Exception as e:
+        raise downstream_error(service, "error", booking_id, detail=str(e))
+    finally:
+        METRICS.observe_downstream(client.name, path, outcome, time.perf_counter() - started)
+
+
+async def fan_out(*coroutines):
+    """
+    Run independent steps concurrently and return their results in order
+    If any step fails the rest are cancelled and the first failure is raised
+    """
+    tasks = [asyncio.ensure_future(coroutine) for coroutine in coroutines]
+    try:
+        return await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+async def release_reservation(availability, reservation_id, hotel_name=None):
+    """Release a held room; returns False if the Availability service could not be told"""
+    try:
+        status_code, _ = await availability.post_json("/release", release_request(reservation_id), affinity=hotel_name)
+    except (aiohttp.ClientError, asyncio.TimeoutError, CircuitOpenError, NoEndpointError) as e:
+        print(f"[{SERVICE_NAME}] Could not release {reservation_id}: {e}")
+        return False
+    return status_code in (200, 404)  # 404: already released, or the hold lapsed
+
+
+async def refund_booking(payment, booking_id, reason, uncharged_ok=False):
+    """Async app.refund_booking: False if not settled yet; a 404 only settles it with uncharged_ok"""
+    try:
+        status_code, _ = await payment.post_json(
+            f"/bookings/{booking_id}/refund", refund_request(reason), affinity=booking_id
+        )
+    except (aiohttp.ClientError, asyncio.TimeoutError, CircuitOpenError, NoEndpointError) as e:
+        print(f"[{SERVICE_NAME}] Could not refund {booking_id}: {e}")
+        return False
+    if status_code == 404:
+        print(f"[{SERVICE_NAME}] No payment recorded for {booking_id}")
+        return uncharged_ok
+    return status_code == 200
+
+
+async def compensate(availability, payment, booking_id, reservation_id, refund, error=None, hotel_name=None,
+                     uncharged_ok=False):
+    """Async app.compensate: release the hold, refund if needed, "failed" once both are done"""
+    await SAGA_LOG.advance(booking_id, COMPENSATING, error=error)
+    released = reservation_id is None or await release_reservation(availability, reservation_id, hotel_name)
+    refunded = not refund or await refund_booking(payment, booking_id, error or "Booking not completed",
+                                                  uncharged_ok)
+    if released and refunded:
+        await SAGA_LOG.advance(booking_id, FAILED)
+
+
+async def confirm_hold(availability, payment, booking_id, reservation_id, hotel_name=None):
+    """Async app.confirm_hold: returns "confirmed", "lapsed" (compensated) or "pending" (retried by recovery)"""
+    try:
+        status_code, _ = await call_downstream(
+            availability, "/confirm", confirm_request(reservation_id),
+            "availability", AVAILABILITY_ENDPOINTS, booking_id, affinity=hotel_name
+        )
+    except StepFailed:
+        return "pending"
+    if status_code == 200:
+        await SAGA_LOG.advance(booking_id, CONFIRMED)
+        return "confirmed"
+    if status_code == 404:
+        await compensate(availability, payment, booking_id, None, refund=True,
+                         error="Room hold expired before confirmation", hotel_name=hotel_name)
+        return "lapsed"
+    return "pending"
+
+
+async def recover_sagas(availability, payment):
+    """Async app.recover_sagas: one pass over the sagas left in flight; see app.recover_saga"""
+    sagas = await SAGA_LOG.claim_stale(SAGA_IDLE_SECONDS, SAGA_LEASE_SECONDS)
+    for saga in sagas:
+        booking_id = saga["booking_id"]
+        print(f"[{SERVICE_NAME}] Recovering saga {booking_id} ({saga['state']})")
+        try:
+            if saga["state"] == STARTED:
+                await SAGA_LOG.advance(booking_id, FAILED, error="Interrupted before the room was held")
+            elif saga["state"] == CHARGED:
+                await confirm_hold(availability, payment, booking_id, saga["reservation_id"], saga_hotel(saga))
+            elif saga["state"] == HELD:
+                await compensate(availability, payment, booking_id, saga["reservation_id"], refund=True,
+                                 error="Interrupted before payment completed", hotel_name=saga_hotel(saga),
+                                 uncharged_ok=True)
+            else:
+                await compensate(availability, payment, booking_id, saga["reservation_id"], refund=True,
+                                 hotel_name=saga_hotel(saga), uncharged_ok=saga["transaction_id"] is None)
+        except Exception as e:
+            print(f"[{SERVICE_NAME}] Saga {booking_id} recovery failed: {e}")
+    await SAGA_LOG.prune(SAGA_RETENTION_SECONDS)
+    return len(sagas)
+
+
+async def saga_recovery(app):
+    """Background task: recover_sagas now and every SAGA_RECOVERY_INTERVAL_SECONDS"""
+    while True:
+        try:
+            await recover_sagas(app["availability_client"], app["payment_client"])
+        except Exception as e:
+            print(f"[{SERVICE_NAME}] Saga recovery pass failed: {e}")
+        await asyncio.sleep(SAGA_RECOVERY_INTERVAL_SECONDS)
+
+
+@web.middleware
+async def record_metrics(request, handler):
+    """Time every request, labelled by its route like the Flask engine"""
+    started = time.perf_counter()
+    status_code = 500
+    try:
+        response = await handler(request)
+        status_code = response.status
+        return response
+    except web.HTTPException as e:
+        status_code = e.status
+        raise
+    finally:
+        resource = request.match_info.route.resource
+        endpoint = resource.canonical if resource is not None else "unmatched"
+        METRICS.observe_request(endpoint, request.method, status_code, time.perf_counter() - started)
+
+
+@web.middleware
+async def trace_requests(request, handler):
+    """Server span per request, continuing the caller's traceparent like the Flask engine"""
+    resource = request.match_info.route.resource
+    endpoint = resource.canonical if resource is not None else "unmatched"
+    span = TRACER.start_span(
+        f"{request.method} {endpoint}", "server", parse_traceparent(request.headers.get(TRACEPARENT_HEADER))
+    )
+    span.set("http.method", request.method)
+    span.set("http.target", request.path_qs)
+    with TRACER.activate(span):
+        try:
+            response = await handler(request)
+        except web.HTTPException as e:
+            span.set("http.status_code", e.status)
+            raise
+        except BaseException as e:
+            span.fail(f"{type(e).__name__}: {e}")
+            raise
+        else:
+            span.set("http.status_code", response.status)
+            if response.status >= 500:
+                span.fail(f"HTTP {response.status}")
+            if span.sampled and not response.prepared:
+                response.headers[TRACE_ID_HEADER] = span.trace_id
+            return response
+        finally:
+            TRACER.finish(span)
+
+
+async def debug_traces(request):
+    """Recent sampled traces from this process's ring buffer, newest first"""
+    try:
+        limit = max(1, int(request.query.get("limit", 20)))
+        min_ms = float(request.query.get("min_ms", 0))
+    except ValueError:
+        return json_response({"status": "error", "message": "limit and min_ms must be numbers"}, 400)
+    return json_response({
+        "status": "success",
+        "tracer": TRACER.snapshot(),
+        "traces": TRACER.traces(limit, request.query.get("trace_id"), min_ms)
+    })
+
+
+async def prometheus_metrics(request):
+    """Prometheus scrape endpoint; the saga gauges read the saga log, so it renders off the loop"""
+    body = await SAGA_LOG.run(METRICS.render)
+    return web.Response(body=body.encode("utf-8"), headers={"Content-Type": CONTENT_TYPE})
+
+
+async def endpoints(request):
+    """Replicas of each downstream service: source, balancer, health, ejections and calls in flight"""
+    clients = (request.app["availability_client"], request.app["payment_client"])
+    return json_response({
+        "status": "success",
+        "services": {client.name: client.registry.snapshot() for client in clients if client.registry is not None}
+    })
+
+
+async def admission(request):
+    """Admission limit for /book-hotel: current limit, bookings in flight, admitted and shed per priority"""
+    if ADMISSION_LIMITER is None:
+        return json_response({"status": "success", "enabled": False})
+    return json_response({"status": "success", "enabled": True, "limiter": ADMISSION_LIMITER.snapshot()})
+
+
+async def circuit_breakers(request):
+    """Report circuit breaker state and hedged-read statistics per downstream service"""
+    clients = (request.app["availability_client"], request.app["payment_client"])
+    return json_response({
+        "status": "success",
+        "breakers": {client.name: client.breaker.snapshot() for client in clients if client.breaker is not None},
+        "hedging": {client.name: client.hedge.snapshot() for client in clients if client.hedge is not None}
+    })
+
+
+async def welcome(request):
+    """Welcome endpoint with service information (encoded once at startup)"""
+    return encoded_response(WELCOME_BODY)
+
+
+async def read_json(request):
+    """Request body as JSON, or None if it is empty or not valid JSON"""
+    if not request.can_read_body:
+        return None
+    try:
+        return loads(await request.read())
+    except ValueError:
+        return None
+
+
+async def booking_saga(request):
+    """State of a booking's saga: started, held, charged, confirmed, compensating or failed"""
+    booking_id = request.match_info["booking_id"]
+    saga = await SAGA_LOG.get(booking_id)
+    if saga is None:
+        return json_response({
+            "status": "not_found",
+            "message": f"No saga recorded for booking {booking_id}",
+            "booking_id": booking_id
+        }, status=404)
+    return json_response({"status": "success", "saga": saga})
+
+
+async def reserve_and_pay(availability, payment, booking, booking_id, total_amount):
+    """Async app.reserve_and_pay: hold the room, charge, confirm the hold; returns the transaction ID"""
+    await SAGA_LOG.start(booking_id, booking, total_amount)
+    try:
+        status_code, data = await call_downstream(
+            availability, "/reserve", reserve_request(booking, booking_id, HOLD_SECONDS),
+            "availability", AVAILABILITY_ENDPOINTS, booking_id, affinity=booking["hotel_name"]
+        )
+        reservation_id = handle_reservation(status_code, data, booking, booking_id)
+    except StepFailed as failure:
+        await SAGA_LOG.advance(booking_id, FAILED, error=failure.body.get("message"))
+        raise
+    await SAGA_LOG.advance(booking_id, HELD, reservation_id=reservation_id)
+
+    status_code = None
+    try:
+        status_code, data = await call_downstream(
+            payment, "/process-payment", payment_request(booking, booking_id, total_amount),
+            "payment", PAYMENT_ENDPOINTS, booking_id,
+            headers=idempotency_headers(booking_id), affinity=booking_id
+        )
+        transaction_id = handle_payment(status_code, data, booking_id)
+    except StepFailed as failure:
+        await compensate(availability, payment, booking_id, reservation_id,
+                         refund=status_code not in (400, 402), error=failure.body.get("message"),
+                         hotel_name=booking["hotel_name"])
+        raise
+    await SAGA_LOG.advance(booking_id, CHARGED, transaction_id=transaction_id)
+
+    outcome = await confirm_hold(availability, payment, booking_id, reservation_id, booking["hotel_name"])
+    if outcome == "lapsed":
+        raise hold_lapsed(booking, booking_id)
+    if outcome == "pending":
+        raise confirmation_pending(booking_id, transaction_id)
+    return transaction_id
+
+
+async def book_hotel(request):
+    """
+    Orchestrate hotel booking workflow
+    Books the JSON body's booking, or the hardcoded booking when the body is empty
+    Flow: 1. Check availability and pre-check payment concurrently
+          2. Hold the room, process payment, confirm the hold (the saga in
+             reserve_and_pay; the hold is released if the payment fails)
+          3. Return consolidated booking confirmation
+    Steps 1-2 run under the same admission limit as the sync engine (app.admitted)
+    """
+    availability = request.app["availability_client"]
+    payment = request.app["payment_client"]
+    try:
+        try:
+            data = await read_json(request)
+            booking, booking_id = new_booking(booking_from_payload(data) if data else None)
+
+            with admitted(booking_id, request.headers.get(PRIORITY_HEADER)):
+                # Step 1: Independent lookups fan out in parallel
+                steps = [call_downstream(
+                    availability, "/check-availability", availability_request(booking),
+                    "availability", AVAILABILITY_ENDPOINTS, booking_id, hedge=True, affinity=booking["hotel_name"]
+                )]
+                if PAYMENT_PRECHECK:
+                    steps.append(call_downstream(
+                        payment, "/validate-payment", precheck_request(booking),
+                        "payment", PAYMENT_ENDPOINTS, booking_id
+                    ))
+                results = await fan_out(*steps)
+                if PAYMENT_PRECHECK:
+                    handle_precheck(*results[1], booking_id)
+                status_code, data = results[0]
+                room_rate, num_nights, total_amount = handle_availability(status_code, data, booking, booking_id)
+
+                # Step 2: Hold the room, process payment with Payment Service, confirm the hold
+                transaction_id = await reserve_and_pay(availability, payment, booking, booking_id, total_amount)
+
+        except StepFailed as failure:
+            return json_response(failure.body, status=failure.status_code, headers=failure.headers)
+
+        # Step 3: Return consolidated booking confirmation
+        return encoded_response(CONFIRMATION.render(confirmation(
+            booking, booking_id, transaction_id, room_rate, num_nights, total_amount
+        )))
+
+    except Exception as e:
+        return json_response({
+            "status": "error",
+            "message": f"Booking orchestration error: {str(e)}"
+        }, status=500)
+
+
+async def quote_bookings(availability, bookings, booking_ids):
+    """Async app.quote_bookings: bulk availability quotes, StepFailed per failed chunk, None to check singly"""
+    quotes = [None] * len(bookings)
+    for indexes in replica_chunks(bookings, availability.registry, AVAILABILITY_BATCH_SIZE):
+        chunk = [bookings[index] for index in indexes]
+        try:
+            status_code, data = await call_downstream(
+                availability, "/check-availability/batch",
+                {"queries": [availability_request(booking) for booking in chunk]},
+                "availability", AVAILABILITY_ENDPOINTS, booking_ids[indexes[0]], hedge=True,
+                affinity=chunk[0]["hotel_name"]
+            )
+        except StepFailed as failure:
+            for index in indexes:
+                quotes[index] = failure
+            continue
+        results = data.get("results")
+        if status_code == 200 and isinstance(results, list) and len(results) == len(chunk):
+            for index, item in zip(indexes, results):
+                quotes[index] = (item.get("http_status", 200), item)
+    return quotes
+
+
+async def book_quoted(availability, payment, booking, booking_id, quote):
+    """Async app.book_quoted: one booking of a batch, admitted as sheddable; returns (status_code, body)"""
+    try:
+        try:
+            if isinstance(quote, StepFailed):
+                raise StepFailed(dict(quote.body, booking_id=booking_id), quote.status_code, quote.headers)
+            with admitted(booking_id, SHEDDABLE, sample=False):
+                if quote is None:
+                    quote = await call_downstream(
+                        availability, "/check-availability", availability_request(booking),
+                        "availability", AVAILABILITY_ENDPOINTS, booking_id, hedge=True,
+                        affinity=booking["hotel_name"]
+                    )
+                room_rate, num_nights, total_amount = handle_availability(*quote, booking, booking_id)
+                transaction_id = await reserve_and_pay(availability, payment, booking, booking_id, total_amount)
+        except StepFailed as failure:
+            return failure.status_code, failure.body
+        return 200, confirmation(booking, booking_id, transaction_id, room_rate, num_nights, total_amount)
+    except Exception as e:
+        return 500, {
+            "status": "error",
+            "message": f"Booking orchestration error: {str(e)}",
+            "booking_id": booking_id
+        }
+
+
+async def book_hotels_batch(request):
+    """
+    Book many rooms in one request; see app.book_hotels_batch
+    At most BATCH_CONCURRENCY bookings are reserved and paid for at a time
+    """
+    try:
+        entries = parse_batch(await read_json(request), MAX_BATCH_BOOKINGS)
+    except StepFailed as failure:
+        return json_response(failure.body, status=failure.status_code)
+
+    response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+    await response.prepare(request)
+
+    async def send(line):
+        await response.write(dumps(line) + b"\n")
+
+    accepted = []
+    for index, entry in enumerate(entries):
+        if isinstance(entry, StepFailed):
+            await send(batch_result(index, entry.status_code, entry.body))
+        else:
+            booking, booking_id = new_booking(entry)
+            accepted.append((index, booking, booking_id))
+
+    availability = request.app["availability_client"]
+    payment = request.app["payment_client"]
+    quotes = await quote_bookings(
+        availability, [booking for _, booking, _ in accepted], [booking_id for _, _, booking_id in accepted]
+    )
+    limit = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def book(index, booking, booking_id, quote):
+        async with limit:
+            # Once started, a booking runs to completion even if the stream is
+            # abandoned, so a held room is always paid for or released
+            return index, await asyncio.shield(book_quoted(availability, payment, booking, booking_id, quote))
+
+    tasks = [
+        asyncio.ensure_future(book(index, booking, booking_id, quote))
+        for (index, booking, booking_id), quote in zip(accepted, quotes)
+    ]
+    confirmed = 0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            index, (status_code, body) = await next_done
+            confirmed += status_code == 200
+            await send(batch_result(index, status_code, body))
+    finally:
+        # A client that disconnects mid-stream cancels the bookings not started yet
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+    await send(batch_summary(len(entries), confirmed))
+    await response.write_eof()
+    return response
+
+
+async def downstream_clients(app):
+    """aiohttp cleanup context: open pooled sessions and start saga recovery on startup, stop both on shutdown"""
+    # An explicit URL (create_app's arguments) bypasses service discovery
+    app["availability_client"] = AsyncDownstreamClient(
+        "availability", app["availability_url"], pool_size=POOL_SIZE,
+        connect_timeout=CONNECT_TIMEOUT, read_timeout=AVAILABILITY_READ_TIMEOUT,
+        retries=DOWNSTREAM_RETRIES,
+        breaker=new_breaker("availability", AVAILABILITY_SLOW_CALL_SECONDS), hedge=new_hedge_policy(),
+        tracer=TRACER, registry=None if app["availability_url"] else AVAILABILITY_REGISTRY
+    )
+    app["payment_client"] = AsyncDownstreamClient(
+        "payment", app["payment_url"], pool_size=POOL_SIZE,
+        connect_timeout=CONNECT_TIMEOUT, read_timeout=PAYMENT_READ_TIMEOUT,
+        retries=DOWNSTREAM_RETRIES,
+        breaker=new_breaker("payment", PAYMENT_SLOW_CALL_SECONDS), tracer=TRACER,
+        registry=None if app["payment_url"] else PAYMENT_REGISTRY
+    )
+    await app["availability_client"].start()
+    await app["payment_client"].start()
+    recovery = asyncio.ensure_future(saga_recovery(app))
+    yield
+    recovery.cancel()
+    await app["availability_client"].close()
+    await app["payment_client"].close()
+
+
+def create_app(availability_url=None, payment_url=None):
+    """Build the aiohttp application (downstream replicas come from service discovery unless URLs are given)"""
+    app = web.Application(middlewares=[record_metrics, trace_requests])
+    app["availability_url"] = availability_url
+    app["payment_url"] = payment_url
+    app.cleanup_ctx.append(downstream_clients)
+    app.router.add_get("/", welcome)
+    app.router.add_post("/book-hotel", book_hotel)
+    app.router.add_post("/book-hotels/batch", book_hotels_batch)
+    app.router.add_get("/sagas/{booking_id}", booking_saga)
+    app.router.add_get("/circuit-breakers", circuit_breakers)
+    app.router.add_get("/endpoints", endpoints)
+    app.router.add_get("/admission", admission)
+    app.router.add_get("/debug/traces", debug_traces)
+    app.router.add_get("/metrics", prometheus_metrics)
+    return app
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("Starting Orchestrator (Hotel Booking) - async engine...")
+    print("=" * 60)
+    print(f"Service: {SERVICE_NAME}")
+    print(f"Port: {SERVICE_PORT}")
+    print(f"Local IP: {get_local_ip()}")
+    print(f"Availability Service: {AVAILABILITY_ENDPOINTS} ({LOAD_BALANCER})")
+    print(f"Payment Service: {PAYMENT_ENDPOINTS} ({LOAD_BALANCER})")
+    print(f"Admission control: {f'adaptive, starting at {ADMISSION_INITIAL_LIMIT}' if ADMISSION_CONTROL else 'off'}")
+    print("=" * 60)
+    web.run_app(create_app(), host='0.0.0.0', port=SERVICE_PORT)
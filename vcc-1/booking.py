@@ -0,0 +1,394 @@
+"""
+Booking Workflow Steps - VCC-1
+Request payloads and response handling shared by the sync (Flask) and
+async (aiohttp) orchestration engines, so both return identical results
+"""
+
+import math
+import secrets
+from datetime import date, datetime, timedelta
+
+from encoding import JSONTemplate, SLOT
+
+# Hardcoded booking details: three nights from a month after startup, inside
+# the Availability service's rolling horizon
+DEFAULT_CHECK_IN = date.today() + timedelta(days=30)
+DEFAULT_BOOKING = {
+    "guest_name": "Lakshya Vashisth",
+    "guest_email": "lakshya@example.com",
+    "hotel_name": "Grand Plaza",
+    "check_in": DEFAULT_CHECK_IN.isoformat(),
+    "check_out": (DEFAULT_CHECK_IN + timedelta(days=3)).isoformat(),
+    "room_type": "Suite",
+    "payment_method": "credit_card",
+    "num_guests": 1
+}
+
+
+class StepFailed(Exception):
+    """
+    A workflow step ended the booking; carries the response to return
+    cause is the downstream_error kind for transport-level failures
+    """
+
+    def __init__(self, body, status_code, headers=None, cause=None):
+        super().__init__(body.get("message"))
+        self.body = body
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.cause = cause
+
+
+REQUIRED_FIELDS = ["guest_name", "hotel_name", "check_in", "check_out", "room_type", "payment_method"]
+
+
+def new_booking(details=None):
+    """
+    Return the booking details (the hardcoded booking unless details are
+    given) and a fresh booking ID
+    The random suffix keeps IDs unique within the same second, since the
+    Payment service uses the booking ID as the default idempotency key
+    """
+    booking_id = f"BOOK{int(datetime.now().timestamp())}{secrets.token_hex(3).upper()}"
+    return dict(details or DEFAULT_BOOKING), booking_id
+
+
+def booking_from_payload(data):
+    """
+    Validate a client booking payload and return the booking details
+    Expected payload:
+    {
+        "guest_name": "Jane Doe", "guest_email": "jane@example.com",
+        "hotel_name": "Grand Plaza", "room_type": "Deluxe",
+        "check_in": "2026-02-15", "check_out": "2026-02-18",
+        "payment_method": "credit_card", "num_guests": 2,
+        "card_token": "tok_4242"
+    }
+    card_token is optional; the Payment service's card velocity rule keys on it
+    Raises StepFailed (400) if it is not an object or lacks a required field
+    """
+    if not isinstance(data, dict):
+        raise StepFailed({"status": "error", "message": "Booking must be a JSON object"}, 400)
+    missing = [field for field in REQUIRED_FIELDS if not data.get(field)]
+    if missing:
+        raise StepFailed({
+            "status": "error",
+            "message": f"Missing required fields: {', '.join(missing)}"
+        }, 400)
+    booking = {field: data[field] for field in REQUIRED_FIELDS}
+    booking["guest_email"] = data.get("guest_email", "")
+    booking["num_guests"] = data.get("num_guests", 1)
+    if data.get("card_token"):
+        booking["card_token"] = data["card_token"]
+    return booking
+
+
+def parse_batch(data, max_size):
+    """
+    Split a /book-hotels/batch payload ({"bookings": [...]}) into one entry
+    per booking: the validated details, or the StepFailed rejecting it
+    Raises StepFailed for a malformed (400) or oversized (413) batch
+    """
+    bookings = data.get("bookings") if isinstance(data, dict) else None
+    if not isinstance(bookings, list):
+        raise StepFailed({"status": "error", "message": "Payload must contain a 'bookings' list"}, 400)
+    if len(bookings) > max_size:
+        raise StepFailed({
+            "status": "error",
+            "message": f"Batch too large: {len(bookings)} bookings (maximum {max_size})"
+        }, 413)
+    entries = []
+    for item in bookings:
+        try:
+            entries.append(booking_from_payload(item))
+        except StepFailed as failure:
+            entries.append(failure)
+    return entries
+
+
+def replica_chunks(bookings, registry, size):
+    """
+    Positions of bookings grouped by the Availability replica that owns their
+    hotel (registry.owner; one group without a registry), at most size per chunk
+    """
+    groups = {}
+    for index, booking in enumerate(bookings):
+        owner = registry.owner(booking["hotel_name"]) if registry is not None else None
+        groups.setdefault(owner, []).append(index)
+    return [indexes[start:start + size] for indexes in groups.values() for start in range(0, len(indexes), size)]
+
+
+def batch_result(index, status_code, body):
+    """One line of the NDJSON batch response: the booking's result and its position"""
+    return dict(body, index=index, http_status=status_code)
+
+
+def batch_summary(total, confirmed):
+    """Final line of the NDJSON batch response"""
+    return {"status": "complete", "total": total, "confirmed": confirmed, "failed": total - confirmed}
+
+
+def idempotency_headers(booking_id):
+    """Headers marking a payment call as safe to retry"""
+    return {"Idempotency-Key": booking_id}
+
+
+def availability_request(booking):
+    """Payload for POST /check-availability on the Availability service"""
+    return {
+        "hotel_name": booking["hotel_name"],
+        "check_in": booking["check_in"],
+        "check_out": booking["check_out"],
+        "room_type": booking["room_type"],
+        "num_guests": booking["num_guests"]
+    }
+
+
+def reserve_request(booking, booking_id, hold_seconds=None):
+    """Payload for POST /reserve on the Availability service (a hold when hold_seconds is given)"""
+    payload = {
+        "hotel_name": booking["hotel_name"],
+        "room_type": booking["room_type"],
+        "check_in": booking["check_in"],
+        "check_out": booking["check_out"],
+        "rooms": 1,
+        "booking_id": booking_id
+    }
+    if hold_seconds is not None:
+        payload["hold_seconds"] = hold_seconds
+    return payload
+
+
+def confirm_request(reservation_id):
+    """Payload for POST /confirm on the Availability service"""
+    return {"reservation_id": reservation_id}
+
+
+def release_request(reservation_id):
+    """Payload for POST /release on the Availability service"""
+    return {"reservation_id": reservation_id}
+
+
+def refund_request(reason):
+    """Payload for POST /bookings/<booking_id>/refund on the Payment service"""
+    return {"reason": reason}
+
+
+def precheck_request(booking):
+    """Payload for POST /validate-payment (fraud and limits pre-check)"""
+    return {
+        "guest_name": booking["guest_name"],
+        "hotel_name": booking["hotel_name"],
+        "payment_method": booking["payment_method"],
+        **card_token(booking)
+    }
+
+
+def payment_request(booking, booking_id, amount):
+    """Payload for POST /process-payment on the Payment service"""
+    return {
+        "booking_id": booking_id,
+        "guest_name": booking["guest_name"],
+        "hotel_name": booking["hotel_name"],
+        "room_type": booking["room_type"],
+        "amount": amount,
+        "currency": "USD",
+        "payment_method": booking["payment_method"],
+        "check_in": booking["check_in"],
+        "check_out": booking["check_out"],
+        **card_token(booking)
+    }
+
+
+def card_token(booking):
+    """The booking's card_token field for a Payment service payload, if it has one"""
+    return {"card_token": booking["card_token"]} if booking.get("card_token") else {}
+
+
+def downstream_error(service, kind, booking_id, address=None, detail=None):
+    """
+    Build the StepFailed for a transport-level failure talking to a service
+    kind is one of "timeout", "connection", "circuit_open", "owner_unavailable"
+    or "error"
+    For "circuit_open", detail is the number of seconds until the breaker
+    lets calls through again; for "owner_unavailable", the replica's address
+    """
+    if kind == "timeout":
+        return StepFailed({
+            "status": "error",
+            "message": f"{service.capitalize()} service timeout",
+            "booking_id": booking_id
+        }, 504, cause=kind)
+    if kind == "circuit_open":
+        return StepFailed({
+            "status": "error",
+            "message": f"{service.capitalize()} service unavailable (circuit open), failing fast",
+            "booking_id": booking_id,
+            "retry_after": round(detail, 1)
+        }, 503, {"Retry-After": str(max(1, math.ceil(detail)))}, cause=kind)
+    if kind == "owner_unavailable":
+        return StepFailed({
+            "status": "error",
+            "message": f"The {service} replica for this booking ({detail}) is out of rotation, failing fast",
+            "booking_id": booking_id
+        }, 503, cause=kind)
+    if kind == "connection":
+        return StepFailed({
+            "status": "error",
+            "message": f"Cannot connect to {service} service at {address}",
+            "booking_id": booking_id
+        }, 503, cause=kind)
+    label = "Availability check" if service == "availability" else "Payment processing"
+    return StepFailed({
+        "status": "error",
+        "message": f"{label} error: {detail}",
+        "booking_id": booking_id
+    }, 500, cause=kind)
+
+
+def overloaded(booking_id, error):
+    """StepFailed for a booking the Orchestrator shed (admission.LimitExceededError) before starting it"""
+    return StepFailed({
+        "status": "error",
+        "message": f"Orchestrator overloaded, {error.priority} bookings are limited to {error.limit} at a time",
+        "booking_id": booking_id,
+        "retry_after": error.retry_after
+    }, 503, {"Retry-After": str(max(1, math.ceil(error.retry_after)))})
+
+
+def handle_availability(status_code, data, booking, booking_id):
+    """
+    Interpret the Availability service response
+    Returns (room_rate, num_nights, total_amount) or raises StepFailed
+    Client errors (unknown hotel or room type, bad dates) keep their status
+    """
+    if status_code in (400, 404):
+        raise StepFailed({
+            "status": "booking_failed",
+            "message": data.get("message", "Invalid booking request"),
+            "booking_id": booking_id
+        }, status_code)
+    if status_code != 200:
+        raise StepFailed({
+            "status": "booking_failed",
+            "message": "Hotel availability service unavailable",
+            "booking_id": booking_id
+        }, 503)
+
+    if data.get("available") is False:
+        raise StepFailed({
+            "status": "booking_failed",
+            "message": f"No {booking['room_type']} rooms available at {booking['hotel_name']} for selected dates",
+            "booking_id": booking_id,
+            "check_in": booking["check_in"],
+            "check_out": booking["check_out"]
+        }, 409)
+
+    room_rate = data.get("room_rate", 0)
+    num_nights = data.get("num_nights", 0)
+    return room_rate, num_nights, data.get("total_price", room_rate * num_nights)
+
+
+def handle_reservation(status_code, data, booking, booking_id):
+    """Interpret the /reserve response; returns the reservation ID"""
+    if status_code == 409:
+        raise StepFailed({
+            "status": "booking_failed",
+            "message": f"No {booking['room_type']} rooms available at {booking['hotel_name']} for selected dates",
+            "booking_id": booking_id,
+            "check_in": booking["check_in"],
+            "check_out": booking["check_out"]
+        }, 409)
+    if status_code != 201:
+        raise StepFailed({
+            "status": "booking_failed",
+            "message": data.get("message", "Room reservation failed"),
+            "booking_id": booking_id
+        }, 503)
+    return data.get("reservation_id")
+
+
+def hold_lapsed(booking, booking_id):
+    """StepFailed for a booking whose room hold ran out before it was paid for (the payment is refunded)"""
+    return StepFailed({
+        "status": "booking_failed",
+        "message": f"The {booking['room_type']} room hold at {booking['hotel_name']} expired before payment "
+                   "completed; the payment has been refunded",
+        "booking_id": booking_id
+    }, 409)
+
+
+def confirmation_pending(booking_id, transaction_id):
+    """
+    StepFailed for a paid booking whose hold could not be confirmed yet
+    The hold is still in place and the Orchestrator keeps confirming it
+    """
+    return StepFailed({
+        "status": "pending",
+        "message": "Payment approved; room confirmation is pending",
+        "booking_id": booking_id,
+        "transaction_id": transaction_id,
+        "saga_url": f"/sagas/{booking_id}"
+    }, 202)
+
+
+def handle_precheck(status_code, data, booking_id):
+    """Interpret the payment pre-check response; raises StepFailed if rejected"""
+    if status_code != 200 or not data.get("valid", False):
+        raise StepFailed({
+            "status": "booking_failed",
+            "message": data.get("message", "Payment pre-check failed"),
+            "booking_id": booking_id,
+            "reason": "Payment pre-check rejected"
+        }, 402)
+
+
+def handle_payment(status_code, data, booking_id):
+    """Interpret the Payment service response; returns the transaction ID"""
+    if status_code not in [200, 201]:
+        raise StepFailed({
+            "status": "booking_failed",
+            "message": data.get("message", "Payment processing failed"),
+            "booking_id": booking_id,
+            "reason": "Payment declined"
+        }, 402)
+    return data.get("transaction_id")
+
+
+# The booking confirmation is the hottest response body, so it is encoded from a template
+CONFIRMATION = JSONTemplate({
+    "status": "confirmed",
+    "message": "Hotel booking confirmed successfully",
+    "booking_id": SLOT,
+    "transaction_id": SLOT,
+    "guest_name": SLOT,
+    "guest_email": SLOT,
+    "hotel_name": SLOT,
+    "room_type": SLOT,
+    "check_in": SLOT,
+    "check_out": SLOT,
+    "number_of_nights": SLOT,
+    "room_rate_per_night": SLOT,
+    "total_amount": SLOT,
+    "currency": "USD",
+    "payment_status": "approved",
+    "booking_timestamp": SLOT
+})
+
+
+def confirmation(booking, booking_id, transaction_id, room_rate, num_nights, total_amount):
+    """Consolidated booking confirmation returned to the client (encode it with CONFIRMATION.render)"""
+    return CONFIRMATION.fill({
+        "booking_id": booking_id,
+        "transaction_id": transaction_id,
+        "guest_name": booking["guest_name"],
+        "guest_email": booking.get("guest_email", ""),
+        "hotel_name": booking["hotel_name"],
+        "room_type": booking["room_type"],
+        "check_in": booking["check_in"],
+        "check_out": booking["check_out"],
+        "number_of_nights": num_nights,
+        "room_rate_per_night": room_rate,
+        "total_amount": total_amount,
+        "booking_timestamp": datetime.now().isoformat()
+    })
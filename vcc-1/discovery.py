@@ -0,0 +1,364 @@
+"""
+Service Discovery - VCC-1
+Endpoint registries for the replicated services the Orchestrator calls
+A registry resolves the replicas of one service from a source:
+  static  "10.0.0.1:5002,10.0.0.2:5002"
+  file    "file:/etc/vcc/availability.txt"  one host:port per line, re-read when it changes
+  dns     "dns:availability.internal:5002"  every address the name resolves to
+and picks one per call. A call without an affinity key goes to the replica
+with the fewest requests in flight (least_outstanding), or to the less busy
+of two picked at random (p2c). A call with a key always goes to the same
+replica (rendezvous hashing), because replicas keep state in memory: a
+hotel's nightly inventory, a booking's payment
+Keys are hashed over every replica the source lists, in rotation or not,
+so a replica's health never moves a key to another replica: while the
+owner of a key is out of rotation, calls with that key fail at once
+(OwnerUnavailableError) instead of reaching a replica without its state.
+Adding or removing a replica in the source does move keys; drain a
+replica's holds and payments before taking it out of the source
+A background thread re-resolves the source and checks every replica (GET
+health_path). Replicas that fail their checks, or too many calls in a row,
+are taken out of rotation; an ejected replica is tried again after
+eject_seconds, doubled on each repeat ejection. If no replica is left, all
+of them are used rather than none (and a key's owner is tried)
+Registry state is per process: every gunicorn worker checks and ejects independently
+"""
+
+import hashlib
+import os
+import random
+import socket
+import threading
+import time
+
+import requests
+
+LEAST_OUTSTANDING = "least_outstanding"
+POWER_OF_TWO = "p2c"
+BALANCERS = (LEAST_OUTSTANDING, POWER_OF_TWO)
+
+
+class NoEndpointError(Exception):
+    """The registry knows no replica of the service (its source resolved to nothing)"""
+
+    def __init__(self, name):
+        super().__init__(f"No endpoints known for {name}")
+        self.name = name
+
+
+class OwnerUnavailableError(NoEndpointError):
+    """The replica that owns a call's affinity key is out of rotation; the call is not sent elsewhere"""
+
+    def __init__(self, name, address):
+        Exception.__init__(self, f"{address}, the {name} replica that owns this key, is out of rotation")
+        self.name = name
+        self.address = address
+
+
+def parse_addresses(text):
+    """host:port entries separated by commas, whitespace or newlines; '#' starts a comment"""
+    addresses = []
+    for line in text.splitlines():
+        for item in line.split("#", 1)[0].replace(",", " ").split():
+            host, _, port = item.rpartition(":")
+            if not host or not port.isdigit():
+                raise ValueError(f"Invalid endpoint {item!r}, expected host:port")
+            if item not in addresses:
+                addresses.append(item)
+    return addresses
+
+
+class StaticSource:
+    """A fixed list of replicas"""
+
+    def __init__(self, addresses):
+        self.addresses = list(addresses)
+
+    def resolve(self):
+        return self.addresses
+
+    def describe(self):
+        return ",".join(self.addresses)
+
+
+class FileSource:
+    """Replicas listed in a file (see parse_addresses); it is only re-read after it changes"""
+
+    def __init__(self, path):
+        self.path = path
+        self._identity = None
+        self._addresses = []
+
+    def resolve(self):
+        stat = os.stat(self.path)
+        identity = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        if identity != self._identity:
+            with open(self.path) as f:
+                self._addresses = parse_addresses(f.read())
+            self._identity = identity
+        return self._addresses
+
+    def describe(self):
+        return f"file:{self.path}"
+
+
+class DnsSource:
+    """Every address a name resolves to, all on the same port"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = int(port)
+
+    def resolve(self):
+        infos = socket.getaddrinfo(self.host, self.port, type=socket.SOCK_STREAM)
+        ips = sorted({info[4][0] for info in infos})
+        return [f"[{ip}]:{self.port}" if ":" in ip else f"{ip}:{self.port}" for ip in ips]
+
+    def describe(self):
+        return f"dns:{self.host}:{self.port}"
+
+
+def source_from_spec(spec):
+    """StaticSource, FileSource or DnsSource for an endpoint spec (see the module docstring)"""
+    if spec.startswith("file:"):
+        return FileSource(spec[len("file:"):])
+    if spec.startswith("dns:"):
+        host, _, port = spec[len("dns:"):].rpartition(":")
+        if not host or not port.isdigit():
+            raise ValueError(f"Invalid DNS endpoint spec {spec!r}, expected dns:name:port")
+        return DnsSource(host, port)
+    return StaticSource(parse_addresses(spec))
+
+
+class Endpoint:
+    """One replica of a service and what this process knows about it"""
+
+    def __init__(self, address):
+        self.address = address
+        self.url = f"http://{address}"
+        self.outstanding = 0           # calls in flight
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0  # calls; a success resets it
+        self.check_failures = 0        # health checks in a row
+        self.healthy = True
+        self.ejected_until = 0.0
+        self.ejections = 0
+        self.last_error = None
+
+    def available(self, now):
+        return self.healthy and self.ejected_until <= now
+
+    def snapshot(self, now):
+        return {
+            "address": self.address,
+            "available": self.available(now),
+            "healthy": self.healthy,
+            "ejected_for": round(max(0.0, self.ejected_until - now), 3),
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "failures": self.failures,
+            "ejections": self.ejections,
+            "last_error": self.last_error
+        }
+
+
+def _rendezvous_weight(address, key):
+    digest = hashlib.blake2b(f"{address}|{key}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def _owner(endpoints, key):
+    return max(endpoints, key=lambda endpoint: _rendezvous_weight(endpoint.address, key))
+
+
+class EndpointRegistry:
+    """
+    The replicas of one service, their load and health
+    Clients call pick() for every attempt and bracket it with acquire() and
+    release(); the registry starts its refresh/health thread on first use
+    """
+
+    def __init__(self, name, source, balancer=LEAST_OUTSTANDING, refresh_seconds=5.0,
+                 health_path="/", health_interval=2.0, health_timeout=0.5, unhealthy_after=2,
+                 eject_after=3, eject_seconds=10.0, max_eject_seconds=120.0, clock=time.monotonic):
+        if balancer not in BALANCERS:
+            raise ValueError(f"Unknown balancer {balancer!r}, expected one of {', '.join(BALANCERS)}")
+        self.name = name
+        self.source = source
+        self.balancer = balancer
+        self.refresh_seconds = refresh_seconds
+        self.health_path = health_path  # None: no active checks, only ejection on failed calls
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self.unhealthy_after = unhealthy_after
+        self.eject_after = eject_after
+        self.eject_seconds = eject_seconds
+        self.max_eject_seconds = max_eject_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._endpoints = {}  # address -> Endpoint, in source order
+        self._refreshed_at = 0.0
+        self._checker_pid = None
+        self.refresh_errors = 0
+        self.last_refresh_error = None
+        self.refresh()
+
+    def refresh(self):
+        """Re-resolve the source; known replicas keep their state. Returns False if resolving failed"""
+        self._refreshed_at = self._clock()
+        try:
+            addresses = self.source.resolve()
+        except (OSError, ValueError) as e:
+            self.refresh_errors += 1
+            self.last_refresh_error = f"{type(e).__name__}: {e}"
+            print(f"[Discovery] Resolving {self.name} ({self.source.describe()}) failed, "
+                  f"keeping {len(self._endpoints)} endpoints: {self.last_refresh_error}")
+            return False
+        with self._lock:
+            if list(self._endpoints) == addresses:
+                return True
+            added = [address for address in addresses if address not in self._endpoints]
+            removed = [address for address in self._endpoints if address not in addresses]
+            self._endpoints = {
+                address: self._endpoints.get(address) or Endpoint(address) for address in addresses
+            }
+        if added or removed:
+            print(f"[Discovery] {self.name} endpoints: {', '.join(addresses) or 'none'}")
+        return True
+
+    def endpoints(self):
+        with self._lock:
+            return list(self._endpoints.values())
+
+    def pick(self, affinity=None, avoid=()):
+        """
+        The replica for the next attempt of a call: the one that owns
+        affinity when given, otherwise by the balancer. Replicas in avoid
+        (addresses) are only used if nothing else is left; a key's owner is
+        never swapped for another replica
+        Raises NoEndpointError if no replica is known, OwnerUnavailableError
+        if the owner of affinity is out of rotation
+        """
+        self._start_checker()
+        endpoints = self.endpoints()
+        if not endpoints:
+            raise NoEndpointError(self.name)
+        now = self._clock()
+        if affinity is not None:
+            owner = _owner(endpoints, affinity)
+            if not owner.available(now) and any(endpoint.available(now) for endpoint in endpoints):
+                raise OwnerUnavailableError(self.name, owner.address)
+            return owner
+        candidates = [endpoint for endpoint in endpoints
+                      if endpoint.available(now) and endpoint.address not in avoid]
+        if not candidates:
+            candidates = [endpoint for endpoint in endpoints if endpoint.address not in avoid] or endpoints
+        if len(candidates) == 1:
+            return candidates[0]
+        if self.balancer == POWER_OF_TWO:
+            first, second = random.sample(candidates, 2)
+            return first if first.outstanding <= second.outstanding else second
+        least = min(endpoint.outstanding for endpoint in candidates)
+        return random.choice([endpoint for endpoint in candidates if endpoint.outstanding == least])
+
+    def owner(self, key):
+        """Address of the replica that owns key, in rotation or not"""
+        self._start_checker()
+        endpoints = self.endpoints()
+        if not endpoints:
+            raise NoEndpointError(self.name)
+        return _owner(endpoints, key).address
+
+    def acquire(self, endpoint):
+        """An attempt is being sent to endpoint"""
+        with self._lock:
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+
+    def release(self, endpoint, failed, error=None):
+        """
+        The attempt finished: failed is True for a transport error or a 5xx,
+        None for an attempt that was cancelled (it counts neither way)
+        """
+        with self._lock:
+            endpoint.outstanding -= 1
+            if failed is None:
+                return
+            if not failed:
+                endpoint.consecutive_failures = 0
+                return
+            endpoint.failures += 1
+            endpoint.consecutive_failures += 1
+            endpoint.last_error = error
+            if endpoint.consecutive_failures >= self.eject_after and endpoint.ejected_until <= self._clock():
+                self._eject(endpoint, f"{endpoint.consecutive_failures} failed calls in a row")
+
+    def _eject(self, endpoint, reason):
+        # Called with self._lock held. A replica that stayed in rotation for
+        # max_eject_seconds since its last ejection starts from eject_seconds again
+        now = self._clock()
+        if now - endpoint.ejected_until > self.max_eject_seconds:
+            endpoint.ejections = 0
+        seconds = min(self.max_eject_seconds, self.eject_seconds * 2 ** endpoint.ejections)
+        endpoint.ejections += 1
+        endpoint.ejected_until = now + seconds
+        endpoint.consecutive_failures = 0
+        print(f"[Discovery] Ejected {self.name} endpoint {endpoint.address} for {seconds:.0f}s: {reason}")
+
+    def check(self, session=None):
+        """One pass of active health checks (GET health_path, any status below 500 passes)"""
+        if self.health_path is None:
+            return
+        session = session or requests
+        for endpoint in self.endpoints():
+            try:
+                response = session.get(f"{endpoint.url}{self.health_path}", timeout=self.health_timeout)
+                passed = response.status_code < 500
+                error = None if passed else f"HTTP {response.status_code}"
+            except requests.exceptions.RequestException as e:
+                passed, error = False, f"{type(e).__name__}: {e}"
+            with self._lock:
+                if passed:
+                    endpoint.check_failures = 0
+                    if not endpoint.healthy:
+                        endpoint.healthy = True
+                        print(f"[Discovery] {self.name} endpoint {endpoint.address} passed its health check")
+                    continue
+                endpoint.check_failures += 1
+                endpoint.last_error = error
+                if endpoint.healthy and endpoint.check_failures >= self.unhealthy_after:
+                    endpoint.healthy = False
+                    print(f"[Discovery] {self.name} endpoint {endpoint.address} failed its health check: {error}")
+
+    def _start_checker(self):
+        # Threads do not survive fork(), so a registry built before a
+        # preloading server forks starts its checker in each worker on first use
+        if self._checker_pid == os.getpid():
+            return
+        with self._lock:
+            if self._checker_pid == os.getpid():
+                return
+            self._checker_pid = os.getpid()
+        threading.Thread(target=self._check_forever, name=f"discovery-{self.name}", daemon=True).start()
+
+    def _check_forever(self):
+        session = requests.Session()
+        while True:
+            time.sleep(self.health_interval)
+            try:
+                if self._clock() - self._refreshed_at >= self.refresh_seconds:
+                    self.refresh()
+                self.check(session)
+            except Exception as e:
+                print(f"[Discovery] {self.name} health check pass failed: {e}")
+
+    def snapshot(self):
+        now = self._clock()
+        return {
+            "source": self.source.describe(),
+            "balancer": self.balancer,
+            "refresh_errors": self.refresh_errors,
+            "last_refresh_error": self.last_refresh_error,
+            "endpoints": [endpoint.snapshot(now) for endpoint in self.endpoints()]
+        }
@@ -0,0 +1,352 @@
+"""
+Downstream HTTP Clients - VCC-1
+Shared, thread-safe clients for the services the Orchestrator calls
+Each downstream service gets its own keep-alive connection pool so a booking
+reuses open TCP connections instead of paying for a new handshake per call
+Calls can be guarded by a circuit breaker, and idempotent reads can be hedged
+With a tracer every call is a client span whose traceparent is sent along
+With an endpoint registry (discovery.py) calls are spread over the service's replicas
+"""
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NewConnectionError
+from urllib3.util.retry import Retry
+
+from resilience import RETRYABLE_STATUSES
+
+MAX_HOST_POOLS = 32  # replicas a registry-backed client keeps connection pools for
+
+
+class PoolStats:
+    """Thread-safe counters describing how a connection pool is being used"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calling = threading.local()  # connect time of the call in progress on this thread
+        self.requests = 0
+        self.new_connections = 0
+        self.discarded = 0
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def record_new_connection(self):
+        with self._lock:
+            self.new_connections += 1
+
+    def record_discard(self):
+        with self._lock:
+            self.discarded += 1
+
+    def record_connect(self, seconds):
+        self._calling.connect_seconds = getattr(self._calling, "connect_seconds", 0.0) + seconds
+
+    def take_connect_seconds(self):
+        """Time this thread spent opening connections since the last call (0.0 if it reused one)"""
+        seconds = getattr(self._calling, "connect_seconds", 0.0)
+        self._calling.connect_seconds = 0.0
+        return seconds
+
+    def snapshot(self):
+        """Return the counters as a plain dict (hits are reused connections)"""
+        with self._lock:
+            hits = max(0, self.requests - self.new_connections)
+            return {
+                "requests": self.requests,
+                "hits": hits,
+                "misses": self.new_connections,
+                "discarded": self.discarded,
+                "hit_ratio": round(hits / self.requests, 4) if self.requests else 0.0
+            }
+
+
+class _CountingPoolMixin:
+    """Connection pool that reports checkouts, new connections and overflow"""
+
+    stats = None
+
+    def _get_conn(self, timeout=None):
+        self.stats.record_request()
+        return super()._get_conn(timeout)
+
+    def _new_conn(self):
+        self.stats.record_new_connection()
+        conn = super()._new_conn()
+        connect = conn.connect
+        stats = self.stats
+
+        def timed_connect():
+            started = time.perf_counter()
+            try:
+                return connect()
+            finally:
+                stats.record_connect(time.perf_counter() - started)
+        conn.connect = timed_connect
+        return conn
+
+    def _put_conn(self, conn):
+        # urllib3 closes the connection instead of queueing it when the pool is full
+        if self.pool is not None and self.pool.full():
+            self.stats.record_discard()
+        return super()._put_conn(conn)
+
+
+class PooledAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pools feed a PoolStats instance"""
+
+    def __init__(self, stats, **kwargs):
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        attrs = {"stats": self.stats}
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": type("CountingHTTPConnectionPool", (_CountingPoolMixin, HTTPConnectionPool), attrs),
+            "https": type("CountingHTTPSConnectionPool", (_CountingPoolMixin, HTTPSConnectionPool), attrs)
+        }
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state.pop("stats", None)
+        return state
+
+
+def _never_connected(error):
+    """True if a requests ConnectionError happened before the request was sent"""
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(error, requests.exceptions.ConnectTimeout) or isinstance(reason, NewConnectionError)
+
+
+class DownstreamClient:
+    """
+    Client for a single downstream service
+    Requests go through one shared PooledAdapter; each thread gets its own
+    Session mounted on that adapter so no cookie or header state is shared
+    between Flask worker threads. With pooled=False every call opens a new
+    connection, which is only useful as a benchmark baseline.
+    With a breaker (resilience.CircuitBreaker) every call is admitted by it
+    and reports its outcome; 5xx responses and transport errors count as
+    failures. With a hedge policy, calls made with hedge=True send a second
+    attempt if the first has not answered after the policy's delay.
+    With a tracer (tracing.Tracer) every call is a client span, child of the
+    current span, and carries its traceparent header
+    With a registry (discovery.EndpointRegistry) instead of a base_url every
+    attempt goes to a replica the registry picks, and a connection that
+    cannot be opened is retried on another replica instead of the same one;
+    calls made with an affinity key stick to that key's replica, are
+    retried only there, and fail while it is out of rotation
+    """
+
+    def __init__(self, name, base_url=None, pool_size=10, connect_timeout=1.0,
+                 read_timeout=5.0, retries=0, backoff_factor=0.1,
+                 retry_methods=None, pooled=True, breaker=None, hedge=None, tracer=None, registry=None):
+        self.name = name
+        self.base_url = base_url.rstrip("/") if base_url else None
+        self.registry = registry
+        self.backoff_factor = backoff_factor
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.pooled = pooled
+        self.stats = PoolStats()
+        self.breaker = breaker
+        self.hedge = hedge
+        self.tracer = tracer
+        self._hedge_executor = None
+        self._hedge_lock = threading.Lock()
+
+        # Connection failures are always retried (the request never left this
+        # host); read failures and 502/503/504 only for the listed methods
+        self.retry = Retry(
+            total=retries,
+            connect=0 if registry is not None else retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRYABLE_STATUSES,
+            allowed_methods=frozenset(retry_methods or Retry.DEFAULT_ALLOWED_METHODS),
+            raise_on_status=False
+        )
+        self._adapter = PooledAdapter(
+            self.stats,
+            pool_connections=MAX_HOST_POOLS if registry is not None else 1,
+            pool_maxsize=pool_size,
+            max_retries=self.retry
+        )
+        self._local = threading.local()
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.mount("http://", self._adapter)
+            session.mount("https://", self._adapter)
+            self._local.session = session
+        return session
+
+    def request(self, method, path, timeout=None, hedge=False, affinity=None, **kwargs):
+        """
+        Send a request to the downstream service
+        timeout may be a single number or a (connect, read) tuple and
+        overrides the client default for this call only
+        hedge=True marks the call as a safe-to-duplicate read
+        affinity sends every call with the same key to the same replica
+        Raises resilience.CircuitOpenError if the breaker rejects the call,
+        and discovery.NoEndpointError if the registry knows no replica
+        """
+        timeout = timeout if timeout is not None else self.timeout
+        hedged = hedge and self.hedge is not None
+        if self.breaker is not None:
+            self.breaker.allow()
+        span = None
+        if self.tracer is not None:
+            span = self.tracer.start_span(f"{method} {self.name} {path}", "client")
+            span.set("peer.service", self.name)
+            span.set("http.url", f"{self.base_url}{path}" if self.registry is None else path)
+            kwargs["headers"] = self.tracer.inject(kwargs.get("headers"), span)
+            self.stats.take_connect_seconds()
+        started = time.perf_counter()
+        failed = True
+        try:
+            if hedged:
+                response = self._send_hedged(method, path, timeout, kwargs, affinity)
+            else:
+                response = self._send(method, path, timeout, kwargs, affinity)
+            failed = response.status_code >= 500
+            if span is not None:
+                span.set("http.status_code", response.status_code)
+                span.set("http.url", response.url)
+            return response
+        except Exception as e:
+            if span is not None:
+                span.fail(f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            if self.breaker is not None:
+                self.breaker.record(failed, elapsed)
+            if hedged and not failed:
+                self.hedge.latencies.add(elapsed)
+            if span is not None:
+                if failed and span.status != "error":
+                    span.fail("HTTP 5xx")
+                connect_seconds = self.stats.take_connect_seconds()  # hedged attempts ran on other threads
+                span.set("net.new_connection", connect_seconds > 0)
+                span.set("net.connect_ms", round(connect_seconds * 1000, 3))
+                span.set("hedged", hedged)
+                self.tracer.finish(span)
+
+    def _send(self, method, path, timeout, kwargs, affinity=None, picked=None, avoid=()):
+        """
+        One attempt; with a registry, to the replica it picks (appended to
+        picked, replicas in avoid are passed over). A connection that could
+        not be opened moves on to another replica, up to `retries` times;
+        a keyed call retries its owner
+        """
+        if self.registry is None:
+            return self._send_to(method, f"{self.base_url}{path}", timeout, kwargs)
+        tried = list(avoid)
+        attempt = 0
+        while True:
+            endpoint = self.registry.pick(affinity, tried)
+            if picked is not None:
+                picked.append(endpoint.address)
+            self.registry.acquire(endpoint)
+            failed, error = True, None
+            try:
+                response = self._send_to(method, f"{endpoint.url}{path}", timeout, kwargs)
+                failed = response.status_code >= 500
+                error = f"HTTP {response.status_code}" if failed else None
+                return response
+            except requests.exceptions.ConnectionError as e:
+                error = f"{type(e).__name__}: {e}"
+                if attempt >= self.retry.total or not _never_connected(e):
+                    raise
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                raise
+            finally:
+                self.registry.release(endpoint, failed, error)
+            if endpoint.address in tried:  # no other replica left: back off before the same one again
+                time.sleep(self.backoff_factor * (2 ** attempt))
+            tried.append(endpoint.address)
+            attempt += 1
+
+    def _send_to(self, method, url, timeout, kwargs):
+        if not self.pooled:
+            self.stats.record_request()
+            self.stats.record_new_connection()
+            return requests.request(method, url, timeout=timeout, **kwargs)
+        return self._session().request(method, url, timeout=timeout, **kwargs)
+
+    def _executor(self):
+        with self._hedge_lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(
+                    max_workers=self.pool_size, thread_name_prefix=f"hedge-{self.name}"
+                )
+            return self._hedge_executor
+
+    def _send_hedged(self, method, path, timeout, kwargs, affinity=None):
+        """
+        Send the request; if it is still outstanding after the hedge delay,
+        send it again and return whichever attempt succeeds first
+        An attempt answering 502/503/504 has not succeeded: the other one is
+        awaited, and that answer is only returned if neither does better.
+        The slower attempt is left to finish in the background. Without an
+        affinity key the second attempt goes to a different replica
+        """
+        executor = self._executor()
+        picked = []
+        primary = executor.submit(self._send, method, path, timeout, kwargs, affinity, picked)
+        try:
+            return primary.result(timeout=self.hedge.delay())
+        except FutureTimeout:
+            pass
+        avoid = tuple(picked) if affinity is None else ()
+        backup = executor.submit(self._send, method, path, timeout, kwargs, affinity, None, avoid)
+        pending = {primary, backup}
+        lost = None  # a failed attempt, preferring a response over an exception
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                response = future.result() if future.exception() is None else None
+                if response is not None and response.status_code not in RETRYABLE_STATUSES:
+                    self.hedge.record_hedge(won=future is backup)
+                    return response
+                if lost is None or response is not None:
+                    lost = future
+        self.hedge.record_hedge(won=False)
+        return lost.result()
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def describe(self):
+        """Return pool configuration and usage statistics"""
+        return {
+            "base_url": self.base_url if self.registry is None else self.registry.source.describe(),
+            "pooled": self.pooled,
+            "pool_size": self.pool_size,
+            "connect_timeout": self.timeout[0],
+            "read_timeout": self.timeout[1],
+            "retries": self.retry.total,
+            "stats": self.stats.snapshot()
+        }
+
+    def close(self):
+        with self._hedge_lock:
+            if self._hedge_executor is not None:
+                self._hedge_executor.shutdown(wait=False)
+                self._hedge_executor = None
+        self._adapter.close()
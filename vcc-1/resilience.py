@@ -0,0 +1,210 @@
+"""
+Downstream Resilience - VCC-1
+Circuit breakers and latency tracking for the services the Orchestrator calls
+A breaker watches the most recent calls to one service; when too many of them
+fail or are slow it opens and calls fail fast instead of waiting out the
+timeout. After a cool-down it lets a few trial calls through (half-open) and
+closes again once they succeed
+Breaker state is per process: every gunicorn worker trips independently
+"""
+
+import threading
+import time
+from collections import deque
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Answers worth another attempt: a hedged attempt that gets one has not won
+RETRYABLE_STATUSES = (502, 503, 504)
+
+
+class CircuitOpenError(Exception):
+    """The breaker rejected the call without contacting the service"""
+
+    def __init__(self, name, retry_after):
+        super().__init__(f"Circuit for {name} is open, retry in {retry_after:.1f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Count-based sliding window breaker with closed, open and half-open states
+    Opens when, over the last window_size calls (and at least minimum_calls),
+    the failure rate reaches failure_rate_threshold or the share of calls
+    slower than slow_call_seconds reaches slow_call_rate_threshold
+    """
+
+    def __init__(self, name, failure_rate_threshold=0.5, slow_call_seconds=2.0,
+                 slow_call_rate_threshold=0.8, window_size=20, minimum_calls=10,
+                 open_seconds=5.0, half_open_calls=3, on_transition=None,
+                 clock=time.monotonic):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.minimum_calls = minimum_calls
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self.on_transition = on_transition
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._window = deque(maxlen=window_size)  # (failed, slow) per recent call
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._trials_started = 0
+        self._trials_succeeded = 0
+        self.rejected = 0
+        self.times_opened = 0
+
+    def _transition(self, state):
+        # Called with self._lock held; returns the (old, new) pair to announce
+        old, self._state = self._state, state
+        if state == OPEN:
+            self._opened_at = self._clock()
+            self.times_opened += 1
+        elif state == HALF_OPEN:
+            self._trials_started = 0
+            self._trials_succeeded = 0
+        else:
+            self._window.clear()
+        return old, state
+
+    def _announce(self, change):
+        if change is not None and self.on_transition is not None:
+            self.on_transition(self.name, *change)
+
+    def allow(self):
+        """Admit a call or raise CircuitOpenError"""
+        change = None
+        with self._lock:
+            if self._state == OPEN:
+                remaining = self._opened_at + self.open_seconds - self._clock()
+                if remaining > 0:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, remaining)
+                change = self._transition(HALF_OPEN)
+            if self._state == HALF_OPEN:
+                if self._trials_started >= self.half_open_calls:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, self.open_seconds)
+                self._trials_started += 1
+        self._announce(change)
+
+    def record(self, failed, seconds):
+        """Report the outcome of an admitted call"""
+        slow = seconds >= self.slow_call_seconds
+        change = None
+        with self._lock:
+            if self._state == HALF_OPEN:
+                if failed:
+                    change = self._transition(OPEN)
+                else:
+                    self._trials_succeeded += 1
+                    if self._trials_succeeded >= self.half_open_calls:
+                        change = self._transition(CLOSED)
+            elif self._state == CLOSED:
+                self._window.append((failed, slow))
+                calls = len(self._window)
+                if calls >= self.minimum_calls:
+                    failures = sum(1 for call_failed, _ in self._window if call_failed)
+                    slow_calls = sum(1 for _, call_slow in self._window if call_slow)
+                    if (failures / calls >= self.failure_rate_threshold
+                            or slow_calls / calls >= self.slow_call_rate_threshold):
+                        change = self._transition(OPEN)
+        self._announce(change)
+
+    def abandon(self):
+        """An admitted call was cancelled before it finished; it counts neither way"""
+        with self._lock:
+            if self._state == HALF_OPEN and self._trials_started > self._trials_succeeded:
+                self._trials_started -= 1
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state
+
+    def snapshot(self):
+        with self._lock:
+            calls = len(self._window)
+            failures = sum(1 for failed, _ in self._window if failed)
+            slow_calls = sum(1 for _, slow in self._window if slow)
+            retry_after = 0.0
+            if self._state == OPEN:
+                retry_after = max(0.0, self._opened_at + self.open_seconds - self._clock())
+            return {
+                "state": self._state,
+                "window_calls": calls,
+                "failure_rate": round(failures / calls, 4) if calls else 0.0,
+                "slow_call_rate": round(slow_calls / calls, 4) if calls else 0.0,
+                "failure_rate_threshold": self.failure_rate_threshold,
+                "slow_call_seconds": self.slow_call_seconds,
+                "slow_call_rate_threshold": self.slow_call_rate_threshold,
+                "open_seconds": self.open_seconds,
+                "retry_after": round(retry_after, 3),
+                "times_opened": self.times_opened,
+                "rejected": self.rejected
+            }
+
+
+class LatencyWindow:
+    """Rolling window of recent call latencies, used to pick the hedge delay"""
+
+    def __init__(self, size=200, minimum_samples=20):
+        self.minimum_samples = minimum_samples
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, fraction):
+        """Latency at the given fraction (0.95 = p95), or None until enough samples"""
+        with self._lock:
+            if len(self._samples) < self.minimum_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class HedgePolicy:
+    """
+    When to send a second, duplicate attempt of an idempotent read
+    The delay is the recent p95 latency clamped to [min_delay, max_delay], so
+    only the slowest ~5% of calls are duplicated
+    """
+
+    def __init__(self, fraction=0.95, min_delay=0.005, max_delay=1.0, default_delay=0.05):
+        self.fraction = fraction
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.default_delay = default_delay
+        self.latencies = LatencyWindow()
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.won = 0
+
+    def delay(self):
+        observed = self.latencies.percentile(self.fraction)
+        if observed is None:
+            return self.default_delay
+        return min(self.max_delay, max(self.min_delay, observed))
+
+    def record_hedge(self, won):
+        with self._lock:
+            self.sent += 1
+            if won:
+                self.won += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "percentile": self.fraction,
+                "delay_seconds": round(self.delay(), 4),
+                "hedges_sent": self.sent,
+                "hedges_won": self.won
+            }
@@ -0,0 +1,148 @@
+"""
+Booking Sagas - VCC-1
+Persistent log of the bookings in flight, so a booking cut short by a
+restart is finished or undone instead of leaving a held room or a charge
+behind
+A booking is a saga of three steps, each undone by a compensation:
+  hold the room      (Availability POST /reserve with hold_seconds) -> POST /release
+  charge the guest   (Payment POST /process-payment)                -> POST /bookings/<id>/refund
+  confirm the hold   (Availability POST /confirm)
+The state is written before the next step is attempted:
+  started -> held -> charged -> confirmed
+  started -> failed                          (no hold was taken)
+  held / charged -> compensating -> failed   (hold released, charge refunded)
+Recovery rolls a saga that never reached "charged" back, and rolls a
+charged one forward by confirming its hold
+SagaLog is SQLite in WAL mode, shared by every worker process on the host;
+a recovering process leases a saga first, so no two drive the same one
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+from encoding import dumps, loads
+
+STARTED = "started"
+HELD = "held"
+CHARGED = "charged"
+CONFIRMED = "confirmed"
+COMPENSATING = "compensating"
+FAILED = "failed"
+IN_FLIGHT = (STARTED, HELD, CHARGED, COMPENSATING)
+
+COLUMNS = [
+    "booking_id", "state", "booking", "amount", "reservation_id", "transaction_id",
+    "error", "created_at", "updated_at"
+]
+
+
+class SagaLog:
+    """Saga state per booking ID, one connection per thread and process"""
+
+    def __init__(self, path, busy_timeout_ms=5000, clock=time.time):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._clock = clock
+        self._local = threading.local()
+        self._create_schema()
+
+    def _connection(self):
+        # A connection inherited through fork() (a preloading server) must not be reused
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _create_schema(self):
+        self._connection().executescript("""
+            CREATE TABLE IF NOT EXISTS sagas (
+                booking_id TEXT PRIMARY KEY,
+                state TEXT NOT NULL,
+                booking TEXT,
+                amount REAL,
+                reservation_id TEXT,
+                transaction_id TEXT,
+                error TEXT,
+                created_at REAL,
+                updated_at REAL,
+                lease_until REAL NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_sagas_state ON sagas (state, updated_at);
+        """)
+
+    def start(self, booking_id, booking, amount):
+        """Record a new saga in state "started" """
+        now = self._clock()
+        self._connection().execute(
+            "INSERT INTO sagas (booking_id, state, booking, amount, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (booking_id, STARTED, dumps(booking).decode("utf-8"), amount, now, now)
+        )
+
+    def advance(self, booking_id, state, reservation_id=None, transaction_id=None, error=None):
+        """Move a saga to state, recording the IDs and error given (others are kept)"""
+        self._connection().execute(
+            "UPDATE sagas SET state = ?, updated_at = ?, reservation_id = COALESCE(?, reservation_id),"
+            " transaction_id = COALESCE(?, transaction_id), error = COALESCE(?, error), lease_until = 0"
+            " WHERE booking_id = ?",
+            (state, self._clock(), reservation_id, transaction_id, error, booking_id)
+        )
+
+    def get(self, booking_id):
+        row = self._connection().execute(
+            f"SELECT {', '.join(COLUMNS)} FROM sagas WHERE booking_id = ?", (booking_id,)
+        ).fetchone()
+        return _saga(row) if row else None
+
+    def claim_stale(self, idle_seconds, lease_seconds, limit=100):
+        """
+        Lease up to limit in-flight sagas nobody has touched for idle_seconds
+        (their request is long gone) and return them; a lease lapses after
+        lease_seconds, so a saga whose recovery fails is retried later
+        """
+        now = self._clock()
+        conn = self._connection()
+        rows = conn.execute(
+            f"SELECT {', '.join(COLUMNS)} FROM sagas WHERE state IN ({', '.join('?' * len(IN_FLIGHT))})"
+            " AND updated_at < ? AND lease_until < ? ORDER BY updated_at LIMIT ?",
+            (*IN_FLIGHT, now - idle_seconds, now, limit)
+        ).fetchall()
+        claimed = []
+        for row in rows:
+            cursor = conn.execute(
+                "UPDATE sagas SET lease_until = ? WHERE booking_id = ? AND lease_until < ? AND updated_at = ?",
+                (now + lease_seconds, row["booking_id"], now, row["updated_at"])
+            )
+            if cursor.rowcount == 1:
+                claimed.append(_saga(row))
+        return claimed
+
+    def count(self, state):
+        return self._connection().execute("SELECT COUNT(*) FROM sagas WHERE state = ?", (state,)).fetchone()[0]
+
+    def prune(self, older_than_seconds):
+        """Delete finished sagas last updated more than older_than_seconds ago; returns how many"""
+        cursor = self._connection().execute(
+            "DELETE FROM sagas WHERE state IN (?, ?) AND updated_at < ?",
+            (CONFIRMED, FAILED, self._clock() - older_than_seconds)
+        )
+        return cursor.rowcount
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+            self._local.conn = None
+
+
+def _saga(row):
+    saga = dict(row)
+    saga["booking"] = loads(saga["booking"]) if saga["booking"] else None
+    return saga
@@ -0,0 +1,371 @@
+"""
+Request Tracing - shared by VCC-1, VCC-2 and VCC-3
+Edit common/tracing.py only; python common/sync.py copies it into each service
+W3C Trace Context propagation and span recording, without an external collector
+An incoming `traceparent` header (00-<trace id>-<parent span id>-<flags>)
+continues the caller's trace; otherwise a new trace starts and is sampled
+with probability sample_rate. The sampling decision travels downstream in
+the flags, so a trace is recorded by every service or by none
+Finished spans of sampled traces go into a fixed-size ring buffer (one slot
+write, no lock) served on GET /debug/traces, and, when an export path is
+set, are appended to a file as OTLP/JSON (one ExportTraceServiceRequest per
+line) by a background thread. Unsampled spans only carry IDs
+Each gunicorn worker process keeps its own buffer
+"""
+
+import contextvars
+import itertools
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from flask import g, jsonify, request
+
+from encoding import dumps
+
+TRACEPARENT_HEADER = "traceparent"
+TRACE_ID_HEADER = "X-Trace-Id"
+TRACEPARENT_PATTERN = re.compile(r"([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})")
+INVALID_TRACE_ID = "0" * 32
+INVALID_SPAN_ID = "0" * 16
+
+# OTLP enum values
+SPAN_KINDS = {"internal": 1, "server": 2, "client": 3}
+STATUS_CODES = {"unset": 0, "ok": 1, "error": 2}
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+def parse_traceparent(header):
+    """(trace_id, parent_span_id, sampled) of a traceparent header, or None if it is absent or invalid"""
+    if not header:
+        return None
+    match = TRACEPARENT_PATTERN.fullmatch(header.strip().lower()[:55])
+    if match is None:
+        return None
+    version, trace_id, span_id, flags = match.groups()
+    if version == "ff" or trace_id == INVALID_TRACE_ID or span_id == INVALID_SPAN_ID:
+        return None
+    return trace_id, span_id, bool(int(flags, 16) & 1)
+
+
+class Span:
+    """One timed operation; attributes are only kept for sampled spans"""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "sampled",
+                 "start_ns", "end_ns", "attributes", "status", "message")
+
+    def __init__(self, trace_id, span_id, parent_id, name, kind, sampled):
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.sampled = sampled
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = {} if sampled else None
+        self.status = "unset"
+        self.message = None
+
+    def set(self, key, value):
+        if self.sampled:
+            self.attributes[key] = value
+
+    def fail(self, message):
+        """Mark the span as failed (a 5xx, a transport error or an exception)"""
+        self.status = "error"
+        self.message = message
+
+    @property
+    def traceparent(self):
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    @property
+    def duration_ms(self):
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def to_otlp(self):
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": SPAN_KINDS[self.kind],
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute(key, value) for key, value in self.attributes.items()],
+            "status": {"code": STATUS_CODES[self.status]}
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        if self.message:
+            span["status"]["message"] = self.message
+        return span
+
+
+def _otlp_attribute(key, value):
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class Tracer:
+    """Creates spans, keeps the recent sampled ones in a ring buffer and exports them"""
+
+    def __init__(self, service, sample_rate=1.0, buffer_size=4096, export_path=None, export_interval=1.0):
+        self.service = service
+        self.sample_rate = sample_rate
+        self.buffer_size = buffer_size
+        self.export_path = export_path
+        self.export_interval = export_interval
+        self._ring = [None] * buffer_size
+        self._slots = itertools.count()
+        self._export_queue = deque(maxlen=buffer_size * 4) if export_path else None
+        self._exporter_pid = None
+        self._exporter_lock = threading.Lock()
+        self.exported = 0
+        self.export_errors = 0
+
+    def current(self):
+        """The span of the running request or operation, or None"""
+        return _current_span.get()
+
+    def start_span(self, name, kind="internal", parent=None, attributes=None):
+        """
+        Start a span under parent: a Span, a parse_traceparent() tuple, or None
+        for the current span (a new, possibly sampled, trace if there is none)
+        """
+        if parent is None:
+            parent = _current_span.get()
+        if isinstance(parent, Span):
+            trace_id, parent_id, sampled = parent.trace_id, parent.span_id, parent.sampled
+        elif parent is not None:
+            trace_id, parent_id, sampled = parent
+        else:
+            trace_id, parent_id = f"{random.getrandbits(128):032x}", None
+            sampled = random.random() < self.sample_rate
+        span = Span(trace_id, f"{random.getrandbits(64) or 1:016x}", parent_id, name, kind, sampled)
+        if sampled and attributes:
+            span.attributes.update(attributes)
+        return span
+
+    def finish(self, span):
+        """End a span; sampled spans are recorded"""
+        span.end_ns = time.time_ns()
+        if not span.sampled:
+            return
+        self._ring[next(self._slots) % self.buffer_size] = span
+        if self._export_queue is not None:
+            self._export_queue.append(span)
+            self._start_exporter()
+
+    @contextmanager
+    def activate(self, span):
+        """Make span the current span for the duration of the block (it is not finished)"""
+        token = _current_span.set(span)
+        try:
+            yield span
+        finally:
+            _current_span.reset(token)
+
+    @contextmanager
+    def span(self, name, kind="internal", attributes=None):
+        """Time the block as a child of the current span; an exception marks it failed"""
+        span = self.start_span(name, kind, attributes=attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.fail(f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            _current_span.reset(token)
+            self.finish(span)
+
+    def bind(self, function, span=None):
+        """function wrapped to run under span (default: the current one), e.g. in a worker thread"""
+        span = span if span is not None else _current_span.get()
+
+        def bound(*args, **kwargs):
+            token = _current_span.set(span)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                _current_span.reset(token)
+        return bound
+
+    def inject(self, headers=None, span=None):
+        """headers (copied) plus the traceparent of span, or of the current span if there is one"""
+        span = span if span is not None else _current_span.get()
+        if span is None:
+            return headers
+        headers = dict(headers) if headers else {}
+        headers[TRACEPARENT_HEADER] = span.traceparent
+        return headers
+
+    def spans(self):
+        """Recorded spans still in the ring buffer, oldest first"""
+        return sorted((span for span in list(self._ring) if span is not None), key=lambda span: span.start_ns)
+
+    def traces(self, limit=20, trace_id=None, min_ms=0.0):
+        """
+        Recent traces, newest first, as this service saw them: every span with
+        its offset from the trace's first span here and its duration, so the
+        time of a request can be read stage by stage
+        """
+        grouped = {}
+        for span in self.spans():
+            if trace_id is None or span.trace_id == trace_id:
+                grouped.setdefault(span.trace_id, []).append(span)
+        traces = []
+        for spans in sorted(grouped.values(), key=lambda spans: spans[0].start_ns, reverse=True):
+            first = spans[0].start_ns
+            duration_ms = (max(span.end_ns for span in spans) - first) / 1e6
+            if duration_ms < min_ms:
+                continue
+            own_ids = {span.span_id for span in spans}
+            roots = [span for span in spans if span.parent_id not in own_ids]
+            traces.append({
+                "trace_id": spans[0].trace_id,
+                "root": roots[0].name,
+                "started_at": datetime.fromtimestamp(first / 1e9).isoformat(timespec="milliseconds"),
+                "duration_ms": round(duration_ms, 3),
+                "spans": [{
+                    "span_id": span.span_id,
+                    "parent_id": span.parent_id,
+                    "name": span.name,
+                    "kind": span.kind,
+                    "offset_ms": round((span.start_ns - first) / 1e6, 3),
+                    "duration_ms": round(span.duration_ms, 3),
+                    "status": span.status,
+                    "attributes": span.attributes
+                } for span in spans]
+            })
+            if len(traces) == limit:
+                break
+        return traces
+
+    def _start_exporter(self):
+        # Threads do not survive fork(), so a tracer built before a preloading
+        # server forks starts its exporter in each worker on first use
+        if self._exporter_pid == os.getpid():
+            return
+        with self._exporter_lock:
+            if self._exporter_pid == os.getpid():
+                return
+            self._exporter_pid = os.getpid()
+            threading.Thread(target=self._export_forever, name="trace-exporter", daemon=True).start()
+
+    def _export_forever(self):
+        while True:
+            time.sleep(self.export_interval)
+            self.export()
+
+    def export(self):
+        """Append the spans finished since the last export to export_path; returns how many"""
+        spans = []
+        while self._export_queue:
+            spans.append(self._export_queue.popleft())
+        if not spans:
+            return 0
+        line = dumps({
+            "resourceSpans": [{
+                "resource": {"attributes": [
+                    _otlp_attribute("service.name", self.service),
+                    _otlp_attribute("process.pid", os.getpid())
+                ]},
+                "scopeSpans": [{
+                    "scope": {"name": "vcc.tracing"},
+                    "spans": [span.to_otlp() for span in spans]
+                }]
+            }]
+        }) + b"\n"
+        try:
+            with open(self.export_path, "ab") as f:
+                f.write(line)
+        except OSError as e:
+            self.export_errors += 1
+            print(f"[{self.service}] Trace export to {self.export_path} failed: {e}")
+            return 0
+        self.exported += len(spans)
+        return len(spans)
+
+    def snapshot(self):
+        return {
+            "service": self.service,
+            "sample_rate": self.sample_rate,
+            "buffer_size": self.buffer_size,
+            "recorded": min(self.buffer_size, sum(1 for span in self._ring if span is not None)),
+            "export_path": self.export_path,
+            "exported": self.exported,
+            "export_errors": self.export_errors
+        }
+
+
+def instrument_tracing(app, tracer):
+    """
+    Give every request of a Flask app a server span (continuing the caller's
+    trace from its traceparent header) and serve recent traces on
+    GET /debug/traces?limit=20&trace_id=...&min_ms=...
+    Returns tracer, so a service can add spans of its own
+    """
+    @app.before_request
+    def _start_span():
+        rule = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        _current_span.set(None)  # a request never continues whatever its thread ran before
+        span = tracer.start_span(
+            f"{request.method} {rule}", "server", parse_traceparent(request.headers.get(TRACEPARENT_HEADER))
+        )
+        span.set("http.method", request.method)
+        span.set("http.target", request.full_path.rstrip("?"))
+        g.trace_span = span
+        g.trace_token = _current_span.set(span)
+
+    @app.after_request
+    def _tag_response(response):
+        span = g.get("trace_span")
+        if span is not None:
+            span.set("http.status_code", response.status_code)
+            if response.status_code >= 500:
+                span.fail(f"HTTP {response.status_code}")
+            if span.sampled:
+                response.headers[TRACE_ID_HEADER] = span.trace_id
+        return response
+
+    @app.teardown_request
+    def _finish_span(error):
+        span = g.pop("trace_span", None)
+        token = g.pop("trace_token", None)
+        if span is None:
+            return
+        if error is not None:
+            span.fail(f"{type(error).__name__}: {error}")
+        try:
+            _current_span.reset(token)
+        except ValueError:  # torn down in another context
+            _current_span.set(None)
+        tracer.finish(span)
+
+    @app.route('/debug/traces', methods=['GET'])
+    def debug_traces():
+        """Recent sampled traces from this worker's ring buffer, newest first"""
+        try:
+            limit = max(1, int(request.args.get("limit", 20)))
+            min_ms = float(request.args.get("min_ms", 0))
+        except ValueError:
+            return jsonify({"status": "error", "message": "limit and min_ms must be numbers"}), 400
+        return jsonify({
+            "status": "success",
+            "tracer": tracer.snapshot(),
+            "traces": tracer.traces(limit, request.args.get("trace_id"), min_ms)
+        })
+
+    return tracer
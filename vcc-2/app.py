@@ -5,43 +5,214 @@ This service checks available rooms and pricing for hotel bookings
 Educational Purpose: Learning how microservices expose domain-specific data
 """
 
+import hashlib
+import os
+import signal
 import socket
+import threading
+import time
+from datetime import date, datetime, timedelta
 from flask import Flask, request, jsonify
-from datetime import datetime, timedelta
+from pricing import quote_batch, day_index
+from inventory import Inventory, InventoryError
+from rates import RatePlans, load_rate_plans
+from catalog import CatalogWatcher, hotel_rows, load_catalog
+from search import SearchIndex
+from cache import AvailabilityCache
+from metrics import Metrics, instrument
+from tracing import Tracer, instrument_tracing
+from encoding import JSONProvider, encode_constant
 
 app = Flask(__name__)
+app.json = JSONProvider(app)  # orjson when installed (see encoding.py)
 
 # Service Configuration
 SERVICE_NAME = "Availability"
 SERVICE_PORT = 5002
+DEBUG = os.environ.get("FLASK_DEBUG") == "1"  # dev server only; serve.py never runs debug
+MAX_BATCH_SIZE = 500  # queries accepted by /check-availability/batch
 
-# Mock hotel database (hardcoded for demonstration)
-HOTELS_DATABASE = {
-    "Grand Plaza": {
-        "city": "New York",
-        "rooms": {
-            "Standard": {"available": 5, "rate": 120.00},
-            "Deluxe": {"available": 3, "rate": 180.00},
-            "Suite": {"available": 1, "rate": 300.00}
-        }
-    },
-    "Oceanview Resort": {
-        "city": "Miami",
-        "rooms": {
-            "Standard": {"available": 8, "rate": 100.00},
-            "Deluxe": {"available": 4, "rate": 160.00},
-            "Suite": {"available": 2, "rate": 280.00}
-        }
-    },
-    "City Center Inn": {
-        "city": "Chicago",
-        "rooms": {
-            "Standard": {"available": 2, "rate": 110.00},
-            "Deluxe": {"available": 6, "rate": 170.00},
-            "Suite": {"available": 0, "rate": 290.00}
-        }
+# Hotel catalogue: hotels.json is compiled into hotels.cat, which is memory-mapped
+# and read like a dict (see catalog.py); editing either file, or SIGHUP, reloads
+# it without a restart. "available" is the number of rooms of that type, i.e.
+# free rooms per night before any reservation; nightly counts are tracked by
+# INVENTORY below
+SERVICE_DIR = os.path.dirname(os.path.abspath(__file__))
+if os.environ.get("CATALOG_PATH"):
+    CATALOG_PATH = os.environ["CATALOG_PATH"]  # prebuilt: python catalog.py SOURCE.json CATALOG.cat
+    CATALOG_SOURCE = os.environ.get("CATALOG_SOURCE")
+else:
+    CATALOG_PATH = os.path.join(SERVICE_DIR, "hotels.cat")
+    CATALOG_SOURCE = os.path.join(SERVICE_DIR, "hotels.json")
+CATALOG_POLL_SECONDS = 2.0  # how often the files are checked for changes
+
+HOTELS_DATABASE = load_catalog(CATALOG_PATH, CATALOG_SOURCE)
+
+# Load testing: INVENTORY_ROOMS=N gives every room type N rooms per night
+INVENTORY_ROOMS = int(os.environ["INVENTORY_ROOMS"]) if os.environ.get("INVENTORY_ROOMS") else None
+
+# Nightly inventory horizon (stays must fall inside it): INVENTORY_HORIZON_DAYS
+# nights from INVENTORY_BACK_DAYS before today, rolled on each day (roll_horizon)
+INVENTORY_BACK_DAYS = 1  # past nights still bookable, e.g. a check-in after midnight
+INVENTORY_HORIZON_DAYS = 730
+INVENTORY_START_DATE = (date.today() - timedelta(days=INVENTORY_BACK_DAYS)).isoformat()
+
+INVENTORY = Inventory(HOTELS_DATABASE, INVENTORY_START_DATE, INVENTORY_HORIZON_DAYS, capacity=INVENTORY_ROOMS)
+MAX_HOLD_SECONDS = 3600  # longest hold /reserve accepts before it must be confirmed
+
+# Rate plans (see rates.py): seasonal, weekend and length-of-stay pricing on
+# top of each room's catalogue rate, precomputed over the inventory horizon.
+# RATE_PLANS_PATH="" prices every night at the catalogue rate
+RATE_PLANS_PATH = os.environ.get("RATE_PLANS_PATH", os.path.join(SERVICE_DIR, "rate_plans.json"))
+RATE_PLANS = RatePlans(
+    load_rate_plans(RATE_PLANS_PATH) if RATE_PLANS_PATH else {}, INVENTORY_START_DATE, INVENTORY_HORIZON_DAYS
+)
+
+# Hotel search (indexes are built on the first search; a reloaded catalogue gets new ones)
+SEARCH_INDEX = SearchIndex(HOTELS_DATABASE, INVENTORY, RATE_PLANS)
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+
+# Response caching
+HOTELS_MAX_AGE = 60                   # seconds clients may reuse /hotels without revalidating
+AVAILABILITY_CACHE_SIZE = 4096
+AVAILABILITY_CACHE_TTL_SECONDS = 30
+
+AVAILABILITY_CACHE = AvailabilityCache(AVAILABILITY_CACHE_SIZE, AVAILABILITY_CACHE_TTL_SECONDS)
+INVENTORY.add_listener(AVAILABILITY_CACHE.invalidate)
+
+METRICS = instrument(app, Metrics(SERVICE_NAME))
+METRICS.gauge("inventory_holds", lambda: INVENTORY.holds())
+
+# Request tracing (see tracing.py): the Orchestrator's traceparent decides sampling
+TRACE_SAMPLE_RATE = float(os.environ.get("TRACE_SAMPLE_RATE", 0.1))  # share of requests without one recorded
+TRACE_BUFFER_SIZE = 4096                                             # spans kept for /debug/traces
+TRACE_EXPORT_PATH = os.environ.get("TRACE_EXPORT_PATH")             # OTLP/JSON lines file; unset = no export
+
+TRACER = instrument_tracing(app, Tracer(SERVICE_NAME, TRACE_SAMPLE_RATE, TRACE_BUFFER_SIZE, TRACE_EXPORT_PATH))
+
+HORIZON_ROLL_AT = 0.0  # time.time() of the next local midnight, when the horizon is due to roll
+
+def roll_horizon(today=None):
+    """
+    Move the horizon on to start INVENTORY_BACK_DAYS before today: the rate
+    plans are priced out to the new last night first, then the inventory
+    drops the nights gone by. Returns the number of nights it moved
+    """
+    start = (today or date.today()) - timedelta(days=INVENTORY_BACK_DAYS)
+    RATE_PLANS.extend(start.toordinal() - RATE_PLANS.start_day + INVENTORY_HORIZON_DAYS)
+    days = INVENTORY.roll(start.isoformat())
+    if days:
+        print(f"[{SERVICE_NAME}] Horizon rolled on {days} night(s): bookable from {start.isoformat()}")
+    return days
+
+@app.before_request
+def roll_horizon_daily():
+    """Roll the horizon on the first request of each day; otherwise one clock comparison"""
+    global HORIZON_ROLL_AT
+    if time.time() >= HORIZON_ROLL_AT:
+        roll_horizon()
+        HORIZON_ROLL_AT = datetime.combine(date.today() + timedelta(days=1), datetime.min.time()).timestamp()
+
+def build_hotels_response(hotels):
+    """Serialize the /hotels payload once per catalogue version; returns (body bytes, ETag)"""
+    hotels_list = []
+    for hotel_name, city, room_types in hotel_rows(hotels):
+        hotels_list.append({
+            "name": hotel_name,
+            "city": city,
+            "room_types": room_types
+        })
+    body = encode_constant({
+        "status": "success",
+        "available_hotels": hotels_list
+    })
+    return body, hashlib.sha1(body).hexdigest()
+
+HOTELS_RESPONSE = None  # (catalogue, body, ETag); built on the first /hotels, not at startup
+
+def hotels_response():
+    """(body, ETag) of /hotels for the catalogue being served"""
+    global HOTELS_RESPONSE
+    catalog, response = HOTELS_DATABASE, HOTELS_RESPONSE
+    if response is None or response[0] is not catalog:
+        response = HOTELS_RESPONSE = (catalog, *build_hotels_response(catalog))
+    return response[1], response[2]
+
+def install_catalog(catalog):
+    """
+    Serve a new catalogue version (called by CATALOG_WATCHER): its search
+    indexes and /hotels body are built first, while the old version keeps
+    serving, then every reference is swapped over
+    """
+    global HOTELS_DATABASE, SEARCH_INDEX, HOTELS_RESPONSE
+    search_index = SearchIndex(catalog, INVENTORY, RATE_PLANS).build()
+    hotels = (catalog, *build_hotels_response(catalog))
+    INVENTORY.set_hotels(catalog)
+    HOTELS_DATABASE, SEARCH_INDEX, HOTELS_RESPONSE = catalog, search_index, hotels
+    RATE_PLANS.forget_rooms()
+    AVAILABILITY_CACHE.clear()  # cached quotes carry the old rates
+    print(f"[{SERVICE_NAME}] Catalogue reloaded: {len(catalog)} hotels from {catalog.path}")
+
+CATALOG_WATCHER = CatalogWatcher(CATALOG_PATH, CATALOG_SOURCE, HOTELS_DATABASE, install_catalog, CATALOG_POLL_SECONDS)
+
+def start_catalog_watcher():
+    """Reload the catalogue when it changes, and on SIGHUP (call after any fork, in the serving process)"""
+    CATALOG_WATCHER.start()
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGHUP, lambda signum, frame: CATALOG_WATCHER.request_reload())
+
+# Responses that never change, encoded once at startup
+WELCOME_BODY = encode_constant({
+    "port": SERVICE_PORT,
+    "description": "Hotel Room Availability Service",
+    "endpoints": {
+        "POST /check-availability": "Check hotel room availability and pricing",
+        "POST /check-availability/batch": "Check availability and pricing for many queries at once",
+        "GET /hotels": "List all available hotels",
+        "GET /catalog": "Loaded hotel catalogue version and reload counters",
+        "GET /search": "Bookable rooms for a stay by city, room type and rate, cheapest first",
+        "POST /reserve": "Atomically reserve (or hold, with hold_seconds) a room for every night of a stay",
+        "POST /confirm": "Confirm a held reservation before its hold lapses",
+        "POST /release": "Release a reservation",
+        "GET /inventory/<hotel_name>/<room_type>": "Free rooms per night for a date range",
+        "GET /rates/<hotel_name>/<room_type>": "Price per night and stay total under the rate plans",
+        "GET /rate-plans": "Seasonal, weekend and length-of-stay rules in force",
+        "GET /cache-stats": "Availability response cache metrics",
+        "GET /debug/traces": "Recent sampled request traces with per-span timings",
+        "GET /metrics": "Request latency and error metrics (Prometheus format)"
     }
-}
+})
+RESERVE_REQUIRED_FIELDS = ["hotel_name", "check_in", "check_out", "room_type"]
+MISSING_RESERVE_FIELDS_BODY = encode_constant({
+    "status": "error",
+    "message": "Missing required fields",
+    "required_fields": RESERVE_REQUIRED_FIELDS
+})
+INVALID_ROOMS_BODY = encode_constant({
+    "status": "error",
+    "message": "rooms must be a positive integer"
+})
+INVALID_HOLD_BODY = encode_constant({
+    "status": "error",
+    "message": f"hold_seconds must be a positive number of at most {MAX_HOLD_SECONDS}"
+})
+MISSING_QUERIES_BODY = encode_constant({
+    "status": "error",
+    "message": "Payload must contain a 'queries' list"
+})
+MISSING_RESERVATION_ID_BODY = encode_constant({
+    "status": "error",
+    "message": "Missing required field: reservation_id"
+})
+MISSING_SEARCH_DATES_BODY = encode_constant({
+    "status": "error",
+    "message": "check_in and check_out query parameters are required"
+})
+
+def encoded_response(body, status_code=200):
+    """Response for a JSON body that is already encoded"""
+    return app.response_class(body, status=status_code, mimetype="application/json")
 
 def get_local_ip():
     """Get the local IP address of the service"""
@@ -54,43 +225,49 @@ def get_local_ip():
     except Exception as e:
         return "127.0.0.1"
 
+def shutdown():
+    """Graceful shutdown hook (called by serve.py once in-flight requests are done)"""
+    print(f"[{SERVICE_NAME}] Shutting down; in-memory reservations are discarded")
+
 def calculate_nights(check_in_str, check_out_str):
     """Calculate number of nights between check-in and check-out"""
-    try:
-        check_in = datetime.strptime(check_in_str, "%Y-%m-%d")
-        check_out = datetime.strptime(check_out_str, "%Y-%m-%d")
-        nights = (check_out - check_in).days
-        return max(1, nights)
-    except Exception as e:
+    check_in = day_index(check_in_str)
+    check_out = day_index(check_out_str)
+    if not check_in or not check_out:
         return 1
+    return max(1, check_out - check_in)
 
 @app.route('/', methods=['GET'])
 def welcome():
-    """Welcome endpoint with service information"""
-    return jsonify({
-        "port": SERVICE_PORT,
-        "description": "Hotel Room Availability Service",
-        "endpoints": {
-            "POST /check-availability": "Check hotel room availability and pricing",
-            "GET /hotels": "List all available hotels"
-        }
-    })
+    """Welcome endpoint with service information (encoded once at startup)"""
+    return encoded_response(WELCOME_BODY)
 
 @app.route('/hotels', methods=['GET'])
 def list_hotels():
-    """List all available hotels in the system"""
-    hotels_list = []
-    for hotel_name, hotel_info in HOTELS_DATABASE.items():
-        hotels_list.append({
-            "name": hotel_name,
-            "city": hotel_info.get("city"),
-            "room_types": list(hotel_info.get("rooms", {}).keys())
-        })
-    
-    return jsonify({
-        "status": "success",
-        "available_hotels": hotels_list
-    })
+    """List all available hotels in the system (serialized once per catalogue version, supports If-None-Match)"""
+    body, etag = hotels_response()
+    response = app.response_class(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = HOTELS_MAX_AGE
+    return response.make_conditional(request)
+
+def availability_cache_key(data):
+    """Normalized cache key for a /check-availability payload, or None if uncacheable"""
+    if not isinstance(data, dict):
+        return None
+    hotel_name = data.get("hotel_name")
+    room_type = data.get("room_type")
+    if not isinstance(hotel_name, str) or not isinstance(room_type, str):
+        return None
+    if room_type not in HOTELS_DATABASE.get(hotel_name, {}).get("rooms", {}):
+        return None
+    key = (hotel_name, room_type, data.get("check_in"), data.get("check_out"), data.get("num_guests", 1))
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
 
 @app.route('/check-availability', methods=['POST'])
 def check_availability():
@@ -107,87 +284,423 @@ def check_availability():
     """
     try:
         data = request.get_json()
-        
-        # Validate required fields
-        required_fields = ["hotel_name", "check_in", "check_out", "room_type"]
-        if not all(field in data for field in required_fields):
+
+        cache_key = availability_cache_key(data)
+        if "no-cache" in request.headers.get("Cache-Control", ""):
+            cache_key = None
+        if cache_key is not None:
+            cached = AVAILABILITY_CACHE.get(cache_key)
+            if cached is not None:
+                body_bytes, status_code = cached
+                response = app.response_class(body_bytes, status=status_code, mimetype="application/json")
+                response.headers["X-Cache"] = "HIT"
+                TRACER.current().set("cache", "hit")
+                return response
+            room_key = cache_key[:2]
+            version = INVENTORY.version(*room_key)
+
+        with TRACER.span("quote"):
+            body, status_code = quote_batch([data], HOTELS_DATABASE, INVENTORY, RATE_PLANS)[0]
+        response = jsonify(body)
+        response.status_code = status_code
+
+        if cache_key is not None and status_code == 200:
+            AVAILABILITY_CACHE.put(
+                cache_key, room_key, INVENTORY.night_range(data["check_in"], data["check_out"]),
+                (response.get_data(), status_code), version, lambda: INVENTORY.version(*room_key)
+            )
+            response.headers["X-Cache"] = "MISS"
+        return response
+
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": f"Availability check error: {str(e)}"
+        }), 500
+
+@app.route('/check-availability/batch', methods=['POST'])
+def check_availability_batch():
+    """
+    Check availability and pricing for many queries in one call
+    Expected payload:
+    {
+        "queries": [
+            {"hotel_name": "Grand Plaza", "check_in": "2026-02-15",
+             "check_out": "2026-02-18", "room_type": "Deluxe"},
+            ...
+        ]
+    }
+    Results come back in request order; each carries its own http_status
+    """
+    try:
+        data = request.get_json()
+        queries = data.get("queries") if isinstance(data, dict) else None
+        if not isinstance(queries, list):
+            return encoded_response(MISSING_QUERIES_BODY, 400)
+
+        if len(queries) > MAX_BATCH_SIZE:
             return jsonify({
                 "status": "error",
-                "message": "Missing required fields",
-                "required_fields": required_fields
-            }), 400
-        
+                "message": f"Batch too large: {len(queries)} queries (maximum {MAX_BATCH_SIZE})"
+            }), 413
+
+        results = []
+        for body, status_code in quote_batch(queries, HOTELS_DATABASE, INVENTORY, RATE_PLANS):
+            item = dict(body)
+            item["http_status"] = status_code
+            results.append(item)
+
+        return jsonify({
+            "status": "success",
+            "count": len(results),
+            "results": results
+        }), 200
+
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": f"Batch availability check error: {str(e)}"
+        }), 500
+
+def find_room(hotel_name, room_type):
+    """Return an error response tuple if the hotel or room type is unknown, else None"""
+    if not isinstance(hotel_name, str) or not isinstance(room_type, str):
+        return jsonify({
+            "status": "error",
+            "message": "hotel_name and room_type must be strings"
+        }), 400
+    if hotel_name not in HOTELS_DATABASE:
+        return jsonify({
+            "status": "not_found",
+            "message": f"Hotel '{hotel_name}' not found in system",
+            "available_hotels": list(HOTELS_DATABASE.keys())
+        }), 404
+    if room_type not in HOTELS_DATABASE[hotel_name].get("rooms", {}):
+        return jsonify({
+            "status": "not_found",
+            "message": f"Room type '{room_type}' not available at {hotel_name}",
+            "available_room_types": list(HOTELS_DATABASE[hotel_name].get("rooms", {}).keys())
+        }), 404
+    return None
+
+@app.route('/reserve', methods=['POST'])
+def reserve_room():
+    """
+    Atomically reserve rooms for every night of a stay
+    Expected payload:
+    {
+        "hotel_name": "Grand Plaza",
+        "room_type": "Suite",
+        "check_in": "2026-02-15",
+        "check_out": "2026-02-18",
+        "rooms": 1,
+        "booking_id": "BOOK123",    (optional, stored as the reference)
+        "hold_seconds": 300         (optional)
+    }
+    With hold_seconds the rooms are only held: the hold lapses and the rooms
+    are sold again unless POST /confirm arrives within that many seconds
+    Repeating the request with the same booking_id returns the reservation
+    already made for it, so a retry never takes a second room
+    """
+    try:
+        data = request.get_json()
+
+        if not isinstance(data, dict) or not all(field in data for field in RESERVE_REQUIRED_FIELDS):
+            return encoded_response(MISSING_RESERVE_FIELDS_BODY, 400)
+
         hotel_name = data.get("hotel_name")
         room_type = data.get("room_type")
-        check_in = data.get("check_in")
-        check_out = data.get("check_out")
-        num_guests = data.get("num_guests", 1)
-        
-        # Check if hotel exists
-        if hotel_name not in HOTELS_DATABASE:
-            return jsonify({
-                "status": "not_found",
-                "available": False,
-                "message": f"Hotel '{hotel_name}' not found in system",
-                "available_hotels": list(HOTELS_DATABASE.keys())
-            }), 404
-        
-        hotel = HOTELS_DATABASE[hotel_name]
-        
-        # Check if room type exists for this hotel
-        if room_type not in hotel.get("rooms", {}):
-            return jsonify({
-                "status": "not_found",
-                "available": False,
-                "message": f"Room type '{room_type}' not available at {hotel_name}",
-                "available_room_types": list(hotel.get("rooms", {}).keys())
-            }), 404
-        
-        room_info = hotel["rooms"][room_type]
-        available_count = room_info.get("available", 0)
-        room_rate = room_info.get("rate", 0)
-        
-        # Calculate number of nights
-        num_nights = calculate_nights(check_in, check_out)
-        
-        # Check if room is available
-        if available_count < 1:
+        not_found = find_room(hotel_name, room_type)
+        if not_found:
+            return not_found
+
+        rooms = data.get("rooms", 1)
+        if not isinstance(rooms, int) or rooms < 1:
+            return encoded_response(INVALID_ROOMS_BODY, 400)
+
+        hold_seconds = data.get("hold_seconds")
+        if hold_seconds is not None and (
+            isinstance(hold_seconds, bool) or not isinstance(hold_seconds, (int, float))
+            or not 0 < hold_seconds <= MAX_HOLD_SECONDS
+        ):
+            return encoded_response(INVALID_HOLD_BODY, 400)
+
+        reservation = INVENTORY.reserve(
+            hotel_name, room_type, data["check_in"], data["check_out"],
+            rooms=rooms, reference=data.get("booking_id"), hold_seconds=hold_seconds
+        )
+        if reservation is None:
             return jsonify({
                 "status": "unavailable",
-                "available": False,
+                "reserved": False,
                 "hotel_name": hotel_name,
                 "room_type": room_type,
-                "check_in": check_in,
-                "check_out": check_out,
+                "check_in": data["check_in"],
+                "check_out": data["check_out"],
                 "message": f"No {room_type} rooms available for the selected dates"
-            }), 200
-        
-        # Room is available - return details
-        total_price = room_rate * num_nights
-        
+            }), 409
+
+        print(f"[{SERVICE_NAME}] Reserved {reservation.reservation_id} ({hotel_name}, {room_type})")
         return jsonify({
-            "status": "success",
-            "available": True,
+            "status": "reserved",
+            "reserved": True,
+            "reservation_id": reservation.reservation_id,
             "hotel_name": hotel_name,
-            "city": hotel.get("city"),
             "room_type": room_type,
-            "check_in": check_in,
-            "check_out": check_out,
-            "num_nights": num_nights,
-            "num_guests": num_guests,
-            "room_rate": room_rate,
-            "total_price": total_price,
-            "available_rooms": available_count,
-            "currency": "USD",
-            "timestamp": datetime.now().isoformat()
+            "check_in": reservation.check_in,
+            "check_out": reservation.check_out,
+            "rooms": reservation.rooms,
+            "booking_id": reservation.reference,
+            "state": reservation.state,
+            "hold_seconds": hold_seconds
+        }), 201
+
+    except InventoryError as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": f"Reservation error: {str(e)}"
+        }), 500
+
+@app.route('/confirm', methods=['POST'])
+def confirm_room():
+    """
+    Confirm a held reservation, so it no longer lapses
+    Expected payload: {"reservation_id": "RSV1"}
+    404 means the hold lapsed (or was released) and its rooms may be sold
+    """
+    try:
+        data = request.get_json()
+        reservation_id = data.get("reservation_id") if isinstance(data, dict) else None
+        if not reservation_id:
+            return encoded_response(MISSING_RESERVATION_ID_BODY, 400)
+
+        reservation = INVENTORY.confirm(reservation_id)
+        if reservation is None:
+            return jsonify({
+                "status": "not_found",
+                "message": f"Reservation {reservation_id} not found (released, or its hold lapsed)",
+                "reservation_id": reservation_id
+            }), 404
+
+        print(f"[{SERVICE_NAME}] Confirmed {reservation_id}")
+        return jsonify({
+            "status": "confirmed",
+            "reservation_id": reservation_id,
+            "hotel_name": reservation.hotel_name,
+            "room_type": reservation.room_type,
+            "check_in": reservation.check_in,
+            "check_out": reservation.check_out,
+            "rooms": reservation.rooms,
+            "booking_id": reservation.reference
         }), 200
 
     except Exception as e:
         return jsonify({
             "status": "error",
-            "message": f"Availability check error: {str(e)}"
+            "message": f"Confirmation error: {str(e)}"
+        }), 500
+
+@app.route('/release', methods=['POST'])
+def release_room():
+    """
+    Release a reservation so its rooms can be sold again
+    Expected payload: {"reservation_id": "RSV1"}
+    """
+    try:
+        data = request.get_json()
+        reservation_id = data.get("reservation_id") if isinstance(data, dict) else None
+        if not reservation_id:
+            return encoded_response(MISSING_RESERVATION_ID_BODY, 400)
+
+        reservation = INVENTORY.release(reservation_id)
+        if reservation is None:
+            return jsonify({
+                "status": "not_found",
+                "message": f"Reservation {reservation_id} not found",
+                "reservation_id": reservation_id
+            }), 404
+
+        print(f"[{SERVICE_NAME}] Released {reservation_id}")
+        return jsonify({
+            "status": "released",
+            "reservation_id": reservation_id,
+            "hotel_name": reservation.hotel_name,
+            "room_type": reservation.room_type,
+            "rooms": reservation.rooms
+        }), 200
+
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": f"Release error: {str(e)}"
         }), 500
 
+@app.route('/inventory/<hotel_name>/<room_type>', methods=['GET'])
+def room_inventory(hotel_name, room_type):
+    """Free rooms per night, e.g. /inventory/Grand Plaza/Suite?check_in=2026-02-15&check_out=2026-02-18"""
+    not_found = find_room(hotel_name, room_type)
+    if not_found:
+        return not_found
+
+    check_in = request.args.get("check_in")
+    check_out = request.args.get("check_out")
+    try:
+        nights = INVENTORY.nightly(hotel_name, room_type, check_in, check_out)
+    except InventoryError as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 400
+
+    return jsonify({
+        "status": "success",
+        "hotel_name": hotel_name,
+        "room_type": room_type,
+        "nights": [{"date": night, "available": count} for night, count in nights],
+        "min_available": min(count for _, count in nights)
+    })
+
+@app.route('/rates/<hotel_name>/<room_type>', methods=['GET'])
+def room_rates(hotel_name, room_type):
+    """Price per night and the stay's total, e.g. /rates/Grand Plaza/Suite?check_in=2026-02-15&check_out=2026-02-18"""
+    not_found = find_room(hotel_name, room_type)
+    if not_found:
+        return not_found
+
+    check_in = request.args.get("check_in")
+    check_out = request.args.get("check_out")
+    try:
+        start, end = INVENTORY.night_range(check_in, check_out)
+    except InventoryError as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 400
+
+    hotel = HOTELS_DATABASE[hotel_name]
+    rate = hotel["rooms"][room_type].get("rate", 0)
+    prices = RATE_PLANS.nightly(hotel_name, hotel.get("city"), room_type, rate, start, end)
+    total, discount = RATE_PLANS.quote(hotel_name, hotel.get("city"), room_type, rate, start, end)
+    return jsonify({
+        "status": "success",
+        "hotel_name": hotel_name,
+        "room_type": room_type,
+        "base_rate": rate,
+        "nights": [
+            {"date": date.fromordinal(INVENTORY.start_day + night).isoformat(), "rate": price}
+            for night, price in zip(range(start, end), prices)
+        ],
+        "stay_discount": discount,
+        "total_price": total,
+        "currency": "USD"
+    })
+
+@app.route('/rate-plans', methods=['GET'])
+def rate_plans():
+    """Rate plan rules in force and how many rooms and distinct price profiles have been computed"""
+    return jsonify({
+        "status": "success",
+        "path": RATE_PLANS_PATH or None,
+        "rate_plans": RATE_PLANS.describe()
+    })
+
+def search_parameter(name, convert, default, minimum, maximum=None):
+    """Query parameter converted and range-checked; raises ValueError with a message for the client"""
+    value = request.args.get(name)
+    if value in (None, ""):
+        return default
+    try:
+        value = convert(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number")
+    if value != value:  # NaN
+        raise ValueError(f"{name} must be a number")
+    if value < minimum or (maximum is not None and value > maximum):
+        limits = f"between {minimum} and {maximum}" if maximum is not None else f"at least {minimum}"
+        raise ValueError(f"{name} must be {limits}")
+    return value
+
+@app.route('/search', methods=['GET'])
+def search_hotels():
+    """
+    Rooms free for a whole stay, cheapest stay (total_price) first, in one call, e.g.
+    /search?city=Miami&check_in=2026-02-15&check_out=2026-02-18&max_rate=200&room_type=Deluxe
+    Optional: city, room_type, min_rate, max_rate (nightly catalogue rate, before
+    rate plans), rooms (default 1), limit (default 20, at most 100) and offset;
+    next_offset is null on the last page
+    """
+    check_in = request.args.get("check_in")
+    check_out = request.args.get("check_out")
+    if not check_in or not check_out:
+        return encoded_response(MISSING_SEARCH_DATES_BODY, 400)
+
+    try:
+        min_rate = search_parameter("min_rate", float, None, 0)
+        max_rate = search_parameter("max_rate", float, None, 0)
+        rooms = search_parameter("rooms", int, 1, 1)
+        limit = search_parameter("limit", int, SEARCH_DEFAULT_LIMIT, 1, SEARCH_MAX_LIMIT)
+        offset = search_parameter("offset", int, 0, 0)
+        nights, page, more = SEARCH_INDEX.search(
+            check_in, check_out, city=request.args.get("city"), room_type=request.args.get("room_type"),
+            min_rate=min_rate, max_rate=max_rate, rooms=rooms, offset=offset, limit=limit
+        )
+    except ValueError as e:  # InventoryError included
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 400
+
+    start, end = INVENTORY.night_range(check_in, check_out)
+    results = []
+    for hotel_name, room_type, rate, free in page:
+        city = HOTELS_DATABASE[hotel_name].get("city")
+        total, discount = RATE_PLANS.quote(hotel_name, city, room_type, rate, start, end)
+        results.append({
+            "hotel_name": hotel_name,
+            "city": city,
+            "room_type": room_type,
+            "room_rate": round(total / nights, 2),
+            "base_rate": rate,
+            "stay_discount": discount,
+            "total_price": total,
+            "available_rooms": free,
+            "currency": "USD"
+        })
+    return jsonify({
+        "status": "success",
+        "check_in": check_in,
+        "check_out": check_out,
+        "num_nights": nights,
+        "count": len(page),
+        "offset": offset,
+        "next_offset": offset + len(page) if more else None,
+        "results": results
+    })
+
+@app.route('/catalog', methods=['GET'])
+def catalog_info():
+    """The catalogue version being served and how many reloads succeeded or failed"""
+    describe = getattr(HOTELS_DATABASE, "describe", None)
+    return jsonify({
+        "status": "success",
+        "catalog": describe() if describe else {"hotels": len(HOTELS_DATABASE)},
+        "reloads": CATALOG_WATCHER.snapshot()
+    })
+
+@app.route('/cache-stats', methods=['GET'])
+def cache_stats():
+    """Availability cache size and hit/miss/invalidation counters"""
+    return jsonify({
+        "status": "success",
+        "availability_cache": AVAILABILITY_CACHE.stats(),
+        "hotels_etag": hotels_response()[1]
+    })
+
 if __name__ == '__main__':
     print("=" * 60)
     print("Starting Availability Service (Hotel Rooms)...")
@@ -195,6 +708,8 @@ if __name__ == '__main__':
     print(f"Service: {SERVICE_NAME}")
     print(f"Port: {SERVICE_PORT}")
     print(f"Local IP: {get_local_ip()}")
-    print(f"Hotels in database: {', '.join(HOTELS_DATABASE.keys())}")
+    print(f"Hotel catalogue: {len(HOTELS_DATABASE)} hotels from {CATALOG_PATH}")
+    print(f"Rate plans: {len(RATE_PLANS.names)} rules from {RATE_PLANS_PATH or '(none)'}")
     print("=" * 60)
-    app.run(host='0.0.0.0', port=SERVICE_PORT, debug=True)
+    start_catalog_watcher()
+    app.run(host='0.0.0.0', port=SERVICE_PORT, debug=DEBUG)
@@ -0,0 +1,100 @@
+"""
+Availability Response Cache - VCC-2
+TTL + LRU cache for /check-availability results
+Entries are indexed by (hotel, room type) and night range so a reserve or
+release only drops the cached answers whose stays overlap the changed nights
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class AvailabilityCache:
+    """Bounded LRU cache of normalized query -> (body, http_status) with expiry"""
+
+    def __init__(self, max_entries=4096, ttl_seconds=30, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries = OrderedDict()  # key -> (expires_at, room_key, start, end, value)
+        self._by_room = {}             # room_key -> {key, ...}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _drop(self, key):
+        _, room_key, _, _, _ = self._entries.pop(key)
+        keys = self._by_room.get(room_key)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_room[room_key]
+
+    def get(self, key):
+        """Return the cached value (refreshing its LRU position), or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= self._clock():
+                self._drop(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[4]
+
+    def put(self, key, room_key, nights, value, version, current_version):
+        """
+        Cache value for a stay covering nights [start, end) of room_key
+        version is the inventory version the value was computed from; if the
+        inventory has moved on since (current_version() differs) the value is
+        already stale and is not stored
+        """
+        start, end = nights
+        with self._lock:
+            if current_version() != version:
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (self._clock() + self.ttl_seconds, room_key, start, end, value)
+            self._by_room.setdefault(room_key, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def invalidate(self, room_key, start, end):
+        """Drop cached stays of room_key that overlap nights [start, end)"""
+        with self._lock:
+            for key in list(self._by_room.get(room_key, ())):
+                _, _, entry_start, entry_end, _ = self._entries[key]
+                if entry_start < end and start < entry_end:
+                    self._drop(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_room.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+            }
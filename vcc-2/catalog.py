@@ -0,0 +1,346 @@
+"""
+Hotel Catalog - VCC-2
+The hotel database as a memory-mapped, columnar binary file
+hotels.json is the editable source; it is compiled into hotels.cat, which
+is mapped read-only at startup, so no matter how many hotels there are
+nothing is parsed up front: pages are read in as hotels are looked up.
+Catalog reads like the old HOTELS_DATABASE dict ({name: {"city", "rooms":
+{room_type: {"available", "rate"}}}}) and builds a hotel's dict on first access
+File layout (little-endian, every column 8-byte aligned):
+  header      magic, format version, hotel/room/string counts, column offsets
+  strings     u32 offsets[strings + 1] into a UTF-8 blob (names, cities, room types)
+  hotels      u32 name[h], u32 city[h], u32 first_room[h + 1]; sorted by name bytes
+  rooms       u32 room_type[r], i32 available[r], f64 rate[r]
+A new file is written next to the old one and renamed over it, so a reader
+maps either the old version or the new one, never half of each
+CatalogWatcher reloads the catalog when the file (or its source) changes or
+on request (SIGHUP) and hands the new version over only once it is loaded
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from collections.abc import Mapping
+
+MAGIC = b"VCCCAT\x00\x01"
+FORMAT_VERSION = 1
+NO_STRING = 0xFFFFFFFF  # a hotel without a city
+HEADER = struct.Struct("<8sIIII8Q")  # magic, version, hotels, rooms, strings, 8 column offsets
+COLUMNS = ("string_offsets", "string_blob", "hotel_names", "hotel_cities", "hotel_rooms",
+           "room_types", "room_available", "room_rates")
+
+
+class CatalogError(ValueError):
+    """Raised for a file that is not a catalog this code can read"""
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+def write_catalog(hotels, path):
+    """Compile a hotel dict into a catalog file at path (atomically replacing any old one)"""
+    strings = []
+    string_ids = {}
+
+    def string_id(value):
+        if value is None:
+            return NO_STRING
+        if value not in string_ids:
+            string_ids[value] = len(strings)
+            strings.append(value)
+        return string_ids[value]
+
+    names, cities, first_rooms = [], [], [0]
+    room_types, available, rates = [], [], []
+    for hotel_name in sorted(hotels, key=lambda name: name.encode("utf-8")):
+        hotel = hotels[hotel_name]
+        names.append(string_id(hotel_name))
+        cities.append(string_id(hotel.get("city")))
+        for room_type, room_info in hotel.get("rooms", {}).items():
+            room_types.append(string_id(room_type))
+            available.append(int(room_info.get("available", 0)))
+            rates.append(float(room_info.get("rate", 0)))
+        first_rooms.append(len(room_types))
+
+    encoded = [value.encode("utf-8") for value in strings]
+    string_offsets = [0]
+    for value in encoded:
+        string_offsets.append(string_offsets[-1] + len(value))
+    sections = [
+        struct.pack(f"<{len(string_offsets)}I", *string_offsets),
+        b"".join(encoded),
+        struct.pack(f"<{len(names)}I", *names),
+        struct.pack(f"<{len(cities)}I", *cities),
+        struct.pack(f"<{len(first_rooms)}I", *first_rooms),
+        struct.pack(f"<{len(room_types)}I", *room_types),
+        struct.pack(f"<{len(available)}i", *available),
+        struct.pack(f"<{len(rates)}d", *rates)
+    ]
+    offsets = []
+    position = _align(HEADER.size)
+    for section in sections:
+        offsets.append(position)
+        position = _align(position + len(section))
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(names), len(room_types), len(strings), *offsets))
+        for offset, section in zip(offsets, sections):
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(section)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def file_identity(path):
+    """What changes when a file is replaced or rewritten; None if it does not exist"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+def load_catalog(path, source=None):
+    """
+    Map the catalog at path, first compiling it from the JSON source when
+    the catalog is missing or older than the source
+    """
+    if source is not None and os.path.exists(source):
+        if not os.path.exists(path) or os.stat(path).st_mtime_ns < os.stat(source).st_mtime_ns:
+            with open(source) as f:
+                write_catalog(json.load(f), path)
+    return Catalog(path)
+
+
+class Catalog(Mapping):
+    """Read-only hotel mapping over a mapped catalog file"""
+
+    def __init__(self, path):
+        if sys.byteorder != "little":
+            raise CatalogError("catalog files are little-endian")
+        self.path = path
+        with open(path, "rb") as f:
+            self.identity = file_identity(path)
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._map)
+        if len(view) < HEADER.size:
+            raise CatalogError(f"{path} is too short to be a catalog")
+        magic, version, self.hotel_count, self.room_count, string_count, *offsets = HEADER.unpack_from(view)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise CatalogError(f"{path} is not a version {FORMAT_VERSION} hotel catalog")
+        sizes = {
+            "string_offsets": (string_count + 1) * 4, "hotel_names": self.hotel_count * 4,
+            "hotel_cities": self.hotel_count * 4, "hotel_rooms": (self.hotel_count + 1) * 4,
+            "room_types": self.room_count * 4, "room_available": self.room_count * 4,
+            "room_rates": self.room_count * 8
+        }
+        columns = dict(zip(COLUMNS, offsets))
+        self._string_offsets = self._column(view, columns["string_offsets"], sizes["string_offsets"], "I")
+        self._blob = view[columns["string_blob"]:columns["string_blob"] + self._string_offsets[-1]]
+        self._names = self._column(view, columns["hotel_names"], sizes["hotel_names"], "I")
+        self._cities = self._column(view, columns["hotel_cities"], sizes["hotel_cities"], "I")
+        self._first_rooms = self._column(view, columns["hotel_rooms"], sizes["hotel_rooms"], "I")
+        self._room_types = self._column(view, columns["room_types"], sizes["room_types"], "I")
+        self._available = self._column(view, columns["room_available"], sizes["room_available"], "i")
+        self._rates = self._column(view, columns["room_rates"], sizes["room_rates"], "d")
+        self.loaded_at = time.time()
+        self._positions = {}  # hotel name -> position, filled as names are looked up
+        self._hotels = {}     # position -> hotel dict, built on first access
+        self._shared = {}     # string id -> str for cities and room types
+
+    def _column(self, view, offset, size, fmt):
+        if offset + size > len(view):
+            raise CatalogError(f"{self.path} is truncated")
+        return view[offset:offset + size].cast(fmt)
+
+    def _string(self, string_id):
+        return str(self._blob[self._string_offsets[string_id]:self._string_offsets[string_id + 1]], "utf-8")
+
+    def _shared_string(self, string_id):
+        if string_id == NO_STRING:
+            return None
+        value = self._shared.get(string_id)
+        if value is None:
+            value = self._shared[string_id] = self._string(string_id)
+        return value
+
+    def _name_bytes(self, position):
+        string_id = self._names[position]
+        return bytes(self._blob[self._string_offsets[string_id]:self._string_offsets[string_id + 1]])
+
+    def _position(self, hotel_name):
+        """Binary search of the sorted name column; None if the hotel is not in the catalog"""
+        position = self._positions.get(hotel_name)
+        if position is not None or not isinstance(hotel_name, str):
+            return position
+        key = hotel_name.encode("utf-8")
+        low, high = 0, self.hotel_count
+        while low < high:
+            middle = (low + high) // 2
+            if self._name_bytes(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.hotel_count and self._name_bytes(low) == key:
+            self._positions[hotel_name] = low
+            return low
+        return None
+
+    def _hotel(self, position):
+        hotel = self._hotels.get(position)
+        if hotel is None:
+            hotel = self._hotels[position] = {
+                "city": self._shared_string(self._cities[position]),
+                "rooms": {
+                    self._shared_string(self._room_types[room]): {
+                        "available": self._available[room], "rate": self._rates[room]
+                    }
+                    for room in range(self._first_rooms[position], self._first_rooms[position + 1])
+                }
+            }
+        return hotel
+
+    def __getitem__(self, hotel_name):
+        position = self._position(hotel_name)
+        if position is None:
+            raise KeyError(hotel_name)
+        return self._hotel(position)
+
+    def __contains__(self, hotel_name):
+        return self._position(hotel_name) is not None
+
+    def __iter__(self):
+        for position in range(self.hotel_count):
+            yield self._string(self._names[position])
+
+    def __len__(self):
+        return self.hotel_count
+
+    def hotel_rows(self):
+        """(name, city, [room types]) of every hotel, straight from the columns"""
+        for position in range(self.hotel_count):
+            yield (
+                self._string(self._names[position]),
+                self._shared_string(self._cities[position]),
+                [self._shared_string(self._room_types[room])
+                 for room in range(self._first_rooms[position], self._first_rooms[position + 1])]
+            )
+
+    def room_rows(self):
+        """(hotel name, city, room type, available, rate) of every room type, straight from the columns"""
+        for position in range(self.hotel_count):
+            hotel_name = self._string(self._names[position])
+            city = self._shared_string(self._cities[position])
+            for room in range(self._first_rooms[position], self._first_rooms[position + 1]):
+                yield hotel_name, city, self._shared_string(self._room_types[room]), \
+                    self._available[room], self._rates[room]
+
+    def describe(self):
+        return {
+            "path": self.path,
+            "hotels": self.hotel_count,
+            "room_types": self.room_count,
+            "bytes": len(self._map),
+            "loaded_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.loaded_at))
+        }
+
+
+def hotel_rows(hotels):
+    """(name, city, [room types]) of a Catalog or a plain hotel dict"""
+    if isinstance(hotels, Catalog):
+        return hotels.hotel_rows()
+    return ((name, hotel.get("city"), list(hotel.get("rooms", {}))) for name, hotel in hotels.items())
+
+
+def room_rows(hotels):
+    """(hotel name, city, room type, available, rate) of a Catalog or a plain hotel dict"""
+    if isinstance(hotels, Catalog):
+        return hotels.room_rows()
+    return (
+        (hotel_name, hotel.get("city"), room_type, room_info.get("available", 0), room_info.get("rate", 0))
+        for hotel_name, hotel in hotels.items()
+        for room_type, room_info in hotel.get("rooms", {}).items()
+    )
+
+
+class CatalogWatcher:
+    """
+    Background reloader: every poll_seconds, or at once after
+    request_reload(), a changed catalog (or source) is loaded and passed to
+    install(catalog); until install returns the old version keeps serving.
+    A catalog that fails to load is reported and the old one kept
+    """
+
+    def __init__(self, path, source, current, install, poll_seconds=2.0):
+        self.path = path
+        self.source = source
+        self.install = install
+        self.poll_seconds = poll_seconds
+        self.reloads = 0
+        self.failures = 0
+        self.last_error = None
+        self._seen = self._identities(current)
+        self._wake = threading.Event()
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _identities(self, catalog=None):
+        return (catalog.identity if catalog is not None else file_identity(self.path),
+                file_identity(self.source) if self.source else None)
+
+    def request_reload(self):
+        """Reload on the watcher thread even if nothing changed (safe to call from a signal handler)"""
+        self._seen = None
+        self._wake.set()
+
+    def start(self):
+        # Threads do not survive fork(), so each worker process starts its own
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+        threading.Thread(target=self._watch_forever, name="catalog-watcher", daemon=True).start()
+
+    def _watch_forever(self):
+        while True:
+            self.check()
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+
+    def check(self):
+        """Reload if the files changed since the last load; returns the new catalog or None"""
+        seen = self._identities()
+        if seen == self._seen:
+            return None
+        try:
+            catalog = load_catalog(self.path, self.source)
+            self.install(catalog)
+        except Exception as e:
+            self.failures += 1
+            self.last_error = f"{type(e).__name__}: {e}"
+            self._seen = seen  # do not retry a broken file until it changes again
+            print(f"[Catalog] Reload of {self.path} failed, keeping the loaded version: {self.last_error}")
+            return None
+        self._seen = self._identities(catalog)
+        self.reloads += 1
+        return catalog
+
+    def snapshot(self):
+        return {"poll_seconds": self.poll_seconds, "reloads": self.reloads,
+                "failures": self.failures, "last_error": self.last_error}
+
+
+if __name__ == "__main__":
+    # python catalog.py hotels.json hotels.cat
+    if len(sys.argv) != 3:
+        sys.exit("usage: python catalog.py SOURCE.json CATALOG.cat")
+    with open(sys.argv[1]) as f:
+        write_catalog(json.load(f), sys.argv[2])
+    print(f"Wrote {Catalog(sys.argv[2]).describe()}")
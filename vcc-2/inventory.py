@@ -0,0 +1,462 @@
+"""
+Room Inventory - VCC-2
+Per-night room counts for every (hotel, room type) over a booking horizon
+that rolls forward a day at a time
+Each room type keeps its nightly counts in a compact array-backed segment tree
+(range add, range minimum), so "is a room free for every night of the stay" and
+reserve/release are O(log nights) instead of a loop over the nights
+Held reservations are compact slotted records that share their room key and
+keep night offsets instead of date strings
+A room type's counts are built the first time it is asked about, so a large
+catalogue costs nothing at startup for the rooms nobody books
+A reservation with a reference (the booking ID) is idempotent: reserving
+the same stay under the same reference again returns the first reservation,
+so a retried /reserve never takes a second room. A reservation may be taken
+as a hold that lapses after a TTL unless it is confirmed; hold deadlines live in a TimerWheel, and a background thread
+releases lapsed holds as their ticks come round
+"""
+
+import itertools
+import os
+import threading
+import time
+from array import array
+from datetime import date
+
+from pricing import day_index
+from timer_wheel import TimerWheel
+
+NO_NIGHT = 2 ** 31 - 1  # padding leaves beyond the horizon never win a min()
+HOLD_TICK_SECONDS = 0.25  # hold expiry resolution (and how often the expiry thread wakes)
+HOLD_WHEEL_BUCKETS = 512  # one revolution of the wheel = 128 s
+
+
+class InventoryError(ValueError):
+    """Raised for stays the inventory cannot answer (bad or out-of-horizon dates)"""
+
+
+class NightlyCounts:
+    """
+    Free rooms per night for one room type
+    Bottom-up segment tree over `nights` leaves: _tree[p] is the minimum of
+    p's subtree including pending adds, _pending[p] is an add not yet pushed
+    to p's children. Both live in flat int32 arrays
+    Leaf 0 is night `first` of the inventory (see Inventory.roll)
+    """
+
+    __slots__ = ("nights", "first", "_size", "_height", "_tree", "_pending")
+
+    def __init__(self, nights, capacity, first=0, counts=()):
+        size = 1
+        while size < nights:
+            size *= 2
+        self.nights = nights
+        self.first = first
+        self._size = size
+        self._height = size.bit_length()
+        self._tree = array("i", [NO_NIGHT]) * (2 * size)
+        self._pending = array("i", [0]) * size
+        for night in range(nights):
+            self._tree[size + night] = capacity
+        for night, count in enumerate(counts):  # the first nights' counts, when given
+            self._tree[size + night] = count
+        for p in range(size - 1, 0, -1):
+            self._tree[p] = min(self._tree[2 * p], self._tree[2 * p + 1])
+
+    def _apply(self, p, value):
+        self._tree[p] += value
+        if p < self._size:
+            self._pending[p] += value
+
+    def _rebuild(self, p):
+        tree = self._tree
+        while p > 1:
+            p >>= 1
+            tree[p] = min(tree[2 * p], tree[2 * p + 1]) + self._pending[p]
+
+    def _push(self, p):
+        for shift in range(self._height, 0, -1):
+            node = p >> shift
+            if node and self._pending[node]:
+                self._apply(2 * node, self._pending[node])
+                self._apply(2 * node + 1, self._pending[node])
+                self._pending[node] = 0
+
+    def add(self, start, end, value):
+        """Add value to every night in [start, end)"""
+        left, right = start + self._size, end + self._size
+        first, last = left, right - 1
+        while left < right:
+            if left & 1:
+                self._apply(left, value)
+                left += 1
+            if right & 1:
+                right -= 1
+                self._apply(right, value)
+            left >>= 1
+            right >>= 1
+        self._rebuild(first)
+        self._rebuild(last)
+
+    def min(self, start, end):
+        """Fewest free rooms on any night in [start, end)"""
+        left, right = start + self._size, end + self._size
+        self._push(left)
+        self._push(right - 1)
+        result = NO_NIGHT
+        tree = self._tree
+        while left < right:
+            if left & 1:
+                result = min(result, tree[left])
+                left += 1
+            if right & 1:
+                right -= 1
+                result = min(result, tree[right])
+            left >>= 1
+            right >>= 1
+        return result
+
+    def counts(self, start, end):
+        """Free rooms for each night in [start, end)"""
+        return [self.min(night, night + 1) for night in range(start, end)]
+
+    def shifted(self, days, capacity):
+        """A copy `days` nights later: the first nights drop off and as many new ones start at capacity"""
+        kept = self.counts(days, self.nights) if days < self.nights else []
+        return NightlyCounts(self.nights, capacity, self.first + days, kept)
+
+
+class Reservation:
+    """Rooms held for nights [start, end) of one room type; dates are formatted on access"""
+
+    __slots__ = ("seq", "key", "start", "end", "rooms", "reference", "start_day", "expires_at")
+
+    def __init__(self, seq, key, start, end, rooms, reference, start_day, expires_at=None):
+        self.seq = seq
+        self.key = key              # the inventory's own (hotel_name, room_type) tuple
+        self.start = start
+        self.end = end
+        self.rooms = rooms
+        self.reference = reference
+        self.start_day = start_day  # ordinal of night 0, shared with the inventory (it never moves)
+        self.expires_at = expires_at  # monotonic deadline of an unconfirmed hold, None once confirmed
+
+    @property
+    def state(self):
+        return "held" if self.expires_at is not None else "confirmed"
+
+    @property
+    def reservation_id(self):
+        return f"RSV{self.seq}"
+
+    @property
+    def hotel_name(self):
+        return self.key[0]
+
+    @property
+    def room_type(self):
+        return self.key[1]
+
+    @property
+    def nights(self):
+        return self.start, self.end
+
+    @property
+    def check_in(self):
+        return date.fromordinal(self.start_day + self.start).isoformat()
+
+    @property
+    def check_out(self):
+        return date.fromordinal(self.start_day + self.end).isoformat()
+
+
+def reservation_seq(reservation_id):
+    """RSV12 -> 12, or None if the ID is malformed"""
+    if isinstance(reservation_id, str) and reservation_id.startswith("RSV") and reservation_id[3:].isdigit():
+        return int(reservation_id[3:])
+    return None
+
+
+class Inventory:
+    """
+    Nightly inventory for a hotel database (a dict or a catalog.Catalog)
+    Every room type starts with its `available` count (or `capacity`, for
+    all of them) free on each night of [start_date, start_date + horizon_days).
+    reserve() and release() are atomic per room type; version() changes
+    whenever a room type's counts do, and listeners are told which nights changed
+    A hold (reserve with hold_seconds) takes the rooms like any reservation
+    but is released automatically unless confirm() is called in time
+    Nights are numbered from start_date for good; roll() moves the horizon
+    to a later first night (first_night) without renumbering them
+    """
+
+    def __init__(self, hotels, start_date, horizon_days, capacity=None, clock=time.monotonic):
+        self.start_day = date.fromisoformat(start_date).toordinal()
+        self.first_night = 0  # night number of the horizon's first night
+        self.horizon_days = horizon_days
+        self._hotels = hotels
+        self._capacity = capacity
+        self._rooms = {}       # key -> NightlyCounts, created on first use
+        self._locks = {}
+        self._versions = {}
+        self._capacities = {}  # key -> rooms per night the counts were built with
+        self._keys = {}        # (hotel_name, room_type) -> the shared key tuple, published last
+        self._create_lock = threading.Lock()
+        self._reservations = {}  # seq -> Reservation
+        self._references = {}    # reference -> seq of its live reservation
+        self._reservations_lock = threading.Lock()  # also guards _holds and _references
+        self._holds = TimerWheel(HOLD_TICK_SECONDS, HOLD_WHEEL_BUCKETS, clock)
+        self._expiry_pid = None
+        self.holds_expired = 0
+        self._ids = itertools.count(1)
+        self._listeners = []
+
+    def add_listener(self, listener):
+        """Call listener((hotel_name, room_type), start, end) after nights [start, end) change"""
+        self._listeners.append(listener)
+
+    def _notify(self, key, start, end):
+        for listener in self._listeners:
+            listener(key, start, end)
+
+    def _room_capacity(self, room_info):
+        return room_info.get("available", 0) if self._capacity is None else self._capacity
+
+    def _key(self, hotel_name, room_type):
+        """The shared key of a room type, building its counts on first use; KeyError if it is not in the catalogue"""
+        key = self._keys.get((hotel_name, room_type))
+        if key is not None:
+            return key
+        capacity = self._room_capacity(self._hotels[hotel_name]["rooms"][room_type])
+        with self._create_lock:
+            key = self._keys.get((hotel_name, room_type))
+            if key is None:
+                key = (hotel_name, room_type)
+                self._rooms[key] = NightlyCounts(self.horizon_days, capacity, self.first_night)
+                self._locks[key] = threading.Lock()
+                self._versions[key] = 0
+                self._capacities[key] = capacity
+                self._keys[key] = key
+        return key
+
+    def set_hotels(self, hotels):
+        """
+        Switch to a new version of the hotel database. Counts already built
+        keep their reservations, shifted on every night by any change in the
+        room type's size; room types dropped from the catalogue keep theirs,
+        so their reservations can still be released
+        """
+        changed = []
+        with self._create_lock:
+            self._hotels = hotels
+            for key in list(self._keys.values()):
+                hotel = hotels.get(key[0])
+                room_info = hotel.get("rooms", {}).get(key[1]) if hotel is not None else None
+                if room_info is None:
+                    continue
+                delta = self._room_capacity(room_info) - self._capacities[key]
+                if delta:
+                    with self._locks[key]:
+                        self._rooms[key].add(0, self.horizon_days, delta)
+                        self._versions[key] += 1
+                        self._capacities[key] += delta
+                    changed.append(key)
+        for key in changed:
+            self._notify(key, self.first_night, self.first_night + self.horizon_days)
+        return changed
+
+    def roll(self, start_date):
+        """
+        Move the horizon on to start at start_date (a later day): the nights
+        before it are dropped, and as many nights at the end open with every
+        room free. Reservations keep their rooms on the nights left. Returns
+        the number of nights the horizon moved
+        """
+        first_night = date.fromisoformat(start_date).toordinal() - self.start_day
+        with self._create_lock:
+            days = first_night - self.first_night
+            if days <= 0:
+                return 0
+            rolled = []
+            for key in list(self._keys.values()):
+                with self._locks[key]:
+                    self._rooms[key] = self._rooms[key].shifted(days, self._capacities[key])
+                    self._versions[key] += 1
+                rolled.append(key)
+            # Published last: a stay checked against the old horizon meanwhile is clipped by _leaves
+            self.first_night = first_night
+        for key in rolled:
+            self._notify(key, first_night - days, first_night + self.horizon_days)
+        return days
+
+    @staticmethod
+    def _leaves(nightly, start, end):
+        # Called with the room key's lock held: nights [start, end) as leaves
+        # of its counts, less any night the horizon has rolled past
+        return max(start - nightly.first, 0), max(min(end - nightly.first, nightly.nights), 0)
+
+    def night_range(self, check_in, check_out):
+        """
+        Map a stay to [start, end) night offsets within the horizon
+        Like calculate_nights, a stay is always at least one night
+        """
+        first = day_index(check_in)
+        last = day_index(check_out)
+        if not first or not last:
+            raise InventoryError("Invalid dates. Use YYYY-MM-DD for check_in and check_out")
+        start = first - self.start_day
+        end = start + max(1, last - first)
+        first_night = self.first_night
+        if start < first_night or end > first_night + self.horizon_days:
+            horizon_start = date.fromordinal(self.start_day + first_night).isoformat()
+            horizon_end = date.fromordinal(self.start_day + first_night + self.horizon_days - 1).isoformat()
+            raise InventoryError(f"Dates outside bookable range {horizon_start} to {horizon_end}")
+        return start, end
+
+    def version(self, hotel_name, room_type):
+        return self._versions.get((hotel_name, room_type), 0)
+
+    def available(self, hotel_name, room_type, check_in, check_out):
+        """Rooms free on every night of the stay"""
+        start, end = self.night_range(check_in, check_out)
+        return self.free_rooms((hotel_name, room_type), start, end)
+
+    def free_rooms(self, key, start, end):
+        """Rooms of key = (hotel_name, room_type) free on every night in [start, end)"""
+        key = self._key(*key)
+        with self._locks[key]:
+            nightly = self._rooms[key]
+            start, end = self._leaves(nightly, start, end)
+            return nightly.min(start, end) if start < end else 0
+
+    def nightly(self, hotel_name, room_type, check_in, check_out):
+        """Free rooms per night as [(date, count), ...]"""
+        key = self._key(hotel_name, room_type)
+        start, end = self.night_range(check_in, check_out)
+        with self._locks[key]:
+            nightly = self._rooms[key]
+            first, last = self._leaves(nightly, start, end)
+            counts = nightly.counts(first, last)
+        first_day = self.start_day + nightly.first + first
+        return [
+            (date.fromordinal(first_day + offset).isoformat(), count)
+            for offset, count in enumerate(counts)
+        ]
+
+    def reserve(self, hotel_name, room_type, check_in, check_out, rooms=1, reference=None, hold_seconds=None):
+        """
+        Atomically take `rooms` rooms for every night of the stay
+        Returns the Reservation, or None if any night is short of rooms
+        With hold_seconds the reservation is a hold, released after that long
+        unless it is confirmed
+        A reference that already has a live reservation gets that reservation
+        back when it is for the same stay; raises InventoryError if it is not
+        """
+        if reference is not None and not isinstance(reference, str):
+            raise InventoryError("booking_id must be a string")
+        key = self._key(hotel_name, room_type)
+        start, end = self.night_range(check_in, check_out)
+        with self._locks[key]:
+            if reference is not None:
+                with self._reservations_lock:
+                    existing = self._reservations.get(self._references.get(reference))
+                if existing is not None:
+                    if (existing.key, existing.nights, existing.rooms) != (key, (start, end), rooms):
+                        raise InventoryError(
+                            f"Booking {reference} already has a different reservation ({existing.reservation_id})"
+                        )
+                    return existing
+            nightly = self._rooms[key]
+            first, last = self._leaves(nightly, start, end)
+            if last - first != end - start:  # the horizon rolled past the first night meanwhile
+                raise InventoryError("Dates outside bookable range")
+            if nightly.min(first, last) < rooms:
+                return None
+            nightly.add(first, last, -rooms)
+            self._versions[key] += 1
+            reservation = Reservation(next(self._ids), key, start, end, rooms, reference, self.start_day)
+            with self._reservations_lock:
+                self._reservations[reservation.seq] = reservation
+                if reference is not None:
+                    self._references[reference] = reservation.seq
+                if hold_seconds is not None:
+                    reservation.expires_at = self._holds.now() + hold_seconds
+                    self._holds.schedule(reservation.seq, reservation.expires_at)
+                    self._start_expiry()
+        self._notify(key, start, end)
+        return reservation
+
+    def confirm(self, reservation_id):
+        """
+        Make a hold permanent; returns the reservation, or None if it is
+        unknown, released or already lapsed. Confirming twice is harmless
+        """
+        with self._reservations_lock:
+            reservation = self._reservations.get(reservation_seq(reservation_id))
+            if reservation is not None and reservation.expires_at is not None:
+                self._holds.cancel(reservation.seq)
+                reservation.expires_at = None
+        return reservation
+
+    def release(self, reservation_id):
+        """Give a reservation's rooms back; returns it, or None if unknown"""
+        with self._reservations_lock:
+            seq = reservation_seq(reservation_id)
+            reservation = self._reservations.pop(seq, None)
+            self._holds.cancel(seq)
+            if reservation is not None:
+                self._forget_reference(reservation)
+        if reservation is None:
+            return None
+        self._restore(reservation)
+        return reservation
+
+    def _forget_reference(self, reservation):
+        # Called with _reservations_lock held; the booking may reserve afresh after this
+        if reservation.reference is not None and self._references.get(reservation.reference) == reservation.seq:
+            del self._references[reservation.reference]
+
+    def _restore(self, reservation):
+        key = reservation.key
+        start, end = reservation.nights
+        with self._locks[key]:
+            nightly = self._rooms[key]
+            first, last = self._leaves(nightly, start, end)
+            if first >= last:
+                return  # every night of it is past
+            nightly.add(first, last, reservation.rooms)
+            self._versions[key] += 1
+        self._notify(key, start, end)
+
+    def expire_holds(self, now=None):
+        """Release every hold whose deadline has passed; returns the lapsed reservations"""
+        with self._reservations_lock:
+            expired = [self._reservations.pop(seq) for seq in self._holds.advance(now)]
+            for reservation in expired:
+                self._forget_reference(reservation)
+            self.holds_expired += len(expired)
+        for reservation in expired:
+            self._restore(reservation)
+        return expired
+
+    def holds(self):
+        """Holds taken and not yet confirmed, released or lapsed"""
+        with self._reservations_lock:
+            return len(self._holds)
+
+    def _start_expiry(self):
+        # Called with _reservations_lock held; threads do not survive fork(),
+        # so an inventory built before a preloading server forks starts it here
+        if self._expiry_pid == os.getpid():
+            return
+        self._expiry_pid = os.getpid()
+        threading.Thread(target=self._expire_forever, name="hold-expiry", daemon=True).start()
+
+    def _expire_forever(self):
+        while True:
+            time.sleep(self._holds.tick_seconds)
+            try:
+                for reservation in self.expire_holds():
+                    print(f"[Inventory] Hold {reservation.reservation_id} lapsed, rooms released")
+            except Exception as e:
+                print(f"[Inventory] Hold expiry failed: {e}")
@@ -0,0 +1,151 @@
+"""
+Availability Quotes - VCC-2
+Prices one or many availability queries in a single column-oriented pass
+Queries are validated one by one, then nights and totals are computed over
+whole columns instead of per request. Free rooms come from the nightly
+inventory, totals from the rate plans (rates.RatePlans.quote_many) when
+there are any. The columns are plain Python arrays and lists: a batch holds
+at most a few hundred stays, too few for an array library to pay off
+"""
+
+from array import array
+from datetime import datetime
+from functools import lru_cache
+
+REQUIRED_FIELDS = ["hotel_name", "check_in", "check_out", "room_type"]
+
+
+@lru_cache(maxsize=4096)
+def _parse_day(date_str):
+    try:
+        return datetime.strptime(date_str, "%Y-%m-%d").toordinal()
+    except ValueError:
+        return 0
+
+
+def day_index(date_str):
+    """Memoized 'YYYY-MM-DD' -> proleptic ordinal day; 0 if it does not parse"""
+    if not isinstance(date_str, str):
+        return 0
+    return _parse_day(date_str)
+
+
+def _resolve(query, hotels):
+    """
+    Validate a single query against the hotel database
+    Returns (hotel, room_info, None) or (None, None, (error_body, http_status))
+    """
+    if not isinstance(query, dict) or not all(field in query for field in REQUIRED_FIELDS):
+        return None, None, ({
+            "status": "error",
+            "message": "Missing required fields",
+            "required_fields": REQUIRED_FIELDS
+        }, 400)
+
+    if not all(isinstance(query[field], str) for field in REQUIRED_FIELDS):
+        return None, None, ({
+            "status": "error",
+            "available": False,
+            "message": f"{', '.join(REQUIRED_FIELDS)} must be strings"
+        }, 400)
+
+    hotel_name = query.get("hotel_name")
+    room_type = query.get("room_type")
+    if hotel_name not in hotels:
+        return None, None, ({
+            "status": "not_found",
+            "available": False,
+            "message": f"Hotel '{hotel_name}' not found in system",
+            "available_hotels": list(hotels.keys())
+        }, 404)
+
+    hotel = hotels[hotel_name]
+    if room_type not in hotel.get("rooms", {}):
+        return None, None, ({
+            "status": "not_found",
+            "available": False,
+            "message": f"Room type '{room_type}' not available at {hotel_name}",
+            "available_room_types": list(hotel.get("rooms", {}).keys())
+        }, 404)
+
+    return hotel, hotel["rooms"][room_type], None
+
+
+def quote_batch(queries, hotels, inventory, rates=None):
+    """
+    Quote a list of availability queries
+    Returns a list of (body, http_status) in request order; invalid items
+    carry the same error body the single /check-availability call returns
+    Without rates every night costs the room's catalogue rate
+    """
+    results = [None] * len(queries)
+    timestamp = datetime.now().isoformat()
+
+    # Pass 1: resolve each query and gather the priced items into columns
+    positions = []
+    starts = array("l")
+    ends = array("l")
+    base_rates = array("d")
+    counts = array("l")
+    rooms = []
+    for position, query in enumerate(queries):
+        hotel, room_info, error = _resolve(query, hotels)
+        if error is not None:
+            results[position] = error
+            continue
+        try:
+            start, end = inventory.night_range(query["check_in"], query["check_out"])
+        except ValueError as e:
+            results[position] = ({"status": "error", "available": False, "message": str(e)}, 400)
+            continue
+        positions.append(position)
+        starts.append(start)
+        ends.append(end)
+        base_rates.append(room_info.get("rate", 0))
+        rooms.append((query["hotel_name"], hotel.get("city"), query["room_type"]))
+        counts.append(inventory.free_rooms((query["hotel_name"], query["room_type"]), start, end))
+
+    # Pass 2: nights and totals over whole columns
+    nights = [end - start for start, end in zip(starts, ends)]
+    if rates is None:
+        totals = [rate * n for rate, n in zip(base_rates, nights)]
+        discounts = [0.0] * len(positions)
+    else:
+        totals, discounts = rates.quote_many(rooms, base_rates, starts, ends)
+
+    # Pass 3: build per-item responses
+    for column, position in enumerate(positions):
+        query = queries[position]
+        hotel_name = query.get("hotel_name")
+        room_type = query.get("room_type")
+        if counts[column] < 1:
+            results[position] = ({
+                "status": "unavailable",
+                "available": False,
+                "hotel_name": hotel_name,
+                "room_type": room_type,
+                "check_in": query.get("check_in"),
+                "check_out": query.get("check_out"),
+                "message": f"No {room_type} rooms available for the selected dates"
+            }, 200)
+            continue
+        results[position] = ({
+            "status": "success",
+            "available": True,
+            "hotel_name": hotel_name,
+            "city": hotels[hotel_name].get("city"),
+            "room_type": room_type,
+            "check_in": query.get("check_in"),
+            "check_out": query.get("check_out"),
+            "num_nights": nights[column],
+            "num_guests": query.get("num_guests", 1),
+            "room_rate": round(totals[column] / nights[column], 2),  # average nightly price of the stay
+            "base_rate": base_rates[column],
+            "stay_discount": discounts[column],
+            "total_price": totals[column],
+            "available_rooms": counts[column],
+            "currency": "USD",
+            "timestamp": timestamp
+        }, 200)
+
+    return results
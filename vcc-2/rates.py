@@ -0,0 +1,264 @@
+"""
+Rate Plans - VCC-2
+Nightly prices from seasonal, weekend and length-of-stay rate plans
+A room's price for a night is its catalogue rate times the multiplier of
+every seasonal and weekend rule covering that night; a stay of at least a
+rule's min_nights then gets that rule's discount on the whole stay
+Quoting a stay is O(1): the multipliers of one set of rules are laid out
+once per night over the inventory horizon as a prefix-sum array, so a stay
+of nights [start, end) costs rate * (prefix[end] - prefix[start]). Rooms
+that match the same rules (usually most of the catalogue) share the array
+quote_many() prices a whole column of stays: each room is looked up once,
+then every total is one subtraction and one multiplication
+When the horizon rolls on, extend() rebuilds the arrays to the new last night
+rate_plans.json:
+  {"weekend": [{"nights": ["friday", "saturday"], "multiplier": 1.15}],
+   "seasons": [{"name": "Summer", "start": "2026-06-15", "end": "2026-09-01",
+                "multiplier": 1.25, "cities": ["Miami"]}],
+   "length_of_stay": [{"min_nights": 7, "discount": 0.1}]}
+A season covers the nights from start up to (not including) end. Any rule
+may be narrowed with "hotels", "cities" and "room_types" lists
+"""
+
+import json
+import threading
+from array import array
+from datetime import date
+
+from pricing import day_index
+
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+SCOPES = ("hotels", "cities", "room_types")
+
+
+class RatePlanError(ValueError):
+    """Raised for a rate plan file that cannot be used"""
+
+
+def _scope(rule, where):
+    scope = []
+    for field in SCOPES:
+        values = rule.get(field)
+        if values is None:
+            scope.append(None)
+        elif isinstance(values, list) and all(isinstance(value, str) for value in values):
+            scope.append(frozenset(values))
+        else:
+            raise RatePlanError(f"{where}: {field} must be a list of names")
+    return tuple(scope)
+
+
+def _number(rule, field, where, low, high):
+    value = rule.get(field)
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not low <= value <= high:
+        raise RatePlanError(f"{where}: {field} must be a number between {low} and {high}")
+    return value
+
+
+def _matches(scope, hotel_name, city, room_type):
+    return all(allowed is None or value in allowed
+               for allowed, value in zip(scope, (hotel_name, city, room_type)))
+
+
+def load_rate_plans(path):
+    """Read and validate a rate plan file (see the module docstring); raises RatePlanError"""
+    try:
+        with open(path) as f:
+            plans = json.load(f)
+    except (OSError, ValueError) as e:
+        raise RatePlanError(f"Cannot read rate plans from {path}: {e}")
+    if not isinstance(plans, dict):
+        raise RatePlanError(f"{path}: rate plans must be a JSON object")
+    return plans
+
+
+class RatePlans:
+    """
+    Rate plans compiled against the inventory horizon
+    [start_date, start_date + horizon_days); quotes take night offsets from
+    Inventory.night_range. A room's prefix sums and discount tiers are looked
+    up on its first quote
+    Nights are numbered from start_date like the inventory's; extend() prices
+    further nights as the inventory's horizon rolls on
+    """
+
+    def __init__(self, plans, start_date, horizon_days):
+        self.start_day = date.fromisoformat(start_date).toordinal()
+        self.horizon_days = horizon_days
+        self._rules = []      # (scope, nights(horizon_days) -> the nights it covers, multiplier)
+        self._discounts = []  # (scope, min_nights, discount)
+        self.names = []
+        for i, rule in enumerate(plans.get("weekend", [])):
+            self._add_weekend(rule, f"weekend[{i}]")
+        for i, rule in enumerate(plans.get("seasons", [])):
+            self._add_season(rule, f"seasons[{i}]")
+        for i, rule in enumerate(plans.get("length_of_stay", [])):
+            where = f"length_of_stay[{i}]"
+            if not isinstance(rule, dict):
+                raise RatePlanError(f"{where} must be an object")
+            min_nights = _number(rule, "min_nights", where, 1, horizon_days)
+            discount = _number(rule, "discount", where, 0, 1)
+            self._discounts.append((_scope(rule, where), int(min_nights), discount))
+            self.names.append(rule.get("name") or f"{int(min_nights)}+ nights -{discount:.0%}")
+        self._lock = threading.Lock()
+        self._profiles = {}  # matching rule positions -> prefix sums of the nightly multiplier
+        self._tiers = {}     # matching discount positions -> discount by length of stay
+        self._rooms = {}     # (hotel_name, room_type) -> (prefix sums, discount by length of stay)
+
+    def _add_weekend(self, rule, where):
+        if not isinstance(rule, dict):
+            raise RatePlanError(f"{where} must be an object")
+        nights = rule.get("nights")
+        if not isinstance(nights, list) or not nights or any(
+                not isinstance(night, str) or night.lower() not in WEEKDAYS for night in nights):
+            raise RatePlanError(f"{where}: nights must be a list of weekday names, e.g. [\"friday\", \"saturday\"]")
+        weekdays = {WEEKDAYS.index(night.lower()) for night in nights}
+        multiplier = _number(rule, "multiplier", where, 0, 100)
+        first_weekday = date.fromordinal(self.start_day).weekday()
+        offsets = [(weekday - first_weekday) % 7 for weekday in weekdays]
+
+        def covered(horizon_days):
+            return (night for offset in offsets for night in range(offset, horizon_days, 7))
+
+        self._rules.append((_scope(rule, where), covered, multiplier))
+        self.names.append(rule.get("name") or f"{'/'.join(sorted(nights))} nights x{multiplier}")
+
+    def _add_season(self, rule, where):
+        if not isinstance(rule, dict):
+            raise RatePlanError(f"{where} must be an object")
+        first, last = day_index(rule.get("start")), day_index(rule.get("end"))
+        if not first or not last or last <= first:
+            raise RatePlanError(f"{where}: start and end must be YYYY-MM-DD dates, start before end")
+        multiplier = _number(rule, "multiplier", where, 0, 100)
+        start, end = max(0, first - self.start_day), last - self.start_day
+
+        def covered(horizon_days):
+            return range(start, max(start, min(end, horizon_days)))
+
+        self._rules.append((_scope(rule, where), covered, multiplier))
+        self.names.append(rule.get("name") or f"{rule['start']} to {rule['end']} x{multiplier}")
+
+    def _build_profile(self, positions):
+        multipliers = [1.0] * self.horizon_days
+        for position in positions:
+            _, covered, multiplier = self._rules[position]
+            for night in covered(self.horizon_days):
+                multipliers[night] *= multiplier
+        prefix = array("d", [0.0]) * (self.horizon_days + 1)
+        total = 0.0
+        for night, multiplier in enumerate(multipliers):
+            total += multiplier
+            prefix[night + 1] = total
+        return prefix
+
+    def _build_tiers(self, positions):
+        """
+        Discount of an n-night stay at [n], up to the longest min_nights;
+        longer stays get the last entry
+        """
+        best = {}  # min_nights -> largest discount
+        for position in positions:
+            _, min_nights, discount = self._discounts[position]
+            best[min_nights] = max(discount, best.get(min_nights, 0.0))
+        by_nights = array("d", [0.0]) * (max(best, default=0) + 1)
+        for min_nights in sorted(best):
+            # A longer stay never gets less off than a shorter one
+            discount = max(best[min_nights], by_nights[min_nights - 1])
+            for nights in range(min_nights, len(by_nights)):
+                by_nights[nights] = discount
+        return by_nights
+
+    def price_group(self, hotel_name, city, room_type):
+        """
+        Key shared by the rooms the same rules apply to: for any stay, their
+        totals are their catalogue rates times the same factor (stay_terms)
+        """
+        rules = tuple(position for position, (scope, _, _) in enumerate(self._rules)
+                      if _matches(scope, hotel_name, city, room_type))
+        discounts = tuple(position for position, (scope, _, _) in enumerate(self._discounts)
+                          if _matches(scope, hotel_name, city, room_type))
+        return rules, discounts
+
+    def _group_prices(self, group):
+        """(prefix sums, discount by length of stay) of a price group; call with the lock held"""
+        rules, discounts = group
+        prefix = self._profiles.get(rules)
+        if prefix is None:
+            prefix = self._profiles[rules] = self._build_profile(rules)
+        by_nights = self._tiers.get(discounts)
+        if by_nights is None:
+            by_nights = self._tiers[discounts] = self._build_tiers(discounts)
+        return prefix, by_nights
+
+    def _room(self, hotel_name, city, room_type):
+        room = self._rooms.get((hotel_name, room_type))
+        if room is not None:
+            return room
+        group = self.price_group(hotel_name, city, room_type)
+        with self._lock:
+            room = self._rooms[(hotel_name, room_type)] = self._group_prices(group)
+        return room
+
+    def stay_terms(self, group, start, end):
+        """
+        (sum of nightly multipliers, length-of-stay discount) of nights
+        [start, end) for a price group: a room of the group at catalogue rate
+        `rate` costs round(rate * multipliers * (1 - discount), 2), as quote() says
+        """
+        with self._lock:
+            prefix, by_nights = self._group_prices(group)
+        return prefix[end] - prefix[start], by_nights[min(end - start, len(by_nights) - 1)]
+
+    def extend(self, horizon_days):
+        """
+        Price nights up to horizon_days from start_date (the inventory's
+        horizon rolled on): every prefix sum built so far is rebuilt that long.
+        Returns False if they already reach that far
+        """
+        with self._lock:
+            if horizon_days <= self.horizon_days:
+                return False
+            self.horizon_days = horizon_days
+            self._profiles = {rules: self._build_profile(rules) for rules in self._profiles}
+            self._rooms = {}
+        return True
+
+    def forget_rooms(self):
+        """Drop what was looked up per room (after a catalogue reload, a hotel may have moved city)"""
+        with self._lock:
+            self._rooms = {}
+
+    def quote(self, hotel_name, city, room_type, rate, start, end):
+        """(total price, length-of-stay discount) of nights [start, end) at catalogue rate `rate`"""
+        prefix, by_nights = self._room(hotel_name, city, room_type)
+        discount = by_nights[min(end - start, len(by_nights) - 1)]
+        return round(rate * (prefix[end] - prefix[start]) * (1 - discount), 2), discount
+
+    def quote_many(self, rooms, rates, starts, ends):
+        """
+        quote() over columns: rooms holds (hotel_name, city, room_type) per
+        stay, rates, starts and ends its catalogue rate and nights
+        Returns the column of totals and the column of discounts
+        """
+        looked_up = {}
+        for room in rooms:
+            if room not in looked_up:
+                looked_up[room] = self._room(*room)
+        prices = [looked_up[room] for room in rooms]
+        discounts = [by_nights[min(end - start, len(by_nights) - 1)]
+                     for (_, by_nights), start, end in zip(prices, starts, ends)]
+        totals = [round(rate * (prefix[end] - prefix[start]) * (1 - discount), 2)
+                  for (prefix, _), rate, start, end, discount in zip(prices, rates, starts, ends, discounts)]
+        return totals, discounts
+
+    def nightly(self, hotel_name, city, room_type, rate, start, end):
+        """Price of each night in [start, end) before any length-of-stay discount"""
+        prefix, _ = self._room(hotel_name, city, room_type)
+        return [round(rate * (prefix[night + 1] - prefix[night]), 2) for night in range(start, end)]
+
+    def describe(self):
+        return {
+            "rules": self.names,
+            "profiles": len(self._profiles),
+            "rooms_priced": len(self._rooms)
+        }
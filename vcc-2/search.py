@@ -0,0 +1,149 @@
+"""
+Hotel Search - VCC-2
+Indexes the hotel database so one query finds every bookable room for a stay
+The catalogue is indexed once, by city and by room type: each index entry
+holds, per rate plan price group (rates.RatePlans.price_group), a list of
+offers (hotel, room type) sorted by nightly rate, with the rates in a
+parallel array. A rate range is then a bisect per group. Rooms of one group
+cost their rate times the same factor for any stay, so each group's list is
+already in stay price order: a search works out that factor once per group
+and merges the groups, visiting candidates cheapest stay first. Each one
+costs a single O(log nights) lookup in the nightly inventory, and the walk
+stops as soon as the page is full
+The indexes are built on the first search, or by build() ahead of time
+"""
+
+import threading
+from heapq import merge
+from array import array
+from bisect import bisect_left, bisect_right
+
+from catalog import room_rows
+
+ANY = None  # index key for "no city" / "no room type" filter
+
+
+def _fold(value):
+    return value.casefold() if isinstance(value, str) else value
+
+
+class Offers:
+    """Offers of one index entry, cheapest first (they are added in that order)"""
+
+    __slots__ = ("rates", "keys")
+
+    def __init__(self):
+        self.rates = array("d")
+        self.keys = []  # (hotel_name, room_type)
+
+    def between(self, min_rate, max_rate):
+        """Positions [first, last) of the offers with min_rate <= rate <= max_rate"""
+        first = 0 if min_rate is None else bisect_left(self.rates, min_rate)
+        last = len(self.rates) if max_rate is None else bisect_right(self.rates, max_rate)
+        return first, last
+
+    def priced(self, first, last, multipliers, discount):
+        """(stay total, rate, key) of the offers at [first, last), cheapest first"""
+        rates, keys = self.rates, self.keys
+        kept = 1 - discount
+        return ((round(rates[position] * multipliers * kept, 2), rates[position], keys[position])
+                for position in range(first, last))
+
+
+class SearchIndex:
+    """
+    City and room type indexes over a hotel database (a dict or a
+    catalog.Catalog), its Inventory and its RatePlans (without them every
+    night costs the catalogue rate)
+    Cities and room types match case-insensitively; a catalogue version
+    never changes, so the indexes are built once and only free rooms are
+    looked up per query (a reloaded catalogue gets a new SearchIndex)
+    """
+
+    def __init__(self, hotels, inventory, rates=None):
+        self._hotels = hotels
+        self._inventory = inventory
+        self._rates = rates
+        self._offers = None
+        self._build_lock = threading.Lock()
+        self.size = 0
+
+    def build(self):
+        """Build the indexes now (otherwise the first search does); returns self"""
+        with self._build_lock:
+            if self._offers is not None:
+                return self
+            # One sort of every offer, then each is appended to its entries in
+            # that order; cities and room types repeat, so each distinct
+            # (city, room type) pair resolves its entries once
+            rows = sorted((float(rate), hotel_name, room_type, city)
+                          for hotel_name, city, room_type, _, rate in room_rows(self._hotels))
+            offers = {}  # index key -> {price group: Offers}
+            targets = {}
+            groups = {}
+            for rate, hotel_name, room_type, city in rows:
+                entries = targets.get((city, room_type))
+                if entries is None:
+                    city_key, type_key = _fold(city), _fold(room_type)
+                    index_keys = [(ANY, type_key), (ANY, ANY)]
+                    if city_key is not None:
+                        index_keys += [(city_key, type_key), (city_key, ANY)]
+                    entries = targets[(city, room_type)] = [
+                        offers.setdefault(index_key, {}) for index_key in index_keys
+                    ]
+                key = (hotel_name, room_type)
+                group = None
+                if self._rates is not None:
+                    group = groups.get(key)
+                    if group is None:
+                        group = groups[key] = self._rates.price_group(hotel_name, city, room_type)
+                for entry in entries:
+                    group_offers = entry.get(group)
+                    if group_offers is None:
+                        group_offers = entry[group] = Offers()
+                    group_offers.rates.append(rate)
+                    group_offers.keys.append(key)
+            self.size = len(rows)
+            self._offers = offers
+        return self
+
+    def __len__(self):
+        return self.build().size
+
+    def search(self, check_in, check_out, city=None, room_type=None, min_rate=None, max_rate=None,
+               rooms=1, offset=0, limit=20):
+        """
+        Offers with at least `rooms` rooms free on every night of the stay,
+        cheapest stay first; min_rate and max_rate bound the catalogue rate.
+        Returns (nights, page, more) where page holds at most limit
+        (hotel_name, room_type, rate, free_rooms) tuples after the first
+        offset matches. Raises InventoryError for dates the inventory cannot answer
+        """
+        start, end = self._inventory.night_range(check_in, check_out)
+        if self._offers is None:
+            self.build()
+        groups = self._offers.get((_fold(city) if city else ANY, _fold(room_type) if room_type else ANY))
+        if groups is None:
+            return end - start, [], False
+
+        candidates = []
+        for group, offers in groups.items():
+            first, last = offers.between(min_rate, max_rate)
+            if first == last:
+                continue
+            multipliers, discount = (end - start, 0.0) if group is None else self._rates.stay_terms(group, start, end)
+            candidates.append(offers.priced(first, last, multipliers, discount))
+        free_rooms = self._inventory.free_rooms
+        page = []
+        skipped = 0
+        for _, rate, key in merge(*candidates):
+            free = free_rooms(key, start, end)
+            if free < rooms:
+                continue
+            if skipped < offset:
+                skipped += 1
+                continue
+            if len(page) == limit:
+                return end - start, page, True
+            page.append((key[0], key[1], rate, free))
+        return end - start, page, False
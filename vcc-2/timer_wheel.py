@@ -0,0 +1,70 @@
+"""
+Timer Wheel - VCC-2
+Hashed timing wheel for reservation hold deadlines
+Time is cut into ticks of tick_seconds and every timer lands in the bucket
+of its deadline's tick, modulo the number of buckets. schedule() and
+cancel() are O(1), and advance() only visits the buckets of the ticks that
+went by, so expiring holds costs the holds that are due (plus the few
+scheduled a whole revolution later in the same bucket) instead of a scan of
+every hold. A timer never fires early; it fires at most one tick late
+"""
+
+import math
+import time
+
+
+class TimerWheel:
+    """Deadlines keyed by any hashable key; not thread-safe, callers hold their own lock"""
+
+    def __init__(self, tick_seconds=0.25, buckets=512, clock=time.monotonic):
+        self.tick_seconds = tick_seconds
+        self._clock = clock
+        self._origin = clock()
+        self._buckets = [{} for _ in range(buckets)]  # key -> tick it is due at
+        self._bucket_of = {}                          # key -> bucket index
+        self._tick = 0                                # last tick advance() processed
+
+    def __len__(self):
+        return len(self._bucket_of)
+
+    def __contains__(self, key):
+        return key in self._bucket_of
+
+    def now(self):
+        return self._clock()
+
+    def schedule(self, key, deadline):
+        """Fire key once the clock reaches deadline (replacing any timer key already has)"""
+        self.cancel(key)
+        tick = max(math.ceil((deadline - self._origin) / self.tick_seconds), self._tick + 1)
+        index = tick % len(self._buckets)
+        self._buckets[index][key] = tick
+        self._bucket_of[key] = index
+
+    def cancel(self, key):
+        """Forget key's timer; returns False if it had none (never scheduled, cancelled or fired)"""
+        index = self._bucket_of.pop(key, None)
+        if index is None:
+            return False
+        del self._buckets[index][key]
+        return True
+
+    def advance(self, now=None):
+        """Move the wheel to now; returns the keys whose deadline has passed, in no particular order"""
+        target = int(((self._clock() if now is None else now) - self._origin) / self.tick_seconds)
+        if target <= self._tick:
+            return []
+        if target - self._tick >= len(self._buckets):
+            visited = self._buckets  # a whole revolution or more went by
+        else:
+            visited = [self._buckets[tick % len(self._buckets)] for tick in range(self._tick + 1, target + 1)]
+        self._tick = target
+        due = []
+        for bucket in visited:
+            if bucket:
+                expired = [key for key, tick in bucket.items() if tick <= target]
+                for key in expired:
+                    del bucket[key]
+                    del self._bucket_of[key]
+                due.extend(expired)
+        return due
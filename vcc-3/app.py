@@ -5,26 +5,199 @@ This service processes hotel booking payments with mock payment gateway logic
 Educational Purpose: Learning inter-service communication patterns
 """
 
+import csv
+import io
+import os
+import random
 import socket
-import json
+import threading
+import time
 from flask import Flask, request, jsonify
-from datetime import datetime
+from datetime import datetime, timedelta
+from store import create_store, DuplicateKeyError, COLUMNS, FILTERS, SQLiteVelocityLog, transaction_seq
+from idempotency import IdempotencyCache
+from payment_queue import PaymentQueue
+from rules import PaymentRules, load_payment_rules
+from metrics import Metrics, instrument
+from tracing import Tracer, instrument_tracing
+from encoding import JSONProvider, JSONTemplate, SLOT, dumps, encode_constant
 
 app = Flask(__name__)
+app.json = JSONProvider(app)  # orjson when installed (see encoding.py)
 
 # Service Configuration
 SERVICE_NAME = "Payment"
 SERVICE_PORT = 5003
-SERVICE_A_IP = "10.109.0.150"
-SERVICE_A_PORT = 5001
+DEBUG = os.environ.get("FLASK_DEBUG") == "1"  # dev server only; serve.py never runs debug
+SERVICE_A_IP = os.environ.get("SERVICE_A_IP", "10.109.0.150")
+SERVICE_A_PORT = int(os.environ.get("SERVICE_A_PORT", 5001))
 
-# Mock payment database
-PAYMENT_TRANSACTIONS = {}
-TRANSACTION_COUNTER = 1000
+# Payment transaction store: "sqlite" is shared by all worker processes on
+# this VM, "memory" is process-local (single worker only)
+TRANSACTION_STORE_BACKEND = "sqlite"
+TRANSACTION_DB_PATH = os.environ.get(
+    "TRANSACTION_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "payments.db")
+)
 
-# Mock payment processing rules (hardcoded for demonstration)
+TRANSACTION_STORE = create_store(TRANSACTION_STORE_BACKEND, TRANSACTION_DB_PATH)
+
+# Idempotency keys: recent ones are cached, older ones are found in the store
+IDEMPOTENCY_CACHE_SIZE = 10000
+IDEMPOTENCY_TTL_SECONDS = 24 * 60 * 60
+
+IDEMPOTENCY_CACHE = IdempotencyCache(IDEMPOTENCY_CACHE_SIZE, IDEMPOTENCY_TTL_SECONDS)
+
+# Transaction queries and export
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+EXPORT_PAGE_SIZE = 1000   # rows read from the store (and written to the client) at a time
+
+# Asynchronous payments: /process-payment stores a pending transaction,
+# answers 202 and a queue worker runs the gateway call. Clients opt in per
+# request with "Prefer: respond-async"; ASYNC_PAYMENTS makes it the default
+ASYNC_PAYMENTS = os.environ.get("ASYNC_PAYMENTS") == "1"
+PAYMENT_QUEUE_SIZE = 1000        # pending payments per worker process before intake answers 429
+PAYMENT_WORKERS = 4              # gateway calls in flight per worker process
+QUEUE_FULL_RETRY_AFTER = 1       # seconds, sent with 429
+QUEUE_DRAIN_SECONDS = 20         # on shutdown, time queued payments get to finish
+# A payment a stopped or crashed worker left pending is settled by another
+# worker's sweep; a worker leases each payment it settles, so none runs twice
+PENDING_STALE_SECONDS = 120      # pending this long and not leased: recovered by the sweep
+PENDING_LEASE_SECONDS = 60       # a settling worker owns a payment this long (gateway call included)
+PENDING_RECOVERY_INTERVAL_SECONDS = 30
+GATEWAY_LATENCY_SECONDS = float(os.environ.get("GATEWAY_LATENCY_SECONDS", 0))  # simulated gateway round trip
+
+METRICS = instrument(app, Metrics(SERVICE_NAME))
+
+# Request tracing (see tracing.py): the Orchestrator's traceparent decides sampling
+TRACE_SAMPLE_RATE = float(os.environ.get("TRACE_SAMPLE_RATE", 0.1))  # share of requests without one recorded
+TRACE_BUFFER_SIZE = 4096                                             # spans kept for /debug/traces
+TRACE_EXPORT_PATH = os.environ.get("TRACE_EXPORT_PATH")             # OTLP/JSON lines file; unset = no export
+
+TRACER = instrument_tracing(app, Tracer(SERVICE_NAME, TRACE_SAMPLE_RATE, TRACE_BUFFER_SIZE, TRACE_EXPORT_PATH))
+
+# Fraud and limit rules (see rules.py), compiled once at startup.
+# PAYMENT_RULES_PATH="" checks no rules at all
+PAYMENT_RULES_PATH = os.environ.get(
+    "PAYMENT_RULES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "payment_rules.json")
+)
+VELOCITY_MAX_KEYS = 100000  # guests/cards each velocity rule tracks per worker process (memory store only)
+
+def new_payment_rules():
+    """
+    Compile PAYMENT_RULES_PATH; with the SQLite store, velocity rules count
+    in the transaction database, so their limits hold across all workers
+    """
+    shared = TRANSACTION_STORE_BACKEND == "sqlite"
+    return PaymentRules(load_payment_rules(PAYMENT_RULES_PATH) if PAYMENT_RULES_PATH else {},
+                        max_keys=VELOCITY_MAX_KEYS,
+                        velocity_log=SQLiteVelocityLog(TRANSACTION_DB_PATH) if shared else None)
+
+PAYMENT_RULES = new_payment_rules()
+
+# Mock payment processing
 VALID_PAYMENT_METHODS = ["credit_card", "debit_card", "bank_transfer"]
-PAYMENT_SUCCESS_RATE = 0.95  # 95% of payments succeed
+PAYMENT_SUCCESS_RATE = 0.95  # 95% of payments that pass the rules succeed at the gateway
+# PAYMENT_SEED makes the simulated gateway's approvals repeatable (for tests);
+# unset, the global random module is used, which is reseeded in every forked worker
+PAYMENT_SEED = os.environ.get("PAYMENT_SEED")
+GATEWAY_DRAW = random.Random(int(PAYMENT_SEED)).random if PAYMENT_SEED else random.random
+PAYMENT_REQUIRED_FIELDS = ["booking_id", "guest_name", "hotel_name", "amount", "payment_method"]
+
+# Responses that never change, encoded once at startup
+WELCOME_BODY = encode_constant({
+    "port": SERVICE_PORT,
+    "description": "Hotel Booking Payment Processing Service",
+    "endpoints": {
+        "POST /process-payment": "Process payment for hotel booking (queued with Prefer: respond-async)",
+        "POST /validate-payment": "Pre-check payment method and limits without charging",
+        "GET /payment-status/<transaction_id>": "Check payment status",
+        "GET /bookings/<booking_id>/payments": "List payment transactions for a booking",
+        "POST /bookings/<booking_id>/refund": "Refund a booking's approved payments",
+        "GET /transactions": "Page through transactions (filters: booking_id, status, hotel_name, since, until)",
+        "GET /transactions/export": "Stream every matching transaction as NDJSON or CSV",
+        "GET /idempotency-stats": "Idempotency key cache hit/miss metrics",
+        "GET /payment-queue-stats": "Asynchronous payment queue depth and worker counters",
+        "GET /payment-rules": "Fraud and limit rules in evaluation order with match counts",
+        "GET /debug/traces": "Recent sampled request traces with per-span timings",
+        "GET /metrics": "Request latency and error metrics (Prometheus format)"
+    }
+})
+MISSING_PAYMENT_FIELDS_BODY = encode_constant({
+    "status": "error",
+    "message": "Missing required payment fields",
+    "required_fields": PAYMENT_REQUIRED_FIELDS
+})
+INVALID_METHOD_BODY = encode_constant({
+    "status": "failed",
+    "message": f"Invalid payment method. Accepted: {', '.join(VALID_PAYMENT_METHODS)}",
+    "transaction_id": None
+})
+INVALID_REFERENCE_BODY = encode_constant({
+    "status": "failed",
+    "message": "booking_id, guest_name and hotel_name must be non-empty strings",
+    "transaction_id": None
+})
+INVALID_AMOUNT_BODY = encode_constant({
+    "status": "failed",
+    "message": "Invalid payment amount. Amount must be greater than 0",
+    "transaction_id": None
+})
+PRECHECK_NOT_OBJECT_BODY = encode_constant({
+    "status": "error",
+    "valid": False,
+    "message": "Payment details must be a JSON object"
+})
+PRECHECK_MISSING_METHOD_BODY = encode_constant({
+    "status": "error",
+    "valid": False,
+    "message": "Missing required field: payment_method"
+})
+PRECHECK_INVALID_METHOD_BODY = encode_constant({
+    "status": "failed",
+    "valid": False,
+    "message": f"Invalid payment method. Accepted: {', '.join(VALID_PAYMENT_METHODS)}"
+})
+PRECHECK_DECLINED_BODIES = {
+    rule.name: encode_constant({
+        "status": "failed",
+        "valid": False,
+        "message": rule.reason
+    })
+    for rule in PAYMENT_RULES.rules
+}
+PRECHECK_VALID_BODY = encode_constant({
+    "status": "success",
+    "valid": True,
+    "max_amount": PAYMENT_RULES.max_amount
+})
+QUEUE_FULL_BODY = encode_constant({
+    "status": "error",
+    "message": "Payment queue is full, retry later",
+    "retry_after": QUEUE_FULL_RETRY_AFTER
+})
+EXPORT_FORMAT_BODY = encode_constant({
+    "status": "error",
+    "message": "format must be ndjson or csv"
+})
+
+# An approved payment is on every booking's path, so it is encoded from a template
+PAYMENT_APPROVED = JSONTemplate({
+    "status": "success",
+    "message": "Payment processed successfully",
+    "transaction_id": SLOT,
+    "booking_id": SLOT,
+    "amount": SLOT,
+    "currency": SLOT,
+    "payment_status": "approved",
+    "hotel_name": SLOT,
+    "guest_name": SLOT,
+    "timestamp": SLOT
+})
+
+def encoded_response(body, status_code=200, headers=None):
+    """Response for a JSON body that is already encoded"""
+    return app.response_class(body, status=status_code, headers=headers, mimetype="application/json")
 
 def get_local_ip():
     """Get the local IP address of the service"""
@@ -37,17 +210,71 @@ def get_local_ip():
     except:
         return "127.0.0.1"
 
+def shutdown():
+    """Graceful shutdown hook (called by serve.py): settle queued payments, close the store connection"""
+    print(f"[{SERVICE_NAME}] Shutting down, draining {PAYMENT_QUEUE.depth()} queued payments")
+    if not PAYMENT_QUEUE.close(QUEUE_DRAIN_SECONDS):
+        print(f"[{SERVICE_NAME}] Payments still queued after {QUEUE_DRAIN_SECONDS}s are left to the recovery sweep")
+    TRANSACTION_STORE.close()
+    if PAYMENT_RULES.velocity_log is not None:
+        PAYMENT_RULES.velocity_log.close()
+
 @app.route('/', methods=['GET'])
 def welcome():
-    """Welcome endpoint with service information"""
-    return jsonify({
-        "port": SERVICE_PORT,
-        "description": "Hotel Booking Payment Processing Service",
-        "endpoints": {
-            "POST /process-payment": "Process payment for hotel booking",
-            "GET /payment-status/<transaction_id>": "Check payment status"
-        }
-    })
+    """Welcome endpoint with service information (encoded once at startup)"""
+    return encoded_response(WELCOME_BODY)
+
+def payment_response(transaction):
+    """Encoded response body and HTTP status for a stored transaction"""
+    if transaction["status"] == "pending":
+        return dumps({
+            "status": "accepted",
+            "message": "Payment queued for processing",
+            "transaction_id": transaction["transaction_id"],
+            "booking_id": transaction["booking_id"],
+            "amount": transaction["amount"],
+            "payment_status": "pending",
+            "status_url": f"/payment-status/{transaction['transaction_id']}"
+        }) + b"\n", 202
+    if transaction["status"] == "approved":
+        return PAYMENT_APPROVED.render(transaction), 200
+    if transaction["status"] == "refunded":
+        return dumps({
+            "status": "refunded",
+            "message": f"Payment was refunded: {transaction['reason']}",
+            "transaction_id": transaction["transaction_id"],
+            "booking_id": transaction["booking_id"],
+            "amount": transaction["amount"]
+        }) + b"\n", 409
+    return dumps({
+        "status": "failed",
+        "message": f"Payment declined: {transaction['reason']}",
+        "transaction_id": transaction["transaction_id"],
+        "booking_id": transaction["booking_id"],
+        "amount": transaction["amount"]
+    }) + b"\n", 402
+
+def replay_payment(transaction, data):
+    """Return the stored response for a repeated idempotency key"""
+    if isinstance(data, dict) and data.get("amount") not in (None, transaction["amount"]):
+        return jsonify({
+            "status": "error",
+            "message": "Idempotency key already used for a payment with a different amount",
+            "transaction_id": transaction["transaction_id"],
+            "idempotency_key": transaction["idempotency_key"]
+        }), 422
+
+    if transaction["status"] == "pending":
+        # The outcome may have been stored by a queue worker of another process
+        transaction = TRANSACTION_STORE.get(transaction["transaction_id"]) or transaction
+        if transaction["status"] != "pending":
+            IDEMPOTENCY_CACHE.put(transaction["idempotency_key"], transaction)
+
+    print(f"[{SERVICE_NAME}] Replaying {transaction['transaction_id']} for key {transaction['idempotency_key']}")
+    body, status_code = payment_response(transaction)
+    response = encoded_response(body, status_code)
+    response.headers["Idempotent-Replay"] = "true"
+    return response
 
 @app.route('/process-payment', methods=['POST'])
 def process_payment():
@@ -65,99 +292,32 @@ def process_payment():
         "check_in": "2026-02-15",
         "check_out": "2026-02-18"
     }
+    The Idempotency-Key header (default: booking_id) identifies the charge;
+    repeating it returns the original response without charging again
+    With "Prefer: respond-async" (or ASYNC_PAYMENTS) the payment is queued:
+    the answer is 202 with a pending transaction to poll on
+    /payment-status, or 429 when the queue is full
     """
-    global TRANSACTION_COUNTER
-    
     try:
         data = request.get_json()
-        
-        # Validate required fields
-        required_fields = ["booking_id", "guest_name", "hotel_name", "amount", "payment_method"]
-        if not all(field in data for field in required_fields):
-            return jsonify({
-                "status": "error",
-                "message": "Missing required payment fields",
-                "required_fields": required_fields
-            }), 400
-        
-        # Validate payment method
-        if data.get("payment_method") not in VALID_PAYMENT_METHODS:
-            return jsonify({
-                "status": "failed",
-                "message": f"Invalid payment method. Accepted: {', '.join(VALID_PAYMENT_METHODS)}",
-                "transaction_id": None
-            }), 400
-        
-        # Validate amount
-        if data.get("amount", 0) <= 0:
-            return jsonify({
-                "status": "failed",
-                "message": "Invalid payment amount. Amount must be greater than 0",
-                "transaction_id": None
-            }), 400
-        
-        # Generate transaction ID
-        TRANSACTION_COUNTER += 1
-        transaction_id = f"TXN{TRANSACTION_COUNTER}"
-        
-        # Simulate payment processing (hardcoded rules for demonstration)
-        # In real scenario: call actual payment gateway
-        amount = data.get("amount", 0)
-        
-        # Decline payments over $10,000 or with suspicious patterns
-        if amount > 10000:
-            payment_status = "declined"
-            reason = "Amount exceeds maximum limit"
-        elif "xxx" in data.get("payment_method", "").lower():
-            payment_status = "declined"
-            reason = "Invalid payment method detected"
-        else:
-            # Random success for demonstration
-            import random
-            payment_status = "approved" if random.random() < PAYMENT_SUCCESS_RATE else "declined"
-            reason = "Payment gateway approval" if payment_status == "approved" else "Insufficient funds"
-        
-        # Store transaction
-        transaction = {
-            "transaction_id": transaction_id,
-            "booking_id": data.get("booking_id"),
-            "guest_name": data.get("guest_name"),
-            "hotel_name": data.get("hotel_name"),
-            "room_type": data.get("room_type", "Standard"),
-            "amount": amount,
-            "currency": data.get("currency", "USD"),
-            "payment_method": data.get("payment_method"),
-            "status": payment_status,
-            "reason": reason,
-            "timestamp": datetime.now().isoformat(),
-            "check_in": data.get("check_in"),
-            "check_out": data.get("check_out")
-        }
-        
-        PAYMENT_TRANSACTIONS[transaction_id] = transaction
-        
-        # Return response
-        if payment_status == "approved":
-            return jsonify({
-                "status": "success",
-                "message": "Payment processed successfully",
-                "transaction_id": transaction_id,
-                "booking_id": data.get("booking_id"),
-                "amount": amount,
-                "currency": data.get("currency", "USD"),
-                "payment_status": payment_status,
-                "hotel_name": data.get("hotel_name"),
-                "guest_name": data.get("guest_name"),
-                "timestamp": transaction["timestamp"]
-            }), 200
-        else:
-            return jsonify({
-                "status": "failed",
-                "message": f"Payment declined: {reason}",
-                "transaction_id": transaction_id,
-                "booking_id": data.get("booking_id"),
-                "amount": amount
-            }), 402
+        idempotency_key = request.headers.get("Idempotency-Key")
+        if not idempotency_key and isinstance(data, dict) and isinstance(data.get("booking_id"), str):
+            idempotency_key = data["booking_id"] or None
+        asynchronous = wants_async(request.headers.get("Prefer", ""))
+
+        if not idempotency_key:
+            return charge_payment(data, None, asynchronous)
+
+        transaction = IDEMPOTENCY_CACHE.lookup(idempotency_key, TRANSACTION_STORE)
+        if transaction is not None:
+            return replay_payment(transaction, data)
+
+        with IDEMPOTENCY_CACHE.key_lock(idempotency_key):
+            # A request with the same key may have finished while we waited
+            transaction = IDEMPOTENCY_CACHE.get(idempotency_key)
+            if transaction is not None:
+                return replay_payment(transaction, data)
+            return charge_payment(data, idempotency_key, asynchronous)
 
     except Exception as e:
         return jsonify({
@@ -165,18 +325,217 @@ def process_payment():
             "message": f"Payment processing error: {str(e)}"
         }), 500
 
+def wants_async(prefer):
+    """Whether a request's Prefer header (RFC 7240) asks for queued processing"""
+    preferences = {token.strip().lower() for token in prefer.split(",")}
+    if "respond-async" in preferences:
+        return True
+    return ASYNC_PAYMENTS and "respond-sync" not in preferences
+
+def run_gateway(payment):
+    """Simulated payment gateway call: returns (status, reason) for a payment"""
+    # In real scenario: call actual payment gateway
+    if GATEWAY_LATENCY_SECONDS:
+        time.sleep(GATEWAY_LATENCY_SECONDS)
+    # Random success for demonstration
+    if GATEWAY_DRAW() < PAYMENT_SUCCESS_RATE:
+        return "approved", "Payment gateway approval"
+    return "declined", "Insufficient funds"
+
+def claim_payment(transaction_id):
+    """Lease a pending payment to this worker; False if another worker holds it or it is settled"""
+    now = time.time()
+    return TRANSACTION_STORE.claim_pending(transaction_id, now, now + PENDING_LEASE_SECONDS)
+
+def settle_queued_payment(transaction):
+    """Queue worker: settle a pending transaction, unless a recovery sweep has claimed it meanwhile"""
+    if claim_payment(transaction["transaction_id"]):
+        settle_payment(transaction)
+
+def settle_payment(transaction):
+    """Run the gateway for a pending transaction leased to this worker and store the outcome"""
+    started = time.perf_counter()
+    status, reason = run_gateway(transaction)
+    METRICS.observe("payment_gateway_duration_seconds", (), time.perf_counter() - started)
+    TRANSACTION_STORE.update_status(transaction["transaction_id"], status, reason)
+    # The same dict may be in IDEMPOTENCY_CACHE; update it once the store has the outcome
+    transaction["status"] = status
+    transaction["reason"] = reason
+    METRICS.inc("payments_settled_total", (("status", status),))
+
+def record_queue_wait(seconds):
+    METRICS.observe("payment_queue_wait_seconds", (), seconds)
+
+def recover_pending_payments():
+    """
+    One recovery pass: settle the payments left pending for
+    PENDING_STALE_SECONDS by a worker that was drained, recycled or crashed;
+    returns how many were picked up
+    """
+    now = time.time()
+    before = (datetime.now() - timedelta(seconds=PENDING_STALE_SECONDS)).isoformat()
+    transactions = TRANSACTION_STORE.claim_stale_pending(before, now, now + PENDING_LEASE_SECONDS)
+    for transaction in transactions:
+        print(f"[{SERVICE_NAME}] Recovering pending payment {transaction['transaction_id']}")
+        try:
+            settle_payment(transaction)
+        except Exception as e:
+            print(f"[{SERVICE_NAME}] Payment {transaction['transaction_id']} recovery failed: {e}")
+    if transactions:
+        METRICS.inc("payments_recovered_total", (), len(transactions))
+    return len(transactions)
+
+def start_pending_recovery():
+    """Run recover_pending_payments() now and every PENDING_RECOVERY_INTERVAL_SECONDS on a daemon thread"""
+    def run():
+        while True:
+            try:
+                recover_pending_payments()
+            except Exception as e:
+                print(f"[{SERVICE_NAME}] Pending payment recovery pass failed: {e}")
+            time.sleep(PENDING_RECOVERY_INTERVAL_SECONDS)
+    threading.Thread(target=run, name="pending-recovery", daemon=True).start()
+
+PAYMENT_QUEUE = PaymentQueue(settle_queued_payment, PAYMENT_QUEUE_SIZE, PAYMENT_WORKERS, on_dequeue=record_queue_wait)
+METRICS.gauge("payment_queue_depth", PAYMENT_QUEUE.depth)
+
+def charge_payment(data, idempotency_key, asynchronous=False):
+    """
+    Validate and store a new transaction
+    A payment the rules decline is stored as declined straight away, queued
+    or not. Otherwise, synchronously the gateway runs first and the outcome
+    is stored; queued, a pending transaction is stored and PAYMENT_QUEUE
+    settles it later
+    """
+    # Validate required fields
+    if not isinstance(data, dict) or not all(field in data for field in PAYMENT_REQUIRED_FIELDS):
+        return encoded_response(MISSING_PAYMENT_FIELDS_BODY, 400)
+
+    # The store indexes these, so anything else would only fail after the charge
+    if not all(isinstance(data[field], str) and data[field] for field in ("booking_id", "guest_name", "hotel_name")):
+        return encoded_response(INVALID_REFERENCE_BODY, 400)
+    
+    # Validate payment method
+    if data.get("payment_method") not in VALID_PAYMENT_METHODS:
+        return encoded_response(INVALID_METHOD_BODY, 400)
+    
+    # Validate amount
+    amount = data.get("amount", 0)
+    if isinstance(amount, bool) or not isinstance(amount, (int, float)) or amount <= 0:
+        return encoded_response(INVALID_AMOUNT_BODY, 400)
+
+    # Fraud and limit rules decline before the gateway (or the queue) is involved
+    with TRACER.span("payment rules") as span:
+        declined = PAYMENT_RULES.evaluate(data)
+        if declined:
+            span.set("payment.rule", declined[0])
+    if declined:
+        METRICS.inc("payment_rule_declines_total", (("rule", declined[0]),))
+        asynchronous = False
+        payment_status, reason = "declined", declined[1]
+    elif asynchronous:
+        if not PAYMENT_QUEUE.reserve():
+            METRICS.inc("payment_queue_rejected_total", ())
+            return encoded_response(QUEUE_FULL_BODY, 429, {"Retry-After": str(QUEUE_FULL_RETRY_AFTER)})
+        payment_status, reason = "pending", None
+    else:
+        with TRACER.span("payment gateway") as span:
+            payment_status, reason = run_gateway(data)
+            span.set("payment.status", payment_status)
+    
+    # Store transaction (the store assigns a collision-free transaction ID)
+    transaction = {
+        "booking_id": data.get("booking_id"),
+        "guest_name": data.get("guest_name"),
+        "hotel_name": data.get("hotel_name"),
+        "room_type": data.get("room_type", "Standard"),
+        "amount": data.get("amount", 0),
+        "currency": data.get("currency", "USD"),
+        "payment_method": data.get("payment_method"),
+        "status": payment_status,
+        "reason": reason,
+        "timestamp": datetime.now().isoformat(),
+        "check_in": data.get("check_in"),
+        "check_out": data.get("check_out"),
+        "idempotency_key": idempotency_key
+    }
+
+    try:
+        with TRACER.span("transaction store add"):
+            TRANSACTION_STORE.add(transaction)
+    except DuplicateKeyError as duplicate:
+        # Another worker process charged this key first
+        if asynchronous:
+            PAYMENT_QUEUE.release()
+        return replay_payment(duplicate.existing, data)
+    except Exception:
+        if asynchronous:
+            PAYMENT_QUEUE.release()
+        raise
+    if idempotency_key:
+        IDEMPOTENCY_CACHE.put(idempotency_key, transaction)
+
+    if asynchronous:
+        PAYMENT_QUEUE.submit(transaction)
+        body, status_code = payment_response(transaction)
+        return encoded_response(body, status_code, {"Location": f"/payment-status/{transaction['transaction_id']}"})
+
+    body, status_code = payment_response(transaction)
+    return encoded_response(body, status_code)
+
+@app.route('/validate-payment', methods=['POST'])
+def validate_payment():
+    """
+    Fraud and limits pre-check, run before the booking amount is known
+    Nothing is charged or stored. Expected payload:
+    {
+        "guest_name": "John Doe",
+        "payment_method": "credit_card",
+        "amount": 350.00            (optional)
+    }
+    """
+    try:
+        data = request.get_json(silent=True)
+
+        if not isinstance(data, dict):
+            return encoded_response(PRECHECK_NOT_OBJECT_BODY, 400)
+
+        if "payment_method" not in data:
+            return encoded_response(PRECHECK_MISSING_METHOD_BODY, 400)
+
+        if data.get("payment_method") not in VALID_PAYMENT_METHODS:
+            return encoded_response(PRECHECK_INVALID_METHOD_BODY, 400)
+
+        # The same rules as a charge; velocity limits are checked but the pre-check is not counted
+        declined = PAYMENT_RULES.evaluate(data, record=False)
+        if declined:
+            return encoded_response(PRECHECK_DECLINED_BODIES[declined[0]], 400)
+
+        return encoded_response(PRECHECK_VALID_BODY)
+
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "valid": False,
+            "message": f"Payment validation error: {str(e)}"
+        }), 500
+
 @app.route('/payment-status/<transaction_id>', methods=['GET'])
 def payment_status(transaction_id):
-    """Get the status of a payment transaction"""
-    if transaction_id not in PAYMENT_TRANSACTIONS:
+    """
+    Get the status of a payment transaction
+    payment_status is pending (queued, poll again after Retry-After seconds),
+    approved or declined
+    """
+    transaction = TRANSACTION_STORE.get(transaction_id)
+    if transaction is None:
         return jsonify({
             "status": "not_found",
             "message": f"Transaction {transaction_id} not found",
             "transaction_id": transaction_id
         }), 404
     
-    transaction = PAYMENT_TRANSACTIONS[transaction_id]
-    return jsonify({
+    response = jsonify({
         "status": "success",
         "transaction_id": transaction_id,
         "booking_id": transaction.get("booking_id"),
@@ -188,6 +547,223 @@ def payment_status(transaction_id):
         "reason": transaction.get("reason"),
         "timestamp": transaction.get("timestamp")
     })
+    if transaction.get("status") == "pending":
+        response.headers["Retry-After"] = "1"
+    return response
+
+@app.route('/bookings/<booking_id>/payments', methods=['GET'])
+def booking_payments(booking_id):
+    """List every payment transaction recorded for a booking"""
+    transactions = TRANSACTION_STORE.find_by_booking(booking_id)
+    if not transactions:
+        return jsonify({
+            "status": "not_found",
+            "message": f"No transactions found for booking {booking_id}",
+            "booking_id": booking_id
+        }), 404
+
+    return jsonify({
+        "status": "success",
+        "booking_id": booking_id,
+        "transactions": [
+            {
+                "transaction_id": transaction.get("transaction_id"),
+                "amount": transaction.get("amount"),
+                "currency": transaction.get("currency"),
+                "payment_status": transaction.get("status"),
+                "reason": transaction.get("reason"),
+                "timestamp": transaction.get("timestamp")
+            }
+            for transaction in transactions
+        ]
+    })
+
+@app.route('/bookings/<booking_id>/refund', methods=['POST'])
+def refund_booking(booking_id):
+    """
+    Refund every approved payment of a booking, e.g. to compensate a booking
+    the Orchestrator could not complete. Optional payload: {"reason": "..."}
+    Safe to repeat: refunded and declined payments are left as they are.
+    A booking this service has no payment for is answered 404, so a caller
+    that reached the wrong replica is not told the booking is settled.
+    While a payment of the booking is still queued the answer is 409; retry
+    after Retry-After
+    """
+    data = request.get_json(silent=True)
+    reason = data.get("reason") if isinstance(data, dict) and data.get("reason") else "Booking not completed"
+    # Holding the booking's key lock waits out a charge for it in progress here
+    with IDEMPOTENCY_CACHE.key_lock(booking_id):
+        transactions = TRANSACTION_STORE.find_by_booking(booking_id)
+        if not transactions:
+            return jsonify({
+                "status": "not_found",
+                "message": f"No payment recorded for booking {booking_id}",
+                "booking_id": booking_id
+            }), 404
+        pending = [t["transaction_id"] for t in transactions if t["status"] == "pending"]
+        if pending:
+            return jsonify({
+                "status": "pending",
+                "message": "Payment still being processed, retry later",
+                "booking_id": booking_id,
+                "pending": pending
+            }), 409, {"Retry-After": "1"}
+
+        refunded = []
+        for transaction in transactions:
+            if transaction["status"] != "approved":
+                continue
+            TRANSACTION_STORE.update_status(transaction["transaction_id"], "refunded", reason)
+            cached = IDEMPOTENCY_CACHE.get(transaction["idempotency_key"]) if transaction["idempotency_key"] else None
+            if cached is not None:
+                cached["status"] = "refunded"
+                cached["reason"] = reason
+            refunded.append(transaction)
+
+    if refunded:
+        print(f"[{SERVICE_NAME}] Refunded {len(refunded)} payment(s) for {booking_id}")
+        METRICS.inc("payments_refunded_total", (), len(refunded))
+    return jsonify({
+        "status": "success",
+        "booking_id": booking_id,
+        "refunded": [t["transaction_id"] for t in refunded],
+        "amount_refunded": sum(t["amount"] for t in refunded)
+    })
+
+def transaction_query(args):
+    """
+    Filters of a /transactions request: (filters, since, until)
+    since and until are ISO 8601 timestamps (inclusive); raises ValueError
+    """
+    filters = {field: args.get(field) for field in FILTERS}
+    bounds = []
+    for name in ("since", "until"):
+        value = args.get(name)
+        if value:
+            try:
+                moment = datetime.fromisoformat(value)
+            except ValueError:
+                raise ValueError(f"Invalid {name} timestamp: {value} (expected ISO 8601)")
+            if moment.tzinfo is not None:
+                # Transactions are stamped in local time without an offset
+                moment = moment.astimezone().replace(tzinfo=None)
+            value = moment.isoformat()
+        bounds.append(value or None)
+    return filters, bounds[0], bounds[1]
+
+def transaction_record(transaction):
+    """A stored transaction with every column, in column order"""
+    return {column: transaction.get(column) for column in COLUMNS}
+
+@app.route('/transactions', methods=['GET'])
+def list_transactions():
+    """
+    Page through transactions in transaction ID order
+    Query parameters: booking_id, status, hotel_name, since, until,
+    limit (default 100, max 1000) and cursor (the next_cursor of the
+    previous page)
+    """
+    try:
+        filters, since, until = transaction_query(request.args)
+        limit = int(request.args.get("limit", DEFAULT_PAGE_SIZE))
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+        cursor = request.args.get("cursor")
+        after = transaction_seq(cursor) if cursor else 0
+    except ValueError as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 400
+
+    page = list(TRANSACTION_STORE.iter_transactions(filters, since, until, after, limit + 1))
+    next_cursor = page[limit - 1]["transaction_id"] if len(page) > limit else None
+    return jsonify({
+        "status": "success",
+        "count": min(len(page), limit),
+        "transactions": [transaction_record(transaction) for transaction in page[:limit]],
+        "next_cursor": next_cursor
+    })
+
+def export_pages(filters, since, until):
+    """Yield every matching transaction, EXPORT_PAGE_SIZE rows at a time, without holding them all"""
+    after = 0
+    while True:
+        page = [transaction_record(transaction) for transaction in
+                TRANSACTION_STORE.iter_transactions(filters, since, until, after, EXPORT_PAGE_SIZE)]
+        if page:
+            yield page
+        if len(page) < EXPORT_PAGE_SIZE:
+            return
+        after = transaction_seq(page[-1]["transaction_id"])
+
+def ndjson_export(pages):
+    for page in pages:
+        yield b"".join(dumps(record) + b"\n" for record in page)
+
+def csv_export(pages):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    for page in pages:
+        writer.writerows([record[column] for column in COLUMNS] for record in page)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+@app.route('/transactions/export', methods=['GET'])
+def export_transactions():
+    """
+    Stream every matching transaction for reconciliation
+    Query parameters: format (ndjson or csv) and the /transactions filters
+    Rows are read page by page as the response is written, so memory use
+    does not grow with the number of transactions
+    """
+    export_format = request.args.get("format", "ndjson")
+    if export_format not in ("ndjson", "csv"):
+        return encoded_response(EXPORT_FORMAT_BODY, 400)
+    try:
+        filters, since, until = transaction_query(request.args)
+    except ValueError as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 400
+
+    pages = export_pages(filters, since, until)
+    if export_format == "csv":
+        return app.response_class(csv_export(pages), mimetype="text/csv", headers={
+            "Content-Disposition": "attachment; filename=transactions.csv"
+        })
+    return app.response_class(ndjson_export(pages), mimetype="application/x-ndjson")
+
+@app.route('/idempotency-stats', methods=['GET'])
+def idempotency_stats():
+    """Idempotency cache size and hit/miss counters"""
+    return jsonify({
+        "status": "success",
+        "idempotency_cache": IDEMPOTENCY_CACHE.stats()
+    })
+
+@app.route('/payment-rules', methods=['GET'])
+def payment_rules():
+    """Fraud and limit rules in evaluation order, with how often each was evaluated and matched"""
+    return jsonify({
+        "status": "success",
+        "path": PAYMENT_RULES_PATH or None,
+        "payment_rules": PAYMENT_RULES.stats()
+    })
+
+@app.route('/payment-queue-stats', methods=['GET'])
+def payment_queue_stats():
+    """Asynchronous payment queue depth and accepted/rejected/processed counters"""
+    return jsonify({
+        "status": "success",
+        "payment_queue": PAYMENT_QUEUE.stats(),
+        "async_by_default": ASYNC_PAYMENTS
+    })
 
 if __name__ == '__main__':
     print("=" * 60)
@@ -197,5 +773,8 @@ if __name__ == '__main__':
     print(f"Port: {SERVICE_PORT}")
     print(f"Local IP: {get_local_ip()}")
     print(f"Endpoints: /process-payment, /payment-status/<txn_id>")
+    print(f"Transaction store: {TRANSACTION_STORE_BACKEND}")
+    print(f"Payment rules: {len(PAYMENT_RULES.rules)} from {PAYMENT_RULES_PATH or '(none)'}")
     print("=" * 60)
-    app.run(host='0.0.0.0', port=SERVICE_PORT, debug=True)
+    start_pending_recovery()
+    app.run(host='0.0.0.0', port=SERVICE_PORT, debug=DEBUG)
@@ -0,0 +1,116 @@
+"""
+Idempotency Keys - VCC-3
+Remembers the response for each idempotency key so a retried /process-payment
+replays the original result instead of charging again
+Recent keys live in a bounded TTL + LRU cache; older ones fall back to the
+transaction store, which keeps the key with every transaction
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class IdempotencyCache:
+    """Bounded LRU cache of key -> transaction with per-entry expiry"""
+
+    def __init__(self, max_entries=10000, ttl_seconds=86400, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self.hits = 0
+        self.store_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """Return the cached transaction for key (refreshing its LRU position), or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, transaction = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                self.expirations += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return transaction
+
+    def put(self, key, transaction):
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl_seconds, transaction)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def lookup(self, key, store):
+        """Cache first, then the transaction store; counts hits and misses"""
+        transaction = self.get(key)
+        if transaction is not None:
+            return transaction
+        transaction = store.find_by_idempotency_key(key)
+        with self._lock:
+            if transaction is None:
+                self.misses += 1
+            else:
+                self.store_hits += 1
+        if transaction is not None:
+            self.put(key, transaction)
+        return transaction
+
+    def key_lock(self, key):
+        """
+        Context manager serialising requests that share a key in this process,
+        so a retry that arrives mid-payment waits for and replays the result
+        """
+        return _KeyLock(self, key)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.store_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "store_hits": self.store_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_ratio": round((self.hits + self.store_hits) / lookups, 4) if lookups else 0.0
+            }
+
+
+class _KeyLock:
+    """Reference-counted per-key lock; the entry is dropped when nobody holds it"""
+
+    def __init__(self, cache, key):
+        self.cache = cache
+        self.key = key
+
+    def __enter__(self):
+        with self.cache._lock:
+            lock, holders = self.cache._key_locks.get(self.key, (None, 0))
+            if lock is None:
+                lock = threading.Lock()
+            self.cache._key_locks[self.key] = (lock, holders + 1)
+        lock.acquire()
+        self.lock = lock
+        return self
+
+    def __exit__(self, *exc_info):
+        self.lock.release()
+        with self.cache._lock:
+            lock, holders = self.cache._key_locks[self.key]
+            if holders <= 1:
+                del self.cache._key_locks[self.key]
+            else:
+                self.cache._key_locks[self.key] = (lock, holders - 1)
+        return False
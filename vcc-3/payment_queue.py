@@ -0,0 +1,130 @@
+"""
+Payment Queue - VCC-3
+Bounded in-process queue of accepted payments, drained by a pool of worker
+threads that run the gateway call
+Intake only stores a pending transaction and enqueues it, so its latency
+does not depend on the gateway's. Capacity is reserved before the pending
+transaction is stored: when max_depth payments are already waiting,
+reserve() fails and the service answers 429 without storing anything
+Every worker process has its own queue; the pending transaction itself is
+in the shared transaction store, so any worker can report its status
+Worker threads start on first use, i.e. after a preloading server has forked
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+_STOP = object()
+
+
+class PaymentQueue:
+    """FIFO of pending payments with a fixed depth limit and worker pool"""
+
+    def __init__(self, process, max_depth=1000, workers=4, on_dequeue=None, clock=time.monotonic):
+        self.process = process          # called with each submitted item, in a worker thread
+        self.max_depth = max_depth
+        self.workers = workers
+        self.on_dequeue = on_dequeue    # called with the seconds an item waited in the queue
+        self._clock = clock
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._reserved = 0              # slots taken by reserve(), queued or about to be
+        self._busy = 0
+        self._threads = []
+        self._pid = None
+        self.accepted = 0
+        self.rejected = 0
+        self.processed = 0
+        self.failed = 0
+
+    def reserve(self):
+        """Take a queue slot for a payment about to be submitted; False when the queue is full"""
+        with self._cond:
+            if self._reserved >= self.max_depth:
+                self.rejected += 1
+                return False
+            self._reserved += 1
+            return True
+
+    def release(self):
+        """Give back a reserved slot that will not be submitted"""
+        with self._cond:
+            self._reserved -= 1
+
+    def submit(self, item):
+        """Queue an item for a slot taken with reserve()"""
+        with self._cond:
+            self._start_workers()
+            self._items.append((self._clock(), item))
+            self.accepted += 1
+            self._cond.notify()
+
+    def _start_workers(self):
+        # Called with self._cond held; threads do not survive fork(), so a
+        # queue created before a preloading server forks starts them here
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._threads = [
+            threading.Thread(target=self._work, name=f"payment-worker-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._items:
+                    self._cond.wait()
+                enqueued_at, item = self._items.popleft()
+                if item is _STOP:
+                    return
+                self._reserved -= 1
+                self._busy += 1
+            try:
+                if self.on_dequeue is not None:
+                    self.on_dequeue(self._clock() - enqueued_at)
+                self.process(item)
+                failed = False
+            except Exception as e:
+                print(f"[PaymentQueue] Processing failed: {e}")
+                failed = True
+            with self._cond:
+                self._busy -= 1
+                self.processed += 1
+                self.failed += failed
+
+    def depth(self):
+        """Payments accepted but not yet picked up by a worker"""
+        with self._cond:
+            return self._reserved
+
+    def close(self, timeout=None):
+        """Let the workers finish what is queued, then stop them; returns True if they all stopped"""
+        with self._cond:
+            if self._pid != os.getpid():
+                return True
+            for _ in self._threads:
+                self._items.append((self._clock(), _STOP))
+            self._cond.notify_all()
+            threads, self._threads, self._pid = self._threads, [], None
+        deadline = None if timeout is None else self._clock() + timeout
+        for thread in threads:
+            thread.join(None if deadline is None else max(0.0, deadline - self._clock()))
+        return not any(thread.is_alive() for thread in threads)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "depth": self._reserved,
+                "max_depth": self.max_depth,
+                "workers": self.workers,
+                "busy_workers": self._busy,
+                "accepted": self.accepted,
+                "rejected": self.rejected,
+                "processed": self.processed,
+                "failed": self.failed
+            }
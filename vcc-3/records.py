@@ -0,0 +1,135 @@
+"""
+Compact Transaction Records - VCC-3
+Memory-lean representation of a stored payment transaction
+A transaction dict costs a hash table plus its own copy of every string it
+was built from; at millions of retained transactions that overhead dominates.
+TransactionRecord keeps the same fields in __slots__, shares one instance of
+each low-cardinality value (status, method, currency, hotel, room type) and
+stores dates and timestamps as integers, which are only formatted back into
+ISO strings when the record is turned into a dict
+"""
+
+from datetime import date, datetime, timedelta
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+
+class Vocabulary:
+    """
+    Interned enum of a low-cardinality field: one shared instance per value
+    Once max_size distinct values are known, new ones are stored as given
+    """
+
+    def __init__(self, max_size=4096):
+        self.max_size = max_size
+        self._values = {}
+
+    def __call__(self, value):
+        if not isinstance(value, str):
+            return value
+        canonical = self._values.get(value)
+        if canonical is None:
+            if len(self._values) >= self.max_size:
+                return value
+            canonical = self._values.setdefault(value, value)
+        return canonical
+
+    def __len__(self):
+        return len(self._values)
+
+
+STATUSES = Vocabulary()
+PAYMENT_METHODS = Vocabulary()
+CURRENCIES = Vocabulary()
+HOTELS = Vocabulary()
+ROOM_TYPES = Vocabulary()
+REASONS = Vocabulary()
+
+
+def pack_date(value):
+    """YYYY-MM-DD -> date ordinal; anything else is kept as text (like the SQLite column)"""
+    if isinstance(value, str):
+        try:
+            day = date.fromisoformat(value)
+        except ValueError:
+            return value
+        return day.toordinal() if day.isoformat() == value else value
+    return value if value is None else str(value)
+
+
+def unpack_date(value):
+    return date.fromordinal(value).isoformat() if isinstance(value, int) else value
+
+
+def pack_timestamp(value):
+    """Naive ISO timestamp -> integer microseconds since 1970-01-01 (no timezone involved)"""
+    if isinstance(value, str):
+        try:
+            moment = datetime.fromisoformat(value)
+        except ValueError:
+            return value
+        if moment.tzinfo is None and moment.isoformat() == value:
+            return (moment - EPOCH) // MICROSECOND
+    return value
+
+
+def timestamp_key(value):
+    """
+    Any ISO timestamp -> integer microseconds since 1970-01-01, for range bounds
+    An aware timestamp is converted to local time, the time transactions are
+    stamped in; raises ValueError if value does not parse
+    """
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone().replace(tzinfo=None)
+    return (moment - EPOCH) // MICROSECOND
+
+
+def unpack_timestamp(value):
+    return (EPOCH + value * MICROSECOND).isoformat() if isinstance(value, int) else value
+
+
+class TransactionRecord:
+    """One stored transaction; seq is its position in the store (TXN id = base + seq)"""
+
+    __slots__ = (
+        "seq", "booking_id", "guest_name", "hotel_name", "room_type", "amount", "currency",
+        "payment_method", "status", "reason", "timestamp", "check_in", "check_out", "idempotency_key"
+    )
+
+    def __init__(self, seq, transaction):
+        self.seq = seq
+        self.booking_id = transaction.get("booking_id")
+        self.guest_name = transaction.get("guest_name")
+        self.hotel_name = HOTELS(transaction.get("hotel_name"))
+        self.room_type = ROOM_TYPES(transaction.get("room_type"))
+        self.amount = transaction.get("amount")
+        self.currency = CURRENCIES(transaction.get("currency"))
+        self.payment_method = PAYMENT_METHODS(transaction.get("payment_method"))
+        self.status = STATUSES(transaction.get("status"))
+        self.reason = REASONS(transaction.get("reason"))
+        self.timestamp = pack_timestamp(transaction.get("timestamp"))
+        self.check_in = pack_date(transaction.get("check_in"))
+        self.check_out = pack_date(transaction.get("check_out"))
+        key = transaction.get("idempotency_key")
+        # The key is usually the booking ID; share the string instead of copying it
+        self.idempotency_key = self.booking_id if key == self.booking_id else key
+
+    def to_dict(self, transaction_id):
+        return {
+            "transaction_id": transaction_id,
+            "booking_id": self.booking_id,
+            "guest_name": self.guest_name,
+            "hotel_name": self.hotel_name,
+            "room_type": self.room_type,
+            "amount": self.amount,
+            "currency": self.currency,
+            "payment_method": self.payment_method,
+            "status": self.status,
+            "reason": self.reason,
+            "timestamp": unpack_timestamp(self.timestamp),
+            "check_in": unpack_date(self.check_in),
+            "check_out": unpack_date(self.check_out),
+            "idempotency_key": self.idempotency_key
+        }
@@ -0,0 +1,322 @@
+"""
+Payment Rules - VCC-3
+Fraud and limit rules checked before a payment reaches the gateway
+Rules are read from payment_rules.json and compiled once into an
+evaluation plan: every rule becomes a check specialised to its settings,
+and the checks run cheapest and most likely to decline first, stopping at
+the first one that matches. A rule's cost is fixed by its type; its
+selectivity (the share of payments it is expected to decline, default
+0.01) may be set in the file and can be compared with the matched counts
+on /payment-rules
+payment_rules.json:
+  {"rules": [
+    {"name": "Amount limit", "type": "max_amount", "limit": 10000},
+    {"name": "Suspicious method", "type": "contains", "field": "payment_method", "patterns": ["xxx"]},
+    {"name": "Blocked guests", "type": "blocklist", "field": "guest_name", "values": ["Mallory"]},
+    {"name": "Guest velocity", "type": "velocity", "field": "guest_name",
+     "window_seconds": 3600, "max_payments": 10, "max_amount": 20000, "action": "monitor"}]}
+A velocity rule counts the payments (and their amounts) that passed every
+rule for each value of its field over a sliding window. A rule whose
+action is "monitor" never declines: it is evaluated for every payment the
+declining rules let through and only counts what it would have declined
+Velocity windows are per process unless the rules are given a shared
+velocity log (store.SQLiteVelocityLog): the Payment app passes its SQLite
+one, so a limit holds across every gunicorn worker on the host
+"""
+
+import json
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import nullcontext
+
+DECLINE = "decline"
+MONITOR = "monitor"
+
+# Relative cost of one evaluation by rule type, used to order the plan
+RULE_COSTS = {"max_amount": 1, "blocklist": 2, "contains": 3, "velocity": 10}
+DEFAULT_SELECTIVITY = 0.01
+DEFAULT_REASONS = {
+    "max_amount": "Amount exceeds maximum limit",
+    "blocklist": "Payment blocked",
+    "contains": "Invalid payment method detected",
+    "velocity": "Too many payments in a short time"
+}
+
+
+class PaymentRuleError(ValueError):
+    """Raised for a payment rule file that cannot be used"""
+
+
+def load_payment_rules(path):
+    """Read a payment rule file (see the module docstring); raises PaymentRuleError"""
+    try:
+        with open(path) as f:
+            config = json.load(f)
+    except (OSError, ValueError) as e:
+        raise PaymentRuleError(f"Cannot read payment rules from {path}: {e}")
+    if not isinstance(config, dict) or not isinstance(config.get("rules", []), list):
+        raise PaymentRuleError(f"{path}: payment rules must be a JSON object with a \"rules\" list")
+    return config
+
+
+def _number(rule, field, where, low, required=True):
+    value = rule.get(field)
+    if value is None and not required:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value < low:
+        raise PaymentRuleError(f"{where}: {field} must be a number of at least {low}")
+    return value
+
+
+def _names(rule, field, where):
+    values = rule.get(field)
+    if not isinstance(values, list) or not values or not all(isinstance(value, str) and value for value in values):
+        raise PaymentRuleError(f"{where}: {field} must be a list of strings")
+    return values
+
+
+class _Window:
+    """Payments of one key inside a velocity window"""
+    __slots__ = ("events", "total")
+
+    def __init__(self):
+        self.events = deque()  # (time, amount), oldest first
+        self.total = 0.0
+
+
+class _Velocity:
+    """Sliding-window payment count and amount per value of a field, LRU-bounded to max_keys"""
+
+    def __init__(self, window_seconds, max_payments, max_amount, max_keys):
+        self.window_seconds = window_seconds
+        self.max_payments = max_payments
+        self.max_amount = max_amount
+        self.max_keys = max_keys
+        self.windows = OrderedDict()
+
+    def _window(self, key, now):
+        window = self.windows.get(key)
+        if window is None:
+            return None
+        events, horizon = window.events, now - self.window_seconds
+        while events and events[0][0] <= horizon:
+            window.total -= events.popleft()[1]
+        if not events:
+            del self.windows[key]
+            return None
+        return window
+
+    def exceeded(self, key, amount, now):
+        window = self._window(key, now)
+        count, total = (len(window.events), window.total) if window is not None else (0, 0.0)
+        return (self.max_payments is not None and count + 1 > self.max_payments or
+                self.max_amount is not None and total + amount > self.max_amount)
+
+    def record(self, key, amount, now):
+        window = self._window(key, now)
+        if window is None:
+            window = self.windows[key] = _Window()
+        else:
+            self.windows.move_to_end(key)
+        window.events.append((now, amount))
+        window.total += amount
+        while len(self.windows) > self.max_keys:
+            self.windows.popitem(last=False)  # the key seen longest ago
+
+    def tracked_keys(self, now):
+        return len(self.windows)
+
+
+class _SharedVelocity:
+    """A velocity window kept in a shared velocity log, named after its rule"""
+
+    def __init__(self, log, rule, window_seconds, max_payments, max_amount):
+        self.log = log
+        self.rule = rule
+        self.window_seconds = window_seconds
+        self.max_payments = max_payments
+        self.max_amount = max_amount
+
+    def exceeded(self, key, amount, now):
+        count, total = self.log.window(self.rule, key, now - self.window_seconds)
+        return (self.max_payments is not None and count + 1 > self.max_payments or
+                self.max_amount is not None and total + amount > self.max_amount)
+
+    def record(self, key, amount, now):
+        self.log.record(self.rule, key, amount, now, now - self.window_seconds)
+
+    def tracked_keys(self, now):
+        return self.log.keys(self.rule, now - self.window_seconds)
+
+
+class _Rule:
+    __slots__ = ("name", "type", "action", "reason", "cost", "selectivity", "check", "velocity", "field",
+                 "limit", "evaluated", "matched")
+
+    def __init__(self, name, rule_type, action, reason, selectivity):
+        self.name = name
+        self.type = rule_type
+        self.action = action
+        self.reason = reason
+        self.cost = RULE_COSTS[rule_type]
+        self.selectivity = selectivity
+        self.check = None     # check(payment, now) -> True when the rule matches
+        self.velocity = None  # _Velocity of a velocity rule
+        self.field = None
+        self.limit = None     # amount limit of a max_amount rule
+        self.evaluated = 0
+        self.matched = 0
+
+
+def _amount(payment):
+    amount = payment.get("amount")
+    return amount if isinstance(amount, (int, float)) and not isinstance(amount, bool) else None
+
+
+class PaymentRules:
+    """
+    Compiled payment rules; evaluate() returns the first declining rule that
+    matches a payment as (name, reason), or None when it may be charged
+    Evaluation holds a lock so that a velocity limit is checked and counted
+    as one step (two payments at once cannot both take the last one); with
+    a velocity_log it also holds that log's write transaction, and the
+    default clock is the wall clock every process shares
+    """
+
+    def __init__(self, config, max_keys=100000, clock=None, velocity_log=None):
+        self.max_keys = max_keys
+        self.velocity_log = velocity_log
+        self._clock = clock or (time.time if velocity_log is not None else time.monotonic)
+        self._lock = threading.Lock()
+        self.rules = [self._compile(rule, f"rules[{i}]") for i, rule in enumerate(config.get("rules", []))]
+        names = [rule.name for rule in self.rules]
+        duplicates = sorted({name for name in names if names.count(name) > 1})
+        if duplicates:
+            raise PaymentRuleError(f"Duplicate rule names: {', '.join(duplicates)}")
+        # Short-circuit order: lowest expected cost per decline first (ties keep file order)
+        self._plan = tuple(sorted((rule for rule in self.rules if rule.action == DECLINE),
+                                  key=lambda rule: rule.cost / rule.selectivity))
+        self._monitors = tuple(rule for rule in self.rules if rule.action == MONITOR)
+        self._velocities = tuple(rule for rule in self.rules if rule.velocity is not None)
+        self.evaluations = 0
+
+    def _compile(self, rule, where):
+        if not isinstance(rule, dict):
+            raise PaymentRuleError(f"{where} must be an object")
+        rule_type = rule.get("type")
+        if rule_type not in RULE_COSTS:
+            raise PaymentRuleError(f"{where}: type must be one of {', '.join(RULE_COSTS)}")
+        action = rule.get("action", DECLINE)
+        if action not in (DECLINE, MONITOR):
+            raise PaymentRuleError(f"{where}: action must be {DECLINE} or {MONITOR}")
+        selectivity = _number(rule, "selectivity", where, 0, required=False)
+        if selectivity is None:
+            selectivity = DEFAULT_SELECTIVITY
+        # A rule expected never to match still runs, just last
+        selectivity = min(1.0, max(selectivity, 1e-9))
+        compiled = _Rule(rule.get("name") or where, rule_type, action,
+                         rule.get("reason") or DEFAULT_REASONS[rule_type], selectivity)
+        field = rule.get("field", "payment_method" if rule_type == "contains" else "guest_name")
+        if not isinstance(field, str) or not field:
+            raise PaymentRuleError(f"{where}: field must be the name of a payment field")
+        compiled.field = field
+
+        if rule_type == "max_amount":
+            limit = compiled.limit = _number(rule, "limit", where, 0)
+
+            def check(payment, now):
+                amount = _amount(payment)
+                return amount is not None and amount > limit
+
+        elif rule_type == "blocklist":
+            blocked = frozenset(value.strip().casefold() for value in _names(rule, "values", where))
+
+            def check(payment, now):
+                value = payment.get(field)
+                return isinstance(value, str) and value.strip().casefold() in blocked
+
+        elif rule_type == "contains":
+            patterns = [pattern.lower() for pattern in _names(rule, "patterns", where)]
+            if len(patterns) == 1:
+                pattern = patterns[0]
+
+                def check(payment, now):
+                    value = payment.get(field)
+                    return isinstance(value, str) and pattern in value.lower()
+            else:
+                search = re.compile("|".join(map(re.escape, patterns)), re.IGNORECASE).search
+
+                def check(payment, now):
+                    value = payment.get(field)
+                    return isinstance(value, str) and search(value) is not None
+
+        else:
+            max_payments = _number(rule, "max_payments", where, 1, required=False)
+            max_amount = _number(rule, "max_amount", where, 0, required=False)
+            if max_payments is None and max_amount is None:
+                raise PaymentRuleError(f"{where}: a velocity rule needs max_payments, max_amount or both")
+            window_seconds = _number(rule, "window_seconds", where, 1)
+            if self.velocity_log is not None:
+                velocity = _SharedVelocity(self.velocity_log, compiled.name, window_seconds, max_payments, max_amount)
+            else:
+                velocity = _Velocity(window_seconds, max_payments, max_amount, self.max_keys)
+            compiled.velocity = velocity
+
+            def check(payment, now):
+                key = payment.get(field)
+                return isinstance(key, str) and velocity.exceeded(key, _amount(payment) or 0.0, now)
+
+        compiled.check = check
+        return compiled
+
+    @property
+    def max_amount(self):
+        """The lowest amount limit that declines, or None"""
+        return min((rule.limit for rule in self._plan if rule.type == "max_amount"), default=None)
+
+    def evaluate(self, payment, record=True):
+        """
+        (name, reason) of the declining rule that matches payment, or None
+        With record=False (a pre-check) velocity windows are read, not counted
+        """
+        shared = self.velocity_log is not None and record and self._velocities
+        with self._lock, (self.velocity_log.transaction() if shared else nullcontext()):
+            now = self._clock() if self._velocities else 0.0
+            self.evaluations += 1
+            for rule in self._plan:
+                rule.evaluated += 1
+                if rule.check(payment, now):
+                    rule.matched += 1
+                    return rule.name, rule.reason
+            for rule in self._monitors:
+                rule.evaluated += 1
+                if rule.check(payment, now):
+                    rule.matched += 1
+            if record:
+                for rule in self._velocities:
+                    key = payment.get(rule.field)
+                    if isinstance(key, str):
+                        rule.velocity.record(key, _amount(payment) or 0.0, now)
+            return None
+
+    def stats(self):
+        with self._lock:
+            now = self._clock()
+            return {
+                "evaluations": self.evaluations,
+                "rules": [
+                    {
+                        "name": rule.name,
+                        "type": rule.type,
+                        "action": rule.action,
+                        "cost": rule.cost,
+                        "selectivity": rule.selectivity,
+                        "evaluated": rule.evaluated,
+                        "matched": rule.matched,
+                        **({"tracked_keys": rule.velocity.tracked_keys(now)} if rule.velocity is not None else {})
+                    }
+                    for rule in self._plan + self._monitors
+                ]
+            }
@@ -0,0 +1,86 @@
+"""
+Production Server - VCC-3 Payment
+Serves app.py with gunicorn instead of the Flask development server:
+debug off, gthread workers (keep-alive), optional preloading and a graceful
+shutdown that lets in-flight requests finish before app.shutdown() runs
+Transactions are in the shared SQLite store, so any number of workers is safe;
+each worker also runs a recovery thread (started after the fork) for
+payments a dead worker's queue left pending
+Settings come from flags or environment variables:
+  WEB_BIND, WEB_WORKERS, WEB_THREADS, WEB_PRELOAD, WEB_GRACEFUL_TIMEOUT
+Run with: python serve.py [--workers N] [--threads N] [--no-preload]
+"""
+
+import argparse
+import multiprocessing
+import os
+
+from gunicorn.app.base import BaseApplication
+
+DEFAULT_BIND = "0.0.0.0:5003"  # SERVICE_PORT in app.py
+DEFAULT_WORKERS = multiprocessing.cpu_count() * 2 + 1
+DEFAULT_THREADS = 4
+DEFAULT_GRACEFUL_TIMEOUT = 30  # seconds in-flight requests get after SIGTERM
+
+
+class ServiceApplication(BaseApplication):
+    """Embedded gunicorn application serving the Flask app"""
+
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        # Runs once in the master with preload_app, otherwise in every worker
+        import app as service
+        return service.app
+
+
+def post_worker_init(worker):
+    """gunicorn hook: the worker process is ready; threads must start here, after the fork"""
+    import app as service
+    service.start_pending_recovery()
+
+
+def worker_exit(server, worker):
+    """gunicorn hook: the worker has drained its requests and is exiting"""
+    import app as service
+    service.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the Payment service with gunicorn")
+    parser.add_argument("--bind", default=os.environ.get("WEB_BIND", DEFAULT_BIND))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("WEB_WORKERS", DEFAULT_WORKERS)))
+    parser.add_argument("--threads", type=int, default=int(os.environ.get("WEB_THREADS", DEFAULT_THREADS)))
+    parser.add_argument("--no-preload", action="store_true",
+                        default=os.environ.get("WEB_PRELOAD", "1") == "0",
+                        help="import the app in each worker instead of once in the master")
+    parser.add_argument("--graceful-timeout", type=int,
+                        default=int(os.environ.get("WEB_GRACEFUL_TIMEOUT", DEFAULT_GRACEFUL_TIMEOUT)))
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"Serving Payment on {args.bind} "
+          f"({args.workers} workers x {args.threads} threads, preload={not args.no_preload})")
+    print("=" * 60)
+    ServiceApplication({
+        "bind": args.bind,
+        "workers": args.workers,
+        "threads": args.threads,
+        "worker_class": "gthread",
+        "preload_app": not args.no_preload,
+        "graceful_timeout": args.graceful_timeout,
+        "keepalive": 30,
+        "post_worker_init": post_worker_init,
+        "worker_exit": worker_exit,
+        "loglevel": "warning"
+    }).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,504 @@
+"""
+Transaction Store - VCC-3
+Pluggable storage for payment transactions
+MemoryTransactionStore keeps the original process-local behaviour;
+SQLiteTransactionStore is shared by every worker process and thread on the
+host (WAL journal, one connection per thread) and hands out transaction IDs
+inside the insert itself, so two workers can never produce the same ID
+Each transaction may carry a unique idempotency_key
+A pending transaction is settled by whichever worker leases it
+(claim_pending, claim_stale_pending), so one left behind by a stopped or
+crashed worker can be picked up by another and is never settled twice
+Both backends keep secondary indexes (booking, status, hotel) for
+iter_transactions, which pages through filtered results in transaction ID
+order without materialising them
+SQLiteVelocityLog keeps the payments counted by velocity rules (see
+rules.py) in the same database, so every worker counts every payment
+"""
+
+from contextlib import contextmanager
+import os
+from array import array
+from bisect import bisect_left, bisect_right
+import sqlite3
+import threading
+
+from records import TransactionRecord, REASONS, STATUSES, timestamp_key
+
+TRANSACTION_ID_BASE = 1000  # first transaction is TXN1001, as before
+
+COLUMNS = [
+    "transaction_id", "booking_id", "guest_name", "hotel_name", "room_type",
+    "amount", "currency", "payment_method", "status", "reason", "timestamp",
+    "check_in", "check_out", "idempotency_key"
+]
+
+
+FILTERS = ["booking_id", "status", "hotel_name"]
+
+
+def transaction_seq(transaction_id):
+    """Position of a transaction in insertion order (TXN1001 -> 1); ValueError if malformed"""
+    if not transaction_id or not transaction_id.startswith("TXN"):
+        raise ValueError(f"Invalid transaction ID: {transaction_id}")
+    return int(transaction_id[3:]) - TRANSACTION_ID_BASE
+
+
+class DuplicateKeyError(Exception):
+    """Another transaction already holds this idempotency key"""
+
+    def __init__(self, existing):
+        super().__init__(f"Idempotency key already used by {existing.get('transaction_id')}")
+        self.existing = existing
+
+
+class TransactionStore:
+    """Interface shared by the transaction store backends"""
+
+    def add(self, transaction):
+        """Store a new transaction, assign and return its transaction_id"""
+        raise NotImplementedError
+
+    def get(self, transaction_id):
+        """Return the transaction dict, or None"""
+        raise NotImplementedError
+
+    def update_status(self, transaction_id, status, reason=None):
+        """Set the outcome of a pending transaction; returns False if it does not exist"""
+        raise NotImplementedError
+
+    def find_by_booking(self, booking_id):
+        """Return all transactions for a booking, oldest first"""
+        raise NotImplementedError
+
+    def find_by_idempotency_key(self, key):
+        """Return the transaction stored under an idempotency key, or None"""
+        raise NotImplementedError
+
+    def claim_pending(self, transaction_id, now, lease_until):
+        """Lease a pending transaction until lease_until unless it is leased at now; True if claimed"""
+        raise NotImplementedError
+
+    def claim_stale_pending(self, before, now, lease_until, limit=100):
+        """
+        Lease up to limit pending transactions stored at or before the ISO
+        timestamp before and not leased at now; returns them, oldest first
+        """
+        raise NotImplementedError
+
+    def iter_transactions(self, filters=None, since=None, until=None, after=0, limit=None):
+        """
+        Yield transactions in transaction ID order, lazily
+        filters maps FILTERS fields to exact values; since/until bound the
+        ISO timestamp (inclusive); after is the transaction_seq to resume after
+        """
+        raise NotImplementedError
+
+    def count(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class MemoryTransactionStore(TransactionStore):
+    """
+    Process-local store; only correct with a single worker process
+    Transactions are kept as compact TransactionRecords in insertion order
+    and turned back into dicts when read
+    """
+
+    def __init__(self):
+        self._records = []   # record for seq n is at position n - 1
+        self._by_key = {}    # idempotency key -> seq
+        self._indexes = {field: {} for field in FILTERS}  # field -> value -> seq or array of seqs
+        self._leases = {}    # seq -> lease_until, for pending transactions claimed once
+        self._lock = threading.Lock()
+
+    def add(self, transaction):
+        key = transaction.get("idempotency_key")
+        with self._lock:
+            if key is not None and key in self._by_key:
+                raise DuplicateKeyError(self._dict(self._by_key[key]))
+            seq = len(self._records) + 1
+            record = TransactionRecord(seq, transaction)
+            self._records.append(record)
+            for field, index in self._indexes.items():
+                _index_add(index, getattr(record, field), seq)
+            if key is not None:
+                self._by_key[record.idempotency_key] = seq
+        transaction_id = f"TXN{TRANSACTION_ID_BASE + seq}"
+        transaction["transaction_id"] = transaction_id
+        return transaction_id
+
+    def _dict(self, seq):
+        return self._records[seq - 1].to_dict(f"TXN{TRANSACTION_ID_BASE + seq}")
+
+    def update_status(self, transaction_id, status, reason=None):
+        try:
+            seq = transaction_seq(transaction_id)
+        except ValueError:
+            return False
+        with self._lock:
+            if not 0 < seq <= len(self._records):
+                return False
+            record = self._records[seq - 1]
+            index = self._indexes["status"]
+            _index_remove(index, record.status, seq)
+            record.status = STATUSES(status)
+            record.reason = REASONS(reason)
+            _index_add(index, record.status, seq)
+            self._leases.pop(seq, None)
+        return True
+
+    def get(self, transaction_id):
+        try:
+            seq = transaction_seq(transaction_id)
+        except ValueError:
+            return None
+        return self._dict(seq) if 0 < seq <= len(self._records) else None
+
+    def find_by_booking(self, booking_id):
+        return list(self.iter_transactions({"booking_id": booking_id}))
+
+    def find_by_idempotency_key(self, key):
+        seq = self._by_key.get(key)
+        return self._dict(seq) if seq else None
+
+    def claim_pending(self, transaction_id, now, lease_until):
+        try:
+            seq = transaction_seq(transaction_id)
+        except ValueError:
+            return False
+        with self._lock:
+            return self._claim(seq, now, lease_until)
+
+    def _claim(self, seq, now, lease_until):
+        # Called with self._lock held
+        if not 0 < seq <= len(self._records) or self._records[seq - 1].status != "pending":
+            return False
+        if self._leases.get(seq, 0) >= now:
+            return False
+        self._leases[seq] = lease_until
+        return True
+
+    def claim_stale_pending(self, before, now, lease_until, limit=100):
+        claimed = []
+        for transaction in self.iter_transactions({"status": "pending"}, until=before):
+            with self._lock:
+                if self._claim(transaction_seq(transaction["transaction_id"]), now, lease_until):
+                    claimed.append(transaction)
+            if len(claimed) >= limit:
+                break
+        return claimed
+
+    def iter_transactions(self, filters=None, since=None, until=None, after=0, limit=None):
+        filters = {field: value for field, value in (filters or {}).items() if value is not None}
+        since_key = timestamp_key(since) if since else None
+        until_key = timestamp_key(until) if until else None
+        with self._lock:
+            # Walk the shortest matching index (or every transaction) from
+            # after, up to the last transaction stored when iteration began
+            end = len(self._records)
+            if filters:
+                candidates = min(
+                    (_index_get(self._indexes[field], value) for field, value in filters.items()), key=len
+                )
+            else:
+                candidates = None
+        # Resume by seq rather than by position: update_status() may insert
+        # into or remove from an index while this generator is suspended
+        yielded = 0
+        last = after
+        while limit is None or yielded < limit:
+            if candidates is not None:
+                position = bisect_right(candidates, last)
+                if position >= len(candidates) or candidates[position] > end:
+                    return
+                seq = candidates[position]
+            else:
+                seq = last + 1
+                if seq > end:
+                    return
+            last = seq
+            record = self._records[seq - 1]
+            if any(getattr(record, field) != value for field, value in filters.items()):
+                continue
+            if since or until:
+                timestamp = record.timestamp
+                if not isinstance(timestamp, int):
+                    timestamp, low, high = timestamp or "", since, until
+                else:
+                    low, high = since_key, until_key
+                if (low and timestamp < low) or (high and timestamp > high):
+                    continue
+            yielded += 1
+            yield record.to_dict(f"TXN{TRANSACTION_ID_BASE + seq}")
+
+    def count(self):
+        return len(self._records)
+
+
+def _index_add(index, value, seq):
+    # Most values (e.g. a booking ID) have one transaction: keep a bare int
+    # until a second one arrives, then switch to a compact int64 array
+    # Arrays stay sorted; seqs arrive in order except from update_status()
+    existing = index.get(value)
+    if existing is None:
+        index[value] = seq
+    elif isinstance(existing, int):
+        index[value] = array("q", sorted((existing, seq)))
+    elif not existing or seq > existing[-1]:
+        existing.append(seq)
+    else:
+        existing.insert(bisect_right(existing, seq), seq)
+
+
+def _index_remove(index, value, seq):
+    existing = index.get(value)
+    if existing is None:
+        return
+    if isinstance(existing, int):
+        if existing == seq:
+            del index[value]
+        return
+    position = bisect_left(existing, seq)
+    if position < len(existing) and existing[position] == seq:
+        del existing[position]
+    if not existing:
+        del index[value]
+
+
+def _index_get(index, value):
+    existing = index.get(value)
+    if existing is None:
+        return ()
+    return (existing,) if isinstance(existing, int) else existing
+
+
+class _SQLiteDatabase:
+    """
+    One connection per thread to a SQLite file in WAL mode
+    Readers never block the writer; concurrent writers wait up to
+    busy_timeout_ms for the write lock
+    """
+
+    def __init__(self, path, busy_timeout_ms=5000):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        self._create_schema()
+
+    def _create_schema(self):
+        raise NotImplementedError
+
+    def _connection(self):
+        # Connections are per thread and per process: a connection inherited
+        # through fork() (e.g. a preloading server) must not be reused
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+            self._local.conn = None
+
+
+class SQLiteTransactionStore(_SQLiteDatabase, TransactionStore):
+    """SQLite store (see _SQLiteDatabase), safe across threads and worker processes"""
+
+    def _create_schema(self):
+        conn = self._connection()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS transactions (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                transaction_id TEXT UNIQUE,
+                booking_id TEXT,
+                guest_name TEXT,
+                hotel_name TEXT,
+                room_type TEXT,
+                amount REAL,
+                currency TEXT,
+                payment_method TEXT,
+                status TEXT,
+                reason TEXT,
+                timestamp TEXT,
+                check_in TEXT,
+                check_out TEXT,
+                idempotency_key TEXT,
+                lease_until REAL NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_transactions_booking ON transactions (booking_id);
+            CREATE INDEX IF NOT EXISTS idx_transactions_status ON transactions (status);
+            CREATE INDEX IF NOT EXISTS idx_transactions_hotel ON transactions (hotel_name);
+            CREATE INDEX IF NOT EXISTS idx_transactions_timestamp ON transactions (timestamp);
+        """)
+        existing = {row["name"] for row in conn.execute("PRAGMA table_info(transactions)")}
+        if "idempotency_key" not in existing:
+            conn.execute("ALTER TABLE transactions ADD COLUMN idempotency_key TEXT")
+        if "lease_until" not in existing:
+            conn.execute("ALTER TABLE transactions ADD COLUMN lease_until REAL NOT NULL DEFAULT 0")
+        conn.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_transactions_idempotency ON transactions (idempotency_key)"
+        )
+
+    def add(self, transaction):
+        conn = self._connection()
+        values = [transaction.get(column) for column in COLUMNS[1:]]
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = conn.execute(
+                f"INSERT INTO transactions ({', '.join(COLUMNS[1:])}) VALUES ({', '.join('?' * len(values))})",
+                values
+            )
+            transaction_id = f"TXN{TRANSACTION_ID_BASE + cursor.lastrowid}"
+            conn.execute("UPDATE transactions SET transaction_id = ? WHERE seq = ?", (transaction_id, cursor.lastrowid))
+            conn.execute("COMMIT")
+        except sqlite3.IntegrityError:
+            conn.execute("ROLLBACK")
+            existing = self.find_by_idempotency_key(transaction.get("idempotency_key"))
+            if existing is None:
+                raise
+            raise DuplicateKeyError(existing)
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        transaction["transaction_id"] = transaction_id
+        return transaction_id
+
+    def get(self, transaction_id):
+        row = self._connection().execute(
+            f"SELECT {', '.join(COLUMNS)} FROM transactions WHERE transaction_id = ?", (transaction_id,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def find_by_booking(self, booking_id):
+        rows = self._connection().execute(
+            f"SELECT {', '.join(COLUMNS)} FROM transactions WHERE booking_id = ? ORDER BY seq", (booking_id,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def update_status(self, transaction_id, status, reason=None):
+        cursor = self._connection().execute(
+            "UPDATE transactions SET status = ?, reason = ? WHERE transaction_id = ?",
+            (status, reason, transaction_id)
+        )
+        return cursor.rowcount > 0
+
+    def find_by_idempotency_key(self, key):
+        row = self._connection().execute(
+            f"SELECT {', '.join(COLUMNS)} FROM transactions WHERE idempotency_key = ?", (key,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def claim_pending(self, transaction_id, now, lease_until):
+        cursor = self._connection().execute(
+            "UPDATE transactions SET lease_until = ? WHERE transaction_id = ? AND status = 'pending'"
+            " AND lease_until < ?", (lease_until, transaction_id, now)
+        )
+        return cursor.rowcount == 1
+
+    def claim_stale_pending(self, before, now, lease_until, limit=100):
+        rows = self._connection().execute(
+            f"SELECT {', '.join(COLUMNS)} FROM transactions WHERE status = 'pending' AND timestamp <= ?"
+            " AND lease_until < ? ORDER BY seq LIMIT ?", (before, now, limit)
+        ).fetchall()
+        # Another worker's sweep may claim the same rows: the conditional update decides
+        return [dict(row) for row in rows if self.claim_pending(row["transaction_id"], now, lease_until)]
+
+    def iter_transactions(self, filters=None, since=None, until=None, after=0, limit=None):
+        # Keyset pagination on seq (= transaction_seq), which every index
+        # above is ordered by within a key, so no page ever needs an OFFSET
+        clauses = ["seq > ?"]
+        params = [after]
+        for field, value in (filters or {}).items():
+            if value is not None:
+                clauses.append(f"{field} = ?")
+                params.append(value)
+        if since:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until:
+            clauses.append("timestamp <= ?")
+            params.append(until)
+        query = f"SELECT {', '.join(COLUMNS)} FROM transactions WHERE {' AND '.join(clauses)} ORDER BY seq"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        for row in self._connection().execute(query, params):
+            yield dict(row)
+
+    def count(self):
+        return self._connection().execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+
+
+class SQLiteVelocityLog(_SQLiteDatabase):
+    """
+    Payments counted by velocity rules, as (rule, key, time, amount) rows
+    Rows older than a rule's window are deleted as new ones are recorded;
+    a check and its record run in one write transaction (transaction())
+    so two workers cannot both take a guest's last payment
+    """
+
+    def _create_schema(self):
+        self._connection().executescript("""
+            CREATE TABLE IF NOT EXISTS velocity_events (
+                rule TEXT,
+                key TEXT,
+                time REAL,
+                amount REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_velocity_key ON velocity_events (rule, key, time);
+            CREATE INDEX IF NOT EXISTS idx_velocity_time ON velocity_events (rule, time);
+        """)
+
+    @contextmanager
+    def transaction(self):
+        """Hold the database write lock for the block (BEGIN IMMEDIATE)"""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def window(self, rule, key, since):
+        """(count, total amount) of a key's payments after since"""
+        count, total = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(amount), 0) FROM velocity_events "
+            "WHERE rule = ? AND key = ? AND time > ?", (rule, key, since)
+        ).fetchone()
+        return count, total
+
+    def record(self, rule, key, amount, now, since):
+        """Count a payment at now, forgetting the rule's payments up to since"""
+        conn = self._connection()
+        conn.execute("DELETE FROM velocity_events WHERE rule = ? AND time <= ?", (rule, since))
+        conn.execute("INSERT INTO velocity_events (rule, key, time, amount) VALUES (?, ?, ?, ?)",
+                     (rule, key, now, amount))
+
+    def keys(self, rule, since):
+        """Number of keys with payments after since"""
+        return self._connection().execute(
+            "SELECT COUNT(DISTINCT key) FROM velocity_events WHERE rule = ? AND time > ?", (rule, since)
+        ).fetchone()[0]
+
+
+def create_store(backend, path=None):
+    """Build the configured store: "memory" or "sqlite" (path required)"""
+    if backend == "memory":
+        return MemoryTransactionStore()
+    if backend == "sqlite":
+        return SQLiteTransactionStore(path)
+    raise ValueError(f"Unknown transaction store backend: {backend}")